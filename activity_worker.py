@@ -6,10 +6,43 @@ do workflow. Ele faz polling na task list, executa as atividades
 e reporta os resultados de volta ao SWF.
 """
 
-import json
+import asyncio
+import inspect
+import os
+import socket
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
 from swf_client import SWFClient
 from config import Config
+from heartbeat import ActivityCancelled, HeartbeatManager
+from codec import decode, encode
+from payload_store import dehydrate, hydrate
+from poller_control import PollerController, drain
+from process_lane import ProcessLane, is_process_lane, process_lane
+import metrics
+import tracing
+import structured_log
+
+
+logger = structured_log.get_logger(__name__)
+
+
+def process_data_task(input_data):
+    """
+    Lógica de ProcessData, no nível de módulo para poder rodar no pool
+    de processos (ver ``ActivityWorker.process_data``).
+    """
+    logger.debug('activity_executing', activity='ProcessData')
+    time.sleep(1)  # Simula processamento demorado
+    
+    return {
+        'status': 'processed',
+        'order_id': input_data.get('order_id'),
+        'processed_items': input_data.get('items', []),
+        'processed_at': time.time()
+    }
+
 
 class ActivityWorker:
     """
@@ -21,20 +54,44 @@ class ActivityWorker:
     3. Executa a lógica de negócio de cada atividade
     4. Reporta sucesso ou falha de volta ao SWF
     """
-    def __init__(self):
+    def __init__(self, identity=None):
         """
         Inicializa o Activity Worker.
         
         Cria uma instância do cliente SWF e mapeia nomes de atividades
         para seus métodos de implementação correspondentes.
+        
+        Args:
+            identity (str): Identificador deste worker nos polls do SWF.
+                Padrão: ``activity-worker-<host>-<pid>``
         """
         self.swf_client = SWFClient()
+        self.identity = identity or f"activity-worker-{socket.gethostname()}-{os.getpid()}"
+        
+        # Sinaliza às threads de polling que devem encerrar
+        self._stop_event = threading.Event()
+        
+        # Controle adaptativo de pollers (criado pelo modo concorrente)
+        self.poller_controller = None
+        
+        # Heartbeats automáticos de todas as tarefas em execução
+        self.heartbeats = HeartbeatManager(self.swf_client)
+        
+        # Pool de processos para handlers CPU-bound (desativado se 0 workers)
+        self.process_lane = None
+        if Config.PROCESS_POOL_WORKERS > 0:
+            self.process_lane = ProcessLane(
+                Config.PROCESS_POOL_WORKERS,
+                Config.PROCESS_POOL_MAX_TASKS_PER_CHILD
+            )
         
         # Mapeamento de nomes de atividades para métodos de implementação
-        # Permite adicionar novas atividades facilmente
+        # Permite adicionar novas atividades facilmente; handlers podem ser
+        # funções comuns, ``async def`` (ver async_runtime.py) ou marcadas com
+        # ``process_lane`` para rodar no pool de processos (ver process_lane.py)
         self.activities = {
             'ValidateInput': self.validate_input,           # Valida dados de entrada
-            'ProcessData': self.process_data,               # Processa dados principais
+            'ProcessData': process_lane(process_data_task), # Processa dados (CPU-bound)
             'EnrichData': self.enrich_data,                 # Enriquece com dados adicionais
             'SaveResults': self.save_results,               # Persiste resultados
             'NotifyCompletion': self.notify_completion,     # Notifica conclusão
@@ -63,13 +120,13 @@ class ActivityWorker:
                     defaultTaskStartToCloseTimeout=Config.ACTIVITY_TASK_TIMEOUT,
                     defaultTaskScheduleToCloseTimeout=Config.ACTIVITY_SCHEDULE_TO_CLOSE_TIMEOUT,
                     defaultTaskScheduleToStartTimeout=Config.ACTIVITY_SCHEDULE_TO_START_TIMEOUT,
-                    defaultTaskHeartbeatTimeout='60',  # Heartbeat a cada 60 segundos
+                    defaultTaskHeartbeatTimeout=Config.ACTIVITY_HEARTBEAT_TIMEOUT,
                     description=f'Activity: {activity_name}'
                 )
-                print(f"Activity '{activity_name}' registered successfully")
+                logger.info('activity_type_registered', activity=activity_name)
             except self.swf_client.client.exceptions.TypeAlreadyExistsException:
                 # Atividade já registrada, não é um erro
-                print(f"Activity '{activity_name}' already exists")
+                logger.info('activity_type_exists', activity=activity_name)
     
     def poll_for_activity_task(self):
         """
@@ -79,31 +136,148 @@ class ActivityWorker:
         aguardando por novas tarefas de atividade. Quando uma tarefa é recebida,
         ela é processada imediatamente.
         
-        O loop continua indefinidamente até que o processo seja interrompido.
-        Em caso de erro, aguarda 5 segundos antes de tentar novamente.
+        O loop continua até que o processo seja interrompido ou ``stop()``
+        seja chamado. Esperas entre polls e o backoff após erros vêm do
+        ``PollerController``. Para várias tarefas em paralelo, use
+        ``run_concurrent``.
+        """
+        logger.info('activity_polling_started', task_list=self.swf_client.task_list)
+        metrics.maybe_start_server()
+        
+        controller = PollerController('activity')
+        controller.run(
+            self.poll_activity_task,
+            lambda task, _identity: self.handle_activity_task(task),
+            self.identity,
+            self._stop_event
+        )
+    
+    def poll_activity_task(self, identity):
+        """
+        Executa um único long poll na task list de atividades.
+        
+        Args:
+            identity (str): Identificador de quem está fazendo o poll
+            
+        Returns:
+            dict | None: Tarefa recebida ou None se nenhuma estava disponível
+        """
+        # Long polling: aguarda até 60 segundos por uma tarefa
+        with tracing.span('poll_activity_task') as span:
+            response = self.swf_client.client.poll_for_activity_task(
+                domain=self.swf_client.domain,
+                taskList={'name': self.swf_client.task_list},
+                identity=identity
+            )
+            span.set_attribute('poll.got_task', bool(response.get('taskToken')))
+        
+        # Se taskToken está presente, há uma tarefa para processar
+        return response if response.get('taskToken') else None
+    
+    def poll_once(self, identity):
         """
-        print(f"Polling for activity tasks on task list: {self.swf_client.task_list}")
+        Busca e executa, na própria thread, no máximo uma tarefa.
+        
+        Args:
+            identity (str): Identificador de quem está fazendo o poll
+            
+        Returns:
+            bool: True se uma tarefa foi recebida e processada
+        """
+        task = self.poll_activity_task(identity)
+        if task is None:
+            return False
+        self.handle_activity_task(task)
+        return True
+    
+    def run_concurrent(self, pollers=None, max_in_flight=None, min_pollers=None):
+        """
+        Executa o worker com várias threads de polling e execução.
+        
+        As threads de polling fazem long polling em paralelo e entregam as
+        tarefas a um pool limitado a ``max_in_flight`` execuções
+        simultâneas. Cada poller reserva uma vaga antes de fazer o poll:
+        com o pool cheio, os pollers param de buscar tarefas (backpressure)
+        em vez de aceitar trabalho que não conseguem iniciar.
         
-        while True:
+        O número de pollers varia entre ``min_pollers`` e ``pollers``
+        conforme o backlog, a latência e a taxa de polls vazios
+        (ver poller_control.PollerController).
+        
+        Bloqueia até ``stop()`` ser chamado.
+        
+        Args:
+            pollers (int): Máximo de threads de polling (padrão: Config.ACTIVITY_POLLERS)
+            max_in_flight (int): Máximo de tarefas em execução (padrão: Config.ACTIVITY_MAX_IN_FLIGHT)
+            min_pollers (int): Mínimo de threads de polling (padrão: Config.POLLER_MIN_POLLERS)
+        """
+        pollers = pollers or Config.ACTIVITY_POLLERS
+        max_in_flight = max_in_flight or Config.ACTIVITY_MAX_IN_FLIGHT
+        min_pollers = min_pollers or Config.POLLER_MIN_POLLERS
+        slots = threading.BoundedSemaphore(max_in_flight)
+        
+        self.poller_controller = PollerController(
+            'activity',
+            min_pollers=min_pollers,
+            max_pollers=pollers,
+            count_pending=self.count_pending_tasks
+        )
+        
+        logger.info('activity_polling_started', task_list=self.swf_client.task_list,
+                    min_pollers=min_pollers, max_pollers=pollers, max_in_flight=max_in_flight)
+        metrics.maybe_start_server()
+        
+        def poll(identity):
+            # Backpressure: só faz poll quando há vaga para executar a tarefa
+            while not slots.acquire(timeout=1):
+                if self._stop_event.is_set():
+                    return None
             try:
-                # Long polling: aguarda até 60 segundos por uma tarefa
-                response = self.swf_client.client.poll_for_activity_task(
-                    domain=self.swf_client.domain,
-                    taskList={'name': self.swf_client.task_list},
-                    identity='activity-worker-1'  # Identificador único deste worker
-                )
-                
-                # Se taskToken está presente, há uma tarefa para processar
-                if 'taskToken' in response:
-                    self.handle_activity_task(response)
-                else:
-                    # Nenhuma tarefa disponível no momento
-                    print("No activity task available, waiting...")
-                    time.sleep(2)
-                    
-            except Exception as e:
-                print(f"Error polling for activity task: {e}")
-                time.sleep(5)  # Aguarda antes de tentar novamente
+                task = self.poll_activity_task(identity)
+            except Exception:
+                slots.release()
+                raise
+            if task is None:
+                slots.release()
+            return task
+        
+        with ThreadPoolExecutor(max_workers=max_in_flight,
+                                thread_name_prefix='activity-executor') as executor:
+            self.poller_controller.run(
+                poll,
+                lambda task, _identity: executor.submit(self._execute_task, task, slots),
+                self.identity,
+                self._stop_event
+            )
+    
+    def count_pending_tasks(self):
+        """
+        Consulta o backlog da task list de atividades.
+        
+        Returns:
+            int: Tarefas de atividade aguardando um worker
+        """
+        response = self.swf_client.client.count_pending_activity_tasks(
+            domain=self.swf_client.domain,
+            taskList={'name': self.swf_client.task_list}
+        )
+        return response['count']
+    
+    def stop(self):
+        """Sinaliza às threads de polling que devem encerrar após o poll atual."""
+        self._stop_event.set()
+    
+    def _execute_task(self, task, slots):
+        """Executa uma tarefa no pool, mede sua latência e libera a vaga ao final."""
+        started = time.monotonic()
+        try:
+            self.handle_activity_task(task)
+        except Exception as e:
+            logger.error('activity_task_error', error=e)
+        finally:
+            slots.release()
+            if self.poller_controller is not None:
+                self.poller_controller.record_task_latency(time.monotonic() - started)
     
     def handle_activity_task(self, task):
         """
@@ -124,34 +298,181 @@ class ActivityWorker:
         # Nome da atividade a ser executada
         activity_type = task['activityType']['name']
         
-        # Dados de entrada (deserializa JSON)
-        input_data = json.loads(task.get('input', '{}'))
+        logger.info('activity_task_received', activity=activity_type)
+        metrics.PAYLOAD_BYTES.labels('activity_input').observe(len(task.get('input') or ''))
         
-        print(f"\nReceived activity task: {activity_type}")
-        print(f"Input: {input_data}")
-        
-        try:
-            # Executa a atividade correspondente usando o mapeamento
-            if activity_type in self.activities:
-                result = self.activities[activity_type](input_data)
+        # Span filho da decisão que agendou a atividade (contexto no input)
+        with tracing.span(
+            'handle_activity_task',
+            {'activity.type': activity_type, 'activity.id': task.get('activityId')},
+            parent=tracing.context_from_payload(task.get('input'))
+        ) as span:
+            try:
+                # Obtém a implementação correspondente usando o mapeamento
+                handler = self.get_activity_handler(activity_type)
                 
-                # Reporta sucesso ao SWF com o resultado
-                self.swf_client.client.respond_activity_task_completed(
-                    taskToken=task_token,
-                    result=json.dumps(result)
-                )
-                print(f"Activity '{activity_type}' completed successfully")
-            else:
-                raise Exception(f"Unknown activity type: {activity_type}")
+                # Heartbeats em segundo plano enquanto o handler executa
+                with self.heartbeats.track(task_token, activity_type), \
+                        metrics.ACTIVITY_SECONDS.labels(activity_type).time():
+                    serialized_result = self.run_activity_handler(handler, task)
                 
-        except Exception as e:
-            # Em caso de erro, reporta falha ao SWF
-            print(f"Activity '{activity_type}' failed: {e}")
-            self.swf_client.client.respond_activity_task_failed(
-                taskToken=task_token,
-                reason=str(e)[:256],      # Motivo limitado a 256 caracteres
-                details=str(e)[:32768]    # Detalhes limitados a 32KB
-            )
+                # Reporta sucesso ao SWF com o resultado
+                self.respond_activity_completed(task_token, activity_type, serialized_result)
+            
+            except ActivityCancelled as e:
+                # O handler parou após pedido de cancelamento do workflow
+                span.set_attribute('activity.canceled', True)
+                self.cancel_activity_task(task_token, activity_type, e)
+                    
+            except Exception as e:
+                # Em caso de erro, reporta falha ao SWF
+                span.record_exception(e)
+                self.fail_activity_task(task_token, activity_type, e)
+    
+    def run_activity_handler(self, handler, task):
+        """
+        Executa o handler de uma tarefa e devolve o resultado serializado.
+        
+        Handlers da lane de processos recebem o JSON bruto no processo
+        filho; os demais recebem o input deserializado. Handlers
+        ``async def`` são executados até o fim com ``asyncio.run``.
+        
+        Args:
+            handler (callable): Implementação da atividade
+            task (dict): Tarefa retornada pelo SWF
+            
+        Returns:
+            str: Resultado da atividade em JSON
+        """
+        if self.process_lane is not None and is_process_lane(handler):
+            raw_input = self.read_raw_activity_input(task)
+            logger.debug('activity_input', activity=task['activityType']['name'],
+                         input=raw_input)
+            return self.process_lane.run(handler.func, raw_input)
+        
+        # Dados de entrada (deserializa JSON)
+        input_data = self.read_activity_input(task)
+        logger.debug('activity_input', activity=task['activityType']['name'], input=input_data)
+        
+        result = handler(input_data)
+        if inspect.isawaitable(result):
+            result = asyncio.run(result)
+        return encode(result)
+    
+    def read_raw_activity_input(self, task):
+        """
+        Devolve o input de uma tarefa de atividade em JSON, sem deserializar.
+        
+        Inputs externalizados (referência do ``payload_store``) são
+        buscados no armazenamento. Usado por todos os caminhos de execução
+        (síncrono, asyncio e lane de processos).
+        
+        Args:
+            task (dict): Tarefa retornada pelo SWF
+            
+        Returns:
+            str: Input original serializado
+        """
+        return hydrate(task.get('input', '{}'))
+    
+    def read_activity_input(self, task):
+        """
+        Deserializa o input de uma tarefa de atividade.
+        
+        Inputs externalizados são resolvidos por ``read_raw_activity_input``.
+        O contexto de trace propagado pelo decider é removido.
+        
+        Args:
+            task (dict): Tarefa retornada pelo SWF
+            
+        Returns:
+            dict: Dados de entrada da atividade
+        """
+        input_data = decode(self.read_raw_activity_input(task))
+        tracing.extract(input_data)
+        return input_data
+    
+    def get_activity_handler(self, activity_type):
+        """
+        Obtém a implementação registrada para um tipo de atividade.
+        
+        Args:
+            activity_type (str): Nome da atividade
+            
+        Returns:
+            callable: Handler síncrono ou ``async def``
+            
+        Raises:
+            Exception: Se a atividade não estiver registrada
+        """
+        if activity_type not in self.activities:
+            raise Exception(f"Unknown activity type: {activity_type}")
+        return self.activities[activity_type]
+    
+    def complete_activity_task(self, task_token, activity_type, result):
+        """
+        Reporta ao SWF a conclusão de uma tarefa.
+        
+        Args:
+            task_token (str): Token da tarefa
+            activity_type (str): Nome da atividade (para log)
+            result (dict): Resultado retornado pelo handler
+        """
+        self.respond_activity_completed(task_token, activity_type, encode(result))
+    
+    def respond_activity_completed(self, task_token, activity_type, serialized_result):
+        """
+        Envia ao SWF um resultado já serializado em JSON.
+        
+        Resultados acima de ``Config.PAYLOAD_OFFLOAD_THRESHOLD`` são
+        gravados no ``payload_store`` e enviados como referência.
+        
+        Args:
+            task_token (str): Token da tarefa
+            activity_type (str): Nome da atividade (para log)
+            serialized_result (str): Resultado em JSON
+        """
+        result = dehydrate(serialized_result)
+        self.swf_client.client.respond_activity_task_completed(
+            taskToken=task_token,
+            result=result
+        )
+        metrics.PAYLOAD_BYTES.labels('activity_result').observe(len(result))
+        metrics.ACTIVITY_TASKS.labels(activity_type, 'completed').inc()
+        logger.info('activity_completed', activity=activity_type)
+    
+    def cancel_activity_task(self, task_token, activity_type, error):
+        """
+        Reporta ao SWF que a tarefa foi cancelada a pedido do workflow.
+        
+        Args:
+            task_token (str): Token da tarefa
+            activity_type (str): Nome da atividade (para log)
+            error (ActivityCancelled): Motivo informado pelo handler
+        """
+        logger.warning('activity_canceled', activity=activity_type, reason=error)
+        metrics.ACTIVITY_TASKS.labels(activity_type, 'canceled').inc()
+        self.swf_client.client.respond_activity_task_canceled(
+            taskToken=task_token,
+            details=str(error)[:32768]
+        )
+    
+    def fail_activity_task(self, task_token, activity_type, error):
+        """
+        Reporta ao SWF a falha de uma tarefa.
+        
+        Args:
+            task_token (str): Token da tarefa
+            activity_type (str): Nome da atividade (para log)
+            error (Exception): Erro que causou a falha
+        """
+        logger.error('activity_failed', activity=activity_type, error=error)
+        metrics.ACTIVITY_TASKS.labels(activity_type, 'failed').inc()
+        self.swf_client.client.respond_activity_task_failed(
+            taskToken=task_token,
+            reason=str(error)[:256],      # Motivo limitado a 256 caracteres
+            details=str(error)[:32768]    # Detalhes limitados a 32KB
+        )
 
     
     # ========== Implementação das Atividades de Negócio ==========
@@ -172,7 +493,7 @@ class ActivityWorker:
         Raises:
             Exception: Se dados obrigatórios estiverem faltando
         """
-        print("Executing: ValidateInput")
+        logger.debug('activity_executing', activity='ValidateInput')
         
         # Verifica se order_id está presente
         if not input_data.get('order_id'):
@@ -197,15 +518,7 @@ class ActivityWorker:
         Returns:
             dict: Dados processados com status e itens
         """
-        print("Executing: ProcessData")
-        time.sleep(1)  # Simula processamento demorado
-        
-        return {
-            'status': 'processed',
-            'order_id': input_data.get('order_id'),
-            'processed_items': input_data.get('items', []),
-            'processed_at': time.time()
-        }
+        return process_data_task(input_data)
     
     def enrich_data(self, input_data):
         """
@@ -220,7 +533,7 @@ class ActivityWorker:
         Returns:
             dict: Dados enriquecidos com informações adicionais
         """
-        print("Executing: EnrichData")
+        logger.debug('activity_executing', activity='EnrichData')
         time.sleep(1)  # Simula consulta a serviços externos
         
         return {
@@ -246,7 +559,7 @@ class ActivityWorker:
         Returns:
             dict: Confirmação de salvamento com ID do registro
         """
-        print("Executing: SaveResults")
+        logger.debug('activity_executing', activity='SaveResults')
         time.sleep(1)  # Simula operação de I/O
         
         return {
@@ -269,7 +582,7 @@ class ActivityWorker:
         Returns:
             dict: Confirmação de envio da notificação
         """
-        print("Executing: NotifyCompletion")
+        logger.debug('activity_executing', activity='NotifyCompletion')
         
         return {
             'status': 'notified',
@@ -291,7 +604,7 @@ class ActivityWorker:
         Returns:
             dict: Confirmação do rollback executado
         """
-        print("Executing: RollbackStep")
+        logger.debug('activity_executing', activity='RollbackStep')
         step_to_rollback = input_data.get('step_to_rollback')
         
         # Aqui você implementaria a lógica específica de rollback
@@ -316,7 +629,7 @@ class ActivityWorker:
         Returns:
             dict: Confirmação da compensação executada
         """
-        print("Executing: CompensateTransaction")
+        logger.debug('activity_executing', activity='CompensateTransaction')
         
         # Implementa ações compensatórias (ex: estornar pagamento,
         # liberar recursos reservados, enviar notificações de cancelamento)
@@ -327,7 +640,49 @@ class ActivityWorker:
             'compensated_at': time.time()
         }
 
+
+# Worker reaproveitado entre invocações "quentes" do Lambda (mantém o
+# cliente SWF e a thread de heartbeats)
+_lambda_worker = None
+
+
+def lambda_handler(event, context):
+    """
+    Handler do AWS Lambda: drena a task list de atividades.
+    
+    Processa atividades em sequência enquanto o tempo restante da
+    invocação comporta mais um long poll e uma atividade
+    (``LAMBDA_POLL_WINDOW + LAMBDA_ACTIVITY_TASK_BUDGET``), e termina no
+    primeiro poll vazio.
+    
+    Args:
+        event (dict): Evento do EventBridge (não utilizado)
+        context: Contexto do Lambda (usa ``get_remaining_time_in_millis``)
+    
+    Returns:
+        dict: Tarefas processadas e motivo da parada
+    """
+    global _lambda_worker
+    try:
+        if _lambda_worker is None:
+            _lambda_worker = ActivityWorker()
+        worker = _lambda_worker
+        
+        processed, stopped = drain(
+            worker.poll_activity_task,
+            lambda task, _identity: worker.handle_activity_task(task),
+            worker.identity,
+            lambda: context.get_remaining_time_in_millis() / 1000,
+            Config.LAMBDA_POLL_WINDOW + Config.LAMBDA_ACTIVITY_TASK_BUDGET
+        )
+        logger.info('lambda_drain_finished', worker='activity', processed=processed, stopped=stopped)
+        return {'processed': processed, 'stopped': stopped}
+    finally:
+        # O processo pode ser congelado após o retorno: escreve os logs em fila
+        structured_log.flush()
+
+
 if __name__ == '__main__':
     worker = ActivityWorker()
     worker.register_activities()
-    worker.poll_for_activity_task()
+    worker.run_concurrent()
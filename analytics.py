@@ -0,0 +1,574 @@
+"""
+Análise em lote dos históricos de workflow.
+
+Transforma históricos em uma tabela colunar com uma linha por tentativa
+de atividade (``ActivityTaskScheduled``) e uma linha por execução, e
+calcula os agregados em passadas vetorizadas sobre as colunas:
+
+- percentis de schedule-to-start, start-to-close e schedule-to-close por atividade
+- desfechos, tentativas e taxa de retry por atividade
+- frequência de rollback (marcador ``ROLLBACK_INITIATED``) e atividade que o causou
+- duração das execuções e status de encerramento
+
+Cada histórico é lido em uma passada única, com índice por ``eventId``.
+As colunas são ``array.array`` compactos durante a montagem e arrays do
+NumPy na análise quando ele está instalado (extra ``analytics``); sem ele
+os mesmos agregados são calculados em Python puro.
+
+A tabela pode ser salva em um arquivo colunar compacto (``save``/``load``):
+cabeçalho JSON seguido dos bytes de cada coluna, tudo comprimido com zlib,
+legível com ou sem NumPy.
+
+Uso:
+    python workflow_starter.py --bulk pedidos.jsonl > execucoes.jsonl
+    python analytics.py --executions execucoes.jsonl --export tabela.swfcol
+    python analytics.py --table tabela.swfcol --json
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import math
+import sys
+import zlib
+from array import array
+from collections import deque
+from collections.abc import Iterable, Iterator
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Any
+
+from codec import decode
+from payload_store import hydrate
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - depende do ambiente
+    np = None
+
+QUANTILES = (50, 95, 99)
+
+OUTCOMES = ("open", "completed", "failed", "timed_out", "canceled")
+CLOSE_STATUSES = (
+    "open",
+    "completed",
+    "failed",
+    "canceled",
+    "terminated",
+    "timed_out",
+    "continued_as_new",
+)
+
+# Evento que encerra a tentativa -> (desfecho, campo de atributos)
+_ACTIVITY_CLOSE_EVENTS = {
+    "ActivityTaskCompleted": (1, "activityTaskCompletedEventAttributes"),
+    "ActivityTaskFailed": (2, "activityTaskFailedEventAttributes"),
+    "ActivityTaskTimedOut": (3, "activityTaskTimedOutEventAttributes"),
+    "ActivityTaskCanceled": (4, "activityTaskCanceledEventAttributes"),
+}
+_WORKFLOW_CLOSE_EVENTS = {
+    "WorkflowExecutionCompleted": 1,
+    "WorkflowExecutionFailed": 2,
+    "WorkflowExecutionCanceled": 3,
+    "WorkflowExecutionTerminated": 4,
+    "WorkflowExecutionTimedOut": 5,
+    "WorkflowExecutionContinuedAsNew": 6,
+}
+
+# Colunas da tabela: nome -> typecode do array (int32, float64, int8)
+ACTIVITY_COLUMNS = {
+    "execution": "i",
+    "activity": "i",
+    "attempt": "i",
+    "scheduled": "d",
+    "started": "d",
+    "closed": "d",
+    "outcome": "b",
+}
+EXECUTION_COLUMNS = {
+    "workflow_started": "d",
+    "workflow_closed": "d",
+    "close_status": "b",
+    "rollback_activity": "i",
+}
+
+_MAGIC = b"SWFCOL1\n"
+
+
+def _timestamp(value: Any) -> float:
+    if isinstance(value, datetime):
+        return value.timestamp()
+    return float(value)
+
+
+class TableBuilder:
+    """Monta a tabela colunar a partir de históricos, um de cada vez."""
+
+    def __init__(self):
+        self.activity_names: list[str] = []
+        self.executions: list[tuple[str, str]] = []
+        self._activity_codes: dict[str, int] = {}
+        self.columns = {name: array(code) for name, code in ACTIVITY_COLUMNS.items()}
+        self.execution_columns = {name: array(code) for name, code in EXECUTION_COLUMNS.items()}
+
+    def _activity_code(self, name: str) -> int:
+        code = self._activity_codes.get(name)
+        if code is None:
+            code = self._activity_codes[name] = len(self.activity_names)
+            self.activity_names.append(name)
+        return code
+
+    def add(self, workflow_id: str, run_id: str, events: Iterable[dict]) -> None:
+        """
+        Acrescenta um histórico (eventos em ordem cronológica) à tabela.
+
+        Args:
+            workflow_id (str): ID do workflow
+            run_id (str): ID da execução
+            events (iterable): Eventos do histórico
+        """
+        execution = len(self.executions)
+        columns = self.columns
+        first_row = len(columns["execution"])
+        rows: dict[int, int] = {}  # eventId do agendamento -> linha da tabela
+        attempts: dict[int, int] = {}
+        workflow_started = workflow_closed = math.nan
+        close_status = 0
+        rollback_activity = -1
+
+        for event in events:
+            event_type = event["eventType"]
+            if event_type == "ActivityTaskScheduled":
+                name = event["activityTaskScheduledEventAttributes"]["activityType"]["name"]
+                code = self._activity_code(name)
+                attempts[code] = attempts.get(code, 0) + 1
+                rows[event["eventId"]] = len(columns["execution"])
+                columns["execution"].append(execution)
+                columns["activity"].append(code)
+                columns["attempt"].append(attempts[code])
+                columns["scheduled"].append(_timestamp(event["eventTimestamp"]))
+                columns["started"].append(math.nan)
+                columns["closed"].append(math.nan)
+                columns["outcome"].append(0)
+            elif event_type == "ActivityTaskStarted":
+                row = rows.get(event["activityTaskStartedEventAttributes"]["scheduledEventId"])
+                if row is not None:
+                    columns["started"][row] = _timestamp(event["eventTimestamp"])
+            elif event_type in _ACTIVITY_CLOSE_EVENTS:
+                outcome, key = _ACTIVITY_CLOSE_EVENTS[event_type]
+                row = rows.get(event[key]["scheduledEventId"])
+                if row is not None:
+                    columns["closed"][row] = _timestamp(event["eventTimestamp"])
+                    columns["outcome"][row] = outcome
+            elif event_type == "MarkerRecorded":
+                attrs = event["markerRecordedEventAttributes"]
+                if attrs["markerName"] == "ROLLBACK_INITIATED":
+                    details = decode(hydrate(attrs.get("details") or "{}")) or {}
+                    failed = details.get("failed_activity")
+                    rollback_activity = self._activity_code(failed) if failed else -2
+            elif event_type == "WorkflowExecutionStarted":
+                workflow_started = _timestamp(event["eventTimestamp"])
+            elif event_type in _WORKFLOW_CLOSE_EVENTS:
+                workflow_closed = _timestamp(event["eventTimestamp"])
+                close_status = _WORKFLOW_CLOSE_EVENTS[event_type]
+
+        if len(columns["execution"]) == first_row and math.isnan(workflow_started):
+            return  # Histórico vazio
+        self.executions.append((workflow_id, run_id))
+        execution_columns = self.execution_columns
+        execution_columns["workflow_started"].append(workflow_started)
+        execution_columns["workflow_closed"].append(workflow_closed)
+        execution_columns["close_status"].append(close_status)
+        execution_columns["rollback_activity"].append(rollback_activity)
+
+    def build(self) -> ActivityTable:
+        """Tabela com as colunas montadas até aqui."""
+        return ActivityTable(
+            list(self.activity_names),
+            list(self.executions),
+            {name: array(column.typecode, column) for name, column in self.columns.items()},
+            {
+                name: array(column.typecode, column)
+                for name, column in self.execution_columns.items()
+            },
+        )
+
+
+def _as_numpy(column: array) -> Any:
+    # Sem cópia: o ndarray usa o buffer do array.array
+    return np.frombuffer(column, dtype=column.typecode)
+
+
+def _percentiles(values: Any, quantiles: tuple[int, ...]) -> dict[str, Any]:
+    """Percentis por interpolação linear (em ms) de valores em segundos."""
+    if np is not None:
+        values = values[~np.isnan(values)]
+        summary: dict[str, Any] = {"count": int(values.size)}
+        points = np.percentile(values, quantiles) * 1000 if values.size else [None] * len(quantiles)
+        for q, point in zip(quantiles, points):
+            summary[f"p{q}"] = None if point is None else float(point)
+        return summary
+    ordered = sorted(value for value in values if not math.isnan(value))
+    summary = {"count": len(ordered)}
+    for q in quantiles:
+        if not ordered:
+            summary[f"p{q}"] = None
+            continue
+        position = (len(ordered) - 1) * q / 100
+        low, high = math.floor(position), math.ceil(position)
+        point = ordered[low] + (ordered[high] - ordered[low]) * (position - low)
+        summary[f"p{q}"] = point * 1000
+    return summary
+
+
+class ActivityTable:
+    """
+    Tabela colunar de tentativas de atividade e de execuções.
+
+    ``columns`` tem uma linha por tentativa (colunas de ``ACTIVITY_COLUMNS``,
+    com ``execution`` e ``activity`` como índices em ``executions`` e
+    ``activity_names``; timestamps em segundos desde a época e NaN quando o
+    evento não ocorreu). ``execution_columns`` tem uma linha por execução.
+    Com NumPy disponível as colunas são ``numpy.ndarray``.
+    """
+
+    def __init__(
+        self,
+        activity_names: list[str],
+        executions: list[tuple[str, str]],
+        columns: dict[str, array],
+        execution_columns: dict[str, array],
+    ):
+        self.activity_names = activity_names
+        self.executions = executions
+        self._raw = {**columns, **execution_columns}
+        convert = _as_numpy if np is not None else (lambda column: column)
+        self.columns = {name: convert(columns[name]) for name in ACTIVITY_COLUMNS}
+        self.execution_columns = {
+            name: convert(execution_columns[name]) for name in EXECUTION_COLUMNS
+        }
+
+    def __len__(self) -> int:
+        return len(self.columns["execution"])
+
+    def summary(self, quantiles: tuple[int, ...] = QUANTILES) -> dict[str, Any]:
+        """
+        Agregados por atividade e das execuções.
+
+        Returns:
+            dict: ``{"executions": {...}, "activities": {nome: {...}}}``; durações
+            em ms (``count`` e percentis), ``retry_rate`` é a fração das
+            atividades agendadas em uma execução que precisaram de mais de
+            uma tentativa
+        """
+        if np is not None:
+            return self._summary_numpy(quantiles)
+        return self._summary_python(quantiles)
+
+    def _summary_numpy(self, quantiles: tuple[int, ...]) -> dict[str, Any]:
+        c, e = self.columns, self.execution_columns
+        names = self.activity_names
+        outcomes = np.bincount(
+            c["activity"] * len(OUTCOMES) + c["outcome"], minlength=len(names) * len(OUTCOMES)
+        ).reshape(len(names), len(OUTCOMES))
+        first = np.bincount(c["activity"][c["attempt"] == 1], minlength=len(names))
+        retried = np.bincount(c["activity"][c["attempt"] == 2], minlength=len(names))
+        triggered = e["rollback_activity"]
+        rollbacks = np.bincount(triggered[triggered >= 0], minlength=len(names))
+        schedule_to_start = c["started"] - c["scheduled"]
+        start_to_close = c["closed"] - c["started"]
+        schedule_to_close = c["closed"] - c["scheduled"]
+
+        activities = {}
+        for code, name in enumerate(names):
+            mask = c["activity"] == code
+            activities[name] = self._activity_summary(
+                {outcome: int(outcomes[code, i]) for i, outcome in enumerate(OUTCOMES)},
+                int(first[code]),
+                int(retried[code]),
+                int(rollbacks[code]),
+                schedule_to_start[mask],
+                start_to_close[mask],
+                schedule_to_close[mask],
+                quantiles,
+            )
+
+        statuses = np.bincount(e["close_status"], minlength=len(CLOSE_STATUSES))
+        return {
+            "executions": self._execution_summary(
+                len(self.executions),
+                {status: int(statuses[i]) for i, status in enumerate(CLOSE_STATUSES)},
+                int(np.count_nonzero(triggered != -1)),
+                e["workflow_closed"] - e["workflow_started"],
+                quantiles,
+            ),
+            "activities": activities,
+        }
+
+    def _summary_python(self, quantiles: tuple[int, ...]) -> dict[str, Any]:
+        c, e = self.columns, self.execution_columns
+        names = self.activity_names
+        outcomes = [[0] * len(OUTCOMES) for _ in names]
+        first, retried, rollbacks = [0] * len(names), [0] * len(names), [0] * len(names)
+        durations: list[tuple[list, list, list]] = [([], [], []) for _ in names]
+        for code, attempt, scheduled, started, closed, outcome in zip(
+            c["activity"], c["attempt"], c["scheduled"], c["started"], c["closed"], c["outcome"]
+        ):
+            outcomes[code][outcome] += 1
+            if attempt == 1:
+                first[code] += 1
+            elif attempt == 2:
+                retried[code] += 1
+            to_start, to_close, total = durations[code]
+            to_start.append(started - scheduled)
+            to_close.append(closed - started)
+            total.append(closed - scheduled)
+        for code in e["rollback_activity"]:
+            if code >= 0:
+                rollbacks[code] += 1
+
+        activities = {
+            name: self._activity_summary(
+                dict(zip(OUTCOMES, outcomes[code])),
+                first[code],
+                retried[code],
+                rollbacks[code],
+                *durations[code],
+                quantiles,
+            )
+            for code, name in enumerate(names)
+        }
+        statuses = [0] * len(CLOSE_STATUSES)
+        for status in e["close_status"]:
+            statuses[status] += 1
+        return {
+            "executions": self._execution_summary(
+                len(self.executions),
+                dict(zip(CLOSE_STATUSES, statuses)),
+                sum(1 for code in e["rollback_activity"] if code != -1),
+                [
+                    closed - started
+                    for started, closed in zip(e["workflow_started"], e["workflow_closed"])
+                ],
+                quantiles,
+            ),
+            "activities": activities,
+        }
+
+    @staticmethod
+    def _activity_summary(
+        outcomes, first, retried, rollbacks, to_start, to_close, total, quantiles
+    ) -> dict[str, Any]:
+        return {
+            "attempts": sum(outcomes.values()),
+            "outcomes": outcomes,
+            "retry_rate": retried / first if first else 0.0,
+            "rollbacks": rollbacks,
+            "schedule_to_start_ms": _percentiles(to_start, quantiles),
+            "start_to_close_ms": _percentiles(to_close, quantiles),
+            "schedule_to_close_ms": _percentiles(total, quantiles),
+        }
+
+    @staticmethod
+    def _execution_summary(count, statuses, rolled_back, durations, quantiles) -> dict[str, Any]:
+        return {
+            "count": count,
+            "close_status": statuses,
+            "rollbacks": rolled_back,
+            "rollback_rate": rolled_back / count if count else 0.0,
+            "duration_ms": _percentiles(durations, quantiles),
+        }
+
+    def save(self, path: str) -> None:
+        """
+        Grava a tabela no formato colunar compacto.
+
+        Args:
+            path (str): Arquivo de destino
+        """
+        columns = [(name, column) for name, column in self._raw.items()]
+        header = {
+            "activity_names": self.activity_names,
+            "executions": self.executions,
+            "columns": [[name, column.typecode, len(column)] for name, column in columns],
+        }
+        compressor = zlib.compressobj()
+        with open(path, "wb") as stream:
+            stream.write(_MAGIC)
+            stream.write(compressor.compress(json.dumps(header).encode() + b"\n"))
+            for _name, column in columns:
+                if sys.byteorder == "big":
+                    column = array(column.typecode, column)
+                    column.byteswap()
+                stream.write(compressor.compress(column.tobytes()))
+            stream.write(compressor.flush())
+
+    @classmethod
+    def load(cls, path: str) -> ActivityTable:
+        """
+        Lê uma tabela gravada com ``save``.
+
+        Raises:
+            ValueError: Se o arquivo não está no formato esperado
+        """
+        with open(path, "rb") as stream:
+            if stream.read(len(_MAGIC)) != _MAGIC:
+                raise ValueError(f"{path} is not an activity table file")
+            data = zlib.decompress(stream.read())
+        header_end = data.index(b"\n")
+        header = json.loads(data[:header_end])
+        offset = header_end + 1
+        raw = {}
+        for name, typecode, length in header["columns"]:
+            column = array(typecode)
+            size = column.itemsize * length
+            column.frombytes(data[offset : offset + size])
+            if sys.byteorder == "big":
+                column.byteswap()
+            raw[name] = column
+            offset += size
+        return cls(
+            header["activity_names"],
+            [tuple(execution) for execution in header["executions"]],
+            {name: raw[name] for name in ACTIVITY_COLUMNS},
+            {name: raw[name] for name in EXECUTION_COLUMNS},
+        )
+
+
+def build_table(histories: Iterable[tuple[str, str, Iterable[dict]]]) -> ActivityTable:
+    """
+    Monta a tabela a partir de históricos.
+
+    Args:
+        histories (iterable): Tuplas ``(workflow_id, run_id, eventos)``
+
+    Returns:
+        ActivityTable: Tabela colunar
+    """
+    builder = TableBuilder()
+    for workflow_id, run_id, events in histories:
+        builder.add(workflow_id, run_id, events)
+    return builder.build()
+
+
+def fetch_histories(
+    starter: Any, executions: Iterable[tuple[str, str]], concurrency: int = 8
+) -> Iterator[tuple[str, str, list[dict]]]:
+    """
+    Lê históricos em paralelo (``WorkflowStarter.iter_workflow_history``).
+
+    No máximo ``concurrency * 2`` históricos ficam em memória por vez; os
+    de execuções encerradas vêm do cache em disco quando já foram lidos.
+
+    Args:
+        starter (WorkflowStarter): Starter usado para ler os históricos
+        executions (iterable): Pares ``(workflow_id, run_id)``
+        concurrency (int): Leituras simultâneas
+
+    Yields:
+        tuple: ``(workflow_id, run_id, eventos)`` na ordem de ``executions``
+    """
+
+    def fetch(execution):
+        workflow_id, run_id = execution
+        return workflow_id, run_id, list(starter.iter_workflow_history(workflow_id, run_id))
+
+    pending: deque = deque()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        for execution in executions:
+            pending.append(executor.submit(fetch, execution))
+            if len(pending) >= concurrency * 2:
+                yield pending.popleft().result()
+        for future in pending:
+            yield future.result()
+
+
+def read_executions(stream) -> Iterator[tuple[str, str]]:
+    """
+    Lê pares ``(workflow_id, run_id)`` de JSONL (saída de ``workflow_starter --bulk``).
+
+    Linhas sem ``run_id`` (inícios com erro) são ignoradas.
+    """
+    for line in stream:
+        line = line.strip()
+        if line:
+            record = json.loads(line)
+            if record.get("run_id"):
+                yield record["workflow_id"], record["run_id"]
+
+
+def format_report(summary: dict[str, Any]) -> str:
+    """Relatório em texto de ``ActivityTable.summary``."""
+
+    def fmt(value):
+        return "-" if value is None else f"{value:.1f}"
+
+    executions = summary["executions"]
+    statuses = ", ".join(
+        f"{status}={count}" for status, count in executions["close_status"].items() if count
+    )
+    duration = executions["duration_ms"]
+    lines = [
+        f"Execuções: {executions['count']} ({statuses or 'nenhuma'})",
+        f"Rollbacks: {executions['rollbacks']} ({executions['rollback_rate']:.1%})",
+        f"Duração (ms): p50={fmt(duration.get('p50'))} p95={fmt(duration.get('p95'))} "
+        f"p99={fmt(duration.get('p99'))}",
+        "",
+        f"{'Atividade':<24}{'tent.':>7}{'falhas':>8}{'retry':>8}{'rollb.':>8}"
+        f"{'s2s p50':>10}{'s2c p50':>10}{'s2c p95':>10}{'s2c p99':>10}",
+    ]
+    for name, stats in sorted(summary["activities"].items()):
+        outcomes = stats["outcomes"]
+        failures = outcomes["failed"] + outcomes["timed_out"]
+        to_start, to_close = stats["schedule_to_start_ms"], stats["start_to_close_ms"]
+        lines.append(
+            f"{name:<24}{stats['attempts']:>7}{failures:>8}{stats['retry_rate']:>8.1%}"
+            f"{stats['rollbacks']:>8}{fmt(to_start.get('p50')):>10}"
+            f"{fmt(to_close.get('p50')):>10}{fmt(to_close.get('p95')):>10}"
+            f"{fmt(to_close.get('p99')):>10}"
+        )
+    return "\n".join(lines)
+
+
+def main(argv: list[str] | None = None) -> int:
+    """Ponto de entrada: ``python analytics.py``."""
+    parser = argparse.ArgumentParser(description="Relatório de latências e falhas por atividade")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument(
+        "--executions",
+        metavar="ARQUIVO",
+        help="JSONL com workflow_id e run_id por linha ('-' para stdin)",
+    )
+    source.add_argument("--table", metavar="ARQUIVO", help="Tabela gravada com --export")
+    parser.add_argument("--export", metavar="ARQUIVO", help="Grava a tabela colunar")
+    parser.add_argument(
+        "--concurrency", type=int, default=8, help="Leituras de histórico simultâneas"
+    )
+    parser.add_argument("--json", action="store_true", help="Relatório em JSON")
+    args = parser.parse_args(argv)
+
+    if args.table:
+        table = ActivityTable.load(args.table)
+    else:
+        from workflow_starter import WorkflowStarter
+
+        stream = sys.stdin if args.executions == "-" else open(args.executions, encoding="utf-8")
+        try:
+            histories = fetch_histories(
+                WorkflowStarter(), read_executions(stream), args.concurrency
+            )
+            table = build_table(histories)
+        finally:
+            if stream is not sys.stdin:
+                stream.close()
+    if args.export:
+        table.save(args.export)
+
+    summary = table.summary()
+    print(json.dumps(summary, indent=2) if args.json else format_report(summary))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
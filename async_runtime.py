@@ -0,0 +1,306 @@
+"""
+Runtime asyncio para os workers de atividade e de decisão.
+
+Este módulo permite manter milhares de atividades em andamento em um único
+processo. Handlers ``async def`` registrados em ``ActivityWorker.activities``
+rodam diretamente no event loop; handlers síncronos são enviados
+automaticamente para um pool de threads, sem bloquear o loop.
+
+As chamadas ao SWF (boto3 é síncrono) rodam em pools de threads dedicados:
+um para os long polls, com uma thread por poller, e outro para as respostas.
+Esperas entre polls e backoff após erros seguem o ``PollerController``.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import contextvars
+import inspect
+from concurrent.futures import ThreadPoolExecutor
+
+import metrics
+import structured_log
+import tracing
+from codec import encode
+from config import Config
+from heartbeat import ActivityCancelled
+from poller_control import PollerController
+from process_lane import is_process_lane
+
+logger = structured_log.get_logger(__name__)
+
+
+class _AsyncPollerRuntime:
+    """Base comum: ciclo de vida dos pollers e parada thread-safe."""
+
+    def __init__(self, worker, pollers: int):
+        self.worker = worker
+        self.pollers = pollers
+        self.controller = PollerController(
+            type(worker).__name__, min_pollers=pollers, max_pollers=pollers
+        )
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._poller_tasks: list[asyncio.Task] = []
+        self._stopping = False
+
+    def stop(self) -> None:
+        """
+        Encerra os pollers; pode ser chamado de qualquer thread.
+
+        Um long poll já em andamento não é interrompido no SWF: se ele
+        devolver uma tarefa depois da parada, ela expira e é reentregue.
+        """
+        self._stopping = True
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self._cancel_pollers)
+
+    def _cancel_pollers(self) -> None:
+        for task in self._poller_tasks:
+            task.cancel()
+
+    async def _run_pollers(self, poller_factory) -> None:
+        self._loop = asyncio.get_running_loop()
+        self._poller_tasks = [
+            asyncio.create_task(poller_factory(f"{self.worker.identity}-async-{index}"))
+            for index in range(1, self.pollers + 1)
+        ]
+        if self._stopping:
+            self._cancel_pollers()
+        await asyncio.gather(*self._poller_tasks, return_exceptions=True)
+
+
+class AsyncActivityRuntime(_AsyncPollerRuntime):
+    """
+    Executa um ``ActivityWorker`` sobre asyncio.
+
+    Cada poller reserva uma vaga do semáforo antes de fazer o poll, então
+    no máximo ``max_in_flight`` atividades ficam em andamento e o polling
+    para quando o limite é atingido (backpressure).
+    """
+
+    def __init__(
+        self,
+        worker,
+        pollers: int | None = None,
+        max_in_flight: int | None = None,
+        sync_handler_threads: int | None = None,
+    ):
+        """
+        Args:
+            worker (ActivityWorker): Worker com o mapeamento de atividades
+            pollers (int): Pollers concorrentes (padrão: Config.ACTIVITY_POLLERS)
+            max_in_flight (int): Máximo de atividades em andamento
+                (padrão: Config.ACTIVITY_MAX_IN_FLIGHT)
+            sync_handler_threads (int): Threads para handlers síncronos
+                (padrão: Config.ASYNC_SYNC_HANDLER_THREADS)
+        """
+        super().__init__(worker, pollers or Config.ACTIVITY_POLLERS)
+        self.max_in_flight = max_in_flight or Config.ACTIVITY_MAX_IN_FLIGHT
+        self.sync_handler_threads = sync_handler_threads or Config.ASYNC_SYNC_HANDLER_THREADS
+        self._in_flight: set[asyncio.Task] = set()
+
+    async def run(self) -> None:
+        """Executa até ``stop()`` e aguarda as atividades em andamento."""
+        self._slots = asyncio.Semaphore(self.max_in_flight)
+        self._poll_executor = ThreadPoolExecutor(self.pollers, "async-activity-poll")
+        self._respond_executor = ThreadPoolExecutor(
+            Config.ASYNC_RESPOND_THREADS, "async-activity-respond"
+        )
+        self._handler_executor = ThreadPoolExecutor(
+            self.sync_handler_threads, "async-activity-handler"
+        )
+
+        logger.info(
+            "activity_polling_started",
+            task_list=self.worker.swf_client.task_list,
+            runtime="asyncio",
+            max_pollers=self.pollers,
+            max_in_flight=self.max_in_flight,
+        )
+        try:
+            await self._run_pollers(self._poller)
+            if self._in_flight:
+                await asyncio.gather(*self._in_flight, return_exceptions=True)
+        finally:
+            for executor in (self._poll_executor, self._respond_executor, self._handler_executor):
+                executor.shutdown(wait=False)
+
+    async def _poller(self, identity: str) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            await self._slots.acquire()
+            started = loop.time()
+            try:
+                task = await loop.run_in_executor(
+                    self._poll_executor, self.worker.poll_activity_task, identity
+                )
+            except asyncio.CancelledError:
+                self._slots.release()
+                raise
+            except Exception as e:
+                self._slots.release()
+                logger.error("poll_error", worker="activity", error=e)
+                await asyncio.sleep(self.controller.record_error(e))
+                continue
+
+            delay = self.controller.record_poll(task is not None, loop.time() - started)
+            if task is None:
+                self._slots.release()
+                logger.debug("poll_empty", worker="activity")
+                await asyncio.sleep(delay)
+                continue
+
+            execution = asyncio.create_task(self._execute(task))
+            self._in_flight.add(execution)
+            execution.add_done_callback(self._in_flight.discard)
+
+    async def _execute(self, task: dict) -> None:
+        loop = asyncio.get_running_loop()
+        task_token = task["taskToken"]
+        activity_type = task["activityType"]["name"]
+        try:
+            logger.info("activity_task_received", activity=activity_type)
+            metrics.PAYLOAD_BYTES.labels("activity_input").observe(len(task.get("input") or ""))
+            with tracing.span(
+                "handle_activity_task",
+                {"activity.type": activity_type, "activity.id": task.get("activityId")},
+                parent=tracing.context_from_payload(task.get("input")),
+            ) as span:
+                try:
+                    handler = self.worker.get_activity_handler(activity_type)
+                    timer = metrics.ACTIVITY_SECONDS.labels(activity_type).time()
+                    with self.worker.heartbeats.track(task_token, activity_type), timer:
+                        serialized_result = await self._run_handler(handler, task)
+                    responder = self.worker.respond_activity_completed
+                    outcome = serialized_result
+                except ActivityCancelled as e:
+                    span.set_attribute("activity.canceled", True)
+                    responder, outcome = self.worker.cancel_activity_task, e
+                except Exception as e:
+                    span.record_exception(e)
+                    responder, outcome = self.worker.fail_activity_task, e
+                # A resposta leva o span corrente para a thread do pool
+                context = contextvars.copy_context()
+                await loop.run_in_executor(
+                    self._respond_executor,
+                    context.run,
+                    responder,
+                    task_token,
+                    activity_type,
+                    outcome,
+                )
+        except Exception as e:
+            logger.error("activity_task_error", activity=activity_type, error=e)
+        finally:
+            self._slots.release()
+
+    async def _run_handler(self, handler, task: dict) -> str:
+        """Executa o handler sem bloquear o loop; devolve o resultado em JSON."""
+        if self.worker.process_lane is not None and is_process_lane(handler):
+            # Lane de processos: JSON de ida e volta (com o input externalizado resolvido)
+            raw_input = self.worker.read_raw_activity_input(task)
+            future = self.worker.process_lane.submit(handler.func, raw_input)
+            return await asyncio.wrap_future(future)
+
+        input_data = self.worker.read_activity_input(task)
+        if inspect.iscoroutinefunction(handler):
+            result = await handler(input_data)
+        else:
+            # Handlers síncronos saem do event loop automaticamente, levando
+            # o contexto da tarefa (heartbeat) para a thread do pool
+            context = contextvars.copy_context()
+            result = await asyncio.get_running_loop().run_in_executor(
+                self._handler_executor, context.run, handler, input_data
+            )
+            if inspect.isawaitable(result):
+                result = await result
+        return encode(result)
+
+
+class AsyncDecisionRuntime(_AsyncPollerRuntime):
+    """
+    Executa um ``DecisionWorker`` sobre asyncio.
+
+    Cada poller busca uma decision task e a processa em uma thread do
+    pool (o replay é CPU-bound e as chamadas ao SWF são síncronas) antes
+    de fazer o próximo poll.
+    """
+
+    def __init__(self, worker, pollers: int | None = None):
+        """
+        Args:
+            worker (DecisionWorker): Worker de decisão
+            pollers (int): Pollers concorrentes (padrão: Config.DECISION_POLLERS)
+        """
+        super().__init__(worker, pollers or Config.DECISION_POLLERS)
+
+    async def run(self) -> None:
+        """Executa até ``stop()``."""
+        self._executor = ThreadPoolExecutor(self.pollers, "async-decision")
+        logger.info(
+            "decision_polling_started",
+            task_list=self.worker.swf_client.task_list,
+            runtime="asyncio",
+            max_pollers=self.pollers,
+        )
+        try:
+            await self._run_pollers(self._poller)
+        finally:
+            self._executor.shutdown(wait=False)
+
+    async def _poller(self, identity: str) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            started = loop.time()
+            try:
+                task = await loop.run_in_executor(
+                    self._executor, self.worker.poll_decision_task, identity
+                )
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error("poll_error", worker="decision", error=e)
+                await asyncio.sleep(self.controller.record_error(e))
+                continue
+
+            delay = self.controller.record_poll(task is not None, loop.time() - started)
+            if task is None:
+                logger.debug("poll_empty", worker="decision")
+                await asyncio.sleep(delay)
+                continue
+
+            try:
+                await loop.run_in_executor(
+                    self._executor, self.worker.handle_decision_task, task, identity
+                )
+            except Exception as e:
+                logger.error("decision_task_error", error=e)
+
+
+def main(argv: list[str] | None = None) -> None:
+    """Ponto de entrada: ``python async_runtime.py {activity,decision}``."""
+    parser = argparse.ArgumentParser(description="Runtime asyncio dos workers SWF")
+    parser.add_argument("worker", choices=["activity", "decision"])
+    args = parser.parse_args(argv)
+
+    if args.worker == "activity":
+        from activity_worker import ActivityWorker
+
+        worker = ActivityWorker()
+        worker.register_activities()
+        runtime = AsyncActivityRuntime(worker)
+    else:
+        from decision_worker import DecisionWorker
+
+        runtime = AsyncDecisionRuntime(DecisionWorker())
+
+    metrics.maybe_start_server()
+    try:
+        asyncio.run(runtime.run())
+    except KeyboardInterrupt:
+        runtime.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1 @@
+"""Benchmarks de desempenho dos caminhos críticos do decider e dos workers."""
@@ -0,0 +1,58 @@
+"""
+Benchmark dos codecs de payload.
+
+Compara os backends JSON instalados (orjson, msgspec, json) com e sem
+compressão (zlib, zstd) em pedidos realistas de 1KB a 32KB: tempo de
+``encode``/``decode`` e tamanho final do payload enviado ao SWF.
+
+Uso:
+    python -m benchmarks.bench_codec
+"""
+
+from __future__ import annotations
+
+import argparse
+import time
+
+from benchmarks.payloads import PAYLOAD_SIZES, order_payload
+from codec import JSON_BACKENDS, PayloadCodec, zstandard
+
+
+def measure(codec: PayloadCodec, payload: dict, repeat: int) -> tuple[float, float, int]:
+    """Melhor tempo de encode e decode (segundos) e tamanho do payload codificado."""
+    best_encode = best_decode = float("inf")
+    for _ in range(repeat):
+        begin = time.perf_counter()
+        encoded = codec.encode(payload)
+        best_encode = min(best_encode, time.perf_counter() - begin)
+        begin = time.perf_counter()
+        codec.decode(encoded)
+        best_decode = min(best_decode, time.perf_counter() - begin)
+    return best_encode, best_decode, len(encoded)
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", type=int, nargs="+", default=PAYLOAD_SIZES)
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args(argv)
+
+    compressions = ["none", "zlib"] + (["zstd"] if zstandard is not None else [])
+    print(
+        f"{'json (bytes)':>12} {'backend':>8} {'compr.':>6} {'enc (us)':>9} "
+        f"{'dec (us)':>9} {'tamanho':>8}"
+    )
+    for size in args.sizes:
+        payload = order_payload(size)
+        for backend in JSON_BACKENDS:
+            for compression in compressions:
+                codec = PayloadCodec(backend, compression, compression_min_bytes=0)
+                encode_s, decode_s, encoded_size = measure(codec, payload, args.repeat)
+                print(
+                    f"{size:>12} {backend:>8} {compression:>6} "
+                    f"{encode_s * 1e6:>9.1f} {decode_s * 1e6:>9.1f} {encoded_size:>8}"
+                )
+
+
+if __name__ == "__main__":
+    main()
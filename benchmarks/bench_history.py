@@ -0,0 +1,70 @@
+"""
+Benchmark do replay de histórico do decision worker.
+
+Mede o tempo de ``DecisionWorker.analyze_events`` para históricos de 100 a
+25.000 eventos. Com o replay indexado o custo por evento deve permanecer
+constante, ou seja, o tempo total cresce de forma linear. A coluna
+"incremental" mede a decisão com o replay em cache (``ReplayCache``), que
+aplica apenas os eventos novos e deve ficar estável com o tamanho.
+
+Uso:
+    python -m benchmarks.bench_history
+"""
+
+from __future__ import annotations
+
+import argparse
+import time
+
+from benchmarks.histories import linear_history
+from history import HistoryReplayer, ReplayCache, events_after, replay_history
+
+DEFAULT_SIZES = [100, 1_000, 5_000, 10_000, 25_000]
+
+
+def measure(events: list[dict], repeat: int) -> float:
+    """Devolve o melhor tempo (segundos) de ``repeat`` replays completos."""
+    best = float("inf")
+    for _ in range(repeat):
+        begin = time.perf_counter()
+        replay_history(events)
+        best = min(best, time.perf_counter() - begin)
+    return best
+
+
+def measure_incremental(events: list[dict], repeat: int, new_events: int = 8) -> float:
+    """Melhor tempo (segundos) para aplicar os últimos ``new_events`` via cache."""
+    cache = ReplayCache(max_bytes=1 << 30)
+    previous_id = events[-new_events - 1]["eventId"]
+    best = float("inf")
+    for _ in range(repeat):
+        replayer = HistoryReplayer()
+        replayer.replay(events[:-new_events])
+        cache.store("run", replayer)
+
+        begin = time.perf_counter()
+        cached = cache.checkout("run", previous_id)
+        cached.replay(events_after(events, cached.last_event_id))
+        best = min(best, time.perf_counter() - begin)
+    return best
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args(argv)
+
+    print(f"{'eventos':>10} {'total (ms)':>12} {'por evento (us)':>16} {'incremental (us)':>17}")
+    for size in args.sizes:
+        events = linear_history(size)
+        elapsed = measure(events, args.repeat)
+        incremental = measure_incremental(events, args.repeat)
+        print(
+            f"{len(events):>10} {elapsed * 1e3:>12.3f} "
+            f"{elapsed / len(events) * 1e6:>16.3f} {incremental * 1e6:>17.3f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+"""
+Relatório de bytes economizados pela projeção de inputs.
+
+Para um pedido realista, mostra por etapa do workflow o tamanho do input
+completo (input do workflow mais todos os resultados anteriores) e o do
+input projetado com os dados que a etapa declara ler.
+
+Uso:
+    python -m benchmarks.bench_projection --order-bytes 16384
+"""
+
+from __future__ import annotations
+
+import argparse
+
+from benchmarks.payloads import order_payload
+from workflow_definition import BUSINESS_PROCESS_WORKFLOW, projection_report
+
+
+def sample_results(order: dict) -> dict:
+    """Resultados típicos de cada etapa para o pedido informado."""
+    return {
+        "ValidateInput": {"status": "validated", "order_id": order["order_id"]},
+        "ProcessData": {
+            "status": "processed",
+            "order_id": order["order_id"],
+            "processed_items": order["items"],
+        },
+        "EnrichData": {
+            "status": "enriched",
+            "order_id": order["order_id"],
+            "enriched_data": {"customer_tier": "premium", "discount_applied": True},
+        },
+        "SaveResults": {"status": "saved", "order_id": order["order_id"], "record_id": "REC-1"},
+        "NotifyCompletion": {"status": "notified", "order_id": order["order_id"]},
+    }
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--order-bytes", type=int, default=16_384)
+    args = parser.parse_args(argv)
+
+    order = order_payload(args.order_bytes)
+    report = projection_report(BUSINESS_PROCESS_WORKFLOW, order, sample_results(order))
+
+    print(f"{'etapa':<18} {'completo':>10} {'projetado':>10} {'economia':>10}")
+    for row in report:
+        print(
+            f"{row['step']:<18} {row['full_bytes']:>10} "
+            f"{row['projected_bytes']:>10} {row['saved_bytes']:>10}"
+        )
+    total_full = sum(row["full_bytes"] for row in report)
+    total_saved = sum(row["saved_bytes"] for row in report)
+    print(f"{'total':<18} {total_full:>10} {total_full - total_saved:>10} {total_saved:>10}")
+
+
+if __name__ == "__main__":
+    main()
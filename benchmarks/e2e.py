@@ -0,0 +1,392 @@
+"""
+Benchmark de ponta a ponta: vazão e latência com workers reais.
+
+Sobe ``--deciders`` instâncias de ``DecisionWorker`` e ``--activity-workers``
+de ``ActivityWorker`` (``run_concurrent``, cada uma em uma thread) contra o
+simulador do SWF (``swf_simulator``) e inicia ``--workflows`` execuções com
+``WorkflowStarter.start_workflows_bulk``. Os handlers de atividade são
+substituídos por um handler sintético de ``--activity-ms`` milissegundos
+(``--real-handlers`` mantém os originais).
+
+Relatório de cada configuração:
+
+- workflows/s (do primeiro início ao último encerramento)
+- schedule-to-start e start-to-close por atividade (p50/p95/p99, ms)
+- schedule-to-start e start-to-close das decision tasks (p50/p95/p99, ms)
+- duração dos workflows (p50/p95/p99, ms)
+- chamadas da API por workflow (total e por operação)
+
+Listas em ``--deciders``/``--activity-workers`` executam todas as
+combinações; cada resultado é acrescentado como uma linha JSON em
+``--output`` para montar curvas de escala.
+
+Uso:
+    python -m benchmarks.e2e --workflows 2000 --deciders 1 2 --activity-workers 1 2 4 \\
+        --output .benchmarks/e2e.jsonl
+"""
+
+from __future__ import annotations
+
+import argparse
+import contextlib
+import json
+import math
+import os
+import platform
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime, timezone
+from typing import Any
+
+import swf_simulator
+from config import Config
+from payload_store import LocalPayloadStore, PayloadStore, set_payload_store
+
+QUANTILES = (50, 95, 99)
+
+
+def percentiles(values: list[float], quantiles: tuple[int, ...] = QUANTILES) -> dict[str, Any]:
+    """
+    Percentis por interpolação linear.
+
+    Args:
+        values (list): Amostras (qualquer ordem)
+        quantiles (tuple): Percentis desejados (0 a 100)
+
+    Returns:
+        dict: ``{"count": n, "p50": ..., "p95": ..., "p99": ...}`` (None sem amostras)
+    """
+    ordered = sorted(values)
+    summary: dict[str, Any] = {"count": len(ordered)}
+    for q in quantiles:
+        if not ordered:
+            summary[f"p{q}"] = None
+            continue
+        position = (len(ordered) - 1) * q / 100
+        low, high = math.floor(position), math.ceil(position)
+        summary[f"p{q}"] = ordered[low] + (ordered[high] - ordered[low]) * (position - low)
+    return summary
+
+
+def _millis(start: datetime, end: datetime) -> float:
+    return (end - start).total_seconds() * 1000
+
+
+def history_latencies(events: list[dict]) -> dict[str, Any]:
+    """
+    Latências de um histórico, a partir dos ``eventTimestamp``.
+
+    Returns:
+        dict: ``activities`` (nome -> ``schedule_to_start``/``start_to_close``),
+        ``decisions`` (``schedule_to_start``/``start_to_close``) e
+        ``workflow`` (duração total, se encerrado), todas em ms
+    """
+    by_id = {event["eventId"]: event for event in events}
+    activities: dict[str, dict[str, list[float]]] = defaultdict(
+        lambda: {"schedule_to_start": [], "start_to_close": []}
+    )
+    decisions: dict[str, list[float]] = {"schedule_to_start": [], "start_to_close": []}
+    closes = {
+        "ActivityTaskCompleted": "activityTaskCompletedEventAttributes",
+        "ActivityTaskFailed": "activityTaskFailedEventAttributes",
+        "ActivityTaskCanceled": "activityTaskCanceledEventAttributes",
+    }
+    workflow = None
+    for event in events:
+        kind = event["eventType"]
+        if kind == "ActivityTaskStarted":
+            scheduled = by_id[event["activityTaskStartedEventAttributes"]["scheduledEventId"]]
+            name = scheduled["activityTaskScheduledEventAttributes"]["activityType"]["name"]
+            activities[name]["schedule_to_start"].append(
+                _millis(scheduled["eventTimestamp"], event["eventTimestamp"])
+            )
+        elif kind in closes:
+            attrs = event[closes[kind]]
+            scheduled = by_id[attrs["scheduledEventId"]]
+            name = scheduled["activityTaskScheduledEventAttributes"]["activityType"]["name"]
+            started = by_id[attrs["startedEventId"]]
+            activities[name]["start_to_close"].append(
+                _millis(started["eventTimestamp"], event["eventTimestamp"])
+            )
+        elif kind == "DecisionTaskStarted":
+            scheduled = by_id[event["decisionTaskStartedEventAttributes"]["scheduledEventId"]]
+            decisions["schedule_to_start"].append(
+                _millis(scheduled["eventTimestamp"], event["eventTimestamp"])
+            )
+        elif kind == "DecisionTaskCompleted":
+            started = by_id[event["decisionTaskCompletedEventAttributes"]["startedEventId"]]
+            decisions["start_to_close"].append(
+                _millis(started["eventTimestamp"], event["eventTimestamp"])
+            )
+        elif kind.startswith("WorkflowExecution") and kind not in (
+            "WorkflowExecutionStarted",
+            "WorkflowExecutionSignaled",
+        ):
+            workflow = _millis(events[0]["eventTimestamp"], event["eventTimestamp"])
+    return {"activities": activities, "decisions": decisions, "workflow": workflow}
+
+
+def _full_history(simulator, workflow_id: str, run_id: str) -> list[dict]:
+    events, token = [], None
+    while True:
+        page = simulator.get_workflow_execution_history(
+            domain=Config.SWF_DOMAIN,
+            execution={"workflowId": workflow_id, "runId": run_id},
+            **({"nextPageToken": token} if token else {}),
+        )
+        events.extend(page["events"])
+        token = page.get("nextPageToken")
+        if not token:
+            return events
+
+
+def _synthetic_handler(activity_ms: float):
+    def handler(data):
+        if activity_ms:
+            time.sleep(activity_ms / 1000)
+        return {"status": "ok"}
+
+    return handler
+
+
+def run_load(
+    workflows: int,
+    deciders: int = 1,
+    activity_workers: int = 1,
+    decision_pollers: int = 2,
+    activity_pollers: int = 4,
+    max_in_flight: int = 16,
+    activity_ms: float = 0.0,
+    real_handlers: bool = False,
+    rate: float = 10_000,
+    concurrency: int = 16,
+    poll_timeout: float = 0.2,
+    timeout: float = 300.0,
+) -> dict[str, Any]:
+    """
+    Executa uma configuração de carga contra o simulador.
+
+    Args:
+        workflows (int): Execuções a iniciar
+        deciders (int): Instâncias de ``DecisionWorker``
+        activity_workers (int): Instâncias de ``ActivityWorker``
+        decision_pollers (int): Pollers máximos por decider
+        activity_pollers (int): Pollers máximos por activity worker
+        max_in_flight (int): Tarefas simultâneas por activity worker
+        activity_ms (float): Duração do handler sintético
+        real_handlers (bool): Mantém os handlers originais das atividades
+        rate (float): Inícios por segundo (token bucket do starter)
+        concurrency (int): Inícios simultâneos
+        poll_timeout (float): Long poll do simulador (define o tempo de parada)
+        timeout (float): Tempo máximo de espera pelo encerramento dos workflows
+
+    Returns:
+        dict: Configuração, vazão, latências e chamadas da API
+    """
+    from activity_worker import ActivityWorker
+    from decision_worker import DecisionWorker
+    from workflow_starter import WorkflowStarter
+
+    simulator = swf_simulator.install(poll_timeout=poll_timeout)
+    threads, instances = [], []
+    try:
+        with tempfile.TemporaryDirectory() as store_dir, open(os.devnull, "w") as devnull:
+            set_payload_store(
+                PayloadStore(
+                    LocalPayloadStore(store_dir),
+                    Config.PAYLOAD_OFFLOAD_THRESHOLD,
+                    Config.PAYLOAD_CACHE_MAX_BYTES,
+                )
+            )
+            # Prints dos workers descartados durante a carga
+            with contextlib.redirect_stdout(devnull):
+                for index in range(deciders):
+                    worker = DecisionWorker(identity=f"e2e-decider-{index}")
+                    instances.append(worker)
+                    threads.append(
+                        threading.Thread(
+                            target=worker.run_concurrent,
+                            args=(decision_pollers, decision_pollers),
+                            daemon=True,
+                        )
+                    )
+                for index in range(activity_workers):
+                    worker = ActivityWorker(identity=f"e2e-activity-{index}")
+                    if not real_handlers:
+                        handler = _synthetic_handler(activity_ms)
+                        worker.activities = dict.fromkeys(worker.activities, handler)
+                    instances.append(worker)
+                    threads.append(
+                        threading.Thread(
+                            target=worker.run_concurrent,
+                            args=(activity_pollers, max_in_flight, activity_pollers),
+                            daemon=True,
+                        )
+                    )
+                for thread in threads:
+                    thread.start()
+
+                begin = time.perf_counter()
+                started, errors = [], 0
+                starter = WorkflowStarter()
+                inputs = ({"order_id": f"ORD-{i:07d}", "customer_id": "C-1"} for i in range(workflows))
+                for _input, workflow_id, outcome in starter.start_workflows_bulk(
+                    inputs, concurrency=concurrency, rate=rate, burst=rate
+                ):
+                    if isinstance(outcome, Exception):
+                        errors += 1
+                    else:
+                        started.append((workflow_id, outcome))
+                starts_elapsed = time.perf_counter() - begin
+
+                deadline = time.monotonic() + timeout
+                while sum(simulator.close_status_counts.values()) < len(started):
+                    if time.monotonic() > deadline:
+                        break
+                    time.sleep(0.01)
+                elapsed = time.perf_counter() - begin
+
+                for worker in instances:
+                    worker.stop()
+                for thread in threads:
+                    thread.join(timeout=poll_timeout + 5)
+                for worker in instances:
+                    heartbeats = getattr(worker, "heartbeats", None)
+                    if heartbeats is not None:
+                        heartbeats.stop()
+                    if getattr(worker, "process_lane", None) is not None:
+                        worker.process_lane.shutdown()
+        set_payload_store(None)
+
+        activity_samples: dict[str, dict[str, list[float]]] = defaultdict(
+            lambda: {"schedule_to_start": [], "start_to_close": []}
+        )
+        decision_samples: dict[str, list[float]] = {"schedule_to_start": [], "start_to_close": []}
+        durations = []
+        for workflow_id, run_id in started:
+            latencies = history_latencies(_full_history(simulator, workflow_id, run_id))
+            for name, samples in latencies["activities"].items():
+                for kind, values in samples.items():
+                    activity_samples[name][kind].extend(values)
+            for kind, values in latencies["decisions"].items():
+                decision_samples[kind].extend(values)
+            if latencies["workflow"] is not None:
+                durations.append(latencies["workflow"])
+
+        closed = dict(simulator.close_status_counts)
+        calls = dict(simulator.calls)
+        # Consultas de histórico do próprio relatório não entram na conta
+        calls.pop("GetWorkflowExecutionHistory", None)
+        per_workflow = len(started) or 1
+        return {
+            "config": {
+                "workflows": workflows,
+                "deciders": deciders,
+                "activity_workers": activity_workers,
+                "decision_pollers": decision_pollers,
+                "activity_pollers": activity_pollers,
+                "max_in_flight": max_in_flight,
+                "activity_ms": activity_ms,
+                "real_handlers": real_handlers,
+                "rate": rate,
+                "concurrency": concurrency,
+            },
+            "meta": {
+                "created_at": datetime.now(timezone.utc).isoformat(),
+                "python": platform.python_version(),
+                "machine": platform.machine(),
+            },
+            "started": len(started),
+            "start_errors": errors,
+            "closed": closed,
+            "elapsed_s": elapsed,
+            "starts_per_s": len(started) / starts_elapsed if starts_elapsed else None,
+            "workflows_per_s": sum(closed.values()) / elapsed if elapsed else None,
+            "workflow_ms": percentiles(durations),
+            "decision_ms": {kind: percentiles(v) for kind, v in decision_samples.items()},
+            "activity_ms": {
+                name: {kind: percentiles(v) for kind, v in samples.items()}
+                for name, samples in sorted(activity_samples.items())
+            },
+            "api_calls_per_workflow": sum(calls.values()) / per_workflow,
+            "api_calls_by_operation": {
+                name: count / per_workflow for name, count in sorted(calls.items())
+            },
+        }
+    finally:
+        swf_simulator.uninstall()
+
+
+def _format_latency(summary: dict[str, Any]) -> str:
+    if not summary["count"]:
+        return "-"
+    return "/".join(f"{summary[f'p{q}']:.1f}" for q in QUANTILES)
+
+
+def print_report(result: dict[str, Any]) -> None:
+    """Resumo legível de um resultado de ``run_load``."""
+    config = result["config"]
+    print(
+        f"\ndeciders={config['deciders']} activity_workers={config['activity_workers']} "
+        f"workflows={result['started']} encerrados={result['closed']} "
+        f"em {result['elapsed_s']:.2f}s"
+    )
+    print(
+        f"  {result['workflows_per_s']:.1f} workflows/s, "
+        f"{result['api_calls_per_workflow']:.1f} chamadas da API por workflow"
+    )
+    print(f"  {'latências p50/p95/p99 (ms)':<28} {'schedule-to-start':>22} {'start-to-close':>22}")
+    rows = [("decision task", result["decision_ms"])] + list(result["activity_ms"].items())
+    for name, summary in rows:
+        print(
+            f"  {name:<28} {_format_latency(summary['schedule_to_start']):>22} "
+            f"{_format_latency(summary['start_to_close']):>22}"
+        )
+    print(f"  {'workflow (duração)':<28} {_format_latency(result['workflow_ms']):>22}")
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--workflows", type=int, default=1_000)
+    parser.add_argument("--deciders", type=int, nargs="+", default=[1])
+    parser.add_argument("--activity-workers", type=int, nargs="+", default=[1])
+    parser.add_argument("--decision-pollers", type=int, default=2)
+    parser.add_argument("--activity-pollers", type=int, default=4)
+    parser.add_argument("--max-in-flight", type=int, default=16)
+    parser.add_argument("--activity-ms", type=float, default=0.0)
+    parser.add_argument("--real-handlers", action="store_true")
+    parser.add_argument("--rate", type=float, default=10_000)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--timeout", type=float, default=300.0)
+    parser.add_argument("--output", help="arquivo JSONL (uma linha por configuração)")
+    args = parser.parse_args(argv)
+
+    for deciders in args.deciders:
+        for activity_workers in args.activity_workers:
+            result = run_load(
+                args.workflows,
+                deciders=deciders,
+                activity_workers=activity_workers,
+                decision_pollers=args.decision_pollers,
+                activity_pollers=args.activity_pollers,
+                max_in_flight=args.max_in_flight,
+                activity_ms=args.activity_ms,
+                real_handlers=args.real_handlers,
+                rate=args.rate,
+                concurrency=args.concurrency,
+                timeout=args.timeout,
+            )
+            print_report(result)
+            if args.output:
+                directory = os.path.dirname(args.output)
+                if directory:
+                    os.makedirs(directory, exist_ok=True)
+                with open(args.output, "a", encoding="utf-8") as output:
+                    output.write(json.dumps(result) + "\n")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,187 @@
+"""Geradores de históricos sintéticos no formato retornado pelo SWF."""
+
+from __future__ import annotations
+
+import json
+from datetime import datetime, timedelta, timezone
+
+WORKFLOW_STEPS = ["ValidateInput", "ProcessData", "EnrichData", "SaveResults", "NotifyCompletion"]
+
+_BASE_TIME = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+
+class HistoryBuilder:
+    """Monta um histórico sintético, atribuindo eventIds sequenciais."""
+
+    def __init__(self):
+        self.events: list[dict] = []
+
+    def add(self, event_type: str, **attributes) -> int:
+        """Acrescenta um evento e devolve o seu eventId."""
+        event_id = len(self.events) + 1
+        event = {
+            "eventId": event_id,
+            "eventType": event_type,
+            "eventTimestamp": _BASE_TIME + timedelta(milliseconds=event_id),
+        }
+        if attributes:
+            key = event_type[0].lower() + event_type[1:] + "EventAttributes"
+            event[key] = attributes
+        self.events.append(event)
+        return event_id
+
+    def start(self, workflow_input: dict) -> None:
+        self.add("WorkflowExecutionStarted", input=json.dumps(workflow_input))
+
+    def signal(self, name: str, signal_input: dict | None = None) -> int:
+        """Acrescenta um sinal recebido pela execução."""
+        return self.add(
+            "WorkflowExecutionSignaled", signalName=name, input=json.dumps(signal_input or {})
+        )
+
+    def marker(self, name: str, details: dict | None = None) -> int:
+        """Acrescenta um marcador registrado por uma decisão."""
+        return self.add("MarkerRecorded", markerName=name, details=json.dumps(details or {}))
+
+    def decision(self) -> None:
+        """Acrescenta uma decision task completa (agendada, iniciada, concluída)."""
+        self.decision_started()
+        self.decision_completed()
+
+    def decision_started(self) -> int:
+        """Acrescenta uma decision task em andamento; devolve o eventId do início."""
+        scheduled = self.add("DecisionTaskScheduled")
+        return self.add("DecisionTaskStarted", scheduledEventId=scheduled)
+
+    def decision_completed(self) -> None:
+        """Conclui a última decision task iniciada."""
+        started = self.events[-1]["eventId"]
+        for event in reversed(self.events):
+            if event["eventType"] == "DecisionTaskStarted":
+                started = event["eventId"]
+                break
+        self.add("DecisionTaskCompleted", scheduledEventId=started - 1, startedEventId=started)
+
+    def activity(self, name: str, outcome: str = "completed", result: dict | None = None) -> int:
+        """Agenda, inicia e encerra uma atividade; devolve o eventId do agendamento."""
+        scheduled = self.schedule(name)
+        self.close(scheduled, outcome, result)
+        return scheduled
+
+    def schedule(self, name: str) -> int:
+        """Agenda uma atividade (que fica em aberto); devolve o eventId do agendamento."""
+        return self.add(
+            "ActivityTaskScheduled",
+            activityType={"name": name, "version": "1.0"},
+            activityId=f"{name}-{len(self.events)}",
+        )
+
+    def close(self, scheduled: int, outcome: str = "completed", result: dict | None = None) -> None:
+        """Inicia e encerra a atividade agendada em ``scheduled``."""
+        started = self.add("ActivityTaskStarted", scheduledEventId=scheduled)
+        if outcome == "completed":
+            self.add(
+                "ActivityTaskCompleted",
+                scheduledEventId=scheduled,
+                startedEventId=started,
+                result=json.dumps(result or {"status": "ok"}),
+            )
+        elif outcome == "failed":
+            self.add(
+                "ActivityTaskFailed",
+                scheduledEventId=scheduled,
+                startedEventId=started,
+                reason="synthetic failure",
+            )
+        else:
+            self.add(
+                "ActivityTaskTimedOut",
+                scheduledEventId=scheduled,
+                startedEventId=started,
+                timeoutType="START_TO_CLOSE",
+            )
+
+
+def linear_history(size: int, workflow_input: dict | None = None) -> list[dict]:
+    """
+    Gera um histórico linear com aproximadamente ``size`` eventos.
+
+    As etapas do workflow são repetidas em ciclo até atingir o tamanho
+    pedido, simulando um pedido de longa duração.
+    """
+    builder = HistoryBuilder()
+    builder.start(workflow_input or {"order_id": "ORD-BENCH"})
+    step = 0
+    while len(builder.events) < size:
+        builder.decision()
+        builder.activity(WORKFLOW_STEPS[step % len(WORKFLOW_STEPS)])
+        step += 1
+    return builder.events
+
+
+def retry_history(size: int, failures_per_step: int = 2) -> list[dict]:
+    """
+    Histórico em que cada etapa falha (alternando falha e timeout)
+    ``failures_per_step`` vezes antes de concluir.
+    """
+    builder = HistoryBuilder()
+    builder.start({"order_id": "ORD-BENCH"})
+    step = 0
+    while len(builder.events) < size:
+        name = WORKFLOW_STEPS[step % len(WORKFLOW_STEPS)]
+        for attempt in range(failures_per_step):
+            builder.decision()
+            builder.activity(name, "failed" if attempt % 2 == 0 else "timed_out")
+        builder.decision()
+        builder.activity(name)
+        step += 1
+    return builder.events
+
+
+def rollback_history(size: int) -> list[dict]:
+    """
+    Histórico linear de ``size`` eventos que termina em rollback: a última
+    etapa esgota as tentativas, ``RollbackStep`` conclui e a compensação
+    fica em aberto.
+    """
+    builder = HistoryBuilder()
+    builder.start({"order_id": "ORD-BENCH"})
+    tail = 30  # Eventos da sequência de falhas, rollback e compensação
+    step = 0
+    while len(builder.events) < size - tail:
+        builder.decision()
+        builder.activity(WORKFLOW_STEPS[step % len(WORKFLOW_STEPS)])
+        step += 1
+    failing = WORKFLOW_STEPS[step % len(WORKFLOW_STEPS)]
+    for _ in range(3):
+        builder.decision()
+        builder.activity(failing, "failed")
+    builder.decision()
+    builder.marker("ROLLBACK_INITIATED", {"failed_activity": failing})
+    builder.activity("RollbackStep")
+    builder.decision()
+    builder.schedule("CompensateTransaction")
+    return builder.events
+
+
+def signal_history(size: int, signals_per_step: int = 10) -> list[dict]:
+    """Histórico dominado por sinais, com uma etapa concluída a cada ``signals_per_step``."""
+    builder = HistoryBuilder()
+    builder.start({"order_id": "ORD-BENCH"})
+    step = 0
+    while len(builder.events) < size:
+        for i in range(signals_per_step):
+            builder.signal("STATUS_UPDATE", {"sequence": i})
+            builder.decision()
+        builder.activity(WORKFLOW_STEPS[step % len(WORKFLOW_STEPS)])
+        step += 1
+    return builder.events
+
+
+# Cenário -> gerador de histórico com aproximadamente ``size`` eventos
+HISTORY_GENERATORS = {
+    "linear": linear_history,
+    "retry": retry_history,
+    "rollback": rollback_history,
+    "signal": signal_history,
+}
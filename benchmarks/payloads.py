@@ -0,0 +1,33 @@
+"""Geradores de payloads sintéticos (pedidos) para os benchmarks."""
+
+from __future__ import annotations
+
+import random
+
+from codec import PayloadCodec
+
+# Tamanhos típicos de input/resultado, até o limite de 32KB do SWF
+PAYLOAD_SIZES = [1_024, 4_096, 16_384, 32_768]
+
+
+def order_payload(target_bytes: int, seed: int = 7) -> dict:
+    """Pedido com itens até atingir aproximadamente ``target_bytes`` em JSON."""
+    rng = random.Random(seed)
+    order = {
+        "order_id": "ORD-2024-000123",
+        "customer_id": "CUST-789",
+        "currency": "BRL",
+        "shipping": {"zip": "01310-100", "city": "São Paulo", "method": "express"},
+        "items": [],
+    }
+    while len(PayloadCodec(json_backend="json").encode(order)) < target_bytes:
+        order["items"].append(
+            {
+                "sku": f"SKU-{rng.randrange(100_000):05d}",
+                "description": rng.choice(["Camiseta", "Caneca", "Livro", "Fone"]),
+                "qty": rng.randint(1, 5),
+                "unit_price": round(rng.uniform(5, 500), 2),
+                "tags": rng.sample(["promo", "fragil", "importado", "kit"], 2),
+            }
+        )
+    return order
@@ -0,0 +1,348 @@
+"""
+Suíte de micro-benchmarks dos caminhos críticos do decider e do activity worker.
+
+Casos medidos:
+
+- ``analyze_events``: replay completo dos históricos sintéticos (linear,
+  retry, rollback e signal) de 10 a 25.000 eventos
+- ``make_decisions``: decisão a partir do estado já reconstruído de cada
+  cenário
+- ``schedule_activity``: montagem da decisão de agendamento com inputs de
+  1KB a 32KB
+- ``handle_activity_task``: tarefa completa no activity worker (input,
+  handler de eco, serialização e resposta) com payloads de 1KB a 32KB
+- ``metrics``: custo de uma observação de histograma e de um incremento de
+  contador com lookup de rótulos (ver metrics.py)
+
+Os resultados são gravados em JSON (``--output``). ``--save-baseline``
+grava a referência em ``--baseline`` e ``--compare`` compara a execução com
+ela, listando os casos mais lentos que ``--threshold`` (código de saída 1
+se houver regressão).
+
+Uso:
+    python -m benchmarks.suite
+    python -m benchmarks.suite --quick --save-baseline
+    python -m benchmarks.suite --quick --compare
+"""
+
+from __future__ import annotations
+
+import argparse
+import contextlib
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+from collections.abc import Iterator
+from datetime import datetime, timezone
+from typing import Any, Callable
+
+from benchmarks.histories import HISTORY_GENERATORS
+from benchmarks.payloads import PAYLOAD_SIZES, order_payload
+from codec import encode
+from config import Config
+from payload_store import LocalPayloadStore, PayloadStore, dehydrate, set_payload_store
+
+DEFAULT_SIZES = [10, 100, 1_000, 10_000, 25_000]
+QUICK_SIZES = [10, 100, 1_000]
+QUICK_PAYLOAD_SIZES = [1_024, 32_768]
+DEFAULT_BASELINE = os.path.join(".benchmarks", "baseline.json")
+
+# Tempo mínimo de cada amostra: chamadas rápidas são repetidas até atingi-lo
+MIN_SAMPLE_SECONDS = 0.005
+
+Case = tuple[str, dict[str, Any], Callable[[], Any]]
+
+
+class _NullSWF:
+    """Cliente SWF que aceita as respostas do activity worker sem rede."""
+
+    def respond_activity_task_completed(self, **kwargs):
+        return {}
+
+    def respond_activity_task_failed(self, **kwargs):
+        return {}
+
+    def respond_activity_task_canceled(self, **kwargs):
+        return {}
+
+    def record_activity_task_heartbeat(self, **kwargs):
+        return {"cancelRequested": False}
+
+
+def time_call(fn: Callable[[], Any], repeat: int) -> tuple[float, float, int]:
+    """
+    Mede uma chamada.
+
+    Args:
+        fn (callable): Função sem argumentos
+        repeat (int): Número de amostras
+
+    Returns:
+        tuple: Melhor tempo e mediana por chamada (segundos) e chamadas por amostra
+    """
+    begin = time.perf_counter()
+    fn()
+    single = time.perf_counter() - begin
+    number = max(1, int(MIN_SAMPLE_SECONDS / single)) if single > 0 else 1000
+    samples = []
+    for _ in range(repeat):
+        begin = time.perf_counter()
+        for _ in range(number):
+            fn()
+        samples.append((time.perf_counter() - begin) / number)
+    return min(samples), statistics.median(samples), number
+
+
+def case_key(case: str, params: dict[str, Any]) -> str:
+    """Identificador estável de um caso, usado na comparação com a baseline."""
+    return f"{case}[{','.join(f'{name}={value}' for name, value in params.items())}]"
+
+
+def decider_cases(sizes: list[int]) -> Iterator[Case]:
+    """Casos de ``analyze_events`` e ``make_decisions`` por cenário e tamanho."""
+    from decision_worker import DecisionWorker
+
+    worker = DecisionWorker(identity="bench-decider")
+    for scenario, generate in HISTORY_GENERATORS.items():
+        for size in sizes:
+            events = generate(size)
+            params = {"scenario": scenario, "events": size}
+            yield "analyze_events", params, lambda events=events: worker.analyze_events(events)
+            state = worker.analyze_events(events)
+            yield "make_decisions", params, lambda state=state: worker.make_decisions(state)
+
+
+def schedule_activity_cases(payload_sizes: list[int]) -> Iterator[Case]:
+    """Casos de ``schedule_activity`` com inputs de workflow de vários tamanhos."""
+    from decision_worker import DecisionWorker
+    from history import new_workflow_state
+
+    worker = DecisionWorker(identity="bench-decider")
+    for size in payload_sizes:
+        state = new_workflow_state()
+        state["workflow_input"] = order_payload(size)
+        state["activity_results"] = {"ValidateInput": {"status": "validated"}}
+        yield (
+            "schedule_activity",
+            {"payload_bytes": size},
+            lambda state=state: worker.schedule_activity("ProcessData", state),
+        )
+
+
+def metrics_cases() -> Iterator[Case]:
+    """Custo por observação das métricas usadas nos caminhos críticos."""
+    from metrics import MetricsRegistry
+
+    registry = MetricsRegistry()
+    latency = registry.histogram("bench_seconds", "Latência", ("operation",)).labels("poll")
+    polls = registry.counter("bench_total", "Polls", ("worker", "result"))
+    yield "metrics", {"op": "histogram_observe"}, lambda: latency.observe(0.003)
+    yield "metrics", {"op": "counter_labels_inc"}, lambda: polls.labels("activity", "task").inc()
+
+
+@contextlib.contextmanager
+def _activity_worker():
+    from activity_worker import ActivityWorker
+
+    worker = ActivityWorker(identity="bench-worker")
+    worker.swf_client.client = _NullSWF()
+    worker.activities["BenchEcho"] = lambda data: data
+    try:
+        yield worker
+    finally:
+        worker.heartbeats.stop()
+        if worker.process_lane is not None:
+            worker.process_lane.shutdown()
+
+
+def handle_activity_cases(worker, payload_sizes: list[int]) -> Iterator[Case]:
+    """Casos de ``handle_activity_task`` com o handler de eco."""
+    for size in payload_sizes:
+        task = activity_task(order_payload(size))
+        yield (
+            "handle_activity_task",
+            {"payload_bytes": size},
+            lambda task=task: worker.handle_activity_task(task),
+        )
+
+
+def activity_task(payload: dict) -> dict:
+    """Tarefa de atividade sintética para o handler de eco."""
+    return {
+        "taskToken": "bench-token",
+        "activityId": "BenchEcho-1",
+        "startedEventId": 1,
+        "workflowExecution": {"workflowId": "bench", "runId": "bench-run"},
+        "activityType": {"name": "BenchEcho", "version": Config.ACTIVITY_VERSION},
+        "input": dehydrate(encode(payload)),
+    }
+
+
+def run_suite(
+    sizes: list[int] | None = None,
+    payload_sizes: list[int] | None = None,
+    repeat: int = 5,
+    only: str | None = None,
+) -> dict[str, Any]:
+    """
+    Executa os casos e devolve o relatório.
+
+    Payloads externalizados vão para um diretório temporário, e a saída dos
+    workers (prints) é descartada durante as medições.
+
+    Args:
+        sizes (list): Tamanhos dos históricos (eventos)
+        payload_sizes (list): Tamanhos dos payloads (bytes de JSON)
+        repeat (int): Amostras por caso
+        only (str): Executa apenas os casos cujo identificador contém o texto
+
+    Returns:
+        dict: ``{"meta": {...}, "results": [{"key", "case", "params", ...}]}``
+    """
+    sizes = sizes or DEFAULT_SIZES
+    payload_sizes = payload_sizes or PAYLOAD_SIZES
+    results = []
+
+    def measure(cases):
+        for case, params, fn in cases:
+            key = case_key(case, params)
+            if only and only not in key:
+                continue
+            best, median, number = time_call(fn, repeat)
+            results.append(
+                {
+                    "key": key,
+                    "case": case,
+                    "params": params,
+                    "best_us": best * 1e6,
+                    "median_us": median * 1e6,
+                    "number": number,
+                    "repeat": repeat,
+                }
+            )
+
+    with tempfile.TemporaryDirectory() as store_dir, open(os.devnull, "w") as devnull:
+        set_payload_store(
+            PayloadStore(
+                LocalPayloadStore(store_dir),
+                Config.PAYLOAD_OFFLOAD_THRESHOLD,
+                Config.PAYLOAD_CACHE_MAX_BYTES,
+            )
+        )
+        try:
+            with contextlib.redirect_stdout(devnull):
+                measure(decider_cases(sizes))
+                measure(schedule_activity_cases(payload_sizes))
+                measure(metrics_cases())
+                with _activity_worker() as worker:
+                    measure(handle_activity_cases(worker, payload_sizes))
+        finally:
+            set_payload_store(None)
+
+    return {
+        "meta": {
+            "created_at": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "implementation": platform.python_implementation(),
+            "machine": platform.machine(),
+            "platform": platform.platform(),
+            "repeat": repeat,
+        },
+        "results": results,
+    }
+
+
+def compare(
+    current: dict[str, Any], baseline: dict[str, Any], threshold: float
+) -> list[dict[str, Any]]:
+    """
+    Compara os melhores tempos de cada caso presente nos dois relatórios.
+
+    Args:
+        current (dict): Relatório desta execução
+        baseline (dict): Relatório de referência
+        threshold (float): Aumento relativo tolerado (0.25 = 25% mais lento)
+
+    Returns:
+        list: Um item por caso com ``key``, ``baseline_us``, ``current_us``,
+        ``ratio`` e ``regression``
+    """
+    reference = {result["key"]: result["best_us"] for result in baseline["results"]}
+    rows = []
+    for result in current["results"]:
+        if result["key"] not in reference:
+            continue
+        ratio = result["best_us"] / reference[result["key"]]
+        rows.append(
+            {
+                "key": result["key"],
+                "baseline_us": reference[result["key"]],
+                "current_us": result["best_us"],
+                "ratio": ratio,
+                "regression": ratio > 1 + threshold,
+            }
+        )
+    return rows
+
+
+def write_report(report: dict[str, Any], path: str) -> None:
+    """Grava um relatório em JSON (criando o diretório, se preciso)."""
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(path, "w", encoding="utf-8") as output:
+        json.dump(report, output, indent=2)
+        output.write("\n")
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", type=int, nargs="+", help="tamanhos dos históricos")
+    parser.add_argument("--payload-sizes", type=int, nargs="+", help="tamanhos dos payloads")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--quick", action="store_true", help="tamanhos reduzidos (CI)")
+    parser.add_argument("--only", help="apenas casos cujo identificador contém o texto")
+    parser.add_argument("--output", help="arquivo JSON com os resultados")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--compare", action="store_true")
+    parser.add_argument("--threshold", type=float, default=0.25)
+    args = parser.parse_args(argv)
+
+    report = run_suite(
+        sizes=args.sizes or (QUICK_SIZES if args.quick else None),
+        payload_sizes=args.payload_sizes or (QUICK_PAYLOAD_SIZES if args.quick else None),
+        repeat=args.repeat,
+        only=args.only,
+    )
+
+    print(f"{'caso':<58} {'melhor (us)':>12} {'mediana (us)':>13}")
+    for result in report["results"]:
+        print(f"{result['key']:<58} {result['best_us']:>12.1f} {result['median_us']:>13.1f}")
+
+    if args.output:
+        write_report(report, args.output)
+    if args.save_baseline:
+        write_report(report, args.baseline)
+        print(f"\nBaseline gravada em {args.baseline}")
+
+    if not args.compare:
+        return 0
+    with open(args.baseline, encoding="utf-8") as stored:
+        rows = compare(report, json.load(stored), args.threshold)
+    print(f"\n{'caso':<58} {'baseline':>10} {'atual':>10} {'razão':>7}")
+    for row in rows:
+        flag = "  REGRESSÃO" if row["regression"] else ""
+        print(
+            f"{row['key']:<58} {row['baseline_us']:>10.1f} {row['current_us']:>10.1f} "
+            f"{row['ratio']:>7.2f}{flag}"
+        )
+    return 1 if any(row["regression"] for row in rows) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
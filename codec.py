@@ -0,0 +1,247 @@
+"""
+Serialização dos payloads trocados com o SWF.
+
+``encode`` transforma um objeto no texto enviado como ``input``, ``result``
+ou ``details``; ``decode`` faz o caminho inverso. O backend JSON é o mais
+rápido disponível (``orjson``, ``msgspec`` ou ``json`` da biblioteca
+padrão), escolhido por ``Config.PAYLOAD_JSON_BACKEND``. O resultado é
+sempre o mesmo da biblioteca padrão: objetos que os backends rápidos não
+representam igual (chaves não-string, inteiros acima de 64 bits, NaN e
+infinitos) são serializados e lidos pelo ``json``.
+
+Com ``Config.PAYLOAD_COMPRESSION`` (``zlib`` ou ``zstd``), payloads a partir
+de ``Config.PAYLOAD_COMPRESSION_MIN_BYTES`` são comprimidos e codificados em
+base64 com um cabeçalho que identifica o formato::
+
+    ~zlib:<base64>
+    ~zstd:<base64>
+
+JSON nunca começa com ``~``, então payloads sem cabeçalho (inclusive os de
+históricos antigos) continuam sendo lidos como JSON puro. A leitura
+entende todos os formatos independentemente da configuração de escrita.
+"""
+
+from __future__ import annotations
+
+import base64
+import json
+import math
+import re
+import zlib
+from typing import Any, Callable
+
+from config import Config
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - depende do ambiente
+    orjson = None
+
+try:
+    import msgspec
+except ImportError:  # pragma: no cover - depende do ambiente
+    msgspec = None
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover - depende do ambiente
+    zstandard = None
+
+HEADER_PREFIX = "~"
+
+
+def _stdlib_dumps(obj: Any) -> str:
+    return json.dumps(obj, separators=(",", ":"), ensure_ascii=False)
+
+
+# Números com 20 ou mais dígitos podem passar de 64 bits: os backends rápidos
+# os leem como float (ou falham), a biblioteca padrão como int
+_LONG_NUMBER = re.compile(r"\d{20}")
+_LONG_NUMBER_BYTES = re.compile(rb"\d{20}")
+
+_FAST_ERRORS: tuple[type[Exception], ...] = (TypeError, ValueError, OverflowError)
+if msgspec is not None:
+    _FAST_ERRORS += (msgspec.MsgspecError,)
+
+
+def _has_non_finite(obj: Any) -> bool:
+    if isinstance(obj, float):
+        return not math.isfinite(obj)
+    if isinstance(obj, dict):
+        return any(_has_non_finite(value) for value in obj.values())
+    if isinstance(obj, (list, tuple)):
+        return any(_has_non_finite(value) for value in obj)
+    return False
+
+
+def _compatible(
+    dumps: Callable[[Any], str], loads: Callable[[str], Any]
+) -> tuple[Callable[[Any], str], Callable[[str], Any]]:
+    """Envolve um backend rápido para que produza o mesmo que o ``json`` padrão."""
+
+    def compatible_dumps(obj: Any) -> str:
+        try:
+            text = dumps(obj)
+        except _FAST_ERRORS:
+            return _stdlib_dumps(obj)
+        # NaN e infinitos viram null nos backends rápidos
+        if "null" in text and _has_non_finite(obj):
+            return _stdlib_dumps(obj)
+        return text
+
+    def compatible_loads(text: str | bytes) -> Any:
+        pattern = _LONG_NUMBER_BYTES if isinstance(text, bytes) else _LONG_NUMBER
+        if pattern.search(text):
+            return json.loads(text)
+        try:
+            return loads(text)
+        except _FAST_ERRORS:
+            return json.loads(text)  # NaN/Infinity ou JSON inválido (erro do json)
+
+    return compatible_dumps, compatible_loads
+
+
+def _json_backends() -> dict[str, tuple[Callable[[Any], str], Callable[[str], Any]]]:
+    """Backends JSON instalados: nome -> (dumps, loads)."""
+    backends = {}
+    if orjson is not None:
+        backends["orjson"] = _compatible(
+            lambda obj: orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS).decode("utf-8"),
+            orjson.loads,
+        )
+    if msgspec is not None:
+        encoder, decoder = msgspec.json.Encoder(), msgspec.json.Decoder()
+        backends["msgspec"] = _compatible(
+            lambda obj: encoder.encode(obj).decode("utf-8"), decoder.decode
+        )
+    backends["json"] = (_stdlib_dumps, json.loads)
+    return backends
+
+
+JSON_BACKENDS = _json_backends()
+
+
+def _select_backend(name: str) -> str:
+    if name == "auto":
+        return next(iter(JSON_BACKENDS))
+    if name not in JSON_BACKENDS:
+        raise ValueError(f"JSON backend '{name}' is not installed")
+    return name
+
+
+def _zlib_compress(data: bytes) -> bytes:
+    return zlib.compress(data, Config.PAYLOAD_COMPRESSION_LEVEL)
+
+
+def _zstd_compress(data: bytes) -> bytes:
+    if zstandard is None:
+        raise RuntimeError("zstd compression requires the 'zstandard' package")
+    return zstandard.ZstdCompressor(level=Config.PAYLOAD_COMPRESSION_LEVEL).compress(data)
+
+
+def _zstd_decompress(data: bytes) -> bytes:
+    if zstandard is None:
+        raise RuntimeError("zstd payload found but the 'zstandard' package is not installed")
+    return zstandard.ZstdDecompressor().decompress(data)
+
+
+# Formato -> (comprimir, descomprimir)
+COMPRESSORS = {
+    "zlib": (_zlib_compress, zlib.decompress),
+    "zstd": (_zstd_compress, _zstd_decompress),
+}
+
+
+class PayloadCodec:
+    """Codificador de payloads com backend JSON e compressão configuráveis."""
+
+    def __init__(
+        self,
+        json_backend: str = "auto",
+        compression: str = "none",
+        compression_min_bytes: int = 1024,
+    ):
+        """
+        Args:
+            json_backend (str): 'auto', 'orjson', 'msgspec' ou 'json'
+            compression (str): 'none', 'zlib' ou 'zstd'
+            compression_min_bytes (int): Tamanho mínimo do JSON para comprimir
+        """
+        if compression != "none" and compression not in COMPRESSORS:
+            raise ValueError(f"Unknown compression '{compression}'")
+        self.json_backend = _select_backend(json_backend)
+        self.compression = compression
+        self.compression_min_bytes = compression_min_bytes
+        self._dumps, self._loads = JSON_BACKENDS[self.json_backend]
+
+    def encode(self, obj: Any) -> str:
+        """
+        Serializa um objeto para envio ao SWF.
+
+        A versão comprimida só é usada quando fica menor que o JSON.
+
+        Args:
+            obj: Objeto serializável em JSON
+
+        Returns:
+            str: JSON ou payload comprimido com cabeçalho
+        """
+        text = self._dumps(obj)
+        if self.compression == "none" or len(text) < self.compression_min_bytes:
+            return text
+        compress, _ = COMPRESSORS[self.compression]
+        packed = base64.b64encode(compress(text.encode("utf-8"))).decode("ascii")
+        encoded = f"{HEADER_PREFIX}{self.compression}:{packed}"
+        return encoded if len(encoded) < len(text) else text
+
+    def decode(self, text: str | None) -> Any:
+        """
+        Deserializa um payload recebido do SWF.
+
+        Args:
+            text (str): JSON ou payload comprimido com cabeçalho
+
+        Returns:
+            Objeto deserializado
+        """
+        if text is None:
+            return None
+        if text.startswith(HEADER_PREFIX):
+            name, _, packed = text[1:].partition(":")
+            if name not in COMPRESSORS:
+                raise ValueError(f"Unknown payload encoding '{name}'")
+            _, decompress = COMPRESSORS[name]
+            return self._loads(decompress(base64.b64decode(packed)))
+        return self._loads(text)
+
+
+# Codec compartilhado do processo (recriado se o módulo for recarregado)
+_codec: PayloadCodec | None = None
+
+
+def get_codec() -> PayloadCodec:
+    """Codec configurado pelo Config, criado no primeiro uso."""
+    global _codec
+    if _codec is None:
+        _codec = PayloadCodec(
+            Config.PAYLOAD_JSON_BACKEND,
+            Config.PAYLOAD_COMPRESSION,
+            Config.PAYLOAD_COMPRESSION_MIN_BYTES,
+        )
+    return _codec
+
+
+def set_codec(codec: PayloadCodec | None) -> None:
+    """Substitui o codec compartilhado (None recria a partir do Config)."""
+    global _codec
+    _codec = codec
+
+
+def encode(obj: Any) -> str:
+    """``PayloadCodec.encode`` do codec compartilhado."""
+    return get_codec().encode(obj)
+
+
+def decode(text: str | None) -> Any:
+    """``PayloadCodec.decode`` do codec compartilhado."""
+    return get_codec().decode(text)
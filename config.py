@@ -32,6 +32,18 @@ class Config:
     # Task List: fila onde workers buscam tarefas para executar
     SWF_TASK_LIST = os.getenv('SWF_TASK_LIST', 'business-process-tasks')
     
+    # ========== Cliente SWF compartilhado ==========
+    # Conexões HTTP do pool do cliente (0 = calcula pelos pollers e threads configurados)
+    SWF_MAX_POOL_CONNECTIONS = int(os.getenv('SWF_MAX_POOL_CONNECTIONS', '0'))
+    
+    # Timeout de leitura (segundos); precisa ser maior que o long poll de 60s do SWF
+    SWF_READ_TIMEOUT = float(os.getenv('SWF_READ_TIMEOUT', '70'))
+    SWF_CONNECT_TIMEOUT = float(os.getenv('SWF_CONNECT_TIMEOUT', '10'))
+    
+    # Modo de retry do botocore (adaptive aplica rate limiting no cliente) e tentativas
+    SWF_RETRY_MODE = os.getenv('SWF_RETRY_MODE', 'adaptive')
+    SWF_MAX_ATTEMPTS = int(os.getenv('SWF_MAX_ATTEMPTS', '5'))
+    
     # ========== Configurações do Workflow ==========
     # Nome e versão do tipo de workflow
     WORKFLOW_NAME = 'BusinessProcessWorkflow'
@@ -53,9 +65,161 @@ class Config:
     # Timeout para uma atividade completar após iniciar (5 minutos)
     ACTIVITY_START_TO_CLOSE_TIMEOUT = '300'
     
+    # Prazo máximo sem heartbeat antes de a atividade expirar (60 segundos)
+    ACTIVITY_HEARTBEAT_TIMEOUT = '60'
+    
+    # Heartbeats automáticos: intervalo máximo e mínimo (segundos) entre envios
+    HEARTBEAT_INTERVAL = float(os.getenv('HEARTBEAT_INTERVAL', '20'))
+    HEARTBEAT_MIN_INTERVAL = float(os.getenv('HEARTBEAT_MIN_INTERVAL', '5'))
+    
+    # Chamadas de heartbeat simultâneas por varredura
+    HEARTBEAT_SENDER_THREADS = int(os.getenv('HEARTBEAT_SENDER_THREADS', '4'))
+    
+    # Threads de polling do activity worker em modo concorrente
+    ACTIVITY_POLLERS = int(os.getenv('ACTIVITY_POLLERS', '1'))
+    
+    # Máximo de atividades executando ao mesmo tempo em um processo
+    ACTIVITY_MAX_IN_FLIGHT = int(os.getenv('ACTIVITY_MAX_IN_FLIGHT', '1'))
+    
+    # Processos para atividades CPU-bound (0 = executa inline na thread do worker)
+    PROCESS_POOL_WORKERS = int(os.getenv('PROCESS_POOL_WORKERS', '0'))
+    
+    # Tarefas executadas por processo filho antes de ser reciclado
+    PROCESS_POOL_MAX_TASKS_PER_CHILD = int(os.getenv('PROCESS_POOL_MAX_TASKS_PER_CHILD', '100'))
+    
+    # Runtime asyncio: threads para handlers síncronos e para respostas ao SWF
+    ASYNC_SYNC_HANDLER_THREADS = int(os.getenv('ASYNC_SYNC_HANDLER_THREADS', '32'))
+    ASYNC_RESPOND_THREADS = int(os.getenv('ASYNC_RESPOND_THREADS', '8'))
+    
+    # ========== Controle adaptativo de pollers ==========
+    # Mínimo de pollers por task list (o máximo vem de ACTIVITY_POLLERS/DECISION_POLLERS)
+    POLLER_MIN_POLLERS = int(os.getenv('POLLER_MIN_POLLERS', '1'))
+    
+    # Segundos entre reavaliações do número de pollers
+    POLLER_ADJUST_INTERVAL = float(os.getenv('POLLER_ADJUST_INTERVAL', '10'))
+    
+    # Backoff exponencial com jitter após erros de poll (segundos)
+    POLLER_BACKOFF_BASE = float(os.getenv('POLLER_BACKOFF_BASE', '1'))
+    POLLER_BACKOFF_MAX = float(os.getenv('POLLER_BACKOFF_MAX', '60'))
+    
+    # Fração de polls vazios a partir da qual um poller é removido
+    POLLER_SHRINK_EMPTY_RATIO = float(os.getenv('POLLER_SHRINK_EMPTY_RATIO', '0.5'))
+    
+    # ========== Serialização de payloads ==========
+    # Backend JSON: 'auto' (orjson > msgspec > json), 'orjson', 'msgspec' ou 'json'
+    PAYLOAD_JSON_BACKEND = os.getenv('PAYLOAD_JSON_BACKEND', 'auto')
+    
+    # Compressão: 'none', 'zlib' ou 'zstd' (requer zstandard); a leitura entende todas
+    PAYLOAD_COMPRESSION = os.getenv('PAYLOAD_COMPRESSION', 'none')
+    PAYLOAD_COMPRESSION_MIN_BYTES = int(os.getenv('PAYLOAD_COMPRESSION_MIN_BYTES', '1024'))
+    PAYLOAD_COMPRESSION_LEVEL = int(os.getenv('PAYLOAD_COMPRESSION_LEVEL', '6'))
+    
+    # ========== Payloads grandes (claim check) ==========
+    # Payloads acima deste tamanho (caracteres) são gravados fora do SWF,
+    # que limita input/result/details a 32768
+    PAYLOAD_OFFLOAD_THRESHOLD = int(os.getenv('PAYLOAD_OFFLOAD_THRESHOLD', '16384'))
+    
+    # Armazenamento: 'local' (diretório compartilhado) ou 's3'
+    PAYLOAD_STORE = os.getenv('PAYLOAD_STORE', 'local')
+    PAYLOAD_STORE_PATH = os.getenv('PAYLOAD_STORE_PATH', '.payloads')
+    PAYLOAD_S3_BUCKET = os.getenv('PAYLOAD_S3_BUCKET', '')
+    PAYLOAD_S3_PREFIX = os.getenv('PAYLOAD_S3_PREFIX', 'payloads/')
+    PAYLOAD_S3_ENDPOINT_URL = os.getenv('PAYLOAD_S3_ENDPOINT_URL') or None
+    
+    # Memória máxima (bytes) do cache local de payloads lidos
+    PAYLOAD_CACHE_MAX_BYTES = int(os.getenv('PAYLOAD_CACHE_MAX_BYTES', str(32 * 1024 * 1024)))
+    
+    # ========== Início de workflows em lote ==========
+    # Inícios simultâneos e limite de taxa (chamadas/s e rajada) de start_workflows_bulk
+    STARTER_BULK_CONCURRENCY = int(os.getenv('STARTER_BULK_CONCURRENCY', '16'))
+    STARTER_RATE_LIMIT = float(os.getenv('STARTER_RATE_LIMIT', '50'))
+    STARTER_RATE_BURST = float(os.getenv('STARTER_RATE_BURST', '50'))
+    
+    # Novas tentativas de um início recusado por throttling
+    STARTER_MAX_RETRIES = int(os.getenv('STARTER_MAX_RETRIES', '5'))
+    
+    # ========== Execução em Lambda ==========
+    # Segundos reservados para um long poll (deve cobrir SWF_READ_TIMEOUT)
+    LAMBDA_POLL_WINDOW = float(os.getenv('LAMBDA_POLL_WINDOW', '70'))
+    
+    # Segundos reservados para processar uma tarefa recebida; o handler para
+    # de fazer polls quando o tempo restante da invocação fica abaixo de
+    # LAMBDA_POLL_WINDOW + reserva da tarefa
+    LAMBDA_DECISION_TASK_BUDGET = float(os.getenv('LAMBDA_DECISION_TASK_BUDGET', '30'))
+    LAMBDA_ACTIVITY_TASK_BUDGET = float(os.getenv('LAMBDA_ACTIVITY_TASK_BUDGET', '60'))
+    
+    # ========== Métricas ==========
+    # Coleta das métricas dos workers (ver metrics.py); false torna o registro no-op
+    METRICS_ENABLED = os.getenv('METRICS_ENABLED', 'true').lower() == 'true'
+    
+    # Porta do endpoint HTTP /metrics no formato do Prometheus (0 = desativado)
+    METRICS_PORT = int(os.getenv('METRICS_PORT', '0'))
+    METRICS_ADDR = os.getenv('METRICS_ADDR', '127.0.0.1')
+    
+    # ========== Tracing ==========
+    # Destino dos spans: none (desativado), jsonl (arquivo local) ou otel
+    # (OpenTelemetry configurado no processo; ver tracing.py)
+    TRACING_EXPORTER = os.getenv('TRACING_EXPORTER', 'none').lower()
+    
+    # Fração dos traces novos amostrados (0 a 1); os filhos seguem a raiz
+    TRACING_SAMPLE_RATE = float(os.getenv('TRACING_SAMPLE_RATE', '1.0'))
+    
+    # Arquivo dos spans com TRACING_EXPORTER=jsonl
+    TRACING_JSONL_PATH = os.getenv('TRACING_JSONL_PATH', 'traces.jsonl')
+    
+    # ========== Logs ==========
+    # Nível mínimo dos logs estruturados (DEBUG, INFO, WARNING, ERROR) e
+    # formato da saída: text (chave=valor) ou json (um objeto por linha)
+    LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO').upper()
+    LOG_FORMAT = os.getenv('LOG_FORMAT', 'text').lower()
+    
+    # Registros pendentes na fila do writer; com a fila cheia os novos são descartados
+    LOG_QUEUE_SIZE = int(os.getenv('LOG_QUEUE_SIZE', '10000'))
+    
+    # Limite de registros por segundo de cada evento (0 = sem limite) e
+    # amostragem por evento, ex.: poll_empty=0.01,activity_input=0.1
+    LOG_RATE_PER_EVENT = float(os.getenv('LOG_RATE_PER_EVENT', '50'))
+    LOG_SAMPLE_RATES = os.getenv('LOG_SAMPLE_RATES', '')
+    
+    # Tamanho máximo de cada campo e termos de chaves mascaradas nos payloads
+    LOG_MAX_FIELD_CHARS = int(os.getenv('LOG_MAX_FIELD_CHARS', '512'))
+    LOG_REDACT_KEYS = os.getenv(
+        'LOG_REDACT_KEYS', 'password,secret,token,authorization,api_key,card_number'
+    )
+    
+    # ========== Cache de Históricos ==========
+    # Históricos de execuções encerradas guardados em disco por
+    # WorkflowStarter.iter_workflow_history (ver history_cache.py);
+    # HISTORY_CACHE_MAX_BYTES=0 desativa o cache
+    HISTORY_CACHE_PATH = os.getenv('HISTORY_CACHE_PATH', '.history-cache')
+    HISTORY_CACHE_MAX_BYTES = int(os.getenv('HISTORY_CACHE_MAX_BYTES', str(256 * 1024 * 1024)))
+    
+    # ========== Visibilidade ==========
+    # Janelas de tempo por listagem e quantas são lidas ao mesmo tempo (visibility.py)
+    VISIBILITY_WINDOWS = int(os.getenv('VISIBILITY_WINDOWS', '8'))
+    VISIBILITY_CONCURRENCY = int(os.getenv('VISIBILITY_CONCURRENCY', '4'))
+    
+    # Execuções por página (máximo do SWF: 1000)
+    VISIBILITY_PAGE_SIZE = int(os.getenv('VISIBILITY_PAGE_SIZE', '1000'))
+    
+    # Novas tentativas de uma chamada recusada por throttling
+    VISIBILITY_MAX_RETRIES = int(os.getenv('VISIBILITY_MAX_RETRIES', '5'))
+    
     # ========== Configurações de Decision Tasks ==========
     # Timeout para processar uma decision task (5 minutos)
     DECISION_TASK_TIMEOUT = '300'
     
+    # Pollers concorrentes do decision worker no runtime asyncio
+    DECISION_POLLERS = int(os.getenv('DECISION_POLLERS', '1'))
+    
+    # Eventos por página do histórico entregue no poll de decision tasks (máx. 1000)
+    DECISION_HISTORY_PAGE_SIZE = int(os.getenv('DECISION_HISTORY_PAGE_SIZE', '1000'))
+    
+    # Lê o histórico do mais recente para o mais antigo (só com replay em cache)
+    DECISION_HISTORY_REVERSE_ORDER = os.getenv('DECISION_HISTORY_REVERSE_ORDER', 'false').lower() == 'true'
+    
+    # Memória máxima (bytes) do cache de replay por runId do decision worker
+    DECISION_CACHE_MAX_BYTES = int(os.getenv('DECISION_CACHE_MAX_BYTES', str(64 * 1024 * 1024)))
+    
     # Timeout total para execução completa do workflow (1 hora)
     EXECUTION_START_TO_CLOSE_TIMEOUT = '3600'
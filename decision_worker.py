@@ -6,10 +6,24 @@ Ele analisa o histórico de eventos, toma decisões sobre próximas ações,
 gerencia retries, rollbacks e retomada de etapas.
 """
 
-import json
+import os
+import socket
+import threading
 import time
 from swf_client import SWFClient
 from config import Config
+from history import HistoryReplayer, ReplayCache, events_after
+from codec import encode
+from payload_store import dehydrate
+from workflow_definition import default_registry
+from poller_control import PollerController, drain
+import metrics
+import tracing
+import structured_log
+
+
+logger = structured_log.get_logger(__name__)
+
 
 class DecisionWorker:
     """
@@ -23,15 +37,37 @@ class DecisionWorker:
     5. Completa ou falha o workflow quando apropriado
     """
     
-    def __init__(self):
+    def __init__(self, identity=None, registry=None):
         """
         Inicializa o Decision Worker.
         
         Cria instância do cliente SWF e estrutura para
         armazenar estado do workflow durante processamento.
+        
+        Args:
+            identity (str): Identificador deste worker nos polls do SWF.
+                Padrão: ``decision-worker-<host>-<pid>``
+            registry (WorkflowRegistry): Planos compilados por tipo de workflow.
+                Padrão: ``workflow_definition.default_registry``
         """
         self.swf_client = SWFClient()
+        self.identity = identity or f"decision-worker-{socket.gethostname()}-{os.getpid()}"
+        
+        # Planos compilados (um por tipo/versão de workflow); o do workflow
+        # configurado é o padrão para tasks e estados sem tipo informado
+        self.registry = registry or default_registry
+        self.plan = self.registry.get(Config.WORKFLOW_NAME, Config.WORKFLOW_VERSION)
+        self.definition = self.plan.definition
+        
+        # Sinaliza ao loop de polling que deve encerrar
+        self._stop_event = threading.Event()
+        
+        # Controle adaptativo de pollers (criado por run_concurrent)
+        self.poller_controller = None
         self.workflow_state = {}  # Estado temporário durante decisões
+        
+        # Cache LRU (por runId) dos replays já feitos, limitado por memória
+        self.replay_cache = ReplayCache(Config.DECISION_CACHE_MAX_BYTES)
     
     def poll_for_decision_task(self):
         """
@@ -45,78 +81,349 @@ class DecisionWorker:
         - Um timer dispara
         - Um sinal é recebido
         
-        O loop continua indefinidamente até que o processo seja interrompido.
+        O loop continua até que o processo seja interrompido ou ``stop()``
+        seja chamado. Esperas entre polls e o backoff após erros vêm do
+        ``PollerController``. Para vários pollers, use ``run_concurrent``.
+        """
+        self.run_concurrent(pollers=1, min_pollers=1)
+    
+    def run_concurrent(self, pollers=None, min_pollers=None):
+        """
+        Executa o worker com várias threads de polling.
+        
+        Cada thread processa a decision task que recebeu antes de fazer o
+        próximo poll. O número de threads varia entre ``min_pollers`` e
+        ``pollers`` conforme o backlog (``count_pending_decision_tasks``),
+        a latência das decisões e a taxa de polls vazios.
+        
+        Bloqueia até ``stop()`` ser chamado.
+        
+        Args:
+            pollers (int): Máximo de threads de polling (padrão: Config.DECISION_POLLERS)
+            min_pollers (int): Mínimo de threads de polling (padrão: Config.POLLER_MIN_POLLERS)
+        """
+        pollers = pollers or Config.DECISION_POLLERS
+        min_pollers = min_pollers or Config.POLLER_MIN_POLLERS
+        self.poller_controller = PollerController(
+            'decision',
+            min_pollers=min_pollers,
+            max_pollers=pollers,
+            count_pending=self.count_pending_tasks
+        )
+        
+        logger.info('decision_polling_started', task_list=self.swf_client.task_list,
+                    min_pollers=min_pollers, max_pollers=pollers)
+        metrics.maybe_start_server()
+        
+        self.poller_controller.run(
+            self.poll_decision_task,
+            self._handle_measured,
+            self.identity,
+            self._stop_event
+        )
+    
+    def count_pending_tasks(self):
+        """
+        Consulta o backlog da task list de decisões.
+        
+        Returns:
+            int: Decision tasks aguardando um decider
+        """
+        response = self.swf_client.client.count_pending_decision_tasks(
+            domain=self.swf_client.domain,
+            taskList={'name': self.swf_client.task_list}
+        )
+        return response['count']
+    
+    def _handle_measured(self, task, identity):
+        """Processa uma decision task registrando sua latência no controller."""
+        started = time.monotonic()
+        try:
+            self.handle_decision_task(task, identity)
+        finally:
+            self.poller_controller.record_task_latency(time.monotonic() - started)
+    
+    def stop(self):
+        """Sinaliza ao loop de polling que deve encerrar após o poll atual."""
+        self._stop_event.set()
+    
+    def poll_decision_task(self, identity):
+        """
+        Executa um único long poll na task list de decisões.
+        
+        Só a primeira página do histórico vem nesta resposta; as demais
+        são lidas por ``iter_history_pages``.
+        
+        Args:
+            identity (str): Identificador de quem está fazendo o poll
+            
+        Returns:
+            dict | None: Decision task recebida ou None se nenhuma estava disponível
+        """
+        # Long polling: aguarda até 60 segundos por uma decision task
+        with tracing.span('poll_decision_task') as span:
+            response = self.swf_client.client.poll_for_decision_task(
+                **self.poll_parameters(identity)
+            )
+            span.set_attribute('poll.got_task', bool(response.get('taskToken')))
+        
+        # Se taskToken está presente, há uma decision task para processar
+        return response if response.get('taskToken') else None
+    
+    def poll_once(self, identity):
         """
-        print(f"Polling for decision tasks on task list: {self.swf_client.task_list}")
+        Busca e processa, na própria thread, no máximo uma decision task.
         
+        Args:
+            identity (str): Identificador de quem está fazendo o poll
+            
+        Returns:
+            bool: True se uma decision task foi recebida e processada
+        """
+        task = self.poll_decision_task(identity)
+        if task is None:
+            return False
+        self.handle_decision_task(task, identity)
+        return True
+    
+    def poll_parameters(self, identity=None):
+        """
+        Monta os parâmetros do poll de decision tasks.
+        
+        Os mesmos parâmetros precisam ser repetidos (junto com o
+        ``nextPageToken``) para buscar as páginas seguintes do histórico.
+        
+        Args:
+            identity (str): Identificador de quem faz o poll (padrão: self.identity)
+        
+        Returns:
+            dict: Argumentos para ``poll_for_decision_task``
+        """
+        return {
+            'domain': self.swf_client.domain,
+            'taskList': {'name': self.swf_client.task_list},
+            'identity': identity or self.identity,
+            'maximumPageSize': Config.DECISION_HISTORY_PAGE_SIZE,
+            'reverseOrder': Config.DECISION_HISTORY_REVERSE_ORDER
+        }
+    
+    def iter_history_pages(self, task, identity=None):
+        """
+        Percorre as páginas do histórico de uma decision task.
+        
+        A primeira página já vem na própria task; as demais são buscadas
+        sob demanda seguindo o ``nextPageToken``. Como é um gerador, quem
+        consome pode parar antes da última página e evitar chamadas à API.
+        
+        Args:
+            task (dict): Resposta do poll com a primeira página
+            identity (str): Identificador usado no poll original
+            
+        Yields:
+            list: Eventos de cada página, na ordem entregue pelo SWF
+        """
+        page = task
         while True:
-            try:
-                # Long polling: aguarda até 60 segundos por uma decision task
-                response = self.swf_client.client.poll_for_decision_task(
-                    domain=self.swf_client.domain,
-                    taskList={'name': self.swf_client.task_list},
-                    identity='decision-worker-1'  # Identificador único deste worker
-                )
-                
-                # Se taskToken está presente, há uma decision task para processar
-                if 'taskToken' in response:
-                    self.handle_decision_task(response)
-                else:
-                    # Nenhuma decision task disponível no momento
-                    print("No decision task available, waiting...")
-                    time.sleep(2)
-                    
-            except Exception as e:
-                print(f"Error polling for decision task: {e}")
-                time.sleep(5)  # Aguarda antes de tentar novamente
+            yield page.get('events', [])
+            next_page_token = page.get('nextPageToken')
+            if not next_page_token:
+                return
+            page = self.swf_client.client.poll_for_decision_task(
+                **self.poll_parameters(identity),
+                nextPageToken=next_page_token
+            )
     
-    def handle_decision_task(self, task):
+    def iter_forward_history_pages(self, workflow_execution):
+        """
+        Percorre o histórico completo de uma execução em ordem crescente.
+        
+        Usado quando as decision tasks chegam em ordem reversa mas não há
+        replay em cache: o histórico é relido do início, página a página,
+        em vez de ser acumulado inteiro para ser invertido.
+        
+        Args:
+            workflow_execution (dict): Identificadores (workflowId e runId)
+            
+        Yields:
+            list: Eventos de cada página, do mais antigo para o mais recente
+        """
+        params = {
+            'domain': self.swf_client.domain,
+            'execution': workflow_execution,
+            'maximumPageSize': Config.DECISION_HISTORY_PAGE_SIZE,
+            'reverseOrder': False
+        }
+        while True:
+            page = self.swf_client.client.get_workflow_execution_history(**params)
+            yield page.get('events', [])
+            next_page_token = page.get('nextPageToken')
+            if not next_page_token:
+                return
+            params['nextPageToken'] = next_page_token
+    
+    def handle_decision_task(self, task, identity=None):
         """
         Processa uma decision task recebida do SWF.
         
-        Analisa todo o histórico de eventos do workflow para determinar
-        o estado atual e toma decisões sobre as próximas ações.
+        Analisa o histórico de eventos do workflow para determinar o
+        estado atual e toma decisões sobre as próximas ações. Quando o
+        replay da execução está em cache, apenas os eventos posteriores a
+        ``previousStartedEventId`` são aplicados.
         
         Args:
             task (dict): Objeto de decision task contendo:
                 - taskToken: Token único para responder
-                - events: Lista completa de eventos do workflow
+                - events: Primeira página de eventos do workflow
+                - nextPageToken: Token da próxima página (se houver)
                 - workflowExecution: Identificadores do workflow
+                - previousStartedEventId: Último DecisionTaskStarted processado
+            identity (str): Identificador usado no poll (para buscar as demais páginas)
         """
         # Token necessário para responder à decision task
         task_token = task['taskToken']
         
-        # Histórico completo de eventos do workflow
-        events = task['events']
+        # Histórico de eventos do workflow, página a página
+        pages = self.iter_history_pages(task, identity)
         
         # Identificadores do workflow (workflowId e runId)
         workflow_execution = task['workflowExecution']
         
-        print(f"\nReceived decision task for workflow: {workflow_execution['workflowId']}")
+        logger.info('decision_task_received', workflow_id=workflow_execution['workflowId'])
         
-        # Analisa o histórico de eventos para determinar estado atual
-        state = self.analyze_events(events)
+        # Plano compilado do tipo de workflow da task
+        try:
+            plan = self.plan_for(task)
+        except KeyError as e:
+            logger.error('decision_task_error', workflow_id=workflow_execution['workflowId'], error=e)
+            return
         
-        # Toma decisões baseadas no estado (agenda atividades, completa workflow, etc)
-        decisions = self.make_decisions(state)
+        # Reconstrói o estado: incremental se o replay desta execução está
+        # no cache, completo caso contrário
+        started = time.perf_counter()
+        trace_started = tracing.now()
+        run_id = workflow_execution['runId']
+        replayer = self.replay_events(
+            run_id,
+            pages,
+            task.get('previousStartedEventId', 0),
+            reverse_order=Config.DECISION_HISTORY_REVERSE_ORDER,
+            plan=plan,
+            forward_pages=lambda: self.iter_forward_history_pages(workflow_execution)
+        )
+        state = replayer.state
         
-        # Responde ao SWF com as decisões tomadas
-        try:
-            self.swf_client.client.respond_decision_task_completed(
-                taskToken=task_token,
-                decisions=decisions  # Lista de decisões a serem executadas
-            )
-            print(f"Decision task completed with {len(decisions)} decision(s)")
-        except Exception as e:
-            print(f"Error responding to decision task: {e}")
+        # O span da decisão é filho do trace do workflow, cujo contexto só é
+        # conhecido depois do replay: começa no instante anterior ao replay
+        with tracing.span(
+            'handle_decision_task',
+            {'workflow.id': workflow_execution['workflowId'], 'workflow.run_id': run_id},
+            parent=state.get('trace_context'),
+            start_time=trace_started
+        ) as span:
+            tracing.record_span('analyze_events', trace_started,
+                                {'history.events': replayer.last_event_id})
+            
+            # Toma decisões baseadas no estado (agenda atividades, completa workflow, etc)
+            with tracing.span('make_decisions'):
+                decisions = self.make_decisions(state, plan)
+            metrics.DECISION_SECONDS.observe(time.perf_counter() - started)
+            metrics.HISTORY_EVENTS.observe(replayer.last_event_id)
+            span.set_attribute('decision.count', len(decisions))
+            
+            # Responde ao SWF com as decisões tomadas
+            try:
+                self.swf_client.client.respond_decision_task_completed(
+                    taskToken=task_token,
+                    decisions=decisions  # Lista de decisões a serem executadas
+                )
+                logger.info('decision_task_completed', workflow_id=workflow_execution['workflowId'],
+                            decisions=len(decisions))
+            except Exception as e:
+                span.record_exception(e)
+                logger.error('decision_respond_error', workflow_id=workflow_execution['workflowId'],
+                             error=e)
+                return
+        
+        # Guarda o replay para a próxima decisão, exceto se o workflow encerrou
+        closing = {'CompleteWorkflowExecution', 'FailWorkflowExecution'}
+        if any(d['decisionType'] in closing for d in decisions):
+            self.replay_cache.discard(run_id)
+        else:
+            self.replay_cache.store(run_id, replayer)
+    
+    def plan_for(self, task):
+        """
+        Plano compilado do tipo de workflow de uma decision task.
+        
+        Args:
+            task (dict): Decision task (usa ``workflowType``, se presente)
+            
+        Returns:
+            WorkflowPlan: Plano do tipo/versão da task
+            
+        Raises:
+            KeyError: Se o tipo de workflow não está registrado
+        """
+        return self.registry.for_task(task, default=self.plan)
+    
+    def replay_events(self, run_id, pages, previous_started_event_id, reverse_order=False, plan=None,
+                      forward_pages=None):
+        """
+        Obtém o replay atualizado de uma execução.
+        
+        Os eventos são aplicados página a página, sem concatenar o
+        histórico inteiro em memória. Se o cache contém o replay desta
+        execução parado exatamente em ``previousStartedEventId``, apenas os
+        eventos novos são aplicados; caso contrário o replay é completo.
+        
+        Com ``reverse_order`` as páginas chegam do evento mais recente para
+        o mais antigo: havendo replay em cache, a leitura para assim que o
+        ponto já aplicado é alcançado, sem buscar as páginas antigas. Sem
+        replay em cache a ordem reversa é ignorada: ``forward_pages`` relê o
+        histórico em ordem crescente, também página a página.
+        
+        Args:
+            run_id (str): Identificador da execução
+            pages (iterable): Páginas (listas de eventos) do histórico
+            previous_started_event_id (int): Último DecisionTaskStarted já processado
+            reverse_order (bool): Se as páginas vêm em ordem decrescente de eventId
+            plan (WorkflowPlan): Plano do tipo de workflow (padrão: self.plan)
+            forward_pages (callable): Retorna as páginas em ordem crescente,
+                usadas no lugar de ``pages`` quando não há replay em cache
+            
+        Returns:
+            HistoryReplayer: Replay com todos os eventos aplicados
+        """
+        replayer = self.replay_cache.checkout(run_id, previous_started_event_id)
+        if replayer is None:
+            replayer = HistoryReplayer(plan or self.plan)
+            if reverse_order and forward_pages is not None:
+                # Inverter exigiria o histórico inteiro em memória: relê do início
+                pages, reverse_order = forward_pages(), False
+        
+        if not reverse_order:
+            for page in pages:
+                replayer.replay(events_after(page, replayer.last_event_id))
+            return replayer
+        
+        # Ordem reversa: coleta apenas a cauda ainda não aplicada
+        tail = []
+        for page in pages:
+            newer = [e for e in page if e['eventId'] > replayer.last_event_id]
+            tail.extend(newer)
+            if len(newer) < len(page):
+                break  # Alcançou o ponto do replay em cache
+        tail.reverse()
+        replayer.replay(tail)
+        return replayer
     
     def analyze_events(self, events):
         """
         Analisa o histórico de eventos para determinar o estado atual do workflow.
         
-        Percorre todos os eventos do workflow e constrói uma representação
-        do estado atual, incluindo atividades completadas, falhas, retries
-        e marcadores especiais.
+        Percorre todos os eventos do workflow uma única vez e constrói uma
+        representação do estado atual, incluindo atividades completadas,
+        falhas, retries e marcadores especiais (ver history.HistoryReplayer).
         
         Args:
             events (list): Lista completa de eventos do workflow
@@ -125,204 +432,214 @@ class DecisionWorker:
             dict: Estado atual do workflow contendo:
                 - completed_activities: Lista de atividades concluídas
                 - failed_activities: Lista de atividades que falharam
+                - timed_out_activities: Lista de atividades que excederam timeout
                 - workflow_input: Dados de entrada do workflow
                 - activity_results: Resultados de cada atividade
                 - retry_count: Contador de tentativas por atividade
                 - markers: Marcadores especiais (rollback, resume, etc)
         """
-        # Inicializa estrutura de estado
-        state = {
-            'completed_activities': [],   # Atividades concluídas com sucesso
-            'failed_activities': [],      # Atividades que falharam
-            'current_step': 0,            # Etapa atual do workflow
-            'workflow_input': {},         # Input original do workflow
-            'activity_results': {},       # Resultados de cada atividade
-            'should_retry': False,        # Flag para indicar retry
-            'should_rollback': False,     # Flag para indicar rollback
-            'retry_count': {},            # Contador de retries por atividade
-            'markers': {}                 # Marcadores especiais do workflow
-        }
-        
-        # Percorre todos os eventos em ordem cronológica
-        for event in events:
-            event_type = event['eventType']
-            
-            # Evento de início do workflow - captura input
-            if event_type == 'WorkflowExecutionStarted':
-                attrs = event['workflowExecutionStartedEventAttributes']
-                state['workflow_input'] = json.loads(attrs.get('input', '{}'))
-            
-            # Evento de atividade completada - registra sucesso
-            elif event_type == 'ActivityTaskCompleted':
-                attrs = event['activityTaskCompletedEventAttributes']
-                # Busca o evento de agendamento para obter o nome da atividade
-                scheduled_event = next(
-                    e for e in events 
-                    if e['eventId'] == attrs['scheduledEventId']
-                )
-                activity_name = scheduled_event['activityTaskScheduledEventAttributes']['activityType']['name']
-                state['completed_activities'].append(activity_name)
-                state['activity_results'][activity_name] = json.loads(attrs.get('result', '{}'))
-            
-            # Evento de atividade falhada - registra falha e incrementa retry
-            elif event_type == 'ActivityTaskFailed':
-                attrs = event['activityTaskFailedEventAttributes']
-                # Busca o evento de agendamento para obter o nome da atividade
-                scheduled_event = next(
-                    e for e in events 
-                    if e['eventId'] == attrs['scheduledEventId']
-                )
-                activity_name = scheduled_event['activityTaskScheduledEventAttributes']['activityType']['name']
-                state['failed_activities'].append(activity_name)
-                
-                # Incrementa contador de retry para esta atividade
-                if activity_name not in state['retry_count']:
-                    state['retry_count'][activity_name] = 0
-                state['retry_count'][activity_name] += 1
-            
-            # Evento de marcador - usado para controle de fluxo especial
-            elif event_type == 'MarkerRecorded':
-                attrs = event['markerRecordedEventAttributes']
-                marker_name = attrs['markerName']
-                state['markers'][marker_name] = json.loads(attrs.get('details', '{}'))
-        
-        return state
+        # Replay em passada única: agendamentos são indexados por eventId,
+        # então cada conclusão/falha é resolvida em O(1)
+        with tracing.span('analyze_events', {'history.events': len(events)}):
+            return HistoryReplayer(self.plan).replay(events)
 
     
-    def make_decisions(self, state):
+    def make_decisions(self, state, plan=None):
         """
         Toma decisões baseadas no estado atual do workflow.
         
         Este é o "cérebro" do workflow que implementa a lógica de orquestração:
-        - Fluxo normal: agenda próxima atividade na sequência
+        - Fluxo normal: agenda, na mesma decisão, todas as etapas cujas
+          dependências foram concluídas (etapas independentes rodam em paralelo)
+        - Junção: etapas dependentes aguardam as atividades em aberto
         - Falhas: implementa retry automático (até 3 tentativas)
         - Rollback: após max retries, inicia processo de compensação
         - Retomada: permite retomar de uma etapa específica
         
+        As etapas prontas, em aberto e com falha vêm do progresso mantido
+        pelo plano compilado durante o replay (``state['progress']``), sem
+        reavaliar o grafo de dependências a cada decisão.
+        
         Args:
             state (dict): Estado atual do workflow
+            plan (WorkflowPlan): Plano do tipo de workflow (padrão: self.plan)
             
         Returns:
-            list: Lista de decisões a serem executadas pelo SWF
+            list: Lista de decisões a serem executadas pelo SWF (vazia
+            enquanto o workflow aguarda atividades em andamento)
         """
         decisions = []
         
-        # Define a sequência de etapas do processo de negócio
-        # Esta é a ordem normal de execução do workflow
-        workflow_steps = [
-            'ValidateInput',      # 1. Valida entrada
-            'ProcessData',        # 2. Processa dados
-            'EnrichData',         # 3. Enriquece informações
-            'SaveResults',        # 4. Persiste resultados
-            'NotifyCompletion'    # 5. Notifica conclusão
-        ]
-        
-        # ========== Tratamento de Falhas e Retry ==========
-        # Verifica se há atividades que falharam
-        if state['failed_activities']:
-            last_failed = state['failed_activities'][-1]
-            retry_count = state['retry_count'].get(last_failed, 0)
-            
-            # Implementa retry automático até 3 tentativas
-            if retry_count < 3:
-                print(f"Retrying activity: {last_failed} (attempt {retry_count + 1})")
-                decisions.append(self.schedule_activity(last_failed, state))
-                return decisions
-            else:
-                # Após 3 tentativas, inicia processo de rollback
-                print(f"Max retries reached for {last_failed}, initiating rollback")
-                
-                # Registra marcador de rollback para rastreamento
-                decisions.append(self.record_marker('ROLLBACK_INITIATED', {
-                    'failed_activity': last_failed,
-                    'reason': 'Max retries exceeded'
-                }))
-                
-                # Agenda atividade de rollback
-                decisions.append(self.schedule_activity('RollbackStep', {
-                    'step_to_rollback': last_failed,
-                    'workflow_input': state['workflow_input']
-                }))
-                return decisions
+        # Etapas do processo de negócio e suas dependências (ver workflow_definition.py):
+        # ValidateInput → (ProcessData ∥ EnrichData) → SaveResults → NotifyCompletion
+        plan = plan or self.plan
+        status = state['activity_status']
+        markers = state['markers']
+        progress = state.get('progress')
+        if progress is None:
+            # Estado montado sem plano: deriva o progresso dos estados das atividades
+            progress = plan.progress_from_status(status)
         
         # ========== Processo de Rollback e Compensação ==========
-        # Verifica se está em modo de rollback (padrão SAGA)
-        if 'ROLLBACK_INITIATED' in state['markers']:
-            if 'RollbackStep' in state['completed_activities']:
-                # Rollback concluído, agora compensa a transação
-                print("Rollback completed, starting compensation")
-                decisions.append(self.schedule_activity('CompensateTransaction', state['workflow_input']))
-                return decisions
-            elif 'CompensateTransaction' in state['completed_activities']:
+        # Em modo de rollback (padrão SAGA) nenhuma etapa normal é agendada
+        if 'ROLLBACK_INITIATED' in markers:
+            rollback = markers['ROLLBACK_INITIATED']
+            # Input de cada etapa da compensação (o mesmo do primeiro agendamento)
+            compensation_inputs = {
+                'RollbackStep': {
+                    'step_to_rollback': rollback.get('failed_activity'),
+                    'workflow_input': state['workflow_input']
+                },
+                'CompensateTransaction': state['workflow_input']
+            }
+            if status.get('CompensateTransaction') == 'completed':
                 # Compensação concluída, finaliza o workflow com falha
-                print("Compensation completed, failing workflow")
+                logger.info('compensation_completed')
                 decisions.append({
                     'decisionType': 'FailWorkflowExecution',
                     'failWorkflowExecutionDecisionAttributes': {
                         'reason': 'Workflow failed and compensated',
-                        'details': json.dumps(state['markers']['ROLLBACK_INITIATED'])
+                        'details': dehydrate(encode(rollback))
                     }
                 })
-                return decisions
+            elif status.get('RollbackStep') == 'completed' and 'CompensateTransaction' not in status:
+                # Rollback concluído, agora compensa a transação
+                logger.info('rollback_completed')
+                decisions.append(self.schedule_activity(
+                    'CompensateTransaction', compensation_inputs['CompensateTransaction'], plan
+                ))
+            else:
+                # Falhas, timeouts e cancelamentos da compensação também são
+                # repetidos até 3 tentativas; depois o workflow falha
+                for step, step_input in compensation_inputs.items():
+                    if status.get(step) not in ('failed', 'timed_out', 'canceled'):
+                        continue
+                    retry_count = state['retry_count'].get(step, 0)
+                    if retry_count < 3:
+                        logger.info('compensation_retry', step=step, attempt=retry_count + 1)
+                        decisions.append(self.schedule_activity(step, step_input, plan))
+                    else:
+                        logger.error('compensation_failed', step=step, reason='max_retries')
+                        decisions.append({
+                            'decisionType': 'FailWorkflowExecution',
+                            'failWorkflowExecutionDecisionAttributes': {
+                                'reason': f'Compensation failed: {step} exceeded max retries',
+                                'details': dehydrate(encode(
+                                    {**rollback, 'compensation_failed_step': step}
+                                ))
+                            }
+                        })
+                    break
+            return decisions
+        
+        # ========== Tratamento de Falhas e Retry ==========
+        # Considera apenas o último resultado de cada etapa: uma etapa que
+        # falhou e depois foi concluída não é repetida
+        for step in list(progress['failed']):
+            retry_count = state['retry_count'].get(step, 0)
+            
+            # Implementa retry automático até 3 tentativas
+            if retry_count < 3:
+                logger.info('activity_retry', step=step, attempt=retry_count + 1)
+                decisions.append(self.schedule_activity(step, state, plan))
+                continue
+            
+            # Após 3 tentativas, inicia processo de rollback
+            logger.warning('rollback_initiated', step=step, reason='max_retries')
+            
+            # Registra marcador de rollback para rastreamento e agenda a
+            # atividade de rollback (descarta retries de outros ramos)
+            return [
+                self.record_marker('ROLLBACK_INITIATED', {
+                    'failed_activity': step,
+                    'reason': 'Max retries exceeded'
+                }),
+                self.schedule_activity('RollbackStep', {
+                    'step_to_rollback': step,
+                    'workflow_input': state['workflow_input']
+                }, plan)
+            ]
         
         # ========== Retomada de Etapa Específica ==========
         # Permite retomar o workflow a partir de uma etapa específica
         # Útil para reprocessamento após correção de problemas
-        if 'RESUME_FROM_STEP' in state['markers']:
-            resume_step = state['markers']['RESUME_FROM_STEP'].get('step')
-            if resume_step in workflow_steps:
-                print(f"Resuming workflow from step: {resume_step}")
-                decisions.append(self.schedule_activity(resume_step, state))
+        if 'RESUME_FROM_STEP' in markers and 'RESUME_COMPLETED' not in markers:
+            resume_step = markers['RESUME_FROM_STEP'].get('step')
+            if plan.step(resume_step) is not None and resume_step not in progress['open']:
+                logger.info('workflow_resumed', step=resume_step)
+                decisions.append(self.schedule_activity(resume_step, state, plan))
                 decisions.append(self.record_marker('RESUME_COMPLETED', {'resumed_step': resume_step}))
                 return decisions
         
         # ========== Fluxo Normal de Execução ==========
-        # Executa a próxima etapa na sequência que ainda não foi completada
-        for step in workflow_steps:
-            if step not in state['completed_activities']:
-                print(f"Scheduling next activity: {step}")
-                decisions.append(self.schedule_activity(step, state))
-                return decisions
+        # Agenda todas as etapas prontas (dependências concluídas)
+        for step in progress['ready']:
+            logger.info('activity_scheduled', step=step)
+            decisions.append(self.schedule_activity(step, state, plan))
+        
+        # Junção: há decisões a enviar ou atividades em andamento
+        if decisions or progress['open']:
+            return decisions
+        
+        if not plan.is_complete(progress):
+            return decisions
         
         # ========== Conclusão do Workflow ==========
         # Todas as etapas foram concluídas com sucesso
-        print("All activities completed successfully, completing workflow")
+        logger.info('workflow_completing')
         decisions.append({
             'decisionType': 'CompleteWorkflowExecution',
             'completeWorkflowExecutionDecisionAttributes': {
-                'result': json.dumps({
+                'result': dehydrate(encode({
                     'status': 'completed',
                     'results': state['activity_results']
-                })
+                }))
             }
         })
         
         return decisions
     
-    def schedule_activity(self, activity_name, state):
+    def schedule_activity(self, activity_name, state, plan=None):
         """
         Cria uma decisão para agendar uma atividade.
         
         Prepara todos os parâmetros necessários para agendar uma atividade,
         incluindo input, timeouts e identificadores únicos.
         
+        Etapas da definição do workflow recebem apenas os campos do input e
+        os resultados anteriores que declaram ler (``StepDefinition``).
+        Atividades fora da definição (rollback, compensação) recebem o
+        input do workflow com todos os resultados.
+        
         Args:
             activity_name (str): Nome da atividade a ser agendada
             state (dict): Estado atual do workflow
+            plan (WorkflowPlan): Plano do tipo de workflow (padrão: self.plan)
             
         Returns:
             dict: Decisão de agendamento de atividade formatada para o SWF
         """
-        # Prepara o input para a atividade
-        activity_input = state.get('workflow_input', {}) if isinstance(state, dict) else state
+        # Prepara o input para a atividade: o estado do workflow ou, para
+        # rollback e compensação, o próprio input montado pelo chamador
+        activity_input = state
         
         # Adiciona resultados de atividades anteriores se disponível
         # Permite que atividades acessem dados de etapas anteriores
         if isinstance(state, dict) and 'activity_results' in state:
-            activity_input = {
-                **activity_input,
-                'previous_results': state['activity_results']
-            }
+            activity_input = state.get('workflow_input', {})
+            step = (plan or self.plan).step(activity_name)
+            if step is not None:
+                activity_input = step.build_input(activity_input, state['activity_results'])
+            else:
+                activity_input = {
+                    **activity_input,
+                    'previous_results': state['activity_results']
+                }
+        
+        # Inputs grandes vão para o payload_store (limite de 32KB do SWF);
+        # o contexto de trace da decisão segue junto para a atividade
+        serialized_input = dehydrate(encode(tracing.inject(activity_input)))
+        metrics.PAYLOAD_BYTES.labels('schedule_input').observe(len(serialized_input))
         
         return {
             'decisionType': 'ScheduleActivityTask',
@@ -333,13 +650,14 @@ class DecisionWorker:
                 },
                 # ID único para esta instância da atividade
                 'activityId': f"{activity_name}-{int(time.time() * 1000)}",
-                'input': json.dumps(activity_input),
+                'input': serialized_input,
                 # Timeouts para controle de execução
                 'scheduleToCloseTimeout': Config.ACTIVITY_SCHEDULE_TO_CLOSE_TIMEOUT,
                 'scheduleToStartTimeout': Config.ACTIVITY_SCHEDULE_TO_START_TIMEOUT,
                 'startToCloseTimeout': Config.ACTIVITY_START_TO_CLOSE_TIMEOUT,
                 'taskList': {'name': self.swf_client.task_list},
-                'heartbeatTimeout': '60'  # Worker deve enviar heartbeat a cada 60s
+                # Sem heartbeat dentro deste prazo a tarefa expira (ver heartbeat.py)
+                'heartbeatTimeout': Config.ACTIVITY_HEARTBEAT_TIMEOUT
             }
         }
     
@@ -361,10 +679,51 @@ class DecisionWorker:
             'decisionType': 'RecordMarker',
             'recordMarkerDecisionAttributes': {
                 'markerName': marker_name,
-                'details': json.dumps(details)
+                'details': dehydrate(encode(details))
             }
         }
 
+# Worker reaproveitado entre invocações "quentes" do Lambda (mantém o
+# cliente SWF e o cache de replay)
+_lambda_worker = None
+
+
+def lambda_handler(event, context):
+    """
+    Handler do AWS Lambda: drena a task list de decisões.
+    
+    Processa decision tasks em sequência enquanto o tempo restante da
+    invocação comporta mais um long poll e uma decisão
+    (``LAMBDA_POLL_WINDOW + LAMBDA_DECISION_TASK_BUDGET``), e termina no
+    primeiro poll vazio.
+    
+    Args:
+        event (dict): Evento do EventBridge (não utilizado)
+        context: Contexto do Lambda (usa ``get_remaining_time_in_millis``)
+    
+    Returns:
+        dict: Tarefas processadas e motivo da parada
+    """
+    global _lambda_worker
+    try:
+        if _lambda_worker is None:
+            _lambda_worker = DecisionWorker()
+        worker = _lambda_worker
+        
+        processed, stopped = drain(
+            worker.poll_decision_task,
+            worker.handle_decision_task,
+            worker.identity,
+            lambda: context.get_remaining_time_in_millis() / 1000,
+            Config.LAMBDA_POLL_WINDOW + Config.LAMBDA_DECISION_TASK_BUDGET
+        )
+        logger.info('lambda_drain_finished', worker='decision', processed=processed, stopped=stopped)
+        return {'processed': processed, 'stopped': stopped}
+    finally:
+        # O processo pode ser congelado após o retorno: escreve os logs em fila
+        structured_log.flush()
+
+
 if __name__ == '__main__':
     worker = DecisionWorker()
-    worker.poll_for_decision_task()
+    worker.run_concurrent()
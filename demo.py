@@ -97,31 +97,26 @@ def demo_workflow_monitoring(workflow_id, run_id):
     # Obtém histórico completo
     events = starter.get_workflow_history(workflow_id, run_id)
     
-    # Analisa eventos
+    # Analisa eventos em uma passada: o agendamento sempre vem antes do
+    # desfecho, então o nome da atividade é guardado pelo eventId
+    scheduled_names = {}
     activities_completed = []
     activities_failed = []
     
     for event in events:
         event_type = event['eventType']
         
-        if event_type == 'ActivityTaskCompleted':
+        if event_type == 'ActivityTaskScheduled':
+            attrs = event['activityTaskScheduledEventAttributes']
+            scheduled_names[event['eventId']] = attrs['activityType']['name']
+        
+        elif event_type == 'ActivityTaskCompleted':
             attrs = event['activityTaskCompletedEventAttributes']
-            # Busca o evento de agendamento
-            scheduled_event = next(
-                e for e in events 
-                if e['eventId'] == attrs['scheduledEventId']
-            )
-            activity_name = scheduled_event['activityTaskScheduledEventAttributes']['activityType']['name']
-            activities_completed.append(activity_name)
+            activities_completed.append(scheduled_names[attrs['scheduledEventId']])
         
         elif event_type == 'ActivityTaskFailed':
             attrs = event['activityTaskFailedEventAttributes']
-            scheduled_event = next(
-                e for e in events 
-                if e['eventId'] == attrs['scheduledEventId']
-            )
-            activity_name = scheduled_event['activityTaskScheduledEventAttributes']['activityType']['name']
-            activities_failed.append(activity_name)
+            activities_failed.append(scheduled_names[attrs['scheduledEventId']])
     
     print("📈 Estatísticas:")
     print(f"  Total de eventos: {len(events)}")
@@ -0,0 +1,298 @@
+"""
+Heartbeats automáticos para atividades em execução.
+
+O ``HeartbeatManager`` mantém uma única thread em segundo plano que envia
+``record_activity_task_heartbeat`` para todas as tarefas em andamento,
+evitando que atividades longas expirem pelo ``heartbeatTimeout``.
+
+Os heartbeats são agrupados: a cada varredura a thread envia apenas os que
+estão vencidos, e várias atualizações de progresso feitas pelo handler
+entre duas varreduras viram uma única chamada à API.
+
+Handlers acessam a tarefa atual pelas funções do módulo, sem mudar sua
+assinatura::
+
+    from heartbeat import ActivityCancelled, cancel_requested, record_progress
+
+    def minha_atividade(input_data):
+        for index, item in enumerate(input_data['items']):
+            if cancel_requested():
+                raise ActivityCancelled('cancelado pelo workflow')
+            record_progress({'processed': index})
+            ...
+
+Handlers da lane de processos (``process_lane``) usam as mesmas funções: no
+processo filho elas leem e escrevem um canal compartilhado
+(``RemoteActivityContext``), que o ``ProcessLane`` do processo pai repassa
+ao ``ActivityContext`` da tarefa.
+"""
+
+from __future__ import annotations
+
+import contextvars
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Any
+
+import structured_log
+from config import Config
+
+logger = structured_log.get_logger(__name__)
+
+# Limite do campo ``details`` de RecordActivityTaskHeartbeat
+MAX_DETAILS_LENGTH = 2048
+
+_current_context: contextvars.ContextVar[ActivityContext | RemoteActivityContext | None] = (
+    contextvars.ContextVar("activity_context", default=None)
+)
+
+
+class ActivityCancelled(Exception):
+    """Levantada por handlers que encerram a execução após pedido de cancelamento."""
+
+
+class ActivityContext:
+    """
+    Estado de heartbeat de uma tarefa em andamento.
+
+    Atributos:
+        task_token (str): Token da tarefa no SWF
+        activity_type (str): Nome da atividade
+        cancel_requested (bool): True quando o SWF pediu cancelamento ou a
+            tarefa deixou de existir (ex.: expirou)
+    """
+
+    def __init__(self, task_token: str, activity_type: str):
+        self.task_token = task_token
+        self.activity_type = activity_type
+        self.cancel_requested = False
+        self.started_at = time.monotonic()
+        self.last_heartbeat = self.started_at
+        self._details: str | None = None
+        self._dirty = False
+        self._lock = threading.Lock()
+
+    def record_progress(self, details: Any) -> None:
+        """
+        Registra o progresso; enviado no próximo heartbeat.
+
+        Args:
+            details (str | dict): Progresso atual (dicts são serializados em JSON)
+        """
+        if not isinstance(details, str):
+            details = json.dumps(details)
+        with self._lock:
+            self._details = details[:MAX_DETAILS_LENGTH]
+            self._dirty = True
+
+    def _take_details(self) -> tuple[str | None, bool]:
+        with self._lock:
+            dirty, self._dirty = self._dirty, False
+            return self._details, dirty
+
+
+class RemoteActivityContext:
+    """
+    Contexto da tarefa visto por um handler da lane de processos.
+
+    O progresso e o pedido de cancelamento trafegam por um dicionário
+    compartilhado (proxy de ``multiprocessing.Manager``) que o processo pai
+    sincroniza com o ``ActivityContext`` real. Cada acesso é uma chamada
+    entre processos.
+    """
+
+    def __init__(self, channel):
+        """
+        Args:
+            channel (DictProxy): Canal compartilhado com o processo pai
+        """
+        self._channel = channel
+
+    @property
+    def cancel_requested(self) -> bool:
+        """True quando o processo pai repassou um pedido de cancelamento."""
+        return bool(self._channel.get("cancel", False))
+
+    def record_progress(self, details: Any) -> None:
+        """
+        Publica o progresso para o processo pai.
+
+        Args:
+            details (str | dict): Progresso atual (dicts são serializados em JSON)
+        """
+        if not isinstance(details, str):
+            details = json.dumps(details)
+        self._channel["details"] = details[:MAX_DETAILS_LENGTH]
+
+
+@contextmanager
+def remote_context(channel):
+    """
+    Associa o canal do processo pai à tarefa executada no processo filho.
+
+    Args:
+        channel (DictProxy): Canal criado pelo ``ProcessLane``
+
+    Yields:
+        RemoteActivityContext: Contexto visto por ``record_progress`` e ``cancel_requested``
+    """
+    context = RemoteActivityContext(channel)
+    reset_token = _current_context.set(context)
+    try:
+        yield context
+    finally:
+        _current_context.reset(reset_token)
+
+
+def current_activity_context() -> ActivityContext | RemoteActivityContext | None:
+    """Contexto da tarefa em execução na thread/task atual (None fora de handlers)."""
+    return _current_context.get()
+
+
+def record_progress(details: Any) -> None:
+    """Registra progresso da tarefa atual; ignorado fora de um handler."""
+    context = _current_context.get()
+    if context is not None:
+        context.record_progress(details)
+
+
+def cancel_requested() -> bool:
+    """Indica se a tarefa atual deve parar (cancelamento pedido ou tarefa perdida)."""
+    context = _current_context.get()
+    return context is not None and context.cancel_requested
+
+
+class HeartbeatManager:
+    """
+    Envia heartbeats de todas as tarefas em andamento a partir de uma thread.
+
+    Um heartbeat é enviado quando a tarefa está há ``interval`` segundos sem
+    heartbeat, ou antes disso (respeitando ``min_interval``) se o handler
+    registrou progresso novo.
+    """
+
+    def __init__(
+        self,
+        swf_client,
+        interval: float | None = None,
+        min_interval: float | None = None,
+        sender_threads: int | None = None,
+    ):
+        """
+        Args:
+            swf_client (SWFClient): Cliente usado para enviar os heartbeats
+            interval (float): Segundos máximos entre heartbeats (padrão: Config.HEARTBEAT_INTERVAL)
+            min_interval (float): Segundos mínimos entre heartbeats de progresso
+                (padrão: Config.HEARTBEAT_MIN_INTERVAL)
+            sender_threads (int): Chamadas simultâneas por varredura
+                (padrão: Config.HEARTBEAT_SENDER_THREADS)
+        """
+        self.swf_client = swf_client
+        self.interval = interval if interval is not None else Config.HEARTBEAT_INTERVAL
+        self.min_interval = (
+            min_interval if min_interval is not None else Config.HEARTBEAT_MIN_INTERVAL
+        )
+        self.sender_threads = sender_threads or Config.HEARTBEAT_SENDER_THREADS
+        self.heartbeats_sent = 0
+        self._contexts: dict[str, ActivityContext] = {}
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread: threading.Thread | None = None
+        self._sender: ThreadPoolExecutor | None = None
+
+    @contextmanager
+    def track(self, task_token: str, activity_type: str):
+        """
+        Acompanha uma tarefa durante a execução do handler.
+
+        Dentro do bloco, ``record_progress`` e ``cancel_requested`` do
+        módulo referem-se a esta tarefa.
+
+        Args:
+            task_token (str): Token da tarefa
+            activity_type (str): Nome da atividade
+
+        Yields:
+            ActivityContext: Contexto de heartbeat da tarefa
+        """
+        context = ActivityContext(task_token, activity_type)
+        with self._lock:
+            self._contexts[task_token] = context
+            self._ensure_started()
+        reset_token = _current_context.set(context)
+        try:
+            yield context
+        finally:
+            _current_context.reset(reset_token)
+            with self._lock:
+                self._contexts.pop(task_token, None)
+
+    def stop(self) -> None:
+        """Encerra a thread de heartbeats."""
+        thread = self._thread
+        self._thread = None
+        self._wakeup.set()
+        if thread is not None:
+            thread.join()
+        if self._sender is not None:
+            self._sender.shutdown(wait=False)
+            self._sender = None
+
+    def _ensure_started(self) -> None:
+        if self._thread is None:
+            self._wakeup.clear()
+            self._sender = ThreadPoolExecutor(self.sender_threads, "heartbeat-sender")
+            self._thread = threading.Thread(target=self._run, name="heartbeat", daemon=True)
+            self._thread.start()
+
+    def _run(self) -> None:
+        # Varre com resolução suficiente para respeitar o menor intervalo
+        tick = max(min(self.min_interval, self.interval) / 2, 0.01)
+        while not self._wakeup.wait(tick):
+            self.sweep()
+
+    def sweep(self) -> int:
+        """
+        Envia os heartbeats vencidos de todas as tarefas acompanhadas.
+
+        Returns:
+            int: Quantidade de heartbeats enviados nesta varredura
+        """
+        now = time.monotonic()
+        with self._lock:
+            contexts = list(self._contexts.values())
+
+        due = []
+        for context in contexts:
+            elapsed = now - context.last_heartbeat
+            if elapsed >= self.interval or (context._dirty and elapsed >= self.min_interval):
+                context.last_heartbeat = now
+                due.append(context)
+
+        if not due:
+            return 0
+        if self._sender is not None and len(due) > 1:
+            list(self._sender.map(self._send, due))
+        else:
+            for context in due:
+                self._send(context)
+        return len(due)
+
+    def _send(self, context: ActivityContext) -> None:
+        details, _ = context._take_details()
+        params = {"taskToken": context.task_token}
+        if details is not None:
+            params["details"] = details
+        try:
+            response = self.swf_client.client.record_activity_task_heartbeat(**params)
+            self.heartbeats_sent += 1
+            if response.get("cancelRequested"):
+                context.cancel_requested = True
+        except Exception as e:
+            # Tarefa desconhecida: expirou ou foi encerrada, não adianta continuar
+            if "UnknownResource" in type(e).__name__ or "UnknownResource" in str(e):
+                context.cancel_requested = True
+            logger.warning("heartbeat_error", activity=context.activity_type, error=e)
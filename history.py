@@ -0,0 +1,328 @@
+"""
+Replay do histórico de eventos do workflow em passada única.
+
+Este módulo reconstrói o estado de um workflow a partir do seu histórico
+de eventos. Os eventos de agendamento de atividade são indexados pelo
+``eventId`` à medida que aparecem, de modo que cada conclusão, falha ou
+timeout de atividade é resolvido em O(1), sem varrer o histórico de novo.
+"""
+
+from __future__ import annotations
+
+import threading
+from collections import OrderedDict
+from collections.abc import Iterable, Sequence
+from typing import Any
+
+from codec import decode
+from payload_store import hydrate
+from tracing import extract
+
+# Custo aproximado, em bytes, de cada entrada do índice de agendamentos
+_INDEX_ENTRY_BYTES = 96
+
+
+def new_workflow_state(plan: Any = None) -> dict[str, Any]:
+    """
+    Cria a estrutura de estado vazia usada pelo decision worker.
+
+    Args:
+        plan (WorkflowPlan): Plano compilado do workflow; quando informado,
+            o estado inclui o progresso das etapas (``progress``)
+
+    Returns:
+        dict: Estado inicial do workflow, sem nenhum evento aplicado
+    """
+    return {
+        "completed_activities": [],  # Atividades concluídas com sucesso
+        "failed_activities": [],  # Atividades que falharam
+        "timed_out_activities": [],  # Atividades que excederam algum timeout
+        "current_step": 0,  # Etapa atual do workflow
+        "workflow_input": {},  # Input original do workflow
+        "activity_results": {},  # Resultados de cada atividade
+        "should_retry": False,  # Flag para indicar retry
+        "should_rollback": False,  # Flag para indicar rollback
+        "retry_count": {},  # Contador de retries por atividade
+        "markers": {},  # Marcadores especiais do workflow
+        # Último estado de cada atividade: scheduled (em aberto), completed,
+        # failed, timed_out ou canceled
+        "activity_status": {},
+        # Progresso das etapas mantido pelo plano compilado (ver workflow_definition)
+        "progress": plan.initial_progress() if plan is not None else None,
+        # Contexto de trace propagado no input do workflow (ver tracing.py)
+        "trace_context": None,
+    }
+
+
+class HistoryReplayer:
+    """
+    Aplica eventos do histórico, em ordem, sobre o estado do workflow.
+
+    O SWF garante que ``ActivityTaskScheduled`` sempre precede o evento que
+    encerra a atividade, então basta manter um índice ``eventId -> nome``
+    alimentado durante a própria passada para resolver o vínculo
+    agendamento → conclusão/falha/timeout sem buscas lineares.
+
+    Com um plano compilado (``WorkflowPlan``), cada mudança de estado de
+    uma atividade também avança o progresso das etapas pela tabela de
+    transições do plano.
+    """
+
+    def __init__(self, plan: Any = None):
+        """
+        Inicializa um replay vazio, pronto para receber eventos.
+
+        Args:
+            plan (WorkflowPlan): Plano compilado do workflow (opcional)
+        """
+        self.plan = plan
+        self.state = new_workflow_state(plan)
+
+        # Índice dos agendamentos: eventId -> nome da atividade
+        self.scheduled_activities: dict[int, str] = {}
+
+        # Último eventId aplicado (0 = nenhum evento ainda)
+        self.last_event_id = 0
+
+        # Estimativa da memória ocupada pelo estado (payloads + índice)
+        self.approx_bytes = 0
+
+        # Tabela de despacho por tipo de evento
+        self._handlers = {
+            "WorkflowExecutionStarted": self._on_workflow_started,
+            "ActivityTaskScheduled": self._on_activity_scheduled,
+            "ActivityTaskCompleted": self._on_activity_completed,
+            "ActivityTaskFailed": self._on_activity_failed,
+            "ActivityTaskTimedOut": self._on_activity_timed_out,
+            "ActivityTaskCanceled": self._on_activity_canceled,
+            "MarkerRecorded": self._on_marker_recorded,
+        }
+
+    def replay(self, events: Iterable[dict]) -> dict[str, Any]:
+        """
+        Aplica uma sequência de eventos e devolve o estado resultante.
+
+        Args:
+            events (iterable): Eventos do histórico em ordem cronológica
+
+        Returns:
+            dict: Estado do workflow após aplicar todos os eventos
+        """
+        for event in events:
+            self.apply(event)
+        return self.state
+
+    def apply(self, event: dict) -> None:
+        """
+        Aplica um único evento sobre o estado.
+
+        Tipos de evento sem efeito no estado são apenas contabilizados
+        em ``last_event_id``.
+
+        Args:
+            event (dict): Evento do histórico do SWF
+        """
+        handler = self._handlers.get(event["eventType"])
+        if handler is not None:
+            handler(event)
+        self.last_event_id = event["eventId"]
+
+    def activity_name_for(self, scheduled_event_id: int) -> str:
+        """
+        Resolve o nome da atividade a partir do eventId do agendamento.
+
+        Args:
+            scheduled_event_id (int): ``scheduledEventId`` do evento de fechamento
+
+        Returns:
+            str: Nome do tipo de atividade agendada
+
+        Raises:
+            KeyError: Se o agendamento não faz parte do histórico aplicado
+        """
+        return self.scheduled_activities[scheduled_event_id]
+
+    # ========== Handlers por tipo de evento ==========
+
+    def _on_workflow_started(self, event):
+        attrs = event["workflowExecutionStartedEventAttributes"]
+        raw_input = hydrate(attrs.get("input", "{}"))
+        self.approx_bytes += len(raw_input)
+        workflow_input = decode(raw_input)
+        self.state["trace_context"] = extract(workflow_input)
+        self.state["workflow_input"] = workflow_input
+
+    def _on_activity_scheduled(self, event):
+        attrs = event["activityTaskScheduledEventAttributes"]
+        activity_name = attrs["activityType"]["name"]
+        self.scheduled_activities[event["eventId"]] = activity_name
+        self._set_status(activity_name, "scheduled")
+        self.approx_bytes += _INDEX_ENTRY_BYTES
+
+    def _on_activity_completed(self, event):
+        attrs = event["activityTaskCompletedEventAttributes"]
+        activity_name = self.activity_name_for(attrs["scheduledEventId"])
+        self.state["completed_activities"].append(activity_name)
+        self._set_status(activity_name, "completed")
+        raw_result = hydrate(attrs.get("result", "{}"))
+        self.approx_bytes += len(raw_result)
+        self.state["activity_results"][activity_name] = decode(raw_result)
+
+    def _on_activity_failed(self, event):
+        attrs = event["activityTaskFailedEventAttributes"]
+        activity_name = self.activity_name_for(attrs["scheduledEventId"])
+        self.state["failed_activities"].append(activity_name)
+        self._set_status(activity_name, "failed")
+        self._count_retry(activity_name)
+
+    def _on_activity_timed_out(self, event):
+        attrs = event["activityTaskTimedOutEventAttributes"]
+        activity_name = self.activity_name_for(attrs["scheduledEventId"])
+        self.state["timed_out_activities"].append(activity_name)
+        self._set_status(activity_name, "timed_out")
+        self._count_retry(activity_name)
+
+    def _on_activity_canceled(self, event):
+        attrs = event["activityTaskCanceledEventAttributes"]
+        activity_name = self.activity_name_for(attrs["scheduledEventId"])
+        self._set_status(activity_name, "canceled")
+        self._count_retry(activity_name)
+
+    def _set_status(self, activity_name, status):
+        self.state["activity_status"][activity_name] = status
+        if self.plan is not None:
+            self.plan.advance(self.state["progress"], activity_name, status)
+
+    def _count_retry(self, activity_name):
+        # Falhas, timeouts e cancelamentos consomem tentativas da atividade
+        retry_count = self.state["retry_count"]
+        retry_count[activity_name] = retry_count.get(activity_name, 0) + 1
+
+    def _on_marker_recorded(self, event):
+        attrs = event["markerRecordedEventAttributes"]
+        raw_details = hydrate(attrs.get("details", "{}"))
+        self.approx_bytes += len(raw_details)
+        self.state["markers"][attrs["markerName"]] = decode(raw_details)
+
+
+def replay_history(events: Iterable[dict], plan: Any = None) -> dict[str, Any]:
+    """
+    Atalho para reconstruir o estado completo de um histórico.
+
+    Args:
+        events (iterable): Eventos do histórico em ordem cronológica
+        plan (WorkflowPlan): Plano compilado do workflow (opcional)
+
+    Returns:
+        dict: Estado do workflow
+    """
+    return HistoryReplayer(plan).replay(events)
+
+
+def events_after(events: Sequence[dict], event_id: int) -> Sequence[dict]:
+    """
+    Devolve apenas os eventos com ``eventId`` maior que ``event_id``.
+
+    O histórico entregue pelo SWF é denso (eventIds 1, 2, 3, ...), então o
+    ponto de corte costuma ser acessado diretamente pelo índice da lista.
+    Se a lista não for densa, recorre a uma filtragem simples.
+
+    Args:
+        events (list): Eventos em ordem crescente de eventId
+        event_id (int): Último eventId já aplicado
+
+    Returns:
+        list: Eventos posteriores a ``event_id``
+    """
+    if not events or event_id < events[0]["eventId"]:
+        return events
+    offset = event_id - events[0]["eventId"] + 1
+    if offset <= len(events) and events[offset - 1]["eventId"] == event_id:
+        return events[offset:]
+    return [event for event in events if event["eventId"] > event_id]
+
+
+class ReplayCache:
+    """
+    Cache LRU de replays por ``runId``, limitado por memória.
+
+    Guarda o ``HistoryReplayer`` de cada execução após uma decisão bem
+    sucedida. Na decision task seguinte da mesma execução basta aplicar os
+    eventos posteriores a ``previousStartedEventId``, em vez de refazer o
+    replay desde o início.
+
+    O replay é retirado do cache enquanto a decisão é processada, então uma
+    mesma execução nunca é atualizada por duas threads ao mesmo tempo.
+    """
+
+    def __init__(self, max_bytes: int):
+        """
+        Args:
+            max_bytes (int): Limite aproximado de memória para todos os replays
+        """
+        self.max_bytes = max_bytes
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[str, HistoryReplayer] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def checkout(self, run_id: str, previous_started_event_id: int) -> HistoryReplayer | None:
+        """
+        Retira do cache o replay de uma execução, se ainda for válido.
+
+        O replay só é reaproveitado se parou exatamente no
+        ``previousStartedEventId`` informado pelo SWF; caso contrário outro
+        decider processou decisões intermediárias e o replay é descartado.
+
+        Args:
+            run_id (str): Identificador da execução
+            previous_started_event_id (int): Campo ``previousStartedEventId`` da task
+
+        Returns:
+            HistoryReplayer | None: Replay reaproveitável ou None (cache miss)
+        """
+        with self._lock:
+            replayer = self._entries.pop(run_id, None)
+            if replayer is not None:
+                self.current_bytes -= replayer.approx_bytes
+            if (
+                replayer is None
+                or not previous_started_event_id
+                or replayer.last_event_id != previous_started_event_id
+            ):
+                self.misses += 1
+                return None
+            self.hits += 1
+            return replayer
+
+    def store(self, run_id: str, replayer: HistoryReplayer) -> None:
+        """
+        Devolve ao cache o replay atualizado, removendo os menos recentes
+        enquanto o limite de memória for excedido.
+
+        Args:
+            run_id (str): Identificador da execução
+            replayer (HistoryReplayer): Replay após a última decisão
+        """
+        if replayer.approx_bytes > self.max_bytes:
+            return
+        with self._lock:
+            previous = self._entries.pop(run_id, None)
+            if previous is not None:
+                self.current_bytes -= previous.approx_bytes
+            self._entries[run_id] = replayer
+            self.current_bytes += replayer.approx_bytes
+            while self.current_bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self.current_bytes -= evicted.approx_bytes
+
+    def discard(self, run_id: str) -> None:
+        """Remove uma execução do cache (ex.: workflow encerrado)."""
+        with self._lock:
+            replayer = self._entries.pop(run_id, None)
+            if replayer is not None:
+                self.current_bytes -= replayer.approx_bytes
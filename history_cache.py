@@ -0,0 +1,272 @@
+"""
+Cache em disco dos históricos de execuções encerradas.
+
+O histórico de uma execução encerrada nunca muda: depois de lido uma vez
+pela API, pode ser relido do disco sem nenhuma chamada ao SWF. Cada
+histórico fica em um arquivo próprio, com um evento JSON compacto por
+linha, comprimido com zlib::
+
+    <HISTORY_CACHE_PATH>/<sha256[:2]>/<sha256 de domínio/workflowId/runId>.jsonl.z
+
+A primeira linha é um cabeçalho com a ordem em que os eventos foram
+gravados (a mesma pedida na leitura pela API). Leituras e gravações são
+em streaming: a memória usada é a de uma página, salvo ao ler na ordem
+inversa à gravada.
+
+O diretório é limitado a ``HISTORY_CACHE_MAX_BYTES``: ao passar do
+limite, os arquivos lidos há mais tempo (mtime, atualizado a cada
+acerto) são removidos.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import zlib
+from collections.abc import Iterable, Iterator
+from datetime import datetime
+from typing import Any
+
+from config import Config
+
+# Eventos que encerram uma execução: depois deles o histórico não muda
+CLOSE_EVENT_TYPES = frozenset(
+    {
+        "WorkflowExecutionCompleted",
+        "WorkflowExecutionFailed",
+        "WorkflowExecutionCanceled",
+        "WorkflowExecutionTerminated",
+        "WorkflowExecutionTimedOut",
+        "WorkflowExecutionContinuedAsNew",
+    }
+)
+
+_SUFFIX = ".jsonl.z"
+_FORMAT_VERSION = 1
+
+# Datas (eventTimestamp) viram {"$dt": "<ISO 8601>"} no arquivo
+_DATETIME_KEY = "$dt"
+
+
+def _default(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return {_DATETIME_KEY: value.isoformat()}
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def _object_hook(value: dict) -> Any:
+    if len(value) == 1 and _DATETIME_KEY in value:
+        return datetime.fromisoformat(value[_DATETIME_KEY])
+    return value
+
+
+def _dump(event: dict) -> bytes:
+    return (json.dumps(event, separators=(",", ":"), default=_default) + "\n").encode("utf-8")
+
+
+def _iter_lines(path: str, chunk_size: int = 64 * 1024) -> Iterator[bytes]:
+    decompressor = zlib.decompressobj()
+    pending = b""
+    with open(path, "rb") as stream:
+        while True:
+            chunk = stream.read(chunk_size)
+            data = decompressor.decompress(chunk) if chunk else decompressor.flush()
+            *lines, pending = (pending + data).split(b"\n")
+            yield from lines
+            if not chunk:
+                break
+    if pending:
+        yield pending
+
+
+class HistoryCache:
+    """Históricos de execuções encerradas em arquivos de um diretório local."""
+
+    def __init__(self, root: str, max_bytes: int):
+        """
+        Args:
+            root (str): Diretório base (criado se não existir)
+            max_bytes (int): Tamanho máximo somado dos arquivos do cache
+        """
+        self.root = root
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._bytes: int | None = None  # Total conhecido; lido do disco no primeiro uso
+        self._lock = threading.Lock()
+
+    def _path(self, domain: str, workflow_id: str, run_id: str) -> str:
+        key = f"{domain}/{workflow_id}/{run_id}".encode()
+        digest = hashlib.sha256(key).hexdigest()
+        return os.path.join(self.root, digest[:2], digest + _SUFFIX)
+
+    def __contains__(self, execution: tuple[str, str, str]) -> bool:
+        return os.path.exists(self._path(*execution))
+
+    def open(
+        self, domain: str, workflow_id: str, run_id: str, reverse_order: bool = False
+    ) -> Iterator[dict] | None:
+        """
+        Lê um histórico do cache.
+
+        Args:
+            domain (str): Domínio do SWF
+            workflow_id (str): ID do workflow
+            run_id (str): ID da execução
+            reverse_order (bool): Eventos do mais recente para o mais antigo
+
+        Returns:
+            Iterator: Eventos do histórico ou None se não está no cache
+        """
+        path = self._path(domain, workflow_id, run_id)
+        try:
+            lines = _iter_lines(path)
+            header = json.loads(next(lines))
+        except (OSError, StopIteration, ValueError, zlib.error):
+            with self._lock:
+                self.misses += 1
+            return None
+        with self._lock:
+            self.hits += 1
+        try:
+            os.utime(path)  # Recência usada na remoção por tamanho
+        except OSError:
+            pass
+        events = (json.loads(line, object_hook=_object_hook) for line in lines)
+        if header.get("reverse_order", False) != reverse_order:
+            return reversed(list(events))
+        return events
+
+    def record(
+        self,
+        domain: str,
+        workflow_id: str,
+        run_id: str,
+        events: Iterable[dict],
+        reverse_order: bool = False,
+    ) -> Iterator[dict]:
+        """
+        Repassa os eventos lidos da API, gravando-os no cache em paralelo.
+
+        O arquivo só é publicado se o iterador for consumido até o fim e a
+        execução estiver encerrada (evento de encerramento no fim do
+        histórico ou, na ordem inversa, no início). Se quem consome parar
+        antes, nada é gravado.
+
+        Args:
+            domain (str): Domínio do SWF
+            workflow_id (str): ID do workflow
+            run_id (str): ID da execução
+            events (Iterable): Eventos na ordem lida da API
+            reverse_order (bool): Se ``events`` vem do mais recente para o mais antigo
+
+        Yields:
+            dict: Os mesmos eventos de ``events``
+        """
+        path = self._path(domain, workflow_id, run_id)
+        directory = os.path.dirname(path)
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        compressor = zlib.compressobj()
+        first = last = None
+        try:
+            with os.fdopen(fd, "wb") as stream:
+                header = {"version": _FORMAT_VERSION, "reverse_order": reverse_order}
+                stream.write(compressor.compress(_dump(header)))
+                for event in events:
+                    if first is None:
+                        first = event
+                    last = event
+                    stream.write(compressor.compress(_dump(event)))
+                    yield event
+                stream.write(compressor.flush())
+            closing = first if reverse_order else last
+            if closing is not None and closing.get("eventType") in CLOSE_EVENT_TYPES:
+                os.replace(tmp_path, path)
+                self._added(os.path.getsize(path))
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def _entries(self) -> list[tuple[float, int, str]]:
+        entries = []
+        for current, _dirs, files in os.walk(self.root):
+            for name in files:
+                if not name.endswith(_SUFFIX):
+                    continue
+                path = os.path.join(current, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue  # Removido por outro processo
+                entries.append((stat.st_mtime, stat.st_size, path))
+        return entries
+
+    def _added(self, size: int) -> None:
+        with self._lock:
+            if self._bytes is None:
+                self._bytes = sum(entry[1] for entry in self._entries())
+            else:
+                self._bytes += size
+            over = self._bytes > self.max_bytes
+        if over:
+            self.evict()
+
+    def size(self) -> int:
+        """Bytes ocupados pelos históricos em cache."""
+        return sum(size for _mtime, size, _path in self._entries())
+
+    def evict(self) -> int:
+        """
+        Remove os históricos usados há mais tempo até caber em ``max_bytes``.
+
+        Returns:
+            int: Número de arquivos removidos
+        """
+        with self._lock:
+            entries = sorted(self._entries())
+            total = sum(size for _mtime, size, _path in entries)
+            removed = 0
+            for _mtime, size, path in entries:
+                if total <= self.max_bytes:
+                    break
+                try:
+                    os.remove(path)
+                except OSError:
+                    continue
+                total -= size
+                removed += 1
+            self._bytes = total
+            return removed
+
+
+# Cache compartilhado do processo (recriado se o módulo for recarregado)
+_cache: HistoryCache | None = None
+_cache_lock = threading.Lock()
+
+
+def get_history_cache() -> HistoryCache | None:
+    """
+    Cache compartilhado do processo, criado a partir do Config no primeiro uso.
+
+    Returns:
+        HistoryCache: Cache configurado ou None com ``HISTORY_CACHE_MAX_BYTES=0``
+    """
+    global _cache
+    if Config.HISTORY_CACHE_MAX_BYTES <= 0:
+        return _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = HistoryCache(Config.HISTORY_CACHE_PATH, Config.HISTORY_CACHE_MAX_BYTES)
+    return _cache
+
+
+def set_history_cache(cache: HistoryCache | None) -> None:
+    """Substitui o cache compartilhado (None recria a partir do Config)."""
+    global _cache
+    with _cache_lock:
+        _cache = cache
@@ -0,0 +1,552 @@
+"""
+Métricas dos workers no formato de texto do Prometheus.
+
+O registro é em memória e sem dependências externas: contadores, gauges e
+histogramas com rótulos, lidos por um endpoint HTTP local opcional
+(``GET /metrics``, formato de exposição 0.0.4). Com ``METRICS_PORT`` maior
+que zero, os workers sobem o endpoint ao iniciar o polling.
+
+Cada observação custa um lookup no dicionário de rótulos (evitado quando
+o chamador guarda o resultado de ``labels``), uma busca binária nos
+limites do histograma e um lock: menos de 1µs por observação (caso
+``metrics`` de benchmarks/suite.py). Com ``METRICS_ENABLED=false`` os
+métodos de registro viram no-op.
+
+Métricas coletadas:
+
+- ``swf_polls_total{worker,result}`` e ``swf_poll_wait_seconds{worker}``:
+  polls por resultado (``task``, ``empty``, ``error``) e duração do long poll
+- ``swf_empty_poll_ratio{worker}``: fração de polls vazios na janela do
+  ``PollerController``
+- ``activity_execution_seconds{activity}`` e
+  ``activity_tasks_total{activity,outcome}``: latência das atividades e
+  desfecho (``completed``, ``failed``, ``canceled``)
+- ``decision_compute_seconds`` e ``decision_history_events``: tempo de
+  replay (incluindo a leitura das páginas seguintes do histórico) e decisão,
+  e tamanho do histórico de cada decision task
+- ``swf_payload_bytes{kind}``: tamanho dos payloads enviados e recebidos,
+  como trafegam no SWF (referências do payload_store contam o tamanho da
+  referência)
+- ``swf_api_call_seconds{operation}`` e
+  ``swf_api_errors_total{operation,code}``: latência e erros das chamadas
+  ao SWF feitas pelo cliente instrumentado (``instrument_client``)
+"""
+
+from __future__ import annotations
+
+import contextlib
+import math
+import threading
+import time
+from bisect import bisect_left
+from collections.abc import Iterator, Sequence
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable
+
+import structured_log
+from config import Config
+from tracing import operation_name
+
+logger = structured_log.get_logger(__name__)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Limites dos histogramas: segundos (inclui long polls de até 60s),
+# tamanho de payloads e número de eventos do histórico
+DEFAULT_BUCKETS = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1,
+    0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 70.0,
+)  # fmt: skip
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 32768, 65536, 262144, 1048576)
+COUNT_BUCKETS = (10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 25000)
+
+
+class _NullChild:
+    """Série descartada: usada quando as métricas estão desativadas."""
+
+    def inc(self, amount: float = 1.0) -> None:
+        pass
+
+    def dec(self, amount: float = 1.0) -> None:
+        pass
+
+    def set(self, value: float) -> None:
+        pass
+
+    def set_function(self, function: Callable[[], float]) -> None:
+        pass
+
+    def observe(self, value: float) -> None:
+        pass
+
+    @contextlib.contextmanager
+    def time(self) -> Iterator[None]:
+        yield
+
+
+_NULL_CHILD = _NullChild()
+
+
+class _CounterChild:
+    __slots__ = ("_value", "_lock")
+
+    def __init__(self):
+        self._value = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0) -> None:
+        if amount < 0:
+            raise ValueError("Counters can only increase")
+        with self._lock:
+            self._value += amount
+
+    def samples(self, name: str, labels: str) -> Iterator[str]:
+        yield f"{name}{labels} {_format_value(self._value)}"
+
+
+class _GaugeChild:
+    __slots__ = ("_value", "_function", "_lock")
+
+    def __init__(self):
+        self._value = 0.0
+        self._function: Callable[[], float] | None = None
+        self._lock = threading.Lock()
+
+    def set(self, value: float) -> None:
+        self._value = float(value)
+
+    def inc(self, amount: float = 1.0) -> None:
+        with self._lock:
+            self._value += amount
+
+    def dec(self, amount: float = 1.0) -> None:
+        self.inc(-amount)
+
+    def set_function(self, function: Callable[[], float]) -> None:
+        """Lê o valor de ``function`` a cada coleta em vez de guardá-lo."""
+        self._function = function
+
+    def samples(self, name: str, labels: str) -> Iterator[str]:
+        value = self._function() if self._function is not None else self._value
+        yield f"{name}{labels} {_format_value(value)}"
+
+
+class _HistogramChild:
+    __slots__ = ("_upper_bounds", "_counts", "_sum", "_lock")
+
+    def __init__(self, upper_bounds: tuple[float, ...]):
+        self._upper_bounds = upper_bounds
+        self._counts = [0] * (len(upper_bounds) + 1)  # o último é o +Inf
+        self._sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float) -> None:
+        index = bisect_left(self._upper_bounds, value)
+        with self._lock:
+            self._counts[index] += 1
+            self._sum += value
+
+    @contextlib.contextmanager
+    def time(self) -> Iterator[None]:
+        """Observa a duração (em segundos) do bloco ``with``."""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started)
+
+    def samples(self, name: str, labels: str) -> Iterator[str]:
+        with self._lock:
+            counts = list(self._counts)
+            total = self._sum
+        cumulative = 0
+        for bound, count in zip((*self._upper_bounds, math.inf), counts):
+            cumulative += count
+            le = f'le="{_format_value(bound)}"'
+            bucket_labels = f"{labels[:-1]},{le}}}" if labels else f"{{{le}}}"
+            yield f"{name}_bucket{bucket_labels} {cumulative}"
+        yield f"{name}_sum{labels} {_format_value(total)}"
+        yield f"{name}_count{labels} {cumulative}"
+
+
+class Metric:
+    """
+    Família de séries de uma métrica (uma por combinação de rótulos).
+
+    Sem rótulos, os métodos da série (``inc``, ``observe``, ``set``...)
+    podem ser chamados direto na métrica.
+    """
+
+    def __init__(
+        self,
+        registry: MetricsRegistry,
+        kind: str,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] | None = None,
+    ):
+        """
+        Args:
+            registry (MetricsRegistry): Registro dono da métrica
+            kind (str): ``counter``, ``gauge`` ou ``histogram``
+            name (str): Nome no Prometheus
+            documentation (str): Texto do ``# HELP``
+            labelnames (sequence): Nomes dos rótulos
+            buckets (sequence): Limites superiores do histograma
+        """
+        self.registry = registry
+        self.kind = kind
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets or DEFAULT_BUCKETS))
+        # Séries por valores de rótulo já convertidos para texto (coleta) e
+        # cache pelos valores como recebidos (lookup sem conversão)
+        self._series: dict[tuple[str, ...], Any] = {}
+        self._children: dict[tuple[Any, ...], Any] = {}
+        self._lock = threading.Lock()
+
+    def labels(self, *values: Any) -> Any:
+        """
+        Série de uma combinação de rótulos, criada no primeiro uso.
+
+        Args:
+            *values: Valores dos rótulos, na ordem de ``labelnames``
+
+        Returns:
+            Série com ``inc``/``observe``/``set`` (no-op se desativado)
+        """
+        if not self.registry.enabled:
+            return _NULL_CHILD
+        child = self._children.get(values)
+        if child is None:
+            key = tuple(str(value) for value in values)
+            if len(key) != len(self.labelnames):
+                raise ValueError(f"{self.name} expects labels {self.labelnames}, got {key}")
+            with self._lock:
+                child = self._series.setdefault(key, self._new_child())
+                self._children[values] = child
+        return child
+
+    def _new_child(self) -> Any:
+        if self.kind == "counter":
+            return _CounterChild()
+        if self.kind == "gauge":
+            return _GaugeChild()
+        return _HistogramChild(self.buckets)
+
+    def inc(self, amount: float = 1.0) -> None:
+        self.labels().inc(amount)
+
+    def dec(self, amount: float = 1.0) -> None:
+        self.labels().dec(amount)
+
+    def set(self, value: float) -> None:
+        self.labels().set(value)
+
+    def set_function(self, function: Callable[[], float]) -> None:
+        self.labels().set_function(function)
+
+    def observe(self, value: float) -> None:
+        self.labels().observe(value)
+
+    def time(self) -> contextlib.AbstractContextManager[None]:
+        return self.labels().time()
+
+    def render(self) -> Iterator[str]:
+        """Linhas desta métrica no formato de texto do Prometheus."""
+        yield f"# HELP {self.name} {_escape_help(self.documentation)}"
+        yield f"# TYPE {self.name} {self.kind}"
+        with self._lock:
+            children = list(self._series.items())
+        for values, child in sorted(children):
+            labels = ""
+            if values:
+                pairs = ",".join(
+                    f'{name}="{_escape_label(value)}"'
+                    for name, value in zip(self.labelnames, values)
+                )
+                labels = f"{{{pairs}}}"
+            try:
+                yield from child.samples(self.name, labels)
+            except Exception as e:
+                # Gauge de função com erro não derruba a coleta inteira
+                logger.error("metric_collect_error", metric=self.name, error=e)
+
+
+class MetricsRegistry:
+    """Conjunto de métricas de um processo, exposto por ``render``."""
+
+    def __init__(self, enabled: bool = True):
+        """
+        Args:
+            enabled (bool): Se False, as séries descartam as observações
+        """
+        self.enabled = enabled
+        self._metrics: dict[str, Metric] = {}
+        self._lock = threading.Lock()
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Metric:
+        """Contador monotônico (o nome deve terminar em ``_total``)."""
+        return self._register("counter", name, documentation, labelnames)
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Metric:
+        """Valor que sobe e desce, opcionalmente lido de uma função."""
+        return self._register("gauge", name, documentation, labelnames)
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] | None = None,
+    ) -> Metric:
+        """Distribuição em buckets cumulativos, com soma e contagem."""
+        return self._register("histogram", name, documentation, labelnames, buckets)
+
+    def _register(self, kind, name, documentation, labelnames, buckets=None) -> Metric:
+        # Registrar de novo o mesmo nome devolve a métrica existente
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = Metric(self, kind, name, documentation, labelnames, buckets)
+                self._metrics[name] = metric
+            elif metric.kind != kind or metric.labelnames != tuple(labelnames):
+                raise ValueError(f"Metric {name} already registered with another type or labels")
+            return metric
+
+    def get(self, name: str) -> Metric:
+        """
+        Métrica registrada com o nome.
+
+        Raises:
+            KeyError: Se não houver métrica com esse nome
+        """
+        return self._metrics[name]
+
+    def render(self) -> str:
+        """Todas as métricas no formato de exposição de texto 0.0.4."""
+        with self._lock:
+            metrics = sorted(self._metrics.values(), key=lambda metric: metric.name)
+        lines = [line for metric in metrics for line in metric.render()]
+        return "\n".join(lines) + "\n"
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    if value == -math.inf:
+        return "-Inf"
+    if math.isnan(value):
+        return "NaN"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _escape_label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _escape_help(text: str) -> str:
+    return text.replace("\\", "\\\\").replace("\n", "\\n")
+
+
+# ========== Registro do processo e métricas dos workers ==========
+
+registry = MetricsRegistry(enabled=Config.METRICS_ENABLED)
+
+POLLS = registry.counter(
+    "swf_polls_total", "Polls por worker e resultado (task, empty, error)", ("worker", "result")
+)
+POLL_WAIT = registry.histogram(
+    "swf_poll_wait_seconds", "Duração dos long polls bem-sucedidos", ("worker",)
+)
+EMPTY_POLL_RATIO = registry.gauge(
+    "swf_empty_poll_ratio", "Fração de polls vazios na janela recente", ("worker",)
+)
+ACTIVITY_SECONDS = registry.histogram(
+    "activity_execution_seconds", "Duração das atividades até a resposta", ("activity",)
+)
+ACTIVITY_TASKS = registry.counter(
+    "activity_tasks_total",
+    "Tarefas de atividade por desfecho (completed, failed, canceled)",
+    ("activity", "outcome"),
+)
+DECISION_SECONDS = registry.histogram(
+    "decision_compute_seconds", "Tempo de replay e decisão de cada decision task"
+)
+HISTORY_EVENTS = registry.histogram(
+    "decision_history_events", "Eventos no histórico de cada decision task", buckets=COUNT_BUCKETS
+)
+PAYLOAD_BYTES = registry.histogram(
+    "swf_payload_bytes",
+    "Tamanho dos payloads como trafegam no SWF "
+    "(activity_input, activity_result, schedule_input, workflow_input)",
+    ("kind",),
+    buckets=SIZE_BUCKETS,
+)
+API_SECONDS = registry.histogram(
+    "swf_api_call_seconds", "Latência das chamadas à API do SWF", ("operation",)
+)
+API_ERRORS = registry.counter(
+    "swf_api_errors_total", "Chamadas à API do SWF com erro", ("operation", "code")
+)
+
+
+# ========== Cliente SWF instrumentado ==========
+
+
+def error_code(error: Exception) -> str:
+    """Código do erro do SWF (ClientError) ou o nome da exceção."""
+    code = (getattr(error, "response", None) or {}).get("Error", {}).get("Code")
+    return code or type(error).__name__
+
+
+class InstrumentedClient:
+    """
+    Proxy de um cliente SWF que mede a latência e os erros de cada chamada.
+
+    Atributos que não são operações (``exceptions``, ``meta``, atributos
+    privados) passam direto para o cliente original.
+    """
+
+    _PASSTHROUGH = frozenset({"exceptions", "meta", "can_paginate", "get_paginator", "get_waiter"})
+
+    def __init__(self, client: Any):
+        """
+        Args:
+            client: Cliente boto3 do SWF ou compatível (ex.: swf_simulator)
+        """
+        self._client = client
+
+    def __getattr__(self, name: str) -> Any:
+        attribute = getattr(self._client, name)
+        if name.startswith("_") or name in self._PASSTHROUGH or not callable(attribute):
+            return attribute
+        wrapped = self._wrap(operation_name(name), attribute)
+        # Guarda no proxy: as próximas chamadas não passam por __getattr__
+        self.__dict__[name] = wrapped
+        return wrapped
+
+    @staticmethod
+    def _wrap(operation: str, method: Callable[..., Any]) -> Callable[..., Any]:
+        latency = API_SECONDS.labels(operation)
+
+        def call(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return method(*args, **kwargs)
+            except Exception as e:
+                API_ERRORS.labels(operation, error_code(e)).inc()
+                raise
+            finally:
+                latency.observe(time.perf_counter() - started)
+
+        call.__name__ = method.__name__ if hasattr(method, "__name__") else operation
+        call.__doc__ = method.__doc__
+        return call
+
+
+def instrument_client(client: Any) -> Any:
+    """
+    Envolve o cliente em um ``InstrumentedClient``.
+
+    Args:
+        client: Cliente boto3 do SWF ou compatível
+
+    Returns:
+        O proxy instrumentado, ou o próprio cliente se as métricas estão desativadas
+    """
+    if not registry.enabled or isinstance(client, InstrumentedClient):
+        return client
+    return InstrumentedClient(client)
+
+
+# ========== Endpoint HTTP ==========
+
+_server: ThreadingHTTPServer | None = None
+_server_lock = threading.Lock()
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    registry: MetricsRegistry = registry
+
+    def do_GET(self) -> None:  # noqa: N802 - nome exigido por BaseHTTPRequestHandler
+        if self.path.split("?", 1)[0] not in ("/metrics", "/"):
+            self.send_error(404)
+            return
+        body = self.registry.render().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", CONTENT_TYPE)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format: str, *args: Any) -> None:  # noqa: A002
+        pass  # Sem uma linha de log por coleta
+
+
+def start_http_server(
+    port: int, addr: str = "127.0.0.1", metrics_registry: MetricsRegistry | None = None
+) -> ThreadingHTTPServer:
+    """
+    Sobe o endpoint ``/metrics`` em uma thread daemon.
+
+    Um processo tem no máximo um endpoint: chamadas seguintes devolvem o
+    servidor já em execução (activity e decision worker no mesmo processo
+    compartilham o endpoint).
+
+    Args:
+        port (int): Porta TCP (0 escolhe uma porta livre)
+        addr (str): Endereço de escuta
+        metrics_registry (MetricsRegistry): Registro exposto (padrão: o do processo)
+
+    Returns:
+        ThreadingHTTPServer: Servidor (``server_address`` traz a porta real)
+    """
+    global _server
+    with _server_lock:
+        if _server is not None:
+            return _server
+        handler = type(
+            "MetricsHandler", (_MetricsHandler,), {"registry": metrics_registry or registry}
+        )
+        server = ThreadingHTTPServer((addr, port), handler)
+        server.daemon_threads = True
+        thread = threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True)
+        thread.start()
+        _server = server
+        logger.info(
+            "metrics_endpoint_listening",
+            url=f"http://{addr}:{server.server_address[1]}/metrics",
+        )
+        return server
+
+
+def stop_http_server() -> None:
+    """Encerra o endpoint do processo, se houver."""
+    global _server
+    with _server_lock:
+        server, _server = _server, None
+    if server is not None:
+        server.shutdown()
+        server.server_close()
+
+
+def maybe_start_server() -> ThreadingHTTPServer | None:
+    """
+    Sobe o endpoint se ``METRICS_PORT`` estiver configurado.
+
+    Returns:
+        ThreadingHTTPServer | None: Servidor ou None se desativado
+    """
+    if not registry.enabled or Config.METRICS_PORT <= 0:
+        return None
+    try:
+        return start_http_server(Config.METRICS_PORT, Config.METRICS_ADDR)
+    except OSError as e:
+        # Porta ocupada não impede o worker de processar tarefas
+        logger.error("metrics_endpoint_error", port=Config.METRICS_PORT, error=e)
+        return None
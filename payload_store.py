@@ -0,0 +1,261 @@
+"""
+Armazenamento externo de payloads grandes ("claim check").
+
+O SWF limita ``input``, ``result`` e ``details`` a 32KB. Payloads acima de
+``Config.PAYLOAD_OFFLOAD_THRESHOLD`` caracteres são gravados em um
+armazenamento externo, endereçados pelo SHA-256 do conteúdo, e trafegam
+no SWF apenas como uma referência::
+
+    {"__payload_ref__": "sha256:<hex>", "size": 123456}
+
+Quem lê um payload chama ``hydrate``, que devolve o texto original (com
+cache local de leitura); quem envia chama ``dehydrate``. Payloads pequenos
+e históricos antigos, sem referências, passam sem alteração.
+
+Backends:
+
+- ``LocalPayloadStore``: diretório local (padrão; todos os workers precisam
+  enxergar o mesmo diretório)
+- ``S3PayloadStore``: bucket S3 ou serviço compatível (``endpoint_url``,
+  ex.: MinIO ou LocalStack)
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from typing import Protocol
+
+from config import Config
+
+REF_KEY = "__payload_ref__"
+
+# Prefixo que toda referência serializada tem (evita json.loads em payloads comuns)
+_REF_PREFIX = '{"' + REF_KEY + '"'
+
+
+class PayloadBackend(Protocol):
+    """Interface mínima de um armazenamento de payloads."""
+
+    def put(self, key: str, data: bytes) -> None: ...
+
+    def get(self, key: str) -> bytes: ...
+
+
+class LocalPayloadStore:
+    """Payloads em arquivos de um diretório local, um arquivo por chave."""
+
+    def __init__(self, root: str):
+        """
+        Args:
+            root (str): Diretório base (criado se não existir)
+        """
+        self.root = root
+
+    def _path(self, key: str) -> str:
+        digest = key.split(":", 1)[-1]
+        return os.path.join(self.root, digest[:2], digest)
+
+    def put(self, key: str, data: bytes) -> None:
+        path = self._path(key)
+        if os.path.exists(path):
+            return  # Mesmo conteúdo, mesma chave
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Grava em arquivo temporário e renomeia: leitores nunca veem arquivo parcial
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path))
+        with os.fdopen(fd, "wb") as tmp:
+            tmp.write(data)
+        os.replace(tmp_path, path)
+
+    def get(self, key: str) -> bytes:
+        with open(self._path(key), "rb") as payload:
+            return payload.read()
+
+
+class S3PayloadStore:
+    """Payloads em um bucket S3 (ou serviço compatível com a API do S3)."""
+
+    def __init__(self, bucket: str, prefix: str = "", endpoint_url: str | None = None, client=None):
+        """
+        Args:
+            bucket (str): Nome do bucket
+            prefix (str): Prefixo das chaves dos objetos
+            endpoint_url (str): Endpoint de um serviço compatível com S3
+            client: Cliente S3 já configurado (padrão: criado no primeiro uso)
+        """
+        self.bucket = bucket
+        self.prefix = prefix
+        self.endpoint_url = endpoint_url
+        self._client = client
+
+    @property
+    def client(self):
+        if self._client is None:
+            import boto3
+
+            self._client = boto3.client(
+                "s3",
+                aws_access_key_id=Config.AWS_ACCESS_KEY_ID,
+                aws_secret_access_key=Config.AWS_SECRET_ACCESS_KEY,
+                region_name=Config.AWS_REGION,
+                endpoint_url=self.endpoint_url,
+            )
+        return self._client
+
+    def _object_key(self, key: str) -> str:
+        return self.prefix + key.replace(":", "/", 1)
+
+    def put(self, key: str, data: bytes) -> None:
+        self.client.put_object(Bucket=self.bucket, Key=self._object_key(key), Body=data)
+
+    def get(self, key: str) -> bytes:
+        response = self.client.get_object(Bucket=self.bucket, Key=self._object_key(key))
+        return response["Body"].read()
+
+
+class PayloadStore:
+    """
+    Substitui payloads grandes por referências e as resolve na leitura.
+
+    Mantém um cache LRU, limitado por bytes, dos payloads lidos e gravados:
+    o mesmo resultado costuma ser lido várias vezes (replay de cada decisão,
+    input das etapas seguintes).
+    """
+
+    def __init__(self, backend: PayloadBackend, threshold: int, cache_max_bytes: int):
+        """
+        Args:
+            backend: Armazenamento com ``put(key, data)`` e ``get(key)``
+            threshold (int): Tamanho (caracteres) a partir do qual o payload é externalizado
+            cache_max_bytes (int): Memória máxima do cache de leitura
+        """
+        self.backend = backend
+        self.threshold = threshold
+        self.cache_max_bytes = cache_max_bytes
+        self._cache: OrderedDict[str, str] = OrderedDict()
+        self._cache_bytes = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def is_reference(text: str | None) -> bool:
+        """Indica se o payload serializado é uma referência externa."""
+        return bool(text) and text.startswith(_REF_PREFIX)
+
+    def dehydrate(self, text: str) -> str:
+        """
+        Externaliza o payload se ele passar do limite.
+
+        Args:
+            text (str): Payload serializado
+
+        Returns:
+            str: O próprio payload ou a referência para ele
+        """
+        if text is None or len(text) <= self.threshold or self.is_reference(text):
+            return text
+        data = text.encode("utf-8")
+        key = "sha256:" + hashlib.sha256(data).hexdigest()
+        if self._cached(key) is None:
+            self.backend.put(key, data)
+            self._remember(key, text)
+        return json.dumps({REF_KEY: key, "size": len(data)})
+
+    def hydrate(self, text: str) -> str:
+        """
+        Resolve uma referência para o payload original.
+
+        Args:
+            text (str): Payload serializado ou referência
+
+        Returns:
+            str: Payload original (payloads sem referência voltam inalterados)
+        """
+        if not self.is_reference(text):
+            return text
+        key = json.loads(text)[REF_KEY]
+        cached = self._cached(key)
+        if cached is not None:
+            return cached
+        payload = self.backend.get(key).decode("utf-8")
+        self._remember(key, payload)
+        return payload
+
+    def _cached(self, key: str) -> str | None:
+        with self._lock:
+            payload = self._cache.get(key)
+            if payload is not None:
+                self._cache.move_to_end(key)
+            return payload
+
+    def _remember(self, key: str, payload: str) -> None:
+        size = len(payload)
+        if size > self.cache_max_bytes:
+            return
+        with self._lock:
+            if key in self._cache:
+                return
+            self._cache[key] = payload
+            self._cache_bytes += size
+            while self._cache_bytes > self.cache_max_bytes:
+                _, evicted = self._cache.popitem(last=False)
+                self._cache_bytes -= len(evicted)
+
+
+# Armazenamento compartilhado do processo (recriado se o módulo for recarregado)
+_store: PayloadStore | None = None
+_store_lock = threading.Lock()
+
+
+def create_payload_store() -> PayloadStore:
+    """
+    Cria o armazenamento a partir do Config.
+
+    ``PAYLOAD_STORE=s3`` usa ``PAYLOAD_S3_BUCKET``/``PAYLOAD_S3_PREFIX``/
+    ``PAYLOAD_S3_ENDPOINT_URL``; qualquer outro valor usa o diretório
+    ``PAYLOAD_STORE_PATH``.
+
+    Returns:
+        PayloadStore: Armazenamento configurado
+    """
+    if Config.PAYLOAD_STORE == "s3":
+        backend = S3PayloadStore(
+            Config.PAYLOAD_S3_BUCKET,
+            prefix=Config.PAYLOAD_S3_PREFIX,
+            endpoint_url=Config.PAYLOAD_S3_ENDPOINT_URL,
+        )
+    else:
+        backend = LocalPayloadStore(Config.PAYLOAD_STORE_PATH)
+    return PayloadStore(backend, Config.PAYLOAD_OFFLOAD_THRESHOLD, Config.PAYLOAD_CACHE_MAX_BYTES)
+
+
+def get_payload_store() -> PayloadStore:
+    """Armazenamento compartilhado do processo, criado no primeiro uso."""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = create_payload_store()
+    return _store
+
+
+def set_payload_store(store: PayloadStore | None) -> None:
+    """Substitui o armazenamento compartilhado (None recria a partir do Config)."""
+    global _store
+    with _store_lock:
+        _store = store
+
+
+def dehydrate(text: str) -> str:
+    """``PayloadStore.dehydrate`` do armazenamento compartilhado."""
+    return get_payload_store().dehydrate(text)
+
+
+def hydrate(text: str) -> str:
+    """``PayloadStore.hydrate`` do armazenamento compartilhado."""
+    if not PayloadStore.is_reference(text):
+        return text
+    return get_payload_store().hydrate(text)
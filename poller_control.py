@@ -0,0 +1,338 @@
+"""
+Controle adaptativo de pollers compartilhado pelos workers.
+
+O ``PollerController`` decide quantos pollers concorrentes manter em uma
+task list e quanto esperar entre polls:
+
+- Após um long poll vazio que realmente aguardou no SWF, não há espera
+  extra; polls vazios que retornam rápido demais recebem um atraso curto.
+- Erros aplicam backoff exponencial com jitter ("full jitter"), mais
+  agressivo quando o SWF indica throttling.
+- O número de pollers cresce com o backlog (``count_pending_*``), a taxa de
+  chegada e a latência das tarefas, e diminui quando a maioria dos polls
+  volta vazia.
+
+É usado tanto pelo ``ActivityWorker`` quanto pelo ``DecisionWorker``.
+
+``drain`` processa tarefas em sequência dentro de um orçamento de tempo;
+é a base dos ``lambda_handler`` dos workers.
+"""
+
+from __future__ import annotations
+
+import math
+import random
+import threading
+import time
+from collections import deque
+from typing import Any, Callable
+
+import metrics
+import structured_log
+from config import Config
+
+logger = structured_log.get_logger(__name__)
+
+# Códigos de erro do SWF/AWS que indicam limite de requisições
+THROTTLING_ERROR_CODES = {
+    "ThrottlingException",
+    "Throttling",
+    "LimitExceededFault",
+    "RequestLimitExceeded",
+    "TooManyRequestsException",
+}
+
+# Um poll vazio mais rápido que isto não aguardou de fato no SWF
+FAST_EMPTY_POLL_SECONDS = 1.0
+
+
+def is_throttling_error(error: Exception) -> bool:
+    """Indica se o erro é um throttling do SWF (ClientError do botocore)."""
+    code = getattr(error, "response", {}).get("Error", {}).get("Code")
+    return code in THROTTLING_ERROR_CODES
+
+
+def backoff_delay(attempt: int, base: float, cap: float, rng: random.Random | None = None) -> float:
+    """
+    Backoff exponencial com "full jitter".
+
+    Args:
+        attempt (int): Número de falhas consecutivas (a partir de 1)
+        base (float): Atraso base em segundos
+        cap (float): Atraso máximo em segundos
+        rng (random.Random): Gerador de números aleatórios (para testes)
+
+    Returns:
+        float: Segundos a aguardar, uniformes em [0, min(cap, base * 2^(attempt-1))]
+    """
+    ceiling = min(cap, base * (2 ** max(attempt - 1, 0)))
+    return (rng or random).uniform(0, ceiling)
+
+
+class PollerController:
+    """
+    Ajusta o número de pollers de uma task list e o intervalo entre polls.
+
+    O alvo de pollers segue a Lei de Little: concorrência necessária ≈
+    (taxa de chegada + backlog a drenar) × latência média por tarefa,
+    limitada a ``[min_pollers, max_pollers]``. Cresce imediatamente e
+    diminui um poller por ajuste, e só quando a taxa de polls vazios passa
+    de ``Config.POLLER_SHRINK_EMPTY_RATIO``.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        min_pollers: int = 1,
+        max_pollers: int = 1,
+        count_pending: Callable[[], int] | None = None,
+        adjust_interval: float | None = None,
+        rng: random.Random | None = None,
+    ):
+        """
+        Args:
+            name (str): Nome da task list/worker (para log)
+            min_pollers (int): Mínimo de pollers mantidos
+            max_pollers (int): Máximo de pollers
+            count_pending (callable): Retorna o backlog da task list
+                (``count_pending_activity_tasks``/``count_pending_decision_tasks``)
+            adjust_interval (float): Segundos entre ajustes (padrão: Config.POLLER_ADJUST_INTERVAL)
+            rng (random.Random): Gerador para o jitter (para testes)
+        """
+        self.name = name
+        self.min_pollers = max(1, min(min_pollers, max_pollers))
+        self.max_pollers = max(1, max_pollers)
+        self.count_pending = count_pending
+        self.adjust_interval = (
+            adjust_interval if adjust_interval is not None else Config.POLLER_ADJUST_INTERVAL
+        )
+        self.target = self.min_pollers
+        self.pending = 0
+        self._rng = rng or random.Random()
+        self._lock = threading.Lock()
+        self._consecutive_errors = 0
+        self._polls: deque[tuple[float, bool]] = deque()  # (instante, recebeu tarefa)
+        self._latencies: deque[float] = deque(maxlen=256)
+        self._last_adjust = time.monotonic()
+        # Séries de métricas resolvidas uma vez (sem lookup de rótulos por poll)
+        self._polls_with_task = metrics.POLLS.labels(name, "task")
+        self._polls_empty = metrics.POLLS.labels(name, "empty")
+        self._polls_failed = metrics.POLLS.labels(name, "error")
+        self._poll_wait = metrics.POLL_WAIT.labels(name)
+        metrics.EMPTY_POLL_RATIO.labels(name).set_function(self.empty_poll_ratio)
+
+    # ========== Observações ==========
+
+    def record_poll(self, got_task: bool, wait_seconds: float) -> float:
+        """
+        Registra o resultado de um poll.
+
+        Args:
+            got_task (bool): Se o poll retornou uma tarefa
+            wait_seconds (float): Duração do poll
+
+        Returns:
+            float: Segundos a aguardar antes do próximo poll
+        """
+        with self._lock:
+            self._consecutive_errors = 0
+            self._polls.append((time.monotonic(), got_task))
+        (self._polls_with_task if got_task else self._polls_empty).inc()
+        self._poll_wait.observe(wait_seconds)
+        if got_task or wait_seconds >= FAST_EMPTY_POLL_SECONDS:
+            return 0.0
+        # Poll vazio que não aguardou no SWF: evita girar em falso
+        return self._rng.uniform(0, FAST_EMPTY_POLL_SECONDS)
+
+    def record_task_latency(self, seconds: float) -> None:
+        """Registra quanto tempo uma tarefa levou para ser processada."""
+        self._latencies.append(seconds)
+
+    def record_error(self, error: Exception) -> float:
+        """
+        Registra uma falha de poll e calcula o backoff.
+
+        Args:
+            error (Exception): Erro ocorrido
+
+        Returns:
+            float: Segundos a aguardar antes de tentar novamente
+        """
+        self._polls_failed.inc()
+        with self._lock:
+            self._consecutive_errors += 1
+            attempt = self._consecutive_errors
+        if is_throttling_error(error):
+            # Throttling: começa mais alto e reduz os pollers imediatamente
+            with self._lock:
+                self.target = max(self.min_pollers, self.target - 1)
+            return backoff_delay(
+                attempt + 1, Config.POLLER_BACKOFF_BASE, Config.POLLER_BACKOFF_MAX, self._rng
+            )
+        return backoff_delay(
+            attempt, Config.POLLER_BACKOFF_BASE, Config.POLLER_BACKOFF_MAX, self._rng
+        )
+
+    # ========== Decisão ==========
+
+    def empty_poll_ratio(self) -> float:
+        """Fração de polls vazios na janela recente (0 sem dados)."""
+        with self._lock:
+            self._trim_window(time.monotonic())
+            if not self._polls:
+                return 0.0
+            return sum(1 for _, got in self._polls if not got) / len(self._polls)
+
+    def desired_pollers(self, force: bool = False) -> int:
+        """
+        Número de pollers desejado, recalculado a cada ``adjust_interval``.
+
+        Args:
+            force (bool): Recalcula mesmo antes do intervalo
+
+        Returns:
+            int: Alvo de pollers concorrentes
+        """
+        now = time.monotonic()
+        if not force and now - self._last_adjust < self.adjust_interval:
+            return self.target
+        self._last_adjust = now
+        if self.min_pollers == self.max_pollers:
+            return self.target
+
+        if self.count_pending is not None:
+            try:
+                self.pending = int(self.count_pending())
+            except Exception as e:
+                logger.warning("count_pending_error", worker=self.name, error=e)
+
+        with self._lock:
+            self._trim_window(now)
+            window = max(now - self._polls[0][0], 1.0) if self._polls else self.adjust_interval
+            received = sum(1 for _, got in self._polls if got)
+            empty_ratio = (len(self._polls) - received) / len(self._polls) if self._polls else 0.0
+            latency = sum(self._latencies) / len(self._latencies) if self._latencies else 1.0
+
+            arrival_rate = received / window + self.pending / self.adjust_interval
+            needed = math.ceil(arrival_rate * latency) + (1 if self.pending else 0)
+            needed = max(self.min_pollers, min(self.max_pollers, needed))
+
+            if needed > self.target:
+                self.target = needed
+            elif needed < self.target and empty_ratio >= Config.POLLER_SHRINK_EMPTY_RATIO:
+                self.target -= 1
+            return self.target
+
+    def _trim_window(self, now: float) -> None:
+        horizon = now - self.adjust_interval * 6
+        while self._polls and self._polls[0][0] < horizon:
+            self._polls.popleft()
+
+    # ========== Execução ==========
+
+    def run(
+        self,
+        poll: Callable[[str], Any],
+        handle: Callable[[Any, str], None],
+        identity_prefix: str,
+        stop_event: threading.Event,
+    ) -> None:
+        """
+        Mantém ``desired_pollers()`` threads de polling até ``stop_event``.
+
+        Cada thread executa ``poll(identity)``; se retornar uma tarefa,
+        chama ``handle(task, identity)``. Threads cujo índice excede o alvo
+        terminam após o poll em andamento. Bloqueia até a parada.
+
+        A latência das tarefas não é medida aqui (``handle`` pode apenas
+        despachar a tarefa); quem processa chama ``record_task_latency``.
+
+        Args:
+            poll (callable): Faz um long poll; retorna a tarefa ou None
+            handle (callable): Processa (ou despacha) a tarefa recebida
+            identity_prefix (str): Prefixo da identity de cada thread
+            stop_event (threading.Event): Sinal de parada
+        """
+        threads: dict[int, threading.Thread] = {}
+        while not stop_event.is_set():
+            desired = self.desired_pollers()
+            for index in range(1, desired + 1):
+                if index not in threads or not threads[index].is_alive():
+                    thread = threading.Thread(
+                        target=self._poller_loop,
+                        args=(index, poll, handle, f"{identity_prefix}-poller-{index}", stop_event),
+                        name=f"{self.name}-poller-{index}",
+                        daemon=True,
+                    )
+                    threads[index] = thread
+                    thread.start()
+            stop_event.wait(min(self.adjust_interval, 1.0))
+        for thread in threads.values():
+            thread.join()
+
+    def _poller_loop(self, index, poll, handle, identity, stop_event) -> None:
+        while not stop_event.is_set() and index <= self.target:
+            started = time.monotonic()
+            try:
+                task = poll(identity)
+            except Exception as e:
+                delay = self.record_error(e)
+                logger.error("poll_error", worker=self.name, error=e, retry_in=round(delay, 1))
+                stop_event.wait(delay)
+                continue
+
+            delay = self.record_poll(task is not None, time.monotonic() - started)
+            if task is None:
+                logger.debug("poll_empty", worker=self.name)
+                stop_event.wait(delay)
+                continue
+
+            try:
+                handle(task, identity)
+            except Exception as e:
+                logger.error("task_error", worker=self.name, error=e)
+
+
+def drain(
+    poll: Callable[[str], Any],
+    handle: Callable[[Any, str], None],
+    identity: str,
+    remaining_seconds: Callable[[], float],
+    reserve_seconds: float,
+) -> tuple[int, str]:
+    """
+    Processa tarefas até a fila esvaziar ou o tempo acabar.
+
+    Antes de cada poll verifica se ainda restam mais de ``reserve_seconds``
+    (um long poll mais o processamento de uma tarefa). Para no primeiro
+    poll vazio ou com erro, sem backoff: a próxima invocação tenta de novo.
+    Erros ao processar uma tarefa são registrados e a drenagem continua.
+
+    Args:
+        poll (callable): Faz um long poll; retorna a tarefa ou None
+        handle (callable): Processa a tarefa recebida
+        identity (str): Identity enviada nos polls
+        remaining_seconds (callable): Tempo restante do orçamento, em segundos
+        reserve_seconds (float): Tempo mínimo para iniciar mais um poll
+
+    Returns:
+        tuple: (tarefas processadas com sucesso, motivo da parada: "empty", "time"
+        ou "error")
+    """
+    processed = 0
+    while remaining_seconds() > reserve_seconds:
+        try:
+            task = poll(identity)
+        except Exception as e:
+            logger.error("poll_error", error=e)
+            return processed, "error"
+        if task is None:
+            return processed, "empty"
+        try:
+            handle(task, identity)
+        except Exception as e:
+            # A tarefa expira e é reentregue pelo SWF; as demais seguem sendo drenadas
+            logger.error("task_error", error=e)
+            continue
+        processed += 1
+    return processed, "time"
@@ -0,0 +1,222 @@
+"""
+Execução de atividades CPU-bound em um pool de processos.
+
+Handlers marcados com ``process_lane`` no mapeamento
+``ActivityWorker.activities`` são executados em processos filhos, fora do
+GIL do processo principal. Polling e respostas ao SWF continuam no
+processo pai.
+
+O input e o resultado trafegam como o próprio JSON recebido/enviado ao SWF:
+o processo pai repassa a string sem deserializá-la e o filho devolve o
+resultado já serializado, evitando pickling de estruturas grandes.
+
+Tarefas enviadas dentro de ``HeartbeatManager.track`` ganham um canal
+compartilhado (``multiprocessing.Manager``): ``record_progress`` e
+``cancel_requested`` no filho funcionam como em handlers comuns, e uma
+thread do processo pai repassa o progresso ao heartbeat e o pedido de
+cancelamento ao filho.
+"""
+
+from __future__ import annotations
+
+import functools
+import multiprocessing
+import sys
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Any, Callable
+
+import heartbeat
+import tracing
+from codec import decode, encode
+from config import Config
+
+# ``max_tasks_per_child`` só existe a partir do Python 3.11
+_NATIVE_RECYCLING = sys.version_info >= (3, 11)
+
+
+class ProcessLaneHandler:
+    """
+    Marca um handler de atividade para execução no pool de processos.
+
+    Continua sendo um callable comum: sem pool configurado, ou quando
+    chamado diretamente, executa inline no processo atual. A função
+    precisa estar no nível de módulo para ser importável pelo filho.
+    """
+
+    lane = "process"
+
+    def __init__(self, func: Callable[[dict], Any]):
+        self.func = func
+        functools.update_wrapper(self, func)
+
+    def __call__(self, input_data: dict) -> Any:
+        return self.func(input_data)
+
+
+def process_lane(func: Callable[[dict], Any]) -> ProcessLaneHandler:
+    """
+    Registra um handler na lane de processos.
+
+    Exemplo:
+        self.activities['ProcessData'] = process_lane(process_data_task)
+
+    Args:
+        func (callable): Função de nível de módulo ``(input_data) -> dict``
+
+    Returns:
+        ProcessLaneHandler: Handler marcado para o pool de processos
+    """
+    return ProcessLaneHandler(func)
+
+
+def is_process_lane(handler: Any) -> bool:
+    """Indica se o handler deve ser executado no pool de processos."""
+    return getattr(handler, "lane", None) == ProcessLaneHandler.lane
+
+
+def _run_serialized(func: Callable[[dict], Any], raw_input: str, channel: Any = None) -> str:
+    """Executado no processo filho: payload de entrada → payload de saída."""
+    input_data = decode(raw_input)
+    tracing.extract(input_data)  # O handler não recebe o contexto de trace
+    if channel is None:
+        return encode(func(input_data))
+    with heartbeat.remote_context(channel):
+        return encode(func(input_data))
+
+
+class ProcessLane:
+    """
+    Pool de processos com reciclagem de workers após N tarefas.
+
+    No Python 3.11+ usa ``max_tasks_per_child`` do próprio
+    ``ProcessPoolExecutor``. Em versões anteriores o pool inteiro é
+    substituído quando o total de tarefas atinge ``workers * N``; as
+    tarefas do pool antigo terminam normalmente.
+
+    O processo do ``Manager`` e a thread que sincroniza os canais de
+    heartbeat só são iniciados na primeira tarefa enviada com um
+    ``ActivityContext`` ativo.
+    """
+
+    def __init__(self, workers: int, max_tasks_per_child: int):
+        """
+        Args:
+            workers (int): Número de processos filhos
+            max_tasks_per_child (int): Tarefas por processo antes de reciclá-lo
+        """
+        self.workers = workers
+        self.max_tasks_per_child = max_tasks_per_child
+        self._executor: ProcessPoolExecutor | None = None
+        self._submitted = 0
+        self._lock = threading.Lock()
+        self._manager: Any = None
+        self._channels: dict[int, tuple[heartbeat.ActivityContext, Any]] = {}
+        self._next_channel = 0
+        self._bridge: threading.Thread | None = None
+        self._bridge_stop = threading.Event()
+
+    def _new_executor(self) -> ProcessPoolExecutor:
+        # spawn: filhos não herdam threads/conexões do pai (boto3, pollers)
+        context = multiprocessing.get_context("spawn")
+        if _NATIVE_RECYCLING:
+            return ProcessPoolExecutor(
+                self.workers, mp_context=context, max_tasks_per_child=self.max_tasks_per_child
+            )
+        return ProcessPoolExecutor(self.workers, mp_context=context)
+
+    def submit(self, func: Callable[[dict], Any], raw_input: str) -> Future:
+        """
+        Envia um handler para o pool.
+
+        Args:
+            func (callable): Função de nível de módulo do handler
+            raw_input (str): Input da tarefa, em JSON, como veio do SWF
+
+        Returns:
+            Future: Resolve para o resultado serializado em JSON
+        """
+        context = heartbeat.current_activity_context()
+        with self._lock:
+            if self._executor is None:
+                self._executor = self._new_executor()
+            elif not _NATIVE_RECYCLING and self._submitted >= (
+                self.workers * self.max_tasks_per_child
+            ):
+                self._executor.shutdown(wait=False)
+                self._executor = self._new_executor()
+                self._submitted = 0
+            self._submitted += 1
+            if not isinstance(context, heartbeat.ActivityContext):
+                return self._executor.submit(_run_serialized, func, raw_input)
+            key, channel = self._open_channel(context)
+            future = self._executor.submit(_run_serialized, func, raw_input, channel)
+        future.add_done_callback(lambda _future: self._close_channel(key))
+        return future
+
+    def _open_channel(self, context: heartbeat.ActivityContext) -> tuple[int, Any]:
+        # Chamado com self._lock
+        if self._manager is None:
+            self._manager = multiprocessing.get_context("spawn").Manager()
+        if self._bridge is None:
+            self._bridge_stop.clear()
+            self._bridge = threading.Thread(
+                target=self._run_bridge, name="process-lane-heartbeat", daemon=True
+            )
+            self._bridge.start()
+        key = self._next_channel
+        self._next_channel += 1
+        channel = self._manager.dict()
+        self._channels[key] = (context, channel)
+        return key, channel
+
+    def _close_channel(self, key: int) -> None:
+        with self._lock:
+            self._channels.pop(key, None)
+
+    def _run_bridge(self) -> None:
+        # Mesma resolução da varredura do HeartbeatManager
+        tick = max(min(Config.HEARTBEAT_MIN_INTERVAL, Config.HEARTBEAT_INTERVAL) / 2, 0.01)
+        while not self._bridge_stop.wait(tick):
+            self.sync_channels()
+
+    def sync_channels(self) -> None:
+        """
+        Sincroniza os canais das tarefas em andamento com seus contextos.
+
+        O último progresso publicado pelo filho vai para o
+        ``ActivityContext`` (e dele para o próximo heartbeat); um pedido de
+        cancelamento recebido pelo heartbeat é repassado ao filho.
+        """
+        with self._lock:
+            channels = list(self._channels.values())
+        for context, channel in channels:
+            try:
+                details = channel.pop("details", None)
+                if details is not None:
+                    context.record_progress(details)
+                if context.cancel_requested:
+                    channel["cancel"] = True
+            except (OSError, EOFError):
+                # Manager encerrado durante o shutdown
+                return
+
+    def run(self, func: Callable[[dict], Any], raw_input: str) -> str:
+        """Executa o handler no pool e aguarda o resultado serializado."""
+        return self.submit(func, raw_input).result()
+
+    def shutdown(self, wait: bool = True) -> None:
+        """Encerra os processos filhos."""
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=wait)
+                self._executor = None
+            bridge, self._bridge = self._bridge, None
+            self._bridge_stop.set()
+        if bridge is not None:
+            bridge.join()
+        with self._lock:
+            if self._manager is not None:
+                self._manager.shutdown()
+                self._manager = None
+            self._channels.clear()
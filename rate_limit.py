@@ -0,0 +1,56 @@
+"""
+Limitação de taxa de chamadas à API do SWF.
+
+O ``TokenBucket`` é compartilhado entre threads: cada chamada consome um
+token e os tokens são repostos continuamente a ``rate`` por segundo, até
+``burst``. Quem não encontra token disponível aguarda o próximo.
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+
+
+class TokenBucket:
+    """Token bucket thread-safe."""
+
+    def __init__(self, rate: float, burst: float | None = None):
+        """
+        Args:
+            rate (float): Tokens repostos por segundo
+            burst (float): Capacidade máxima do balde (padrão: ``rate``, mínimo 1)
+        """
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+        self.rate = rate
+        self.capacity = max(1.0, burst if burst is not None else rate)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float) -> None:
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def try_acquire(self) -> float:
+        """
+        Tenta consumir um token sem bloquear.
+
+        Returns:
+            float: 0 se consumiu; senão, segundos até haver um token
+        """
+        with self._lock:
+            self._refill(time.monotonic())
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return 0.0
+            return (1 - self._tokens) / self.rate
+
+    def acquire(self) -> None:
+        """Consome um token, aguardando a reposição se necessário."""
+        while True:
+            wait = self.try_acquire()
+            if not wait:
+                return
+            time.sleep(wait)
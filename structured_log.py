@@ -0,0 +1,439 @@
+"""
+Logs estruturados e não bloqueantes dos workers.
+
+Cada registro é um evento com nome fixo (``activity_completed``,
+``poll_empty``...) e campos nomeados. Quem loga apenas coloca o registro
+em uma fila; uma thread em segundo plano formata e escreve em lotes na
+saída padrão, de modo que threads de polling e de execução não disputam
+o stdout nem pagam a serialização de payloads grandes.
+
+Antes de entrar na fila, cada registro passa por:
+
+- nível mínimo (``LOG_LEVEL``): registros abaixo dele custam uma comparação
+- amostragem por evento (``LOG_SAMPLE_RATES``, ex.: ``poll_empty=0.01``)
+- limite de taxa por evento (``LOG_RATE_PER_EVENT`` registros/s, com
+  ``rate_limit.TokenBucket``); os descartados são contados e resumidos
+  periodicamente em um evento ``log_suppressed``
+
+Na escrita, campos com dicts e listas são serializados em JSON, valores
+sob chaves sensíveis (``LOG_REDACT_KEYS``) são mascarados e textos longos
+são truncados em ``LOG_MAX_FIELD_CHARS``. ``LOG_FORMAT`` escolhe entre
+``text`` (``chave=valor``) e ``json`` (um objeto por linha).
+
+Uso::
+
+    from structured_log import get_logger
+
+    logger = get_logger(__name__)
+    logger.info("activity_completed", activity="ValidateInput")
+"""
+
+from __future__ import annotations
+
+import atexit
+import json
+import os
+import queue
+import random
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timezone
+from typing import Any, TextIO
+
+from config import Config
+from rate_limit import TokenBucket
+from tracing import current_span
+
+LEVELS = {"DEBUG": 10, "INFO": 20, "WARNING": 30, "ERROR": 40}
+_LEVEL_NAMES = {value: name for name, value in LEVELS.items()}
+
+REDACTED = "[REDACTED]"
+
+# Registros escritos por lote e intervalo do resumo de descartados
+_BATCH_SIZE = 256
+_SUPPRESSED_REPORT_SECONDS = 10.0
+
+
+def parse_sample_rates(spec: str) -> dict[str, float]:
+    """
+    Lê ``LOG_SAMPLE_RATES``.
+
+    Args:
+        spec (str): Pares ``evento=fração`` separados por vírgula
+
+    Returns:
+        dict: Fração de registros mantidos por evento
+
+    Raises:
+        ValueError: Se algum par é inválido
+    """
+    rates = {}
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        event, _, rate = item.partition("=")
+        if not event or not rate:
+            raise ValueError(f"Invalid LOG_SAMPLE_RATES entry '{item}'")
+        rates[event.strip()] = float(rate)
+    return rates
+
+
+def truncate(text: str, max_chars: int) -> str:
+    """Corta textos longos, indicando quantos caracteres foram omitidos."""
+    if max_chars <= 0 or len(text) <= max_chars:
+        return text
+    return f"{text[:max_chars]}...(+{len(text) - max_chars} chars)"
+
+
+def redact(value: Any, keys: frozenset[str], depth: int = 0) -> Any:
+    """
+    Mascara valores sob chaves sensíveis em dicts e listas aninhados.
+
+    Uma chave é sensível se contém (sem diferenciar maiúsculas) algum dos
+    termos de ``keys``: ``token`` cobre ``taskToken`` e ``api_token``.
+
+    Args:
+        value: Valor a percorrer
+        keys (frozenset): Termos sensíveis, em minúsculas
+        depth (int): Nível atual (a partir de 8 níveis o valor é mantido)
+
+    Returns:
+        Cópia com os valores sensíveis substituídos por ``[REDACTED]``
+    """
+    if depth >= 8:
+        return value
+    if isinstance(value, dict):
+        return {
+            key: (
+                REDACTED
+                if any(term in str(key).lower() for term in keys)
+                else redact(item, keys, depth + 1)
+            )
+            for key, item in value.items()
+        }
+    if isinstance(value, (list, tuple)):
+        return [redact(item, keys, depth + 1) for item in value]
+    return value
+
+
+class LogWriter:
+    """Fila de registros e thread que os formata e escreve em lotes."""
+
+    def __init__(
+        self,
+        stream: TextIO | None = None,
+        fmt: str = "text",
+        queue_size: int = 10000,
+        max_field_chars: int = 512,
+        redact_keys: frozenset[str] = frozenset(),
+    ):
+        """
+        Args:
+            stream (TextIO): Destino (padrão: ``sys.stdout`` do momento da escrita)
+            fmt (str): ``text`` ou ``json``
+            queue_size (int): Registros pendentes antes de descartar novos
+            max_field_chars (int): Tamanho máximo de cada campo formatado
+            redact_keys (frozenset): Termos de chaves sensíveis, em minúsculas
+        """
+        if fmt not in ("text", "json"):
+            raise ValueError(f"Unknown LOG_FORMAT '{fmt}'")
+        self.stream = stream
+        self.fmt = fmt
+        self.max_field_chars = max_field_chars
+        self.redact_keys = redact_keys
+        self.dropped = 0
+        self._queue: queue.Queue = queue.Queue(maxsize=queue_size)
+        self._thread: threading.Thread | None = None
+        self._lock = threading.Lock()
+
+    def submit(self, record: tuple) -> None:
+        """Enfileira um registro sem bloquear (descarta se a fila está cheia)."""
+        if self._thread is None:
+            self._start()
+        try:
+            self._queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def flush(self, timeout: float = 5.0) -> bool:
+        """
+        Aguarda a escrita de tudo o que já foi enfileirado.
+
+        Returns:
+            bool: False se o prazo acabou antes
+        """
+        if self._thread is None:
+            return True
+        done = threading.Event()
+        try:
+            self._queue.put(done, timeout=timeout)
+        except queue.Full:
+            return False
+        return done.wait(timeout)
+
+    def close(self, timeout: float = 5.0) -> None:
+        """Escreve os pendentes e encerra a thread."""
+        if self._thread is None:
+            return
+        try:
+            self._queue.put(None, timeout=timeout)
+        except queue.Full:
+            return
+        self._thread.join(timeout)
+        self._thread = None
+
+    def _start(self) -> None:
+        with self._lock:
+            if self._thread is None:
+                thread = threading.Thread(target=self._run, name="log-writer", daemon=True)
+                thread.start()
+                self._thread = thread
+
+    def _run(self) -> None:
+        next_report = time.monotonic() + _SUPPRESSED_REPORT_SECONDS
+        while True:
+            try:
+                item = self._queue.get(timeout=1.0)
+            except queue.Empty:
+                item = False
+            batch = [] if item is False else [item]
+            while len(batch) < _BATCH_SIZE:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            lines, waiters, stop = [], [], False
+            for entry in batch:
+                if entry is None:
+                    stop = True
+                elif isinstance(entry, threading.Event):
+                    waiters.append(entry)
+                else:
+                    lines.append(self.format(entry))
+            # Resumo dos descartes: periódico e também a cada flush
+            if waiters or stop or time.monotonic() >= next_report:
+                next_report = time.monotonic() + _SUPPRESSED_REPORT_SECONDS
+                lines.extend(self.format(record) for record in self._suppressed_records())
+            if lines:
+                self._write("".join(lines))
+            for waiter in waiters:
+                waiter.set()
+            if stop:
+                return
+
+    def _suppressed_records(self) -> list[tuple]:
+        counts = _take_suppressed()
+        if self.dropped:
+            counts["queue_full"], self.dropped = self.dropped, 0
+        if not counts:
+            return []
+        return [(time.time(), LEVELS["WARNING"], __name__, "log_suppressed", dict(counts))]
+
+    def _write(self, text: str) -> None:
+        stream = self.stream or sys.stdout
+        try:
+            stream.write(text)
+            stream.flush()
+        except Exception:
+            pass  # Destino fechado: logs não derrubam o worker
+
+    def format(self, record: tuple) -> str:
+        """
+        Formata um registro ``(timestamp, nível, logger, evento, campos)``.
+
+        Returns:
+            str: Linha terminada em ``\\n`` no formato ``fmt``
+        """
+        timestamp, level, name, event, fields = record
+        when = datetime.fromtimestamp(timestamp, timezone.utc).isoformat(timespec="milliseconds")
+        values = {key: self._field(key, value) for key, value in fields.items()}
+        level_name = _LEVEL_NAMES.get(level, str(level))
+        if self.fmt == "json":
+            line = {"ts": when, "level": level_name, "logger": name, "event": event, **values}
+            return json.dumps(line, ensure_ascii=False, default=str) + "\n"
+        pairs = " ".join(f"{key}={_text_value(value)}" for key, value in values.items())
+        return f"{when} {level_name:<7} {name} {event}{' ' if pairs else ''}{pairs}\n"
+
+    def _field(self, key: str, value: Any) -> Any:
+        if any(term in key.lower() for term in self.redact_keys):
+            return REDACTED
+        if isinstance(value, BaseException):
+            value = f"{type(value).__name__}: {value}"
+        elif isinstance(value, (dict, list, tuple)):
+            value = json.dumps(redact(value, self.redact_keys), ensure_ascii=False, default=str)
+        elif not isinstance(value, (str, int, float, bool)) and value is not None:
+            value = str(value)
+        if isinstance(value, str):
+            return truncate(value, self.max_field_chars)
+        return value
+
+
+def _text_value(value: Any) -> str:
+    text = str(value)
+    if not text or any(char in text for char in ' "=\n'):
+        return json.dumps(text, ensure_ascii=False)
+    return text
+
+
+# ========== Estado do processo: nível, amostragem e limites por evento ==========
+
+_level = LEVELS.get(Config.LOG_LEVEL, LEVELS["INFO"])
+_sample_rates = parse_sample_rates(Config.LOG_SAMPLE_RATES)
+_rate_per_event = Config.LOG_RATE_PER_EVENT
+_buckets: dict[str, TokenBucket] = {}
+_suppressed: Counter = Counter()
+_suppressed_lock = threading.Lock()
+_writer: LogWriter | None = None
+_writer_lock = threading.Lock()
+_loggers: dict[str, Logger] = {}
+
+
+def _take_suppressed() -> Counter:
+    global _suppressed
+    with _suppressed_lock:
+        counts, _suppressed = _suppressed, Counter()
+    return counts
+
+
+def _suppress(event: str) -> None:
+    with _suppressed_lock:
+        _suppressed[event] += 1
+
+
+def _allow(event: str) -> bool:
+    rate = _sample_rates.get(event)
+    if rate is not None and random.random() >= rate:
+        return False  # Fora da amostra: não conta como suprimido
+    if _rate_per_event <= 0:
+        return True
+    bucket = _buckets.get(event)
+    if bucket is None:
+        bucket = _buckets.setdefault(event, TokenBucket(_rate_per_event))
+    if bucket.try_acquire():
+        _suppress(event)
+        return False
+    return True
+
+
+def get_writer() -> LogWriter:
+    """Writer do processo, criado a partir do Config no primeiro uso."""
+    global _writer
+    if _writer is None:
+        with _writer_lock:
+            if _writer is None:
+                _writer = LogWriter(
+                    fmt=Config.LOG_FORMAT,
+                    queue_size=Config.LOG_QUEUE_SIZE,
+                    max_field_chars=Config.LOG_MAX_FIELD_CHARS,
+                    redact_keys=frozenset(
+                        key.strip().lower()
+                        for key in Config.LOG_REDACT_KEYS.split(",")
+                        if key.strip()
+                    ),
+                )
+    return _writer
+
+
+def configure(
+    level: str | None = None,
+    writer: LogWriter | None = None,
+    sample_rates: dict[str, float] | None = None,
+    rate_per_event: float | None = None,
+) -> None:
+    """
+    Ajusta o logging do processo (ex.: testes).
+
+    Args:
+        level (str): Nível mínimo (DEBUG, INFO, WARNING, ERROR)
+        writer (LogWriter): Substitui o writer (o atual é encerrado)
+        sample_rates (dict): Fração mantida por evento
+        rate_per_event (float): Registros/s por evento (0 = sem limite)
+    """
+    global _level, _writer, _sample_rates, _rate_per_event
+    if level is not None:
+        _level = LEVELS[level.upper()]
+    if sample_rates is not None:
+        _sample_rates = dict(sample_rates)
+    if rate_per_event is not None:
+        _rate_per_event = rate_per_event
+        _buckets.clear()
+    if writer is not None:
+        with _writer_lock:
+            previous, _writer = _writer, writer
+        if previous is not None:
+            previous.close()
+
+
+def flush(timeout: float = 5.0) -> bool:
+    """Aguarda a escrita dos registros já enfileirados (ex.: fim de um Lambda)."""
+    return _writer.flush(timeout) if _writer is not None else True
+
+
+def shutdown() -> None:
+    """Escreve os registros pendentes e encerra a thread de escrita."""
+    if _writer is not None:
+        _writer.close()
+
+
+def _reset_after_fork() -> None:
+    # A thread de escrita não existe no processo filho (ex.: ProcessLane)
+    global _writer, _writer_lock, _suppressed_lock
+    _writer = None
+    _writer_lock = threading.Lock()
+    _suppressed_lock = threading.Lock()
+    _buckets.clear()
+
+
+atexit.register(shutdown)
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+class Logger:
+    """Logger nomeado; os métodos recebem o nome do evento e campos."""
+
+    __slots__ = ("name",)
+
+    def __init__(self, name: str):
+        self.name = name
+
+    def log(self, level: int, event: str, fields: dict[str, Any]) -> None:
+        if level < _level or not _allow(event):
+            return
+        span = current_span()
+        if span is not None and span.context is not None:
+            fields["trace_id"] = f"{span.context.trace_id:032x}"
+        get_writer().submit((time.time(), level, self.name, event, fields))
+
+    def is_enabled_for(self, level: str) -> bool:
+        """Indica se registros do nível seriam escritos (evita montar campos caros)."""
+        return LEVELS[level] >= _level
+
+    def debug(self, event: str, **fields: Any) -> None:
+        self.log(10, event, fields)
+
+    def info(self, event: str, **fields: Any) -> None:
+        self.log(20, event, fields)
+
+    def warning(self, event: str, **fields: Any) -> None:
+        self.log(30, event, fields)
+
+    def error(self, event: str, **fields: Any) -> None:
+        self.log(40, event, fields)
+
+
+def get_logger(name: str) -> Logger:
+    """
+    Logger do módulo ``name`` (um por nome).
+
+    Args:
+        name (str): Nome exibido nos registros (normalmente ``__name__``)
+
+    Returns:
+        Logger: Logger compartilhado
+    """
+    logger = _loggers.get(name)
+    if logger is None:
+        logger = _loggers.setdefault(name, Logger(name))
+    return logger
@@ -3,10 +3,135 @@ Cliente AWS SWF para gerenciamento de domínios e tipos de workflow.
 
 Este módulo fornece uma interface simplificada para interagir com o
 AWS Simple Workflow Service, incluindo registro de domínios e workflows.
+
+Todas as instâncias de ``SWFClient`` do processo compartilham um único
+cliente boto3, criado sob demanda no primeiro uso. O cliente tem pool de
+conexões dimensionado para os pollers, timeout de leitura maior que o long
+poll de 60s e retries no modo ``adaptive``. ``set_client_factory`` permite
+trocar a criação do cliente (ex.: simulador local ou wrappers).
+
+O cliente da factory padrão é instrumentado (``metrics.instrument_client``):
+cada chamada registra latência e erros por operação. Com tracing ativo,
+cada chamada feita dentro de um span abre um span filho
+(``tracing.trace_client``).
 """
 
+import threading
+
 import boto3
+from botocore.config import Config as BotoConfig
+
 from config import Config
+import metrics
+import tracing
+import structured_log
+
+logger = structured_log.get_logger(__name__)
+
+# Cliente compartilhado do processo (recriado se o módulo for recarregado)
+_client = None
+_client_factory = None
+_client_lock = threading.Lock()
+
+
+def max_pool_connections():
+    """
+    Tamanho do pool de conexões HTTP do cliente compartilhado.
+    
+    Sem ``SWF_MAX_POOL_CONNECTIONS`` explícito, soma as threads que podem
+    chamar o SWF ao mesmo tempo: pollers de atividade e de decisão,
+    respostas, heartbeats e chamadas assíncronas.
+    
+    Returns:
+        int: Conexões simultâneas permitidas
+    """
+    if Config.SWF_MAX_POOL_CONNECTIONS > 0:
+        return Config.SWF_MAX_POOL_CONNECTIONS
+    concurrent_calls = (
+        Config.ACTIVITY_POLLERS
+        + Config.DECISION_POLLERS
+        + Config.ACTIVITY_MAX_IN_FLIGHT
+        + Config.HEARTBEAT_SENDER_THREADS
+        + Config.ASYNC_RESPOND_THREADS
+    )
+    return max(10, concurrent_calls)
+
+
+def client_config():
+    """
+    Configuração do botocore para o cliente SWF.
+    
+    Returns:
+        botocore.config.Config: Pool, timeouts e política de retry
+    """
+    return BotoConfig(
+        max_pool_connections=max_pool_connections(),
+        read_timeout=Config.SWF_READ_TIMEOUT,
+        connect_timeout=Config.SWF_CONNECT_TIMEOUT,
+        retries={'mode': Config.SWF_RETRY_MODE, 'max_attempts': Config.SWF_MAX_ATTEMPTS},
+        tcp_keepalive=True
+    )
+
+
+def create_client():
+    """
+    Factory padrão: cliente boto3 do SWF com as credenciais do Config.
+    
+    Returns:
+        botocore.client.SWF: Novo cliente, com métricas por chamada se
+            ``METRICS_ENABLED`` (ver metrics.InstrumentedClient) e spans por
+            chamada se houver tracer ativo (ver tracing.TracedClient)
+    """
+    client = boto3.client(
+        'swf',
+        aws_access_key_id=Config.AWS_ACCESS_KEY_ID,
+        aws_secret_access_key=Config.AWS_SECRET_ACCESS_KEY,
+        region_name=Config.AWS_REGION,
+        config=client_config()
+    )
+    return metrics.instrument_client(tracing.trace_client(client))
+
+
+def get_client():
+    """
+    Retorna o cliente compartilhado, criando-o no primeiro uso.
+    
+    Clientes do botocore são thread-safe: pollers, heartbeats e respostas
+    usam o mesmo cliente e o mesmo pool de conexões.
+    
+    Returns:
+        botocore.client.SWF: Cliente compartilhado
+    """
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = (_client_factory or create_client)()
+    return _client
+
+
+def set_client_factory(factory):
+    """
+    Substitui a factory do cliente compartilhado e descarta o atual.
+    
+    Args:
+        factory (callable): Função sem argumentos que retorna um cliente
+            compatível com o do SWF; None restaura ``create_client``.
+            Para medir as chamadas, a factory pode devolver
+            ``metrics.instrument_client(cliente)``
+    """
+    global _client_factory
+    with _client_lock:
+        _client_factory = factory
+    reset_client()
+
+
+def reset_client():
+    """Descarta o cliente compartilhado; o próximo uso cria outro."""
+    global _client
+    with _client_lock:
+        _client = None
+
 
 class SWFClient:
     """
@@ -18,23 +143,29 @@ class SWFClient:
     
     def __init__(self):
         """
-        Inicializa o cliente SWF com credenciais da configuração.
+        Inicializa o cliente SWF com a configuração do Config.
         
-        Cria uma instância do cliente boto3 configurado com as
-        credenciais AWS e região especificadas no Config.
+        O cliente boto3 não é criado aqui: ``client`` devolve o cliente
+        compartilhado do processo, criado no primeiro uso.
         """
-        # Inicializa o cliente boto3 para SWF
-        self.client = boto3.client(
-            'swf',
-            aws_access_key_id=Config.AWS_ACCESS_KEY_ID,
-            aws_secret_access_key=Config.AWS_SECRET_ACCESS_KEY,
-            region_name=Config.AWS_REGION
-        )
+        # Cliente próprio desta instância (None = usa o compartilhado)
+        self._client = None
         
         # Armazena configurações frequentemente usadas
         self.domain = Config.SWF_DOMAIN
         self.task_list = Config.SWF_TASK_LIST
     
+    @property
+    def client(self):
+        """Cliente boto3 do SWF (o compartilhado, salvo se substituído)."""
+        if self._client is not None:
+            return self._client
+        return get_client()
+    
+    @client.setter
+    def client(self, value):
+        self._client = value
+    
     def register_domain(self):
         """
         Registra o domínio SWF se ainda não existir.
@@ -52,10 +183,10 @@ class SWFClient:
                 workflowExecutionRetentionPeriodInDays='30',  # Histórico mantido por 30 dias
                 description='Domain for business process workflows'
             )
-            print(f"Domain '{self.domain}' registered successfully")
+            logger.info('domain_registered', domain=self.domain)
         except self.client.exceptions.DomainAlreadyExistsException:
             # Domínio já existe, não é um erro
-            print(f"Domain '{self.domain}' already exists")
+            logger.info('domain_exists', domain=self.domain)
     
     def register_workflow_type(self):
         """
@@ -79,7 +210,9 @@ class SWFClient:
                 defaultChildPolicy='TERMINATE',  # Termina workflows filhos se o pai terminar
                 description='Bidirectional business process workflow with reprocessing capabilities'
             )
-            print(f"Workflow type '{Config.WORKFLOW_NAME}' registered successfully")
+            logger.info('workflow_type_registered', workflow_type=Config.WORKFLOW_NAME,
+                        version=Config.WORKFLOW_VERSION)
         except self.client.exceptions.TypeAlreadyExistsException:
             # Tipo de workflow já existe, não é um erro
-            print(f"Workflow type '{Config.WORKFLOW_NAME}' already exists")
+            logger.info('workflow_type_exists', workflow_type=Config.WORKFLOW_NAME,
+                        version=Config.WORKFLOW_VERSION)
@@ -0,0 +1,1142 @@
+"""
+Simulador do SWF em memória para testes de ponta a ponta e de carga.
+
+``SimulatedSWF`` implementa, no próprio processo, os métodos do cliente
+boto3 do SWF usados pelo projeto: início, poll e resposta de decision e
+activity tasks, histórico paginado, sinais, marcadores, timers, timeouts,
+heartbeats, contagem de tarefas pendentes, encerramento de execuções e
+listagem e contagem de execuções abertas e encerradas (visibilidade).
+Workers reais rodam contra ele sem AWS e sem rede::
+
+    import swf_simulator
+
+    simulator = swf_simulator.install()  # swf_client.set_client_factory
+    # ... ActivityWorker / DecisionWorker / WorkflowStarter normais ...
+    swf_simulator.uninstall()
+
+Diferenças em relação ao SWF:
+
+- Domínios e tipos não registrados são aceitos (o registro só detecta
+  duplicatas, como no SWF, para ``setup.py`` e ``register_activities``)
+- Timeouts são verificados a cada chamada da API e durante os long polls;
+  ``clock`` pode ser substituído para testes determinísticos
+- Decisões não suportadas geram ``ValueError`` em vez de eventos ``*Failed``
+
+Todas as operações são O(1) (ou proporcionais ao tamanho da página de
+histórico) sob um único lock, exceto as de visibilidade, que percorrem as
+execuções retidas; as filas são ``deque`` por task list.
+"""
+
+from __future__ import annotations
+
+import heapq
+import itertools
+import json
+import threading
+import time
+import uuid
+from collections import Counter, deque
+from datetime import datetime, timezone
+from typing import Any, Callable
+
+from botocore.exceptions import ClientError
+
+import swf_client
+
+# Tamanho padrão (e máximo) de página de histórico do SWF
+MAX_PAGE_SIZE = 1000
+
+
+class SimulatedFault(ClientError):
+    """Erro da API simulada, compatível com ``ClientError`` do botocore."""
+
+    code = "SimulatedFault"
+
+    def __init__(self, message: str, operation_name: str = "SimulatedSWF"):
+        super().__init__({"Error": {"Code": self.code, "Message": message}}, operation_name)
+
+
+def _fault(name: str) -> type[SimulatedFault]:
+    return type(name, (SimulatedFault,), {"code": name})
+
+
+class SimulatorExceptions:
+    """Equivalente a ``client.exceptions`` do boto3."""
+
+    ClientError = ClientError
+    DomainAlreadyExistsException = _fault("DomainAlreadyExistsFault")
+    TypeAlreadyExistsException = _fault("TypeAlreadyExistsFault")
+    UnknownResourceFault = _fault("UnknownResourceFault")
+    WorkflowExecutionAlreadyStartedFault = _fault("WorkflowExecutionAlreadyStartedFault")
+    OperationNotPermittedFault = _fault("OperationNotPermittedFault")
+    ValidationException = _fault("ValidationException")
+
+
+def _datetime(value: Any) -> datetime:
+    """Converte uma data da API (datetime ou segundos desde a época) em datetime UTC."""
+    if isinstance(value, datetime):
+        return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+    return datetime.fromtimestamp(float(value), timezone.utc)
+
+
+def _seconds(value: Any) -> float | None:
+    """Converte um timeout do SWF (string em segundos ou 'NONE') em float."""
+    if value is None or value == "NONE":
+        return None
+    return float(value)
+
+
+class _Execution:
+    """Estado de uma execução: eventos, decision task e atividades em aberto."""
+
+    __slots__ = (
+        "domain",
+        "workflow_id",
+        "run_id",
+        "workflow_type",
+        "task_list",
+        "task_start_to_close",
+        "events",
+        "open",
+        "close_status",
+        "decision_scheduled_id",
+        "decision_started_id",
+        "decision_token",
+        "decision_pending",
+        "previous_started_id",
+        "activities",
+        "activity_ids",
+        "timers",
+    )
+
+    def __init__(self, domain, workflow_id, run_id, workflow_type, task_list, task_start_to_close):
+        self.domain = domain
+        self.workflow_id = workflow_id
+        self.run_id = run_id
+        self.workflow_type = workflow_type
+        self.task_list = task_list
+        self.task_start_to_close = task_start_to_close
+        self.events: list[dict] = []
+        self.open = True
+        self.close_status: str | None = None
+        self.decision_scheduled_id = 0  # DecisionTaskScheduled ainda não iniciada
+        self.decision_started_id = 0  # DecisionTaskStarted em andamento
+        self.decision_token: str | None = None
+        self.decision_pending = False  # Eventos novos durante a decisão em andamento
+        self.previous_started_id = 0
+        self.activities: dict[int, _ActivityTask] = {}  # scheduledEventId -> tarefa
+        self.activity_ids: dict[str, int] = {}  # activityId -> scheduledEventId
+        self.timers: dict[str, int] = {}  # timerId -> TimerStarted eventId
+
+    @property
+    def execution(self) -> dict[str, str]:
+        return {"workflowId": self.workflow_id, "runId": self.run_id}
+
+
+class _ActivityTask:
+    """Atividade agendada (na fila ou em execução)."""
+
+    __slots__ = (
+        "execution",
+        "scheduled_id",
+        "started_id",
+        "activity_id",
+        "activity_type",
+        "input",
+        "task_list",
+        "timeouts",
+        "token",
+        "cancel_requested",
+        "heartbeat_details",
+        "heartbeat_deadline",
+    )
+
+    def __init__(
+        self, execution, scheduled_id, activity_id, activity_type, input, task_list, timeouts
+    ):
+        self.execution = execution
+        self.scheduled_id = scheduled_id
+        self.started_id = 0
+        self.activity_id = activity_id
+        self.activity_type = activity_type
+        self.input = input
+        self.task_list = task_list
+        self.timeouts = timeouts  # tipo -> segundos (None = sem limite)
+        self.token: str | None = None
+        self.cancel_requested = False
+        self.heartbeat_details: str | None = None
+        self.heartbeat_deadline: float | None = None
+
+    @property
+    def alive(self) -> bool:
+        return self.execution.open and self.execution.activities.get(self.scheduled_id) is self
+
+
+class SimulatedSWF:
+    """
+    Backend SWF em memória com a interface do cliente boto3.
+
+    Seguro para uso por várias threads: pollers bloqueiam em condições por
+    task list até haver tarefa, um timeout vencer ou ``poll_timeout``
+    terminar (equivalente ao long poll de 60s do SWF).
+    """
+
+    exceptions = SimulatorExceptions
+
+    def __init__(
+        self,
+        poll_timeout: float = 60.0,
+        clock: Callable[[], float] = time.monotonic,
+        retain_closed: int | None = None,
+    ):
+        """
+        Args:
+            poll_timeout (float): Duração máxima de um poll sem tarefas
+            clock (callable): Relógio monotônico usado nos timeouts
+            retain_closed (int): Execuções encerradas mantidas para consulta
+                de histórico (None = todas; as mais antigas são descartadas)
+        """
+        self.poll_timeout = poll_timeout
+        self.clock = clock
+        self.retain_closed = retain_closed
+
+        self._lock = threading.Lock()
+        self._conditions: dict[tuple[str, str, str], threading.Condition] = {}
+        self._queues: dict[tuple[str, str, str], deque] = {}
+
+        self.domains: dict[str, dict] = {}
+        self.workflow_types: dict[tuple[str, str, str], dict] = {}
+        self.activity_types: dict[tuple[str, str, str], dict] = {}
+
+        self._executions: dict[tuple[str, str, str], _Execution] = {}  # (domínio, wf, run)
+        self._open_runs: dict[tuple[str, str], str] = {}  # (domínio, workflowId) -> runId
+        self._closed: deque = deque()
+        self._decision_tokens: dict[str, tuple[str, _Execution]] = {}
+        self._activity_tokens: dict[str, _ActivityTask] = {}
+
+        # Timeouts pendentes: (prazo, sequência, callback, argumentos)
+        self._deadlines: list = []
+        self._sequence = itertools.count()
+        self._tokens = itertools.count(1)
+
+        # Contadores para relatórios de carga
+        self.calls: Counter = Counter()
+        self.close_status_counts: Counter = Counter()
+
+    # ------------------------------------------------------------------ registro
+
+    def register_domain(self, name, workflowExecutionRetentionPeriodInDays="30", **kwargs):
+        with self._lock:
+            if name in self.domains:
+                raise self.exceptions.DomainAlreadyExistsException(
+                    f"Domain '{name}' already exists", "RegisterDomain"
+                )
+            self.domains[name] = {"retention": workflowExecutionRetentionPeriodInDays, **kwargs}
+        return {}
+
+    def register_workflow_type(self, domain, name, version, **kwargs):
+        return self._register(self.workflow_types, domain, name, version, kwargs)
+
+    def register_activity_type(self, domain, name, version, **kwargs):
+        return self._register(self.activity_types, domain, name, version, kwargs)
+
+    def _register(self, registry, domain, name, version, attributes):
+        with self._lock:
+            if (domain, name, version) in registry:
+                raise self.exceptions.TypeAlreadyExistsException(
+                    f"Type '{name}' version '{version}' already exists", "RegisterType"
+                )
+            registry[(domain, name, version)] = attributes
+        return {}
+
+    # ------------------------------------------------------------------ execuções
+
+    def start_workflow_execution(
+        self,
+        domain,
+        workflowId,
+        workflowType,
+        taskList=None,
+        input=None,
+        executionStartToCloseTimeout=None,
+        taskStartToCloseTimeout=None,
+        childPolicy=None,
+        tagList=None,
+        **kwargs,
+    ):
+        with self._lock:
+            self.calls["StartWorkflowExecution"] += 1
+            self._fire_due()
+            if (domain, workflowId) in self._open_runs:
+                raise self.exceptions.WorkflowExecutionAlreadyStartedFault(
+                    f"Workflow '{workflowId}' is already running", "StartWorkflowExecution"
+                )
+            defaults = self.workflow_types.get(
+                (domain, workflowType["name"], workflowType["version"]), {}
+            )
+            task_list = (taskList or defaults.get("defaultTaskList") or {"name": ""})["name"]
+            execution_timeout = executionStartToCloseTimeout or defaults.get(
+                "defaultExecutionStartToCloseTimeout"
+            )
+            task_timeout = taskStartToCloseTimeout or defaults.get("defaultTaskStartToCloseTimeout")
+            run_id = uuid.uuid4().hex
+            execution = _Execution(
+                domain, workflowId, run_id, dict(workflowType), task_list, _seconds(task_timeout)
+            )
+            self._executions[(domain, workflowId, run_id)] = execution
+            self._open_runs[(domain, workflowId)] = run_id
+
+            self._add_event(
+                execution,
+                "WorkflowExecutionStarted",
+                input=input,
+                workflowType=dict(workflowType),
+                taskList={"name": task_list},
+                executionStartToCloseTimeout=execution_timeout or "NONE",
+                taskStartToCloseTimeout=task_timeout or "NONE",
+                childPolicy=childPolicy or defaults.get("defaultChildPolicy", "TERMINATE"),
+                tagList=list(tagList or []),
+            )
+            seconds = _seconds(execution_timeout)
+            if seconds is not None:
+                self._schedule_deadline(seconds, self._execution_timed_out, domain, execution)
+            self._request_decision(domain, execution)
+        return {"runId": run_id}
+
+    def signal_workflow_execution(
+        self, domain, workflowId, signalName, runId=None, input=None, **kwargs
+    ):
+        with self._lock:
+            self.calls["SignalWorkflowExecution"] += 1
+            self._fire_due()
+            execution = self._open_execution(domain, workflowId, runId, "SignalWorkflowExecution")
+            self._add_event(
+                execution, "WorkflowExecutionSignaled", signalName=signalName, input=input
+            )
+            self._request_decision(domain, execution)
+        return {}
+
+    def terminate_workflow_execution(
+        self, domain, workflowId, runId=None, reason=None, details=None, **kwargs
+    ):
+        with self._lock:
+            self.calls["TerminateWorkflowExecution"] += 1
+            self._fire_due()
+            execution = self._open_execution(
+                domain, workflowId, runId, "TerminateWorkflowExecution"
+            )
+            self._close(
+                domain,
+                execution,
+                "TERMINATED",
+                "WorkflowExecutionTerminated",
+                reason=reason,
+                details=details,
+                childPolicy="TERMINATE",
+            )
+        return {}
+
+    def get_workflow_execution_history(
+        self,
+        domain,
+        execution,
+        maximumPageSize=MAX_PAGE_SIZE,
+        nextPageToken=None,
+        reverseOrder=False,
+        **kwargs,
+    ):
+        with self._lock:
+            self.calls["GetWorkflowExecutionHistory"] += 1
+            if nextPageToken:
+                return self._next_page(nextPageToken)
+            key = (domain, execution["workflowId"], execution["runId"])
+            run = self._executions.get(key)
+            if run is None:
+                raise self.exceptions.UnknownResourceFault(
+                    f"Unknown execution: {execution}", "GetWorkflowExecutionHistory"
+                )
+            return self._page(run, len(run.events), 0, maximumPageSize, reverseOrder)
+
+    # ------------------------------------------------------------------ visibilidade
+
+    def list_open_workflow_executions(
+        self,
+        domain,
+        startTimeFilter,
+        typeFilter=None,
+        tagFilter=None,
+        executionFilter=None,
+        nextPageToken=None,
+        maximumPageSize=MAX_PAGE_SIZE,
+        reverseOrder=False,
+        **kwargs,
+    ):
+        with self._lock:
+            self.calls["ListOpenWorkflowExecutions"] += 1
+            self._fire_due()
+            infos = self._visible(
+                "ListOpenWorkflowExecutions",
+                domain,
+                True,
+                startTimeFilter,
+                None,
+                typeFilter=typeFilter,
+                tagFilter=tagFilter,
+                executionFilter=executionFilter,
+            )
+            return self._visibility_page(infos, nextPageToken, maximumPageSize, reverseOrder)
+
+    def list_closed_workflow_executions(
+        self,
+        domain,
+        startTimeFilter=None,
+        closeTimeFilter=None,
+        executionFilter=None,
+        closeStatusFilter=None,
+        typeFilter=None,
+        tagFilter=None,
+        nextPageToken=None,
+        maximumPageSize=MAX_PAGE_SIZE,
+        reverseOrder=False,
+        **kwargs,
+    ):
+        with self._lock:
+            self.calls["ListClosedWorkflowExecutions"] += 1
+            self._fire_due()
+            infos = self._visible(
+                "ListClosedWorkflowExecutions",
+                domain,
+                False,
+                startTimeFilter,
+                closeTimeFilter,
+                typeFilter=typeFilter,
+                tagFilter=tagFilter,
+                executionFilter=executionFilter,
+                closeStatusFilter=closeStatusFilter,
+            )
+            return self._visibility_page(infos, nextPageToken, maximumPageSize, reverseOrder)
+
+    def count_open_workflow_executions(
+        self, domain, startTimeFilter, typeFilter=None, tagFilter=None, executionFilter=None
+    ):
+        with self._lock:
+            self.calls["CountOpenWorkflowExecutions"] += 1
+            self._fire_due()
+            infos = self._visible(
+                "CountOpenWorkflowExecutions",
+                domain,
+                True,
+                startTimeFilter,
+                None,
+                typeFilter=typeFilter,
+                tagFilter=tagFilter,
+                executionFilter=executionFilter,
+            )
+            return {"count": len(infos), "truncated": False}
+
+    def count_closed_workflow_executions(
+        self,
+        domain,
+        startTimeFilter=None,
+        closeTimeFilter=None,
+        executionFilter=None,
+        typeFilter=None,
+        tagFilter=None,
+        closeStatusFilter=None,
+    ):
+        with self._lock:
+            self.calls["CountClosedWorkflowExecutions"] += 1
+            self._fire_due()
+            infos = self._visible(
+                "CountClosedWorkflowExecutions",
+                domain,
+                False,
+                startTimeFilter,
+                closeTimeFilter,
+                typeFilter=typeFilter,
+                tagFilter=tagFilter,
+                executionFilter=executionFilter,
+                closeStatusFilter=closeStatusFilter,
+            )
+            return {"count": len(infos), "truncated": False}
+
+    def execution_status(self, domain: str, workflow_id: str, run_id: str) -> str | None:
+        """Status de encerramento ('COMPLETED', 'FAILED', ...) ou None se aberta."""
+        with self._lock:
+            execution = self._executions.get((domain, workflow_id, run_id))
+            if execution is None:
+                raise self.exceptions.UnknownResourceFault(f"Unknown run '{run_id}'")
+            return execution.close_status
+
+    def open_execution_count(self) -> int:
+        """Número de execuções em aberto (todos os domínios)."""
+        with self._lock:
+            return len(self._open_runs)
+
+    # ------------------------------------------------------------------ decision tasks
+
+    def poll_for_decision_task(
+        self,
+        domain,
+        taskList,
+        identity=None,
+        maximumPageSize=MAX_PAGE_SIZE,
+        reverseOrder=False,
+        nextPageToken=None,
+        **kwargs,
+    ):
+        if nextPageToken:
+            with self._lock:
+                self.calls["PollForDecisionTask"] += 1
+                return self._next_page(nextPageToken)
+
+        def start(execution):
+            token = self._new_token("d")
+            started_id = self._add_event(
+                execution,
+                "DecisionTaskStarted",
+                scheduledEventId=execution.decision_scheduled_id,
+                identity=identity,
+            )
+            execution.decision_scheduled_id = 0
+            execution.decision_started_id = started_id
+            execution.decision_token = token
+            self._decision_tokens[token] = (domain, execution)
+            if execution.task_start_to_close is not None:
+                self._schedule_deadline(
+                    execution.task_start_to_close,
+                    self._decision_timed_out,
+                    domain,
+                    execution,
+                    token,
+                )
+            response = self._page(
+                execution, len(execution.events), 0, maximumPageSize, reverseOrder
+            )
+            response.update(
+                taskToken=token,
+                startedEventId=started_id,
+                previousStartedEventId=execution.previous_started_id,
+                workflowExecution=execution.execution,
+                workflowType=dict(execution.workflow_type),
+            )
+            return response
+
+        def valid(execution):
+            return execution.open and execution.decision_scheduled_id
+
+        return self._poll(
+            "PollForDecisionTask",
+            ("decision", domain, taskList["name"]),
+            valid,
+            start,
+            {"startedEventId": 0, "previousStartedEventId": 0, "events": []},
+        )
+
+    def respond_decision_task_completed(self, taskToken, decisions=None, executionContext=None):
+        with self._lock:
+            self.calls["RespondDecisionTaskCompleted"] += 1
+            self._fire_due()
+            domain, execution = self._take_decision_token(taskToken)
+            completed_id = self._add_event(
+                execution,
+                "DecisionTaskCompleted",
+                scheduledEventId=execution.decision_started_id - 1,
+                startedEventId=execution.decision_started_id,
+                executionContext=executionContext,
+            )
+            execution.previous_started_id = execution.decision_started_id
+            execution.decision_started_id = 0
+            for decision in decisions or []:
+                if not execution.open:
+                    break
+                self._apply_decision(domain, execution, decision, completed_id)
+            if execution.open and execution.decision_pending:
+                execution.decision_pending = False
+                self._request_decision(domain, execution)
+        return {}
+
+    def count_pending_decision_tasks(self, domain, taskList):
+        return self._count("decision", domain, taskList["name"])
+
+    def _apply_decision(self, domain, execution, decision, completed_id):
+        kind = decision["decisionType"]
+        attrs = decision.get(kind[0].lower() + kind[1:] + "DecisionAttributes", {})
+        if kind == "ScheduleActivityTask":
+            self._schedule_activity(domain, execution, attrs, completed_id)
+        elif kind == "RecordMarker":
+            self._add_event(
+                execution,
+                "MarkerRecorded",
+                markerName=attrs["markerName"],
+                details=attrs.get("details"),
+                decisionTaskCompletedEventId=completed_id,
+            )
+        elif kind == "StartTimer":
+            self._start_timer(domain, execution, attrs, completed_id)
+        elif kind == "CancelTimer":
+            started_id = execution.timers.pop(attrs["timerId"], None)
+            if started_id is not None:
+                self._add_event(
+                    execution,
+                    "TimerCanceled",
+                    timerId=attrs["timerId"],
+                    startedEventId=started_id,
+                    decisionTaskCompletedEventId=completed_id,
+                )
+        elif kind == "RequestCancelActivityTask":
+            scheduled_id = execution.activity_ids.get(attrs["activityId"])
+            if scheduled_id is not None:
+                execution.activities[scheduled_id].cancel_requested = True
+                self._add_event(
+                    execution,
+                    "ActivityTaskCancelRequested",
+                    activityId=attrs["activityId"],
+                    decisionTaskCompletedEventId=completed_id,
+                )
+        elif kind == "CompleteWorkflowExecution":
+            self._close(
+                domain,
+                execution,
+                "COMPLETED",
+                "WorkflowExecutionCompleted",
+                result=attrs.get("result"),
+                decisionTaskCompletedEventId=completed_id,
+            )
+        elif kind == "FailWorkflowExecution":
+            self._close(
+                domain,
+                execution,
+                "FAILED",
+                "WorkflowExecutionFailed",
+                reason=attrs.get("reason"),
+                details=attrs.get("details"),
+                decisionTaskCompletedEventId=completed_id,
+            )
+        elif kind == "CancelWorkflowExecution":
+            self._close(
+                domain,
+                execution,
+                "CANCELED",
+                "WorkflowExecutionCanceled",
+                details=attrs.get("details"),
+                decisionTaskCompletedEventId=completed_id,
+            )
+        else:
+            raise ValueError(f"Decision type '{kind}' is not supported by the simulator")
+
+    # ------------------------------------------------------------------ activity tasks
+
+    def poll_for_activity_task(self, domain, taskList, identity=None, **kwargs):
+        def start(task):
+            token = self._new_token("a")
+            execution = task.execution
+            task.started_id = self._add_event(
+                execution,
+                "ActivityTaskStarted",
+                scheduledEventId=task.scheduled_id,
+                identity=identity,
+            )
+            task.token = token
+            self._activity_tokens[token] = task
+            self._arm_activity_timeouts(domain, task, started=True)
+            return {
+                "taskToken": token,
+                "activityId": task.activity_id,
+                "startedEventId": task.started_id,
+                "workflowExecution": execution.execution,
+                "activityType": dict(task.activity_type),
+                "input": task.input,
+            }
+
+        def valid(task):
+            return task.alive and task.token is None
+
+        return self._poll(
+            "PollForActivityTask",
+            ("activity", domain, taskList["name"]),
+            valid,
+            start,
+            {"startedEventId": 0},
+        )
+
+    def respond_activity_task_completed(self, taskToken, result=None):
+        return self._close_activity(
+            "RespondActivityTaskCompleted", taskToken, "ActivityTaskCompleted", result=result
+        )
+
+    def respond_activity_task_failed(self, taskToken, reason=None, details=None):
+        return self._close_activity(
+            "RespondActivityTaskFailed",
+            taskToken,
+            "ActivityTaskFailed",
+            reason=reason,
+            details=details,
+        )
+
+    def respond_activity_task_canceled(self, taskToken, details=None):
+        return self._close_activity(
+            "RespondActivityTaskCanceled", taskToken, "ActivityTaskCanceled", details=details
+        )
+
+    def record_activity_task_heartbeat(self, taskToken, details=None):
+        with self._lock:
+            self.calls["RecordActivityTaskHeartbeat"] += 1
+            self._fire_due()
+            task = self._activity_task(taskToken, "RecordActivityTaskHeartbeat")
+            task.heartbeat_details = details
+            heartbeat = task.timeouts.get("HEARTBEAT")
+            if heartbeat is not None:
+                task.heartbeat_deadline = self.clock() + heartbeat
+            return {"cancelRequested": task.cancel_requested}
+
+    def count_pending_activity_tasks(self, domain, taskList):
+        return self._count("activity", domain, taskList["name"])
+
+    def _schedule_activity(self, domain, execution, attrs, completed_id):
+        activity_type = attrs["activityType"]
+        activity_id = attrs["activityId"]
+        defaults = self.activity_types.get(
+            (domain, activity_type["name"], activity_type["version"]), {}
+        )
+        if activity_id in execution.activity_ids:
+            self._add_event(
+                execution,
+                "ScheduleActivityTaskFailed",
+                activityType=dict(activity_type),
+                activityId=activity_id,
+                cause="ACTIVITY_ID_ALREADY_IN_USE",
+                decisionTaskCompletedEventId=completed_id,
+            )
+            self._request_decision(domain, execution)
+            return
+
+        def timeout(name):
+            value = attrs.get(name)
+            if value is None:
+                value = defaults.get("defaultTask" + name[0].upper() + name[1:])
+            return value
+
+        task_list = attrs.get("taskList") or defaults.get("defaultTaskList") or {}
+        task_list = task_list.get("name") or execution.task_list
+        raw = {
+            "scheduleToCloseTimeout": timeout("scheduleToCloseTimeout"),
+            "scheduleToStartTimeout": timeout("scheduleToStartTimeout"),
+            "startToCloseTimeout": timeout("startToCloseTimeout"),
+            "heartbeatTimeout": timeout("heartbeatTimeout"),
+        }
+        scheduled_id = self._add_event(
+            execution,
+            "ActivityTaskScheduled",
+            activityType=dict(activity_type),
+            activityId=activity_id,
+            input=attrs.get("input"),
+            control=attrs.get("control"),
+            taskList={"name": task_list},
+            decisionTaskCompletedEventId=completed_id,
+            **{name: value or "NONE" for name, value in raw.items()},
+        )
+        task = _ActivityTask(
+            execution,
+            scheduled_id,
+            activity_id,
+            dict(activity_type),
+            attrs.get("input"),
+            task_list,
+            {
+                "SCHEDULE_TO_CLOSE": _seconds(raw["scheduleToCloseTimeout"]),
+                "SCHEDULE_TO_START": _seconds(raw["scheduleToStartTimeout"]),
+                "START_TO_CLOSE": _seconds(raw["startToCloseTimeout"]),
+                "HEARTBEAT": _seconds(raw["heartbeatTimeout"]),
+            },
+        )
+        execution.activities[scheduled_id] = task
+        execution.activity_ids[activity_id] = scheduled_id
+        self._arm_activity_timeouts(domain, task, started=False)
+        self._enqueue(("activity", domain, task_list), task)
+
+    def _arm_activity_timeouts(self, domain, task, started):
+        timeouts = task.timeouts
+        if not started:
+            for kind in ("SCHEDULE_TO_CLOSE", "SCHEDULE_TO_START"):
+                if timeouts[kind] is not None:
+                    started_id = None if kind == "SCHEDULE_TO_CLOSE" else 0
+                    self._schedule_deadline(
+                        timeouts[kind], self._activity_timed_out, domain, task, kind, started_id
+                    )
+            return
+        if timeouts["START_TO_CLOSE"] is not None:
+            self._schedule_deadline(
+                timeouts["START_TO_CLOSE"],
+                self._activity_timed_out,
+                domain,
+                task,
+                "START_TO_CLOSE",
+                task.started_id,
+            )
+        if timeouts["HEARTBEAT"] is not None:
+            task.heartbeat_deadline = self.clock() + timeouts["HEARTBEAT"]
+            self._schedule_deadline(
+                timeouts["HEARTBEAT"], self._heartbeat_check, domain, task, task.started_id
+            )
+
+    def _close_activity(self, operation, token, event_type, **attributes):
+        with self._lock:
+            self.calls[operation] += 1
+            self._fire_due()
+            task = self._activity_task(token, operation)
+            domain = task.execution.domain
+            self._finish_activity(task)
+            self._add_event(
+                task.execution,
+                event_type,
+                scheduledEventId=task.scheduled_id,
+                startedEventId=task.started_id,
+                **attributes,
+            )
+            self._request_decision(domain, task.execution)
+        return {}
+
+    def _finish_activity(self, task):
+        execution = task.execution
+        execution.activities.pop(task.scheduled_id, None)
+        execution.activity_ids.pop(task.activity_id, None)
+        if task.token is not None:
+            self._activity_tokens.pop(task.token, None)
+
+    def _activity_task(self, token, operation):
+        task = self._activity_tokens.get(token)
+        if task is None or not task.alive:
+            raise self.exceptions.UnknownResourceFault(
+                "Unknown activity task token (closed or timed out)", operation
+            )
+        return task
+
+    # ------------------------------------------------------------------ timers e timeouts
+
+    def _start_timer(self, domain, execution, attrs, completed_id):
+        timer_id = attrs["timerId"]
+        started_id = self._add_event(
+            execution,
+            "TimerStarted",
+            timerId=timer_id,
+            startToFireTimeout=attrs["startToFireTimeout"],
+            control=attrs.get("control"),
+            decisionTaskCompletedEventId=completed_id,
+        )
+        execution.timers[timer_id] = started_id
+        self._schedule_deadline(
+            float(attrs["startToFireTimeout"]),
+            self._timer_fired,
+            domain,
+            execution,
+            timer_id,
+            started_id,
+        )
+
+    def _timer_fired(self, domain, execution, timer_id, started_id):
+        if not execution.open or execution.timers.get(timer_id) != started_id:
+            return  # Cancelado ou execução encerrada
+        del execution.timers[timer_id]
+        self._add_event(execution, "TimerFired", timerId=timer_id, startedEventId=started_id)
+        self._request_decision(domain, execution)
+
+    def _activity_timed_out(self, domain, task, kind, started_id):
+        if not task.alive or (started_id is not None and task.started_id != started_id):
+            return  # Encerrada, ou o prazo era de antes do início
+        self._finish_activity(task)
+        self._add_event(
+            task.execution,
+            "ActivityTaskTimedOut",
+            timeoutType=kind,
+            scheduledEventId=task.scheduled_id,
+            startedEventId=task.started_id,
+            details=task.heartbeat_details,
+        )
+        self._request_decision(domain, task.execution)
+
+    def _heartbeat_check(self, domain, task, started_id):
+        if not task.alive or task.started_id != started_id:
+            return
+        remaining = task.heartbeat_deadline - self.clock()
+        if remaining > 0:
+            # Heartbeat recebido: verifica de novo no novo prazo
+            self._schedule_deadline(remaining, self._heartbeat_check, domain, task, started_id)
+            return
+        self._activity_timed_out(domain, task, "HEARTBEAT", started_id)
+
+    def _decision_timed_out(self, domain, execution, token):
+        if not execution.open or execution.decision_token != token:
+            return
+        self._decision_tokens.pop(token, None)
+        self._add_event(
+            execution,
+            "DecisionTaskTimedOut",
+            timeoutType="START_TO_CLOSE",
+            scheduledEventId=execution.decision_started_id - 1,
+            startedEventId=execution.decision_started_id,
+        )
+        execution.decision_started_id = 0
+        execution.decision_token = None
+        execution.decision_pending = False
+        self._request_decision(domain, execution)
+
+    def _execution_timed_out(self, domain, execution):
+        if execution.open:
+            self._close(
+                domain,
+                execution,
+                "TIMED_OUT",
+                "WorkflowExecutionTimedOut",
+                timeoutType="START_TO_CLOSE",
+                childPolicy="TERMINATE",
+            )
+
+    def _schedule_deadline(self, seconds, callback, *args):
+        heapq.heappush(
+            self._deadlines, (self.clock() + seconds, next(self._sequence), callback, args)
+        )
+
+    def _fire_due(self):
+        """Dispara os timeouts vencidos (chamado com o lock adquirido)."""
+        deadlines = self._deadlines
+        if not deadlines:
+            return
+        now = self.clock()
+        while deadlines and deadlines[0][0] <= now:
+            _, _, callback, args = heapq.heappop(deadlines)
+            callback(*args)
+
+    def advance(self) -> None:
+        """Processa timeouts vencidos sem outra chamada da API (útil com relógio falso)."""
+        with self._lock:
+            self._fire_due()
+
+    # ------------------------------------------------------------------ infraestrutura
+
+    def _add_event(self, execution, event_type, **attributes) -> int:
+        event_id = len(execution.events) + 1
+        event = {
+            "eventId": event_id,
+            "eventType": event_type,
+            "eventTimestamp": datetime.now(timezone.utc),
+        }
+        key = event_type[0].lower() + event_type[1:] + "EventAttributes"
+        event[key] = {name: value for name, value in attributes.items() if value is not None}
+        execution.events.append(event)
+        return event_id
+
+    def _request_decision(self, domain, execution):
+        """Agenda uma decision task, salvo se já há uma agendada ou em andamento."""
+        if not execution.open or execution.decision_scheduled_id:
+            return
+        if execution.decision_started_id:
+            execution.decision_pending = True
+            return
+        execution.decision_scheduled_id = self._add_event(
+            execution,
+            "DecisionTaskScheduled",
+            taskList={"name": execution.task_list},
+            startToCloseTimeout=(
+                str(int(execution.task_start_to_close))
+                if execution.task_start_to_close is not None
+                else "NONE"
+            ),
+        )
+        self._enqueue(("decision", domain, execution.task_list), execution)
+
+    def _close(self, domain, execution, status, event_type, **attributes):
+        self._add_event(execution, event_type, **attributes)
+        execution.open = False
+        execution.close_status = status
+        self._open_runs.pop((domain, execution.workflow_id), None)
+        if execution.decision_token is not None:
+            self._decision_tokens.pop(execution.decision_token, None)
+        for task in execution.activities.values():
+            if task.token is not None:
+                self._activity_tokens.pop(task.token, None)
+        execution.activities.clear()
+        execution.activity_ids.clear()
+        execution.timers.clear()
+        self.close_status_counts[status] += 1
+        if self.retain_closed is not None:
+            self._closed.append((domain, execution.workflow_id, execution.run_id))
+            while len(self._closed) > self.retain_closed:
+                self._executions.pop(self._closed.popleft(), None)
+
+    def _open_execution(self, domain, workflow_id, run_id, operation):
+        open_run = self._open_runs.get((domain, workflow_id))
+        if open_run is None or (run_id and run_id != open_run):
+            raise self.exceptions.UnknownResourceFault(
+                f"Unknown execution: {workflow_id}/{run_id}", operation
+            )
+        return self._executions[(domain, workflow_id, open_run)]
+
+    def _take_decision_token(self, token):
+        entry = self._decision_tokens.pop(token, None)
+        if entry is None:
+            raise self.exceptions.UnknownResourceFault(
+                "Unknown decision task token (closed or timed out)", "RespondDecisionTaskCompleted"
+            )
+        domain, execution = entry
+        execution.decision_token = None
+        return domain, execution
+
+    def _new_token(self, prefix):
+        return f"{prefix}-{next(self._tokens)}"
+
+    def _condition(self, key):
+        condition = self._conditions.get(key)
+        if condition is None:
+            condition = self._conditions[key] = threading.Condition(self._lock)
+            self._queues[key] = deque()
+        return condition
+
+    def _enqueue(self, key, item):
+        condition = self._condition(key)
+        self._queues[key].append(item)
+        condition.notify()
+
+    def _poll(self, operation, key, valid, start, empty):
+        with self._lock:
+            self.calls[operation] += 1
+            condition = self._condition(key)
+            queue = self._queues[key]
+            deadline = self.clock() + self.poll_timeout
+            while True:
+                self._fire_due()
+                while queue:
+                    item = queue.popleft()
+                    if valid(item):
+                        return start(item)
+                remaining = deadline - self.clock()
+                if remaining <= 0:
+                    return dict(empty)
+                if self._deadlines:
+                    remaining = min(remaining, max(self._deadlines[0][0] - self.clock(), 0.001))
+                condition.wait(remaining)
+
+    def _count(self, kind, domain, task_list):
+        with self._lock:
+            self._fire_due()
+            self._condition((kind, domain, task_list))
+            queue = self._queues[(kind, domain, task_list)]
+            if kind == "decision":
+                count = sum(1 for execution in queue if execution.open)
+            else:
+                count = sum(1 for task in queue if task.alive and task.token is None)
+            return {"count": count, "truncated": False}
+
+    def _page(self, execution, upto, offset, page_size, reverse):
+        page_size = min(page_size or MAX_PAGE_SIZE, MAX_PAGE_SIZE)
+        if reverse:
+            stop = upto - offset
+            page = execution.events[max(stop - page_size, 0) : stop][::-1]
+        else:
+            page = execution.events[offset : min(offset + page_size, upto)]
+        response: dict[str, Any] = {"events": page}
+        next_offset = offset + len(page)
+        if next_offset < upto:
+            # Token sem estado no simulador: páginas abandonadas não ocupam memória
+            response["nextPageToken"] = json.dumps(
+                [execution.domain, execution.workflow_id, execution.run_id]
+                + [upto, next_offset, page_size, reverse]
+            )
+        return response
+
+    def _visible(self, operation, domain, open_, start_filter, close_filter, **filters):
+        """Execuções (mais recentes primeiro) que atendem aos filtros, como no SWF."""
+        if (start_filter is None) == (close_filter is None):
+            raise self.exceptions.ValidationException(
+                "Exactly one of startTimeFilter or closeTimeFilter is required", operation
+            )
+        given = [name for name, value in filters.items() if value is not None]
+        if len(given) > 1:
+            raise self.exceptions.ValidationException(
+                f"Filters are mutually exclusive: {', '.join(given)}", operation
+            )
+        type_filter = filters.get("typeFilter")
+        tag = (filters.get("tagFilter") or {}).get("tag")
+        workflow_id = (filters.get("executionFilter") or {}).get("workflowId")
+        close_status = (filters.get("closeStatusFilter") or {}).get("status")
+
+        infos = []
+        for execution in self._executions.values():
+            if execution.domain != domain or execution.open != open_:
+                continue
+            info = self._execution_info(execution)
+            moment = info["startTimestamp"] if start_filter else info["closeTimestamp"]
+            time_filter = start_filter or close_filter
+            if moment < _datetime(time_filter["oldestDate"]):
+                continue
+            if time_filter.get("latestDate") is not None:
+                if moment > _datetime(time_filter["latestDate"]):
+                    continue
+            if workflow_id is not None and execution.workflow_id != workflow_id:
+                continue
+            if tag is not None and tag not in info["tagList"]:
+                continue
+            if close_status is not None and execution.close_status != close_status:
+                continue
+            if type_filter is not None and (
+                execution.workflow_type["name"] != type_filter["name"]
+                or type_filter.get("version") not in (None, execution.workflow_type["version"])
+            ):
+                continue
+            infos.append(info)
+        infos.sort(key=lambda info: info["startTimestamp"], reverse=True)
+        return infos
+
+    @staticmethod
+    def _execution_info(execution):
+        started = execution.events[0]
+        info = {
+            "execution": execution.execution,
+            "workflowType": dict(execution.workflow_type),
+            "startTimestamp": started["eventTimestamp"],
+            "executionStatus": "OPEN" if execution.open else "CLOSED",
+            "tagList": started["workflowExecutionStartedEventAttributes"].get("tagList", []),
+            "cancelRequested": False,
+        }
+        if not execution.open:
+            info["closeTimestamp"] = execution.events[-1]["eventTimestamp"]
+            info["closeStatus"] = execution.close_status
+        return info
+
+    def _visibility_page(self, infos, token, page_size, reverse):
+        if reverse:
+            infos.reverse()
+        offset = int(token) if token else 0
+        page_size = min(page_size or MAX_PAGE_SIZE, MAX_PAGE_SIZE)
+        response: dict[str, Any] = {"executionInfos": infos[offset : offset + page_size]}
+        if offset + page_size < len(infos):
+            response["nextPageToken"] = str(offset + page_size)
+        return response
+
+    def _next_page(self, token):
+        try:
+            domain, workflow_id, run_id, upto, offset, page_size, reverse = json.loads(token)
+            execution = self._executions[(domain, workflow_id, run_id)]
+        except (ValueError, KeyError):
+            raise self.exceptions.UnknownResourceFault(f"Invalid page token '{token}'") from None
+        return self._page(execution, upto, offset, page_size, reverse)
+
+
+def install(simulator: SimulatedSWF | None = None, **kwargs) -> SimulatedSWF:
+    """
+    Usa o simulador como cliente compartilhado de todos os ``SWFClient``.
+
+    Args:
+        simulator (SimulatedSWF): Simulador a usar (padrão: um novo, com ``kwargs``)
+
+    Returns:
+        SimulatedSWF: Simulador instalado
+    """
+    simulator = simulator or SimulatedSWF(**kwargs)
+    swf_client.set_client_factory(lambda: simulator)
+    return simulator
+
+
+def uninstall() -> None:
+    """Restaura o cliente boto3 padrão."""
+    swf_client.set_client_factory(None)
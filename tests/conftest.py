@@ -32,3 +32,12 @@ def _aws_env_fixture(monkeypatch: pytest.MonkeyPatch) -> None:
     monkeypatch.setenv("AWS_REGION", "us-east-1")
     monkeypatch.setenv("SWF_DOMAIN", "test-domain")
     monkeypatch.setenv("SWF_TASK_LIST", "test-task-list")
+
+
+@pytest.fixture(autouse=True)
+def _flush_logs_fixture():
+    """Escreve os logs de cada teste enquanto a saída dele ainda está capturada."""
+    yield
+    import structured_log
+
+    structured_log.flush()
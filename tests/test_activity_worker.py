@@ -116,3 +116,68 @@ def test_register_activities_cria_todos_os_tipos(worker_module):
     )
     registrados = {info["activityType"]["name"] for info in response["typeInfos"]}
     assert set(worker.activities.keys()) <= registrados
+
+
+def test_run_concurrent_respeita_max_in_flight_e_identidades(worker_module):
+    import threading
+    import time as _time
+
+    worker = worker_module.ActivityWorker(identity="w")
+    worker.swf_client.client = MagicMock()
+
+    lock = threading.Lock()
+    state = {"polled": 0, "running": 0, "peak": 0, "done": 0}
+    identities = set()
+
+    def fake_poll(**kwargs):
+        with lock:
+            identities.add(kwargs["identity"])
+            state["polled"] += 1
+            if state["polled"] > 12:
+                return {}
+        return {
+            "taskToken": f"tok-{state['polled']}",
+            "activityType": {"name": "Slow", "version": "1.0"},
+            "input": "{}",
+        }
+
+    def slow(_input):
+        with lock:
+            state["running"] += 1
+            state["peak"] = max(state["peak"], state["running"])
+        _time.sleep(0.02)
+        with lock:
+            state["running"] -= 1
+            state["done"] += 1
+            if state["done"] == 12:
+                worker.stop()
+        return {}
+
+    worker.swf_client.client.poll_for_activity_task.side_effect = fake_poll
+    worker.activities["Slow"] = slow
+
+    worker.run_concurrent(pollers=3, max_in_flight=2, min_pollers=3)
+
+    assert state["done"] == 12
+    assert state["peak"] <= 2
+    assert identities == {"w-poller-1", "w-poller-2", "w-poller-3"}
+
+
+def test_lambda_handler_drena_atividades_ate_poll_vazio(worker_module):
+    import swf_client
+
+    client = MagicMock()
+    task = {
+        "taskToken": "tok-1",
+        "activityType": {"name": "ValidateInput", "version": "1.0"},
+        "input": json.dumps({"order_id": "ORD-1"}),
+    }
+    client.poll_for_activity_task.side_effect = [task, task, task, {"taskToken": ""}]
+    swf_client.set_client_factory(lambda: client)
+
+    context = MagicMock()
+    context.get_remaining_time_in_millis.return_value = 290_000
+    result = worker_module.lambda_handler({}, context)
+
+    assert result == {"processed": 3, "stopped": "empty"}
+    assert client.respond_activity_task_completed.call_count == 3
@@ -0,0 +1,162 @@
+"""Testes da tabela colunar de históricos, dos agregados e da CLI de relatório."""
+
+from __future__ import annotations
+
+import json
+
+import pytest
+
+from benchmarks.histories import HistoryBuilder, rollback_history
+
+
+@pytest.fixture(params=["numpy", "python"])
+def analytics_module(request, monkeypatch):
+    import importlib
+
+    import analytics
+
+    importlib.reload(analytics)
+    if request.param == "numpy":
+        pytest.importorskip("numpy")
+    else:
+        monkeypatch.setattr(analytics, "np", None)
+    return analytics
+
+
+def _retried_history():
+    builder = HistoryBuilder()
+    builder.start({"order_id": "ORD-1"})
+    builder.activity("ValidateInput")  # eventos 2-4: 1ms até iniciar, 1ms de execução
+    builder.activity("ProcessData", "failed")
+    builder.activity("ProcessData")
+    builder.add("WorkflowExecutionCompleted", result="{}")
+    return builder.events
+
+
+def _histories():
+    return [("wf-1", "run-1", _retried_history()), ("wf-2", "run-2", rollback_history(60))]
+
+
+def test_agregados_por_atividade_e_execucao(analytics_module):
+    summary = analytics_module.build_table(_histories()[:1]).summary()
+
+    validate = summary["activities"]["ValidateInput"]
+    assert (validate["attempts"], validate["outcomes"]["completed"]) == (1, 1)
+    assert validate["schedule_to_start_ms"]["p50"] == pytest.approx(1.0, abs=1e-3)
+    assert validate["schedule_to_close_ms"]["p99"] == pytest.approx(2.0, abs=1e-3)
+    process = summary["activities"]["ProcessData"]
+    assert process["outcomes"] == {
+        "open": 0,
+        "completed": 1,
+        "failed": 1,
+        "timed_out": 0,
+        "canceled": 0,
+    }
+    assert process["retry_rate"] == 1.0
+    assert summary["executions"]["duration_ms"]["p50"] == pytest.approx(10.0, abs=1e-3)
+
+
+def test_frequencia_de_rollback_e_atividade_que_o_causou(analytics_module):
+    summary = analytics_module.build_table(_histories()).summary()
+
+    executions = summary["executions"]
+    assert executions["count"] == 2
+    assert executions["close_status"]["completed"] == 1
+    assert executions["close_status"]["open"] == 1
+    assert (executions["rollbacks"], executions["rollback_rate"]) == (1, 0.5)
+    assert executions["duration_ms"]["count"] == 1
+    compensate = summary["activities"]["CompensateTransaction"]
+    assert compensate["outcomes"]["open"] == 1
+    assert compensate["start_to_close_ms"] == {"count": 0, "p50": None, "p95": None, "p99": None}
+    failing = [name for name, stats in summary["activities"].items() if stats["rollbacks"]]
+    assert len(failing) == 1
+    assert summary["activities"][failing[0]]["outcomes"]["failed"] >= 3
+
+
+def test_taxa_de_retry_por_atividade_agendada(analytics_module):
+    histories = [("wf-1", "run-1", _retried_history())]
+    builder = HistoryBuilder()
+    builder.start({"order_id": "ORD-2"})
+    builder.activity("ProcessData")
+    histories.append(("wf-2", "run-2", builder.events))
+
+    process = analytics_module.build_table(histories).summary()["activities"]["ProcessData"]
+
+    assert process["attempts"] == 3
+    assert process["retry_rate"] == 0.5
+
+
+def test_numpy_e_python_puro_dao_o_mesmo_resultado(monkeypatch):
+    pytest.importorskip("numpy")
+    import analytics
+
+    expected = analytics.build_table(_histories()).summary()
+    monkeypatch.setattr(analytics, "np", None)
+
+    _assert_close(analytics.build_table(_histories()).summary(), expected)
+
+
+def _assert_close(actual, expected):
+    if isinstance(expected, dict):
+        assert actual.keys() == expected.keys()
+        for key in expected:
+            _assert_close(actual[key], expected[key])
+    elif isinstance(expected, float):
+        assert actual == pytest.approx(expected)
+    else:
+        assert actual == expected
+
+
+def test_arquivo_colunar_ida_e_volta(analytics_module, tmp_path):
+    table = analytics_module.build_table(_histories())
+    path = tmp_path / "tabela.swfcol"
+
+    table.save(str(path))
+    loaded = analytics_module.ActivityTable.load(str(path))
+
+    assert loaded.summary() == table.summary()
+    assert loaded.executions == [("wf-1", "run-1"), ("wf-2", "run-2")]
+    assert len(loaded) == len(table)
+    (tmp_path / "outro").write_bytes(b"not a table")
+    with pytest.raises(ValueError):
+        analytics_module.ActivityTable.load(str(tmp_path / "outro"))
+
+
+def test_cli_le_historicos_exporta_e_relata(analytics_module, tmp_path, capsys):
+    import importlib
+
+    import history_cache
+    import structured_log
+    import swf_client
+    import swf_simulator
+    import workflow_starter
+
+    for module in (swf_client, swf_simulator, workflow_starter):
+        importlib.reload(module)
+    history_cache.set_history_cache(history_cache.HistoryCache(str(tmp_path / "cache"), 1 << 20))
+    swf_simulator.install(poll_timeout=0)
+    try:
+        starter = workflow_starter.WorkflowStarter()
+        lines = []
+        for order_id in ("ORD-1", "ORD-2"):
+            result = starter.start_workflow({"order_id": order_id})
+            starter.terminate_workflow(result["workflow_id"], result["run_id"])
+            lines.append(json.dumps(result))
+        lines.append(json.dumps({"workflow_id": "wf-x", "error": "Throttling"}))
+        executions = tmp_path / "execucoes.jsonl"
+        executions.write_text("\n".join(lines) + "\n")
+        table = tmp_path / "tabela.swfcol"
+        structured_log.flush()
+        capsys.readouterr()
+
+        analytics_module.main(["--executions", str(executions), "--export", str(table), "--json"])
+        summary = json.loads(capsys.readouterr().out)
+        analytics_module.main(["--table", str(table)])
+        report = capsys.readouterr().out
+    finally:
+        swf_simulator.uninstall()
+        history_cache.set_history_cache(None)
+
+    assert summary["executions"]["count"] == 2
+    assert summary["executions"]["close_status"]["terminated"] == 2
+    assert report.startswith("Execuções: 2 (terminated=2)")
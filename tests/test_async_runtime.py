@@ -0,0 +1,137 @@
+"""Testes do runtime asyncio dos workers."""
+
+from __future__ import annotations
+
+import asyncio
+import json
+from unittest.mock import MagicMock
+
+import pytest
+
+
+@pytest.fixture
+def modules():
+    import importlib
+
+    import activity_worker
+    import async_runtime
+    import config
+    import swf_client
+
+    importlib.reload(config)
+    importlib.reload(swf_client)
+    importlib.reload(activity_worker)
+    importlib.reload(async_runtime)
+    return activity_worker, async_runtime
+
+
+def order_task(input_data):
+    """Handler de nível de módulo (importável pelo processo filho)."""
+    return {"order_id": input_data["order_id"], "items": len(input_data["items"])}
+
+
+def _task(index, name):
+    return {
+        "taskToken": f"tok-{index}",
+        "activityType": {"name": name, "version": "1.0"},
+        "input": json.dumps({"order_id": f"ORD-{index}"}),
+    }
+
+
+def test_runtime_executa_handlers_async_e_sincronos_concorrentemente(modules):
+    activity_worker, async_runtime = modules
+    worker = activity_worker.ActivityWorker(identity="aw")
+    client = worker.swf_client.client = MagicMock()
+
+    total = 40
+    tasks = iter([_task(i, "Wait" if i % 2 else "ValidateInput") for i in range(total)])
+    client.poll_for_activity_task.side_effect = lambda **_kw: next(tasks, {})
+
+    runtime = async_runtime.AsyncActivityRuntime(worker, pollers=2, max_in_flight=total)
+    state = {"waiting": 0, "peak": 0}
+
+    async def wait(input_data):
+        state["waiting"] += 1
+        state["peak"] = max(state["peak"], state["waiting"])
+        await asyncio.sleep(0.05)
+        state["waiting"] -= 1
+        return {"order_id": input_data["order_id"]}
+
+    worker.activities["Wait"] = wait
+    completed = []
+
+    def on_completed(**kwargs):
+        completed.append(kwargs["taskToken"])
+        if len(completed) == total:
+            runtime.stop()
+
+    client.respond_activity_task_completed.side_effect = on_completed
+
+    asyncio.run(asyncio.wait_for(runtime.run(), timeout=10))
+
+    assert sorted(completed) == sorted(f"tok-{i}" for i in range(total))
+    # Handlers async aguardam juntos no event loop
+    assert state["peak"] > 1
+    client.respond_activity_task_failed.assert_not_called()
+
+
+def test_runtime_reporta_falha_de_handler(modules):
+    activity_worker, async_runtime = modules
+    worker = activity_worker.ActivityWorker(identity="aw")
+    client = worker.swf_client.client = MagicMock()
+
+    tasks = iter([{**_task(0, "ValidateInput"), "input": "{}"}])
+    client.poll_for_activity_task.side_effect = lambda **_kw: next(tasks, {})
+    runtime = async_runtime.AsyncActivityRuntime(worker, pollers=1, max_in_flight=4)
+    client.respond_activity_task_failed.side_effect = lambda **_kw: runtime.stop()
+
+    asyncio.run(asyncio.wait_for(runtime.run(), timeout=10))
+
+    kwargs = client.respond_activity_task_failed.call_args.kwargs
+    assert kwargs["taskToken"] == "tok-0"
+    assert "order_id" in kwargs["reason"]
+
+
+def test_handler_async_no_worker_sincrono(modules):
+    activity_worker, _ = modules
+    worker = activity_worker.ActivityWorker()
+    client = worker.swf_client.client = MagicMock()
+
+    async def handler(input_data):
+        return {"echo": input_data["order_id"]}
+
+    worker.activities["Echo"] = handler
+    worker.handle_activity_task(_task(7, "Echo"))
+
+    result = json.loads(client.respond_activity_task_completed.call_args.kwargs["result"])
+    assert result == {"echo": "ORD-7"}
+
+
+def test_lane_de_processos_recebe_input_externalizado(modules, tmp_path):
+    activity_worker, async_runtime = modules
+    from payload_store import LocalPayloadStore, PayloadStore, set_payload_store
+    from process_lane import ProcessLane, process_lane
+
+    store = PayloadStore(LocalPayloadStore(str(tmp_path)), threshold=100, cache_max_bytes=0)
+    set_payload_store(store)
+    worker = activity_worker.ActivityWorker(identity="aw")
+    client = worker.swf_client.client = MagicMock()
+    worker.process_lane = ProcessLane(workers=1, max_tasks_per_child=10)
+    worker.activities["Order"] = process_lane(order_task)
+    order = {"order_id": "ORD-1", "items": [f"item-{i}" for i in range(50)]}
+    task = {**_task(0, "Order"), "input": store.dehydrate(json.dumps(order))}
+    assert store.is_reference(task["input"])
+
+    tasks = iter([task])
+    client.poll_for_activity_task.side_effect = lambda **_kw: next(tasks, {})
+    runtime = async_runtime.AsyncActivityRuntime(worker, pollers=1, max_in_flight=4)
+    client.respond_activity_task_completed.side_effect = lambda **_kw: runtime.stop()
+    try:
+        asyncio.run(asyncio.wait_for(runtime.run(), timeout=10))
+    finally:
+        worker.process_lane.shutdown()
+        set_payload_store(None)
+
+    result = json.loads(client.respond_activity_task_completed.call_args.kwargs["result"])
+    assert result == {"order_id": "ORD-1", "items": 50}
+    client.respond_activity_task_failed.assert_not_called()
@@ -0,0 +1,66 @@
+"""Testes do benchmark de ponta a ponta contra o simulador."""
+
+from __future__ import annotations
+
+import json
+
+import pytest
+
+from benchmarks.e2e import history_latencies, main, percentiles
+from benchmarks.histories import HistoryBuilder
+
+
+@pytest.fixture(autouse=True)
+def _reload_modules():
+    import importlib
+
+    import config
+    import swf_client
+    import swf_simulator
+
+    importlib.reload(config)
+    importlib.reload(swf_client)
+    importlib.reload(swf_simulator)
+
+
+def test_percentis_por_interpolacao():
+    summary = percentiles([float(v) for v in range(1, 101)])
+
+    assert summary["count"] == 100
+    assert summary["p50"] == pytest.approx(50.5)
+    assert summary["p99"] == pytest.approx(99.01)
+    assert percentiles([])["p95"] is None
+
+
+def test_latencias_extraidas_do_historico():
+    builder = HistoryBuilder()
+    builder.start({"order_id": "ORD-1"})
+    builder.decision()
+    builder.activity("ValidateInput")
+    builder.add("WorkflowExecutionCompleted", result="{}")
+
+    latencies = history_latencies(builder.events)
+
+    # HistoryBuilder espaça os eventos em 1ms
+    assert latencies["activities"]["ValidateInput"] == {
+        "schedule_to_start": [1.0],
+        "start_to_close": [1.0],
+    }
+    assert latencies["decisions"]["start_to_close"] == [1.0]
+    assert latencies["workflow"] == len(builder.events) - 1
+
+
+def test_carga_com_workers_reais_grava_jsonl(tmp_path, capsys):
+    output = tmp_path / "e2e.jsonl"
+
+    main(["--workflows", "30", "--activity-workers", "1", "2", "--output", str(output)])
+
+    results = [json.loads(line) for line in output.read_text().splitlines()]
+    assert [r["config"]["activity_workers"] for r in results] == [1, 2]
+    for result in results:
+        assert result["closed"] == {"COMPLETED": 30}
+        assert result["workflows_per_s"] > 0
+        assert result["activity_ms"]["SaveResults"]["start_to_close"]["count"] == 30
+        assert result["decision_ms"]["schedule_to_start"]["p99"] is not None
+        assert result["api_calls_by_operation"]["StartWorkflowExecution"] == 1
+    assert "workflows/s" in capsys.readouterr().out
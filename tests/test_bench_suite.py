@@ -0,0 +1,68 @@
+"""Testes dos geradores de histórico e da suíte de micro-benchmarks."""
+
+from __future__ import annotations
+
+import json
+
+import pytest
+
+from benchmarks.histories import HISTORY_GENERATORS
+from history import replay_history
+
+
+@pytest.mark.parametrize("scenario", sorted(HISTORY_GENERATORS))
+def test_geradores_produzem_historicos_validos(scenario):
+    events = HISTORY_GENERATORS[scenario](500)
+
+    assert 500 <= len(events) < 600
+    assert [e["eventId"] for e in events] == list(range(1, len(events) + 1))
+    state = replay_history(events)
+    assert state["workflow_input"] == {"order_id": "ORD-BENCH"}
+
+
+def test_historico_de_rollback_termina_com_compensacao_em_aberto():
+    state = replay_history(HISTORY_GENERATORS["rollback"](200))
+
+    assert "ROLLBACK_INITIATED" in state["markers"]
+    assert state["activity_status"]["RollbackStep"] == "completed"
+    assert state["activity_status"]["CompensateTransaction"] == "scheduled"
+
+
+def test_suite_gera_resultados_e_compara_com_baseline(tmp_path, capsys, monkeypatch):
+    from benchmarks import suite
+
+    baseline = tmp_path / "baseline.json"
+    args = ["--sizes", "10", "--payload-sizes", "1024", "--repeat", "1"]
+
+    assert suite.main(args + ["--baseline", str(baseline), "--save-baseline"]) == 0
+    report = json.loads(baseline.read_text())
+    keys = {result["key"] for result in report["results"]}
+    assert {
+        "analyze_events[scenario=retry,events=10]",
+        "make_decisions[scenario=signal,events=10]",
+        "schedule_activity[payload_bytes=1024]",
+        "handle_activity_task[payload_bytes=1024]",
+    } <= keys
+
+    # Tempos fixos: só o caso com baseline artificialmente rápida regride
+    monkeypatch.setattr(suite, "time_call", lambda fn, repeat: (1e-3, 1e-3, 1))
+    for result in report["results"]:
+        result["best_us"] = 1000.0
+    report["results"][0]["best_us"] = 0.001
+    baseline.write_text(json.dumps(report))
+    capsys.readouterr()
+    assert suite.main(args + ["--baseline", str(baseline), "--compare"]) == 1
+    flagged = [line for line in capsys.readouterr().out.splitlines() if "REGRESSÃO" in line]
+    assert [line.split()[0] for line in flagged] == [report["results"][0]["key"]]
+
+
+def test_compare_ignora_casos_ausentes_na_baseline():
+    from benchmarks.suite import compare
+
+    current = {"results": [{"key": "a", "best_us": 12.0}, {"key": "novo", "best_us": 1.0}]}
+    baseline = {"results": [{"key": "a", "best_us": 10.0}]}
+
+    rows = compare(current, baseline, threshold=0.25)
+
+    assert [(row["key"], row["regression"]) for row in rows] == [("a", False)]
+    assert rows[0]["ratio"] == pytest.approx(1.2)
@@ -0,0 +1,69 @@
+"""Testes do codec de payloads."""
+
+from __future__ import annotations
+
+import json
+import math
+
+import pytest
+
+from codec import JSON_BACKENDS, PayloadCodec
+
+ORDER = {
+    "order_id": "ORD-1",
+    "customer_id": "CUST-9",
+    "items": [{"sku": f"SKU-{i}", "qty": i % 5 + 1, "price": 9.9} for i in range(200)],
+    "note": "pedido com acentuação",
+}
+
+
+@pytest.mark.parametrize("backend", sorted(JSON_BACKENDS))
+def test_backends_json_fazem_ida_e_volta(backend):
+    codec = PayloadCodec(json_backend=backend)
+    encoded = codec.encode(ORDER)
+
+    assert json.loads(encoded) == ORDER
+    assert codec.decode(encoded) == ORDER
+
+
+@pytest.mark.parametrize("backend", sorted(JSON_BACKENDS))
+def test_backends_rapidos_serializam_como_a_biblioteca_padrao(backend):
+    codec = PayloadCodec(json_backend=backend)
+    payload = {1: "a", "big": 2**70, "neg": -(2**80), "ok": [1, None, 2.5]}
+
+    encoded = codec.encode(payload)
+
+    assert json.loads(encoded) == json.loads(json.dumps(payload))
+    assert codec.decode(encoded) == {"1": "a", "big": 2**70, "neg": -(2**80), "ok": [1, None, 2.5]}
+    assert isinstance(codec.decode(encoded)["big"], int)
+    special = codec.decode(codec.encode({"nan": float("nan"), "inf": float("inf")}))
+    assert math.isnan(special["nan"]) and special["inf"] == float("inf")
+
+
+def test_compressao_zlib_usa_cabecalho_e_reduz_tamanho():
+    codec = PayloadCodec(compression="zlib", compression_min_bytes=100)
+    encoded = codec.encode(ORDER)
+
+    assert encoded.startswith("~zlib:")
+    assert len(encoded) < len(json.dumps(ORDER))
+    assert codec.decode(encoded) == ORDER
+
+
+def test_payload_pequeno_nao_e_comprimido():
+    codec = PayloadCodec(compression="zlib", compression_min_bytes=1024)
+    assert codec.encode({"a": 1}) == '{"a":1}'
+
+
+def test_leitura_compativel_com_json_puro_e_com_outro_formato():
+    plain_reader = PayloadCodec(compression="none")
+    compressed = PayloadCodec(compression="zlib", compression_min_bytes=0).encode(ORDER)
+
+    assert plain_reader.decode(json.dumps(ORDER, indent=2)) == ORDER
+    assert plain_reader.decode(compressed) == ORDER
+
+
+def test_formato_desconhecido():
+    with pytest.raises(ValueError):
+        PayloadCodec().decode("~lz4:AAAA")
+    with pytest.raises(ValueError):
+        PayloadCodec(compression="lz4")
@@ -0,0 +1,420 @@
+"""Testes do decision worker: replay incremental e decisões."""
+
+from __future__ import annotations
+
+import json
+from unittest.mock import MagicMock
+
+import pytest
+
+from benchmarks.histories import HistoryBuilder
+
+
+@pytest.fixture
+def worker_module():
+    import importlib
+
+    import config
+    import decision_worker
+    import swf_client
+
+    importlib.reload(config)
+    importlib.reload(swf_client)
+    importlib.reload(decision_worker)
+    return decision_worker
+
+
+def _decision_task(events, previous_started_event_id=0, run_id="run-1"):
+    return {
+        "taskToken": "tok-dec",
+        "events": events,
+        "previousStartedEventId": previous_started_event_id,
+        "workflowExecution": {"workflowId": "wf-1", "runId": run_id},
+    }
+
+
+def _scheduled_names(client):
+    decisions = client.respond_decision_task_completed.call_args.kwargs["decisions"]
+    return [
+        d["scheduleActivityTaskDecisionAttributes"]["activityType"]["name"]
+        for d in decisions
+        if d["decisionType"] == "ScheduleActivityTask"
+    ]
+
+
+def test_segunda_decisao_aplica_apenas_eventos_novos(worker_module, monkeypatch):
+    worker = worker_module.DecisionWorker()
+    worker.swf_client.client = MagicMock()
+
+    builder = HistoryBuilder()
+    builder.start({"order_id": "ORD-1"})
+    first_started = builder.decision_started()
+    worker.handle_decision_task(_decision_task(list(builder.events)))
+    assert _scheduled_names(worker.swf_client.client) == ["ValidateInput"]
+
+    builder.decision_completed()
+    builder.activity("ValidateInput", result={"status": "validated"})
+    builder.decision_started()
+
+    applied = []
+    original_apply = worker_module.HistoryReplayer.apply
+    monkeypatch.setattr(
+        worker_module.HistoryReplayer,
+        "apply",
+        lambda self, event: (applied.append(event["eventId"]), original_apply(self, event)),
+    )
+    worker.handle_decision_task(_decision_task(list(builder.events), first_started))
+
+    assert worker.replay_cache.hits == 1
+    assert min(applied) == first_started + 1
+    assert _scheduled_names(worker.swf_client.client) == ["ProcessData", "EnrichData"]
+
+
+def test_cache_miss_refaz_replay_completo(worker_module):
+    worker = worker_module.DecisionWorker()
+    worker.swf_client.client = MagicMock()
+
+    builder = HistoryBuilder()
+    builder.start({"order_id": "ORD-2"})
+    builder.activity("ValidateInput")
+    builder.decision_started()
+
+    # previousStartedEventId desconhecido para este worker → replay completo
+    worker.handle_decision_task(_decision_task(builder.events, previous_started_event_id=3))
+
+    assert worker.replay_cache.misses == 1
+    assert _scheduled_names(worker.swf_client.client) == ["ProcessData", "EnrichData"]
+
+
+def test_workflow_concluido_sai_do_cache(worker_module):
+    worker = worker_module.DecisionWorker()
+    worker.swf_client.client = MagicMock()
+
+    builder = HistoryBuilder()
+    builder.start({"order_id": "ORD-3"})
+    for step in ["ValidateInput", "ProcessData", "EnrichData", "SaveResults", "NotifyCompletion"]:
+        builder.activity(step)
+    builder.decision_started()
+
+    worker.handle_decision_task(_decision_task(builder.events))
+
+    decisions = worker.swf_client.client.respond_decision_task_completed.call_args.kwargs[
+        "decisions"
+    ]
+    assert decisions[0]["decisionType"] == "CompleteWorkflowExecution"
+    assert json.loads(decisions[0]["completeWorkflowExecutionDecisionAttributes"]["result"])
+    assert len(worker.replay_cache) == 0
+
+
+def _decisions_for(worker_module, builder):
+    worker = worker_module.DecisionWorker()
+    worker.swf_client.client = MagicMock()
+    return worker.make_decisions(worker.analyze_events(builder.events))
+
+
+def _types_and_names(decisions):
+    return [
+        d.get("scheduleActivityTaskDecisionAttributes", {}).get("activityType", {}).get("name")
+        or d["decisionType"]
+        for d in decisions
+    ]
+
+
+def test_juncao_aguarda_ramo_em_aberto(worker_module):
+    builder = HistoryBuilder()
+    builder.start({"order_id": "ORD-6"})
+    builder.activity("ValidateInput")
+    builder.activity("ProcessData")
+    builder.schedule("EnrichData")
+
+    assert _decisions_for(worker_module, builder) == []
+
+    builder.close(builder.events[-1]["eventId"])
+    assert _types_and_names(_decisions_for(worker_module, builder)) == ["SaveResults"]
+
+
+def test_etapa_concluida_apos_falha_nao_e_repetida(worker_module):
+    builder = HistoryBuilder()
+    builder.start({"order_id": "ORD-7"})
+    builder.activity("ValidateInput")
+    builder.activity("ProcessData", outcome="failed")
+    builder.activity("ProcessData")
+    builder.activity("EnrichData")
+
+    assert _types_and_names(_decisions_for(worker_module, builder)) == ["SaveResults"]
+
+
+def test_retry_de_um_ramo_nao_bloqueia_o_outro(worker_module):
+    builder = HistoryBuilder()
+    builder.start({"order_id": "ORD-8"})
+    builder.activity("ValidateInput")
+    builder.schedule("ProcessData")
+    builder.activity("EnrichData", outcome="timed_out")
+
+    assert _types_and_names(_decisions_for(worker_module, builder)) == ["EnrichData"]
+
+
+def test_rollback_iniciado_uma_unica_vez_e_compensacao_encerra(worker_module):
+    builder = HistoryBuilder()
+    builder.start({"order_id": "ORD-9"})
+    builder.activity("ValidateInput")
+    for _ in range(3):
+        builder.activity("ProcessData", outcome="failed")
+
+    decisions = _decisions_for(worker_module, builder)
+    assert _types_and_names(decisions) == ["RecordMarker", "RollbackStep"]
+    rollback_input = json.loads(decisions[1]["scheduleActivityTaskDecisionAttributes"]["input"])
+    assert rollback_input["step_to_rollback"] == "ProcessData"
+
+    builder.add(
+        "MarkerRecorded",
+        markerName="ROLLBACK_INITIATED",
+        details=decisions[0]["recordMarkerDecisionAttributes"]["details"],
+    )
+    builder.schedule("RollbackStep")
+    assert _decisions_for(worker_module, builder) == []
+
+    builder.close(builder.events[-1]["eventId"])
+    decisions = _decisions_for(worker_module, builder)
+    assert _types_and_names(decisions) == ["CompensateTransaction"]
+    compensate_input = json.loads(decisions[0]["scheduleActivityTaskDecisionAttributes"]["input"])
+    assert compensate_input == {"order_id": "ORD-9"}
+
+    builder.activity("CompensateTransaction")
+    assert _types_and_names(_decisions_for(worker_module, builder)) == ["FailWorkflowExecution"]
+
+
+def _rollback_history(worker_module):
+    builder = HistoryBuilder()
+    builder.start({"order_id": "ORD-10"})
+    builder.activity("ValidateInput")
+    for _ in range(3):
+        builder.activity("ProcessData", outcome="failed")
+    marker = _decisions_for(worker_module, builder)[0]
+    builder.add(
+        "MarkerRecorded",
+        markerName="ROLLBACK_INITIATED",
+        details=marker["recordMarkerDecisionAttributes"]["details"],
+    )
+    return builder
+
+
+@pytest.mark.parametrize("outcome", ["failed", "timed_out"])
+def test_rollback_step_com_falha_e_repetido_e_depois_falha_o_workflow(worker_module, outcome):
+    builder = _rollback_history(worker_module)
+
+    builder.activity("RollbackStep", outcome=outcome)
+    decisions = _decisions_for(worker_module, builder)
+    assert _types_and_names(decisions) == ["RollbackStep"]
+    rollback_input = json.loads(decisions[0]["scheduleActivityTaskDecisionAttributes"]["input"])
+    assert rollback_input["step_to_rollback"] == "ProcessData"
+
+    builder.activity("RollbackStep", outcome=outcome)
+    assert _types_and_names(_decisions_for(worker_module, builder)) == ["RollbackStep"]
+    builder.activity("RollbackStep", outcome=outcome)
+    (decision,) = _decisions_for(worker_module, builder)
+    assert decision["decisionType"] == "FailWorkflowExecution"
+    attributes = decision["failWorkflowExecutionDecisionAttributes"]
+    assert attributes["reason"] == "Compensation failed: RollbackStep exceeded max retries"
+    assert json.loads(attributes["details"])["compensation_failed_step"] == "RollbackStep"
+
+
+def test_compensacao_com_falha_e_repetida_com_o_input_do_workflow(worker_module):
+    builder = _rollback_history(worker_module)
+    builder.activity("RollbackStep")
+
+    builder.activity("CompensateTransaction", outcome="failed")
+    decisions = _decisions_for(worker_module, builder)
+    assert _types_and_names(decisions) == ["CompensateTransaction"]
+    compensate_input = json.loads(decisions[0]["scheduleActivityTaskDecisionAttributes"]["input"])
+    assert compensate_input == {"order_id": "ORD-10"}
+
+    builder.activity("CompensateTransaction", outcome="failed")
+    builder.activity("CompensateTransaction", outcome="failed")
+    (decision,) = _decisions_for(worker_module, builder)
+    assert decision["failWorkflowExecutionDecisionAttributes"]["reason"] == (
+        "Compensation failed: CompensateTransaction exceeded max retries"
+    )
+
+
+def test_decider_escolhe_plano_pelo_tipo_do_workflow(worker_module):
+    from workflow_definition import (
+        BUSINESS_PROCESS_WORKFLOW,
+        StepDefinition,
+        WorkflowDefinition,
+        WorkflowRegistry,
+    )
+
+    quick = WorkflowDefinition("QuickCheck", "1.0", (StepDefinition("ValidateInput"),))
+    worker = worker_module.DecisionWorker(
+        registry=WorkflowRegistry((BUSINESS_PROCESS_WORKFLOW, quick))
+    )
+    worker.swf_client.client = MagicMock()
+
+    builder = HistoryBuilder()
+    builder.start({"order_id": "ORD-9"})
+    builder.activity("ValidateInput")
+    builder.decision_started()
+    task = _decision_task(builder.events, run_id="run-quick")
+    task["workflowType"] = {"name": "QuickCheck", "version": "1.0"}
+
+    worker.handle_decision_task(task)
+
+    decisions = worker.swf_client.client.respond_decision_task_completed.call_args.kwargs[
+        "decisions"
+    ]
+    assert _types_and_names(decisions) == ["CompleteWorkflowExecution"]
+
+
+def test_tipo_de_workflow_desconhecido_nao_responde(worker_module):
+    worker = worker_module.DecisionWorker()
+    worker.swf_client.client = MagicMock()
+    builder = HistoryBuilder()
+    builder.start({"order_id": "ORD-10"})
+    builder.decision_started()
+    task = _decision_task(builder.events)
+    task["workflowType"] = {"name": "Unknown", "version": "1.0"}
+
+    worker.handle_decision_task(task)
+
+    worker.swf_client.client.respond_decision_task_completed.assert_not_called()
+
+
+def test_replay_cache_respeita_limite_de_memoria():
+    from history import HistoryReplayer, ReplayCache
+
+    cache = ReplayCache(max_bytes=250)
+    for run_id in ["a", "b", "c"]:
+        replayer = HistoryReplayer()
+        replayer.approx_bytes = 100
+        cache.store(run_id, replayer)
+
+    assert len(cache) == 2
+    assert cache.current_bytes == 200
+    assert cache.checkout("a", 0) is None
+
+
+def test_historico_paginado_segue_next_page_token(worker_module):
+    worker = worker_module.DecisionWorker()
+    worker.swf_client.client = MagicMock()
+
+    builder = HistoryBuilder()
+    builder.start({"order_id": "ORD-4"})
+    builder.activity("ValidateInput")
+    builder.activity("ProcessData")
+    builder.decision_started()
+    events = builder.events
+
+    task = _decision_task(events[:4])
+    task["nextPageToken"] = "page-2"
+    worker.swf_client.client.poll_for_decision_task.return_value = {"events": events[4:]}
+
+    worker.handle_decision_task(task)
+
+    kwargs = worker.swf_client.client.poll_for_decision_task.call_args.kwargs
+    assert kwargs["nextPageToken"] == "page-2"
+    assert kwargs["maximumPageSize"] == worker_module.Config.DECISION_HISTORY_PAGE_SIZE
+    assert _scheduled_names(worker.swf_client.client) == ["EnrichData"]
+
+
+def test_ordem_reversa_para_ao_alcancar_replay_em_cache(worker_module):
+    worker = worker_module.DecisionWorker()
+    client = worker.swf_client.client = MagicMock()
+
+    builder = HistoryBuilder()
+    builder.start({"order_id": "ORD-5"})
+    previous_started = builder.decision_started()
+    worker.handle_decision_task(_decision_task(list(builder.events)))
+
+    builder.decision_completed()
+    builder.activity("ValidateInput")
+    builder.decision_started()
+    newest_first = list(reversed(builder.events))
+
+    pages = iter([newest_first[:7], newest_first[7:]])
+    replayer = worker.replay_events("run-1", pages, previous_started, reverse_order=True)
+
+    assert replayer.state["completed_activities"] == ["ValidateInput"]
+    assert replayer.last_event_id == builder.events[-1]["eventId"]
+    # A segunda página (eventos já aplicados) nunca é consumida
+    assert next(pages) == newest_first[7:]
+    client.poll_for_decision_task.assert_not_called()
+
+
+def test_ordem_reversa_sem_cache_le_historico_em_ordem_crescente(worker_module, monkeypatch):
+    monkeypatch.setattr(worker_module.Config, "DECISION_HISTORY_REVERSE_ORDER", True)
+    worker = worker_module.DecisionWorker()
+    client = worker.swf_client.client = MagicMock()
+
+    builder = HistoryBuilder()
+    builder.start({"order_id": "ORD-6"})
+    builder.activity("ValidateInput")
+    builder.activity("ProcessData")
+    builder.decision_started()
+    events = builder.events
+
+    newest_first = list(reversed(events))
+    task = _decision_task(newest_first[:3])
+    task["nextPageToken"] = "reverse-page-2"
+    client.poll_for_decision_task.return_value = {"events": newest_first[3:]}
+    client.get_workflow_execution_history.side_effect = [
+        {"events": events[:5], "nextPageToken": "forward-page-2"},
+        {"events": events[5:]},
+    ]
+
+    worker.handle_decision_task(task)
+
+    calls = client.get_workflow_execution_history.call_args_list
+    assert [call.kwargs["reverseOrder"] for call in calls] == [False, False]
+    assert calls[1].kwargs["nextPageToken"] == "forward-page-2"
+    # As páginas em ordem reversa nunca são buscadas
+    client.poll_for_decision_task.assert_not_called()
+    assert _scheduled_names(client) == ["EnrichData"]
+
+
+class _FakeLambdaContext:
+    """Contexto do Lambda cujo tempo restante cai a cada consulta."""
+
+    def __init__(self, remaining_ms, step_ms):
+        self.remaining_ms = remaining_ms
+        self.step_ms = step_ms
+
+    def get_remaining_time_in_millis(self):
+        self.remaining_ms -= self.step_ms
+        return self.remaining_ms
+
+
+def test_lambda_handler_drena_ate_poll_vazio_e_reusa_worker(worker_module):
+    import swf_client
+
+    client = MagicMock()
+    builder = HistoryBuilder()
+    builder.start({"order_id": "ORD-1"})
+    builder.decision_started()
+    task = _decision_task(list(builder.events))
+    client.poll_for_decision_task.side_effect = [task, task, {"taskToken": ""}] * 2
+    swf_client.set_client_factory(lambda: client)
+
+    result = worker_module.lambda_handler({}, _FakeLambdaContext(300_000, 1_000))
+    worker = worker_module._lambda_worker
+    worker_module.lambda_handler({}, _FakeLambdaContext(300_000, 1_000))
+
+    assert result == {"processed": 2, "stopped": "empty"}
+    assert worker_module._lambda_worker is worker
+    assert client.respond_decision_task_completed.call_count == 4
+
+
+def test_lambda_handler_para_quando_tempo_nao_comporta_outra_tarefa(worker_module):
+    import swf_client
+
+    client = MagicMock()
+    builder = HistoryBuilder()
+    builder.start({"order_id": "ORD-1"})
+    builder.decision_started()
+    client.poll_for_decision_task.return_value = _decision_task(list(builder.events))
+    swf_client.set_client_factory(lambda: client)
+
+    # Consultas veem 300s, 240s, 180s, 120s, 60s; reserva padrão de 100s (70 + 30)
+    result = worker_module.lambda_handler({}, _FakeLambdaContext(360_000, 60_000))
+
+    assert result == {"processed": 4, "stopped": "time"}
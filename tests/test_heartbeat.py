@@ -0,0 +1,93 @@
+"""Testes dos heartbeats automáticos e do cancelamento cooperativo."""
+
+from __future__ import annotations
+
+import json
+import time
+from unittest.mock import MagicMock
+
+import pytest
+
+from heartbeat import (
+    ActivityCancelled,
+    HeartbeatManager,
+    cancel_requested,
+    current_activity_context,
+    record_progress,
+)
+
+
+def _swf_client():
+    swf_client = MagicMock()
+    swf_client.client.record_activity_task_heartbeat.return_value = {"cancelRequested": False}
+    return swf_client
+
+
+def test_sweep_envia_apenas_heartbeats_vencidos_e_agrupa_progresso():
+    swf_client = _swf_client()
+    manager = HeartbeatManager(swf_client, interval=60, min_interval=0)
+
+    with manager.track("tok-a", "A"), manager.track("tok-b", "B") as context_b:
+        assert manager.sweep() == 0  # Recém iniciadas: nada vencido
+
+        context_b.record_progress({"step": 1})
+        context_b.record_progress({"step": 2})
+        assert manager.sweep() == 1
+
+    call = swf_client.client.record_activity_task_heartbeat.call_args.kwargs
+    assert call == {"taskToken": "tok-b", "details": json.dumps({"step": 2})}
+
+
+def test_thread_de_fundo_envia_heartbeat_e_propaga_cancelamento():
+    swf_client = _swf_client()
+    swf_client.client.record_activity_task_heartbeat.return_value = {"cancelRequested": True}
+    manager = HeartbeatManager(swf_client, interval=0.02, min_interval=0.01)
+
+    try:
+        with manager.track("tok-c", "C"):
+            deadline = time.monotonic() + 2
+            while not cancel_requested() and time.monotonic() < deadline:
+                time.sleep(0.01)
+            assert cancel_requested()
+    finally:
+        manager.stop()
+
+    assert manager.heartbeats_sent >= 1
+    assert current_activity_context() is None
+
+
+def test_record_progress_fora_de_handler_e_ignorado():
+    record_progress({"ignored": True})
+    assert not cancel_requested()
+
+
+@pytest.fixture
+def worker_module():
+    import importlib
+
+    import activity_worker
+    import config
+    import swf_client
+
+    importlib.reload(config)
+    importlib.reload(swf_client)
+    importlib.reload(activity_worker)
+    return activity_worker
+
+
+def test_handler_cancelado_responde_activity_task_canceled(worker_module):
+    worker = worker_module.ActivityWorker()
+    worker.swf_client.client = MagicMock()
+
+    def cancellable(_input):
+        assert current_activity_context().task_token == "tok-x"
+        raise ActivityCancelled("stopped early")
+
+    worker.activities["Cancellable"] = cancellable
+    worker.handle_activity_task(
+        {"taskToken": "tok-x", "activityType": {"name": "Cancellable"}, "input": "{}"}
+    )
+
+    kwargs = worker.swf_client.client.respond_activity_task_canceled.call_args.kwargs
+    assert kwargs == {"taskToken": "tok-x", "details": "stopped early"}
+    worker.swf_client.client.respond_activity_task_failed.assert_not_called()
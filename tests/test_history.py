@@ -0,0 +1,57 @@
+"""Testes do replay indexado do histórico de eventos."""
+
+from __future__ import annotations
+
+import json
+
+from benchmarks.histories import HistoryBuilder, linear_history
+from history import HistoryReplayer, replay_history
+
+
+def test_replay_resolve_conclusao_falha_e_timeout_pelo_indice():
+    builder = HistoryBuilder()
+    builder.start({"order_id": "ORD-1"})
+    builder.activity("ValidateInput", result={"status": "validated"})
+    builder.activity("ProcessData", outcome="failed")
+    builder.activity("ProcessData", outcome="timed_out")
+    builder.add("MarkerRecorded", markerName="ROLLBACK_INITIATED", details=json.dumps({"x": 1}))
+
+    state = replay_history(builder.events)
+
+    assert state["workflow_input"] == {"order_id": "ORD-1"}
+    assert state["completed_activities"] == ["ValidateInput"]
+    assert state["activity_results"]["ValidateInput"] == {"status": "validated"}
+    assert state["failed_activities"] == ["ProcessData"]
+    assert state["retry_count"] == {"ProcessData": 2}  # Timeout também consome tentativa
+    assert state["timed_out_activities"] == ["ProcessData"]
+    assert state["activity_status"] == {"ValidateInput": "completed", "ProcessData": "timed_out"}
+    assert state["markers"]["ROLLBACK_INITIATED"] == {"x": 1}
+
+
+def test_replay_registra_ultimo_event_id():
+    events = linear_history(50)
+    replayer = HistoryReplayer()
+    replayer.replay(events)
+
+    assert replayer.last_event_id == events[-1]["eventId"]
+
+
+def test_analyze_events_usa_replay_indexado(monkeypatch):
+    import decision_worker
+
+    worker = decision_worker.DecisionWorker()
+    events = linear_history(200)
+
+    assert worker.analyze_events(events) == replay_history(events, worker.plan)
+
+
+def test_activity_status_acompanha_atividades_em_aberto():
+    builder = HistoryBuilder()
+    builder.start({"order_id": "ORD-1"})
+    process = builder.schedule("ProcessData")
+    builder.schedule("EnrichData")
+    builder.close(process)
+
+    state = replay_history(builder.events)
+
+    assert state["activity_status"] == {"ProcessData": "completed", "EnrichData": "scheduled"}
@@ -0,0 +1,113 @@
+"""Testes da leitura em streaming do histórico e do cache em disco."""
+
+from __future__ import annotations
+
+import os
+from datetime import datetime
+
+import pytest
+
+
+@pytest.fixture
+def setup(tmp_path):
+    import importlib
+
+    import config
+    import history_cache
+    import swf_client
+    import swf_simulator
+    import workflow_starter
+
+    for module in (config, history_cache, swf_client, swf_simulator, workflow_starter):
+        importlib.reload(module)
+    cache = history_cache.HistoryCache(str(tmp_path), max_bytes=1 << 20)
+    history_cache.set_history_cache(cache)
+    simulator = swf_simulator.install(poll_timeout=0)
+    yield simulator, cache, workflow_starter.WorkflowStarter()
+    swf_simulator.uninstall()
+    history_cache.set_history_cache(None)
+
+
+def _closed_run(simulator, starter, order_id="ORD-1"):
+    result = starter.start_workflow({"order_id": order_id})
+    starter.terminate_workflow(result["workflow_id"], result["run_id"])
+    return result["workflow_id"], result["run_id"]
+
+
+def test_historico_encerrado_relido_do_disco_sem_chamadas(setup):
+    simulator, cache, starter = setup
+    workflow_id, run_id = _closed_run(simulator, starter)
+
+    events = list(starter.iter_workflow_history(workflow_id, run_id, page_size=1))
+    api_calls = simulator.calls["GetWorkflowExecutionHistory"]
+    cached = list(starter.iter_workflow_history(workflow_id, run_id))
+    reverse = list(starter.iter_workflow_history(workflow_id, run_id, reverse_order=True))
+
+    assert [e["eventType"] for e in events] == [
+        "WorkflowExecutionStarted",
+        "DecisionTaskScheduled",
+        "WorkflowExecutionTerminated",
+    ]
+    assert api_calls == 3
+    assert simulator.calls["GetWorkflowExecutionHistory"] == 3
+    assert cached == events
+    assert reverse == events[::-1]
+    assert isinstance(cached[0]["eventTimestamp"], datetime)
+    assert starter.get_workflow_history(workflow_id, run_id) == events
+    assert (cache.hits, cache.misses) == (3, 1)
+
+
+def test_leitura_inversa_pela_api_e_gravada_no_cache(setup):
+    simulator, cache, starter = setup
+    workflow_id, run_id = _closed_run(simulator, starter)
+
+    reverse = list(starter.iter_workflow_history(workflow_id, run_id, reverse_order=True))
+    forward = list(starter.iter_workflow_history(workflow_id, run_id))
+
+    assert reverse[0]["eventType"] == "WorkflowExecutionTerminated"
+    assert forward == reverse[::-1]
+    assert simulator.calls["GetWorkflowExecutionHistory"] == 1
+
+
+def test_execucao_aberta_ou_leitura_interrompida_nao_gravam(setup):
+    simulator, cache, starter = setup
+    started = starter.start_workflow({"order_id": "ORD-1"})
+    open_run = (started["workflow_id"], started["run_id"])
+    closed_run = _closed_run(simulator, starter, "ORD-2")
+
+    list(starter.iter_workflow_history(*open_run))
+    history = starter.iter_workflow_history(*closed_run, page_size=1)
+    next(history)
+    history.close()
+
+    domain = starter.swf_client.domain
+    assert (domain, *open_run) not in cache
+    assert (domain, *closed_run) not in cache
+    assert cache.size() == 0
+    assert not [name for _root, _dirs, files in os.walk(cache.root) for name in files]
+
+
+def test_remove_os_historicos_usados_ha_mais_tempo(setup):
+    simulator, cache, starter = setup
+    domain = starter.swf_client.domain
+    first = _closed_run(simulator, starter, "ORD-1")
+    second = _closed_run(simulator, starter, "ORD-2")
+    list(starter.iter_workflow_history(*first))
+    size = cache.size()
+    os.utime(cache._path(domain, *first), (1, 1))
+
+    cache.max_bytes = size + size // 2
+    list(starter.iter_workflow_history(*second))
+
+    assert (domain, *first) not in cache
+    assert (domain, *second) in cache
+    assert cache.size() <= cache.max_bytes
+
+
+def test_cache_desativado_por_config(setup, monkeypatch):
+    import history_cache
+
+    history_cache.set_history_cache(None)
+    monkeypatch.setattr(history_cache.Config, "HISTORY_CACHE_MAX_BYTES", 0)
+
+    assert history_cache.get_history_cache() is None
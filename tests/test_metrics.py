@@ -0,0 +1,236 @@
+"""Testes do registro de métricas, do cliente instrumentado e do endpoint HTTP."""
+
+from __future__ import annotations
+
+import json
+import urllib.error
+import urllib.request
+from unittest.mock import MagicMock
+
+import pytest
+from botocore.exceptions import ClientError
+
+
+@pytest.fixture
+def metrics_module(monkeypatch):
+    import importlib
+
+    import config
+    import metrics
+
+    monkeypatch.delenv("METRICS_ENABLED", raising=False)
+    importlib.reload(config)
+    importlib.reload(metrics)
+    yield metrics
+    metrics.stop_http_server()
+
+
+def test_histograma_renderiza_buckets_cumulativos(metrics_module):
+    registry = metrics_module.MetricsRegistry()
+    latency = registry.histogram("op_seconds", "Latência", ("op",), buckets=(0.1, 1.0))
+
+    for value in (0.05, 0.1, 0.5, 3.0):
+        latency.labels("poll").observe(value)
+
+    lines = registry.render().splitlines()
+    assert lines[:2] == ["# HELP op_seconds Latência", "# TYPE op_seconds histogram"]
+    assert lines[2:] == [
+        'op_seconds_bucket{op="poll",le="0.1"} 2',
+        'op_seconds_bucket{op="poll",le="1"} 3',
+        'op_seconds_bucket{op="poll",le="+Inf"} 4',
+        'op_seconds_sum{op="poll"} 3.65',
+        'op_seconds_count{op="poll"} 4',
+    ]
+
+
+def test_contador_gauge_de_funcao_e_escape_de_rotulos(metrics_module):
+    registry = metrics_module.MetricsRegistry()
+    errors = registry.counter("errors_total", "Erros", ("code",))
+    ratio = registry.gauge("ratio", "Razão")
+
+    errors.labels('a"b\\c').inc()
+    errors.labels('a"b\\c').inc(2)
+    ratio.set_function(lambda: 0.25)
+
+    text = registry.render()
+    assert 'errors_total{code="a\\"b\\\\c"} 3' in text
+    assert "ratio 0.25" in text
+    assert registry.counter("errors_total", "Erros", ("code",)) is errors
+    with pytest.raises(ValueError):
+        registry.gauge("errors_total", "Erros")
+    with pytest.raises(ValueError):
+        errors.labels("a", "b")
+
+
+def test_registro_desativado_descarta_observacoes(metrics_module):
+    registry = metrics_module.MetricsRegistry(enabled=False)
+    latency = registry.histogram("op_seconds", "Latência")
+
+    latency.observe(1.0)
+    with latency.time():
+        pass
+
+    assert "op_seconds_count" not in registry.render()
+
+
+def test_cliente_instrumentado_mede_latencia_e_erros(metrics_module):
+    client = MagicMock()
+    client.poll_for_activity_task.return_value = {"taskToken": ""}
+    client.count_pending_activity_tasks.side_effect = ClientError(
+        {"Error": {"Code": "ThrottlingException", "Message": "slow down"}},
+        "CountPendingActivityTasks",
+    )
+    instrumented = metrics_module.instrument_client(client)
+
+    assert instrumented.poll_for_activity_task(domain="d") == {"taskToken": ""}
+    with pytest.raises(ClientError):
+        instrumented.count_pending_activity_tasks(domain="d")
+
+    assert instrumented.exceptions is client.exceptions
+    assert metrics_module.instrument_client(instrumented) is instrumented
+    text = metrics_module.registry.render()
+    assert 'swf_api_call_seconds_count{operation="PollForActivityTask"} 1' in text
+    assert 'swf_api_call_seconds_count{operation="CountPendingActivityTasks"} 1' in text
+    assert (
+        'swf_api_errors_total{operation="CountPendingActivityTasks",code="ThrottlingException"} 1'
+        in text
+    )
+
+
+def test_endpoint_http_expoe_metricas(metrics_module):
+    registry = metrics_module.MetricsRegistry()
+    registry.counter("hits_total", "Acessos").inc()
+    server = metrics_module.start_http_server(0, metrics_registry=registry)
+    base = f"http://127.0.0.1:{server.server_address[1]}"
+
+    with urllib.request.urlopen(f"{base}/metrics", timeout=5) as response:
+        body = response.read().decode()
+        content_type = response.headers["Content-Type"]
+
+    assert "hits_total 1" in body
+    assert content_type == metrics_module.CONTENT_TYPE
+    assert metrics_module.start_http_server(0) is server
+    with pytest.raises(urllib.error.HTTPError):
+        urllib.request.urlopen(f"{base}/outro", timeout=5)
+
+
+def test_endpoint_so_sobe_com_porta_configurada(metrics_module, monkeypatch):
+    assert metrics_module.maybe_start_server() is None
+
+    monkeypatch.setattr(metrics_module.Config, "METRICS_PORT", 1)
+    monkeypatch.setattr(metrics_module, "start_http_server", lambda port, addr: (port, addr))
+
+    assert metrics_module.maybe_start_server() == (1, "127.0.0.1")
+
+
+def test_erros_de_coleta_e_do_endpoint_vao_para_o_log_estruturado(
+    metrics_module, monkeypatch, capsys
+):
+    import importlib
+    import io
+    import socket
+
+    import structured_log
+
+    stream = io.StringIO()
+    structured_log.configure(writer=structured_log.LogWriter(stream=stream))
+    registry = metrics_module.MetricsRegistry()
+    registry.gauge("broken", "Quebrada").set_function(lambda: 1 / 0)
+    busy = socket.socket()
+    try:
+        metrics_module.start_http_server(0, metrics_registry=registry)
+        text = registry.render()
+        metrics_module.stop_http_server()
+        busy.bind(("127.0.0.1", 0))
+        busy.listen()
+        monkeypatch.setattr(metrics_module.Config, "METRICS_PORT", busy.getsockname()[1])
+        assert metrics_module.maybe_start_server() is None
+    finally:
+        busy.close()
+        structured_log.flush()
+        structured_log.shutdown()
+        importlib.reload(structured_log)
+
+    assert text.splitlines() == ["# HELP broken Quebrada", "# TYPE broken gauge"]
+    lines = stream.getvalue().splitlines()
+    assert [line.split()[3] for line in lines] == [
+        "metrics_endpoint_listening",
+        "metric_collect_error",
+        "metrics_endpoint_error",
+    ]
+    assert 'metric=broken error="ZeroDivisionError: division by zero"' in lines[1]
+    assert capsys.readouterr().out == ""
+
+
+def test_poller_controller_registra_polls(metrics_module):
+    from poller_control import PollerController
+
+    controller = PollerController("activity")
+    controller.record_poll(True, wait_seconds=0.2)
+    controller.record_poll(False, wait_seconds=60)
+    controller.record_error(RuntimeError("boom"))
+
+    text = metrics_module.registry.render()
+    assert 'swf_polls_total{worker="activity",result="task"} 1' in text
+    assert 'swf_polls_total{worker="activity",result="empty"} 1' in text
+    assert 'swf_polls_total{worker="activity",result="error"} 1' in text
+    assert 'swf_poll_wait_seconds_count{worker="activity"} 2' in text
+    assert 'swf_empty_poll_ratio{worker="activity"} 0.5' in text
+
+
+def test_activity_worker_registra_desfecho_e_payloads(metrics_module):
+    import importlib
+
+    import activity_worker
+
+    importlib.reload(activity_worker)
+    worker = activity_worker.ActivityWorker(identity="metrics-test")
+    worker.swf_client.client = MagicMock()
+    payload = json.dumps({"order_id": "ORD-1"})
+
+    for task_input in (payload, json.dumps({})):
+        worker.handle_activity_task(
+            {
+                "taskToken": "tok",
+                "activityType": {"name": "ValidateInput", "version": "1.0"},
+                "input": task_input,
+            }
+        )
+    worker.heartbeats.stop()
+
+    text = metrics_module.registry.render()
+    assert 'activity_tasks_total{activity="ValidateInput",outcome="completed"} 1' in text
+    assert 'activity_tasks_total{activity="ValidateInput",outcome="failed"} 1' in text
+    assert 'activity_execution_seconds_count{activity="ValidateInput"} 2' in text
+    assert 'swf_payload_bytes_count{kind="activity_input"} 2' in text
+    assert 'swf_payload_bytes_count{kind="activity_result"} 1' in text
+
+
+def test_decision_worker_registra_tempo_e_historico(metrics_module):
+    import importlib
+
+    import decision_worker
+
+    importlib.reload(decision_worker)
+    worker = decision_worker.DecisionWorker(identity="metrics-test")
+    worker.swf_client.client = MagicMock()
+    task = {
+        "taskToken": "tok",
+        "workflowExecution": {"workflowId": "wf-1", "runId": "run-1"},
+        "events": [
+            {
+                "eventId": 1,
+                "eventType": "WorkflowExecutionStarted",
+                "workflowExecutionStartedEventAttributes": {"input": '{"order_id": "ORD-1"}'},
+            },
+            {"eventId": 2, "eventType": "DecisionTaskScheduled"},
+            {"eventId": 3, "eventType": "DecisionTaskStarted"},
+        ],
+    }
+
+    worker.handle_decision_task(task)
+
+    text = metrics_module.registry.render()
+    assert "decision_compute_seconds_count 1" in text
+    assert "decision_history_events_sum 3" in text
+    assert 'swf_payload_bytes_count{kind="schedule_input"} 1' in text
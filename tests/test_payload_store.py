@@ -0,0 +1,120 @@
+"""Testes do armazenamento externo de payloads grandes."""
+
+from __future__ import annotations
+
+import json
+from unittest.mock import MagicMock
+
+import pytest
+
+from benchmarks.histories import HistoryBuilder
+from history import replay_history
+from payload_store import (
+    LocalPayloadStore,
+    PayloadStore,
+    S3PayloadStore,
+    set_payload_store,
+)
+
+
+class _CountingBackend:
+    def __init__(self):
+        self.objects = {}
+        self.gets = 0
+
+    def put(self, key, data):
+        self.objects[key] = data
+
+    def get(self, key):
+        self.gets += 1
+        return self.objects[key]
+
+
+@pytest.fixture
+def shared_store(tmp_path):
+    store = PayloadStore(LocalPayloadStore(str(tmp_path)), threshold=100, cache_max_bytes=10_000)
+    set_payload_store(store)
+    yield store
+    set_payload_store(None)
+
+
+def test_payload_pequeno_passa_inalterado(tmp_path):
+    store = PayloadStore(LocalPayloadStore(str(tmp_path)), threshold=100, cache_max_bytes=1000)
+    assert store.dehydrate('{"a": 1}') == '{"a": 1}'
+    assert store.hydrate('{"a": 1}') == '{"a": 1}'
+
+
+def test_payload_grande_vira_referencia_por_conteudo(tmp_path):
+    store = PayloadStore(LocalPayloadStore(str(tmp_path)), threshold=100, cache_max_bytes=0)
+    payload = json.dumps({"items": list(range(100))})
+
+    reference = store.dehydrate(payload)
+
+    assert PayloadStore.is_reference(reference)
+    assert store.dehydrate(payload) == reference  # Mesmo conteúdo, mesma chave
+    assert store.hydrate(reference) == payload
+
+
+def test_cache_de_leitura_evita_buscas_repetidas():
+    backend = _CountingBackend()
+    writer = PayloadStore(backend, threshold=10, cache_max_bytes=0)
+    reference = writer.dehydrate("x" * 50)
+    reader = PayloadStore(backend, threshold=10, cache_max_bytes=1000)
+
+    for _ in range(3):
+        assert reader.hydrate(reference) == "x" * 50
+
+    assert backend.gets == 1
+
+
+def test_s3_payload_store_com_moto():
+    moto = pytest.importorskip("moto")
+    import boto3
+
+    with moto.mock_aws():
+        client = boto3.client("s3", region_name="us-east-1")
+        client.create_bucket(Bucket="payloads")
+        store = PayloadStore(
+            S3PayloadStore("payloads", prefix="p/", client=client), threshold=10, cache_max_bytes=0
+        )
+        reference = store.dehydrate("y" * 50)
+
+        keys = [o["Key"] for o in client.list_objects_v2(Bucket="payloads")["Contents"]]
+        assert keys[0].startswith("p/sha256/")
+        assert store.hydrate(reference) == "y" * 50
+
+
+def test_replay_busca_resultados_externalizados(shared_store):
+    big_result = {"status": "processed", "processed_items": list(range(200))}
+    builder = HistoryBuilder()
+    builder.start({"order_id": "ORD-1"})
+    builder.decision()
+    builder.activity("ProcessData", result=big_result)
+    event = builder.events[-1]["activityTaskCompletedEventAttributes"]
+    event["result"] = shared_store.dehydrate(event["result"])
+
+    state = replay_history(builder.events)
+
+    assert PayloadStore.is_reference(event["result"])
+    assert state["activity_results"]["ProcessData"] == big_result
+
+
+def test_activity_worker_le_input_e_externaliza_resultado(shared_store):
+    import activity_worker
+
+    worker = activity_worker.ActivityWorker()
+    worker.swf_client.client = MagicMock()
+    worker.activities["Echo"] = lambda input_data: input_data
+    big_input = {"order_id": "ORD-1", "items": ["item"] * 100}
+
+    worker.handle_activity_task(
+        {
+            "taskToken": "tok",
+            "activityType": {"name": "Echo", "version": "1.0"},
+            "input": shared_store.dehydrate(json.dumps(big_input)),
+        }
+    )
+
+    result = worker.swf_client.client.respond_activity_task_completed.call_args.kwargs["result"]
+    assert PayloadStore.is_reference(result)
+    assert json.loads(shared_store.hydrate(result)) == big_input
@@ -0,0 +1,102 @@
+"""Testes do controle adaptativo de pollers."""
+
+from __future__ import annotations
+
+import random
+import threading
+
+from botocore.exceptions import ClientError
+
+from poller_control import PollerController, backoff_delay, drain, is_throttling_error
+
+
+def _client_error(code: str) -> ClientError:
+    return ClientError({"Error": {"Code": code, "Message": code}}, "PollForActivityTask")
+
+
+def test_backoff_delay_respeita_teto_exponencial_e_limite():
+    rng = random.Random(1)
+    for attempt in range(1, 12):
+        delay = backoff_delay(attempt, base=1, cap=30, rng=rng)
+        assert 0 <= delay <= min(30, 2 ** (attempt - 1))
+
+
+def test_is_throttling_error_reconhece_codigos_do_swf():
+    assert is_throttling_error(_client_error("ThrottlingException"))
+    assert is_throttling_error(_client_error("LimitExceededFault"))
+    assert not is_throttling_error(_client_error("UnknownResourceFault"))
+    assert not is_throttling_error(RuntimeError("boom"))
+
+
+def test_throttling_reduz_alvo_de_pollers():
+    controller = PollerController("activity", min_pollers=1, max_pollers=4, rng=random.Random(0))
+    controller.target = 3
+
+    controller.record_error(_client_error("ThrottlingException"))
+
+    assert controller.target == 2
+
+
+def test_poll_vazio_de_long_poll_nao_aguarda_e_poll_rapido_aguarda_pouco():
+    controller = PollerController("activity", rng=random.Random(0))
+
+    assert controller.record_poll(False, wait_seconds=60) == 0.0
+    assert 0 <= controller.record_poll(False, wait_seconds=0.01) <= 1.0
+    assert controller.record_poll(True, wait_seconds=0.01) == 0.0
+
+
+def test_desired_pollers_cresce_com_backlog_e_diminui_com_polls_vazios():
+    pending = {"count": 50}
+    controller = PollerController(
+        "activity",
+        min_pollers=1,
+        max_pollers=8,
+        count_pending=lambda: pending["count"],
+        adjust_interval=10,
+    )
+    for _ in range(20):
+        controller.record_task_latency(2.0)
+
+    assert controller.desired_pollers(force=True) == 8
+
+    pending["count"] = 0
+    for _ in range(20):
+        controller.record_poll(False, wait_seconds=60)
+    controller.record_task_latency(0.0)
+
+    assert controller.desired_pollers(force=True) == 7  # Diminui um por ajuste
+
+
+def test_run_mantem_pollers_com_identidade_propria_ate_stop_event():
+    controller = PollerController("decision", min_pollers=2, max_pollers=2, adjust_interval=0.05)
+    stop_event = threading.Event()
+    handled = []
+    identities = set()
+
+    def poll(identity):
+        identities.add(identity)
+        return {"taskToken": "t"}
+
+    def handle(task, identity):
+        handled.append(task)
+        if len(identities) == 2 or len(handled) >= 10_000:
+            stop_event.set()
+
+    controller.run(poll, handle, "worker", stop_event)
+
+    assert identities == {"worker-poller-1", "worker-poller-2"}
+
+
+def test_drain_continua_apos_erro_ao_processar_tarefa():
+    tasks = iter(["a", "boom", "b", None])
+    handled = []
+
+    def handle(task, identity):
+        if task == "boom":
+            raise RuntimeError("history page unavailable")
+        handled.append((task, identity))
+
+    processed, stopped = drain(lambda _identity: next(tasks), handle, "w-1", lambda: 60.0, 1.0)
+
+    assert (processed, stopped) == (2, "empty")
+    assert handled == [("a", "w-1"), ("b", "w-1")]
@@ -0,0 +1,105 @@
+"""Testes da lane de processos para atividades CPU-bound."""
+
+from __future__ import annotations
+
+import json
+import os
+import time
+from unittest.mock import MagicMock
+
+import pytest
+
+from heartbeat import ActivityCancelled, HeartbeatManager, cancel_requested, record_progress
+from process_lane import ProcessLane, is_process_lane, process_lane
+
+
+def pid_task(input_data):
+    """Handler de nível de módulo (importável pelo processo filho)."""
+    return {"pid": os.getpid(), "n": input_data["n"] * 2}
+
+
+def cancellable_task(input_data):
+    """Publica progresso e espera o cancelamento repassado pelo processo pai."""
+    record_progress({"pid": os.getpid()})
+    deadline = time.monotonic() + 30
+    while not cancel_requested():
+        if time.monotonic() > deadline:
+            raise TimeoutError("cancelamento não chegou ao processo filho")
+        time.sleep(0.01)
+    raise ActivityCancelled("cancelado pelo workflow")
+
+
+def test_handler_marcado_executa_inline_quando_chamado_diretamente():
+    handler = process_lane(pid_task)
+
+    assert is_process_lane(handler)
+    assert handler({"n": 2}) == {"pid": os.getpid(), "n": 4}
+
+
+def test_lane_troca_json_e_recicla_processos():
+    lane = ProcessLane(workers=1, max_tasks_per_child=2)
+    try:
+        results = [json.loads(lane.run(pid_task, json.dumps({"n": n}))) for n in range(4)]
+    finally:
+        lane.shutdown()
+
+    assert [r["n"] for r in results] == [0, 2, 4, 6]
+    pids = [r["pid"] for r in results]
+    assert os.getpid() not in pids
+    # Um processo atende no máximo 2 tarefas antes de ser substituído
+    assert pids[0] == pids[1] and pids[2] == pids[3] and pids[1] != pids[2]
+
+
+def test_progresso_e_cancelamento_atravessam_a_lane():
+    manager = HeartbeatManager(MagicMock(), interval=60, min_interval=60)
+    lane = ProcessLane(workers=1, max_tasks_per_child=10)
+    try:
+        with manager.track("tok-c", "Cancellable") as context:
+            future = lane.submit(cancellable_task, json.dumps({}))
+            deadline = time.monotonic() + 30
+            while context._details is None and time.monotonic() < deadline:
+                lane.sync_channels()
+                time.sleep(0.01)
+            context.cancel_requested = True
+            lane.sync_channels()
+            with pytest.raises(ActivityCancelled):
+                future.result(timeout=30)
+    finally:
+        lane.shutdown()
+        manager.stop()
+
+    child_pid = json.loads(context._details)["pid"]
+    assert child_pid != os.getpid()
+
+
+def test_activity_worker_envia_handler_marcado_ao_pool():
+    import importlib
+
+    import activity_worker
+    import config
+    import swf_client
+
+    importlib.reload(config)
+    importlib.reload(swf_client)
+    importlib.reload(activity_worker)
+
+    worker = activity_worker.ActivityWorker()
+    worker.swf_client.client = MagicMock()
+    worker.process_lane = ProcessLane(workers=1, max_tasks_per_child=10)
+    worker.activities["Pid"] = process_lane(pid_task)
+
+    try:
+        worker.handle_activity_task(
+            {
+                "taskToken": "tok-p",
+                "activityType": {"name": "Pid", "version": "1.0"},
+                "input": json.dumps({"n": 21}),
+            }
+        )
+    finally:
+        worker.process_lane.shutdown()
+
+    kwargs = worker.swf_client.client.respond_activity_task_completed.call_args.kwargs
+    result = json.loads(kwargs["result"])
+    assert result["n"] == 42
+    assert result["pid"] != os.getpid()
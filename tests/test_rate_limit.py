@@ -0,0 +1,32 @@
+"""Testes do token bucket."""
+
+from __future__ import annotations
+
+import time
+
+import pytest
+
+from rate_limit import TokenBucket
+
+
+def test_rajada_inicial_e_espera_ate_proximo_token():
+    bucket = TokenBucket(rate=10, burst=3)
+
+    assert [bucket.try_acquire() for _ in range(3)] == [0.0, 0.0, 0.0]
+    wait = bucket.try_acquire()
+    assert 0 < wait <= 0.1
+
+
+def test_acquire_respeita_taxa():
+    bucket = TokenBucket(rate=50, burst=1)
+
+    started = time.monotonic()
+    for _ in range(6):
+        bucket.acquire()
+
+    assert time.monotonic() - started >= 0.09  # 5 reposições a 50/s
+
+
+def test_rate_invalido():
+    with pytest.raises(ValueError):
+        TokenBucket(rate=0)
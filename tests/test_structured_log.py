@@ -0,0 +1,161 @@
+"""Testes dos logs estruturados: formato, filtros, descartes e uso nos workers."""
+
+from __future__ import annotations
+
+import io
+import json
+from unittest.mock import MagicMock
+
+import pytest
+
+
+@pytest.fixture
+def log_module():
+    import importlib
+
+    import config
+    import structured_log
+
+    importlib.reload(config)
+    importlib.reload(structured_log)
+    yield structured_log
+    structured_log.shutdown()
+    importlib.reload(structured_log)
+
+
+@pytest.fixture
+def output(log_module):
+    stream = io.StringIO()
+    log_module.configure(
+        writer=log_module.LogWriter(stream=stream, redact_keys=frozenset({"password", "token"}))
+    )
+
+    def read():
+        assert log_module.flush()
+        return stream.getvalue()
+
+    return read
+
+
+def test_formato_texto_com_campos_e_excecao(log_module, output):
+    logger = log_module.get_logger("worker")
+
+    logger.info("activity_failed", activity="ValidateInput", error=ValueError("bad input"))
+    logger.debug("poll_empty", worker="activity")
+
+    (line,) = output().splitlines()
+    assert line.endswith(
+        'INFO    worker activity_failed activity=ValidateInput error="ValueError: bad input"'
+    )
+    assert log_module.get_logger("worker") is logger
+
+
+def test_formato_json_trunca_e_mascara_payloads(log_module):
+    stream = io.StringIO()
+    writer = log_module.LogWriter(
+        stream=stream, fmt="json", max_field_chars=40, redact_keys=frozenset({"password"})
+    )
+    log_module.configure(writer=writer, level="DEBUG")
+
+    log_module.get_logger("worker").debug(
+        "activity_input",
+        input={"user": {"password": "hunter2", "name": "ana"}, "items": list(range(50))},
+        db_password="hunter2",
+    )
+    log_module.flush()
+
+    record = json.loads(stream.getvalue())
+    assert (record["level"], record["logger"], record["event"]) == (
+        "DEBUG",
+        "worker",
+        "activity_input",
+    )
+    assert record["db_password"] == "[REDACTED]"
+    assert "hunter2" not in record["input"]
+    assert record["input"].startswith('{"user": {"password": "[REDACTED]"')
+    assert record["input"].endswith("chars)")
+    with pytest.raises(ValueError):
+        log_module.LogWriter(fmt="xml")
+
+
+def test_limite_por_evento_resumido_em_log_suppressed(log_module, output):
+    log_module.configure(rate_per_event=0.001)
+    logger = log_module.get_logger("poller")
+
+    for _ in range(5):
+        logger.info("poll_error", worker="activity")
+    logger.info("task_error", worker="activity")
+
+    lines = output().splitlines()
+    assert [line.split()[3] for line in lines] == ["poll_error", "task_error", "log_suppressed"]
+    assert lines[-1].endswith("poll_error=4")
+
+
+def test_amostragem_por_evento(log_module, output):
+    assert log_module.parse_sample_rates(" poll_empty=0.01, a=1 ") == {"poll_empty": 0.01, "a": 1.0}
+    with pytest.raises(ValueError):
+        log_module.parse_sample_rates("poll_empty")
+    log_module.configure(sample_rates={"poll_empty": 0.0})
+    logger = log_module.get_logger("poller")
+
+    for _ in range(10):
+        logger.info("poll_empty")
+    logger.info("poll_task")
+
+    assert [line.split()[3] for line in output().splitlines()] == ["poll_task"]
+
+
+def test_fila_cheia_descarta_sem_bloquear(log_module, monkeypatch):
+    stream = io.StringIO()
+    writer = log_module.LogWriter(stream=stream, queue_size=1)
+    started = writer._start
+    monkeypatch.setattr(writer, "_start", lambda: None)
+
+    for event in ("a", "b", "c"):
+        writer.submit((0.0, 20, "test", event, {}))
+    assert writer.dropped == 2
+
+    monkeypatch.setattr(writer, "_start", started)
+    writer._start()
+    writer.flush()
+    assert "queue_full=2" in stream.getvalue()
+    writer.close()
+
+
+def test_registros_dentro_de_span_levam_trace_id(log_module, output):
+    import tracing
+
+    tracing.set_tracer(tracing.SimpleTracer(lambda span: None))
+    try:
+        with tracing.span("op") as span:
+            log_module.get_logger("worker").info("inside")
+    finally:
+        tracing.set_tracer(None)
+
+    assert output().split()[-1] == f"trace_id={span.context.trace_id:032x}"
+
+
+def test_activity_worker_loga_input_mascarado_em_debug(log_module, output):
+    import importlib
+
+    import activity_worker
+
+    importlib.reload(activity_worker)
+    log_module.configure(level="DEBUG")
+    worker = activity_worker.ActivityWorker(identity="log-test")
+    worker.swf_client.client = MagicMock()
+
+    worker.handle_activity_task(
+        {
+            "taskToken": "tok",
+            "activityType": {"name": "ValidateInput", "version": "1.0"},
+            "input": json.dumps({"order_id": "ORD-1", "password": "hunter2"}),
+        }
+    )
+    worker.heartbeats.stop()
+
+    text = output()
+    assert "activity_task_received activity=ValidateInput" in text
+    assert "activity_completed activity=ValidateInput" in text
+    assert "[REDACTED]" in text
+    assert "hunter2" not in text
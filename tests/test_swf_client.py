@@ -55,3 +55,37 @@ def test_register_workflow_type_define_task_list_e_nome(swf_client_module):
     )
     config = response["configuration"]
     assert config["defaultTaskList"]["name"] == client.task_list
+
+
+def test_instancias_compartilham_cliente_criado_sob_demanda(swf_client_module):
+    created = []
+
+    def factory():
+        created.append(object())
+        return created[-1]
+
+    swf_client_module.set_client_factory(factory)
+    first = swf_client_module.SWFClient()
+    second = swf_client_module.SWFClient()
+    assert created == []  # Nada é criado no construtor
+
+    assert first.client is second.client is created[0]
+    assert len(created) == 1
+
+
+def test_client_pode_ser_substituido_por_instancia(swf_client_module):
+    swf_client_module.set_client_factory(lambda: "compartilhado")
+    client = swf_client_module.SWFClient()
+    client.client = "proprio"
+
+    assert client.client == "proprio"
+    assert swf_client_module.SWFClient().client == "compartilhado"
+
+
+def test_client_config_para_long_poll(swf_client_module, monkeypatch):
+    monkeypatch.setattr(swf_client_module.Config, "ACTIVITY_POLLERS", 40)
+    config = swf_client_module.client_config()
+
+    assert config.read_timeout > 60
+    assert config.retries["mode"] == "adaptive"
+    assert config.max_pool_connections >= 40
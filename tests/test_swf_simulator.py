@@ -0,0 +1,271 @@
+"""Testes do simulador do SWF em memória."""
+
+from __future__ import annotations
+
+import json
+
+import pytest
+
+DOMAIN = "test-domain"
+TASK_LIST = {"name": "test-task-list"}
+WORKFLOW_TYPE = {"name": "BusinessProcessWorkflow", "version": "1.0"}
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def sim_module():
+    import importlib
+
+    import config
+    import swf_client
+    import swf_simulator
+
+    importlib.reload(config)
+    importlib.reload(swf_client)
+    importlib.reload(swf_simulator)
+    yield swf_simulator
+    swf_simulator.uninstall()
+
+
+@pytest.fixture
+def workers(sim_module):
+    import importlib
+
+    import activity_worker
+    import decision_worker
+
+    importlib.reload(activity_worker)
+    importlib.reload(decision_worker)
+    simulator = sim_module.install(poll_timeout=0)
+    deciders = decision_worker.DecisionWorker(identity="decider")
+    activities = activity_worker.ActivityWorker(identity="worker")
+    return simulator, deciders, activities
+
+
+def _run_until_idle(decider, worker, max_rounds=100):
+    for _ in range(max_rounds):
+        progressed = decider.poll_once("decider")
+        progressed = worker.poll_once("worker") or progressed
+        if not progressed:
+            return
+
+
+def _start(simulator, workflow_id="wf-1", **kwargs):
+    return simulator.start_workflow_execution(
+        domain=DOMAIN,
+        workflowId=workflow_id,
+        workflowType=WORKFLOW_TYPE,
+        taskList=TASK_LIST,
+        input=json.dumps({"order_id": "ORD-1"}),
+        **kwargs,
+    )["runId"]
+
+
+def _event_types(simulator, workflow_id, run_id):
+    history = simulator.get_workflow_execution_history(
+        domain=DOMAIN, execution={"workflowId": workflow_id, "runId": run_id}
+    )
+    return [event["eventType"] for event in history["events"]]
+
+
+def test_workers_reais_concluem_workflow(workers):
+    simulator, decider, worker = workers
+    worker.activities = {name: (lambda data: {"status": "ok"}) for name in worker.activities}
+    run_id = _start(simulator)
+
+    _run_until_idle(decider, worker)
+
+    assert simulator.execution_status(DOMAIN, "wf-1", run_id) == "COMPLETED"
+    types = _event_types(simulator, "wf-1", run_id)
+    assert types.count("ActivityTaskCompleted") == 5
+    assert types[-1] == "WorkflowExecutionCompleted"
+    assert simulator.close_status_counts == {"COMPLETED": 1}
+
+
+def test_falhas_repetidas_levam_a_rollback_e_falha(workers):
+    simulator, decider, worker = workers
+
+    def fail(_data):
+        raise RuntimeError("boom")
+
+    worker.activities = {name: (lambda data: {"status": "ok"}) for name in worker.activities}
+    worker.activities["ValidateInput"] = fail
+    run_id = _start(simulator)
+
+    _run_until_idle(decider, worker)
+
+    assert simulator.execution_status(DOMAIN, "wf-1", run_id) == "FAILED"
+    assert _event_types(simulator, "wf-1", run_id).count("ActivityTaskFailed") == 3
+
+
+def test_workflow_id_em_uso_e_token_desconhecido(sim_module):
+    simulator = sim_module.SimulatedSWF(poll_timeout=0)
+    _start(simulator)
+
+    with pytest.raises(simulator.exceptions.WorkflowExecutionAlreadyStartedFault):
+        _start(simulator)
+    with pytest.raises(simulator.exceptions.UnknownResourceFault):
+        simulator.respond_activity_task_completed(taskToken="a-999", result="{}")
+
+
+def test_historico_paginado_em_ambas_as_ordens(sim_module):
+    simulator = sim_module.SimulatedSWF(poll_timeout=0)
+    run_id = _start(simulator)
+    for i in range(7):
+        simulator.signal_workflow_execution(domain=DOMAIN, workflowId="wf-1", signalName=f"S{i}")
+    full = _event_types(simulator, "wf-1", run_id)
+
+    for reverse in (False, True):
+        pages, token = [], None
+        while True:
+            page = simulator.get_workflow_execution_history(
+                domain=DOMAIN,
+                execution={"workflowId": "wf-1", "runId": run_id},
+                maximumPageSize=3,
+                reverseOrder=reverse,
+                **({"nextPageToken": token} if token else {}),
+            )
+            pages.extend(event["eventType"] for event in page["events"])
+            token = page.get("nextPageToken")
+            if not token:
+                break
+        assert pages == (full[::-1] if reverse else full)
+
+
+def test_eventos_durante_decisao_geram_nova_decision_task(sim_module):
+    simulator = sim_module.SimulatedSWF(poll_timeout=0)
+    _start(simulator)
+    task = simulator.poll_for_decision_task(domain=DOMAIN, taskList=TASK_LIST)
+    assert task["previousStartedEventId"] == 0
+    assert task["workflowType"] == WORKFLOW_TYPE
+
+    simulator.signal_workflow_execution(domain=DOMAIN, workflowId="wf-1", signalName="PING")
+    assert simulator.count_pending_decision_tasks(domain=DOMAIN, taskList=TASK_LIST)["count"] == 0
+    simulator.respond_decision_task_completed(taskToken=task["taskToken"], decisions=[])
+
+    second = simulator.poll_for_decision_task(domain=DOMAIN, taskList=TASK_LIST)
+    assert second["previousStartedEventId"] == task["startedEventId"]
+    assert "WorkflowExecutionSignaled" in [e["eventType"] for e in second["events"]]
+
+
+def _schedule(simulator, **attributes):
+    task = simulator.poll_for_decision_task(domain=DOMAIN, taskList=TASK_LIST)
+    decision = {
+        "decisionType": "ScheduleActivityTask",
+        "scheduleActivityTaskDecisionAttributes": {
+            "activityType": {"name": "ValidateInput", "version": "1.0"},
+            "activityId": "ValidateInput-1",
+            "input": "{}",
+            "taskList": TASK_LIST,
+            **attributes,
+        },
+    }
+    simulator.respond_decision_task_completed(taskToken=task["taskToken"], decisions=[decision])
+
+
+def test_heartbeat_expirado_gera_timeout_e_invalida_token(sim_module):
+    clock = FakeClock()
+    simulator = sim_module.SimulatedSWF(poll_timeout=0, clock=clock)
+    run_id = _start(simulator)
+    _schedule(simulator, heartbeatTimeout="10", startToCloseTimeout="100")
+    task = simulator.poll_for_activity_task(domain=DOMAIN, taskList=TASK_LIST)
+
+    clock.now = 8
+    assert simulator.record_activity_task_heartbeat(taskToken=task["taskToken"]) == {
+        "cancelRequested": False
+    }
+    clock.now = 15  # Dentro do prazo renovado pelo heartbeat
+    simulator.advance()
+    clock.now = 19
+    simulator.advance()
+
+    history = simulator.get_workflow_execution_history(
+        domain=DOMAIN, execution={"workflowId": "wf-1", "runId": run_id}
+    )["events"]
+    timed_out = [e for e in history if e["eventType"] == "ActivityTaskTimedOut"]
+    assert [e["activityTaskTimedOutEventAttributes"]["timeoutType"] for e in timed_out] == [
+        "HEARTBEAT"
+    ]
+    assert history[-1]["eventType"] == "DecisionTaskScheduled"
+    with pytest.raises(simulator.exceptions.UnknownResourceFault):
+        simulator.respond_activity_task_completed(taskToken=task["taskToken"], result="{}")
+
+
+def test_schedule_to_start_expira_tarefa_na_fila(sim_module):
+    clock = FakeClock()
+    simulator = sim_module.SimulatedSWF(poll_timeout=0, clock=clock)
+    run_id = _start(simulator)
+    _schedule(simulator, scheduleToStartTimeout="5")
+    assert simulator.count_pending_activity_tasks(domain=DOMAIN, taskList=TASK_LIST)["count"] == 1
+
+    clock.now = 6
+
+    assert simulator.poll_for_activity_task(domain=DOMAIN, taskList=TASK_LIST) == {
+        "startedEventId": 0
+    }
+    assert "ActivityTaskTimedOut" in _event_types(simulator, "wf-1", run_id)
+
+
+def test_timer_dispara_e_cancelamento_chega_no_heartbeat(sim_module):
+    clock = FakeClock()
+    simulator = sim_module.SimulatedSWF(poll_timeout=0, clock=clock)
+    run_id = _start(simulator)
+    _schedule(simulator)
+    activity = simulator.poll_for_activity_task(domain=DOMAIN, taskList=TASK_LIST)
+
+    simulator.signal_workflow_execution(domain=DOMAIN, workflowId="wf-1", signalName="CANCEL")
+    task = simulator.poll_for_decision_task(domain=DOMAIN, taskList=TASK_LIST)
+    simulator.respond_decision_task_completed(
+        taskToken=task["taskToken"],
+        decisions=[
+            {
+                "decisionType": "StartTimer",
+                "startTimerDecisionAttributes": {"timerId": "t1", "startToFireTimeout": "30"},
+            },
+            {
+                "decisionType": "RequestCancelActivityTask",
+                "requestCancelActivityTaskDecisionAttributes": {"activityId": "ValidateInput-1"},
+            },
+        ],
+    )
+    assert simulator.record_activity_task_heartbeat(taskToken=activity["taskToken"]) == {
+        "cancelRequested": True
+    }
+
+    clock.now = 31
+    simulator.advance()
+
+    assert _event_types(simulator, "wf-1", run_id)[-2:] == ["TimerFired", "DecisionTaskScheduled"]
+
+
+def test_registro_duplicado_usa_excecoes_do_cliente(sim_module, capsys):
+    import structured_log
+    import swf_client
+
+    sim_module.install(poll_timeout=0)
+    client = swf_client.SWFClient()
+
+    client.register_domain()
+    client.register_domain()
+    structured_log.flush()
+
+    assert "domain_exists domain=test-domain" in capsys.readouterr().out
+
+
+def test_execucoes_encerradas_descartadas_alem_do_limite(sim_module):
+    simulator = sim_module.SimulatedSWF(poll_timeout=0, retain_closed=1)
+    runs = [_start(simulator, workflow_id=f"wf-{i}") for i in range(2)]
+    for i in range(len(runs)):
+        simulator.terminate_workflow_execution(domain=DOMAIN, workflowId=f"wf-{i}")
+
+    with pytest.raises(simulator.exceptions.UnknownResourceFault):
+        simulator.execution_status(DOMAIN, "wf-0", runs[0])
+    assert simulator.execution_status(DOMAIN, "wf-1", runs[1]) == "TERMINATED"
+    assert simulator.open_execution_count() == 0
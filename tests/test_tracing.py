@@ -0,0 +1,217 @@
+"""Testes do tracing: spans, amostragem, propagação nos payloads e workers."""
+
+from __future__ import annotations
+
+import json
+import random
+
+import pytest
+
+DOMAIN = "test-domain"
+
+
+@pytest.fixture
+def tracing_module():
+    import importlib
+
+    import config
+    import tracing
+
+    importlib.reload(config)
+    importlib.reload(tracing)
+    yield tracing
+    tracing.set_tracer(None)
+
+
+@pytest.fixture
+def spans(tracing_module):
+    exported = []
+    tracing_module.set_tracer(tracing_module.SimpleTracer(exported.append, rng=random.Random(7)))
+    return exported
+
+
+def test_traceparent_ida_e_volta_e_valores_invalidos(tracing_module):
+    context = tracing_module.SpanContext(trace_id=0xABC, span_id=0x12, sampled=False)
+
+    value = context.traceparent()
+
+    assert value == f"00-{0xABC:032x}-{0x12:016x}-00"
+    assert tracing_module.SpanContext.from_traceparent(value) == context
+    for invalid in (None, "", "00-xyz-12-01", f"00-{0:032x}-{1:016x}-01"):
+        assert tracing_module.SpanContext.from_traceparent(invalid) is None
+
+
+def test_tracer_padrao_nao_registra_nem_propaga(tracing_module):
+    with tracing_module.span("op") as span:
+        assert span is tracing_module.NOOP_SPAN
+        assert tracing_module.inject({"a": 1}) == {"a": 1}
+    assert not tracing_module.is_enabled()
+    assert tracing_module.context_from_payload('{"_traceparent":"00-..."}') is None
+
+
+def test_spans_aninhados_registram_pai_e_excecao(tracing_module, spans):
+    with pytest.raises(RuntimeError):
+        with tracing_module.span("raiz", {"workflow.id": "wf-1"}):
+            with tracing_module.span("filho"):
+                pass
+            raise RuntimeError("boom")
+
+    child, root = spans
+    assert (child.name, root.name) == ("filho", "raiz")
+    assert child.parent_id == root.context.span_id
+    assert child.context.trace_id == root.context.trace_id
+    assert root.status == "error"
+    assert root.attributes == {
+        "workflow.id": "wf-1",
+        "error.type": "RuntimeError",
+        "error.message": "boom",
+    }
+    assert tracing_module.current_span() is None
+
+
+def test_amostragem_na_raiz_e_herdada_pelos_filhos(tracing_module):
+    exported = []
+    tracing_module.set_tracer(tracing_module.SimpleTracer(exported.append, sample_rate=0.0))
+
+    with tracing_module.span("raiz"):
+        payload = tracing_module.inject({"order_id": "ORD-1"})
+        with tracing_module.span("filho"):
+            pass
+    remote = tracing_module.extract(dict(payload))
+    with tracing_module.span("remoto", parent=remote):
+        pass
+
+    assert exported == []
+    assert list(payload) == ["_traceparent", "order_id"]
+    assert remote is not None and not remote.sampled
+
+
+def test_inject_extract_e_leitura_sem_deserializar(tracing_module, spans):
+    from codec import encode
+
+    with tracing_module.span("decisao") as span:
+        payload = tracing_module.inject({"_traceparent": "antigo", "order_id": "ORD-1"})
+    text = encode(payload)
+
+    assert text.startswith('{"_traceparent":"00-')
+    assert tracing_module.context_from_payload(text) == span.context
+    assert tracing_module.context_from_payload(json.dumps({"order_id": "ORD-1"})) is None
+    data = json.loads(text)
+    assert tracing_module.extract(data) == span.context
+    assert data == {"order_id": "ORD-1"}
+
+
+def test_contexto_lido_de_payload_comprimido(tracing_module, spans):
+    import codec
+
+    codec.set_codec(codec.PayloadCodec(compression="zlib", compression_min_bytes=0))
+    try:
+        with tracing_module.span("decisao") as span:
+            text = codec.encode(tracing_module.inject({"items": list(range(200))}))
+        assert not text.startswith("{")
+        assert tracing_module.context_from_payload(text) == span.context
+    finally:
+        codec.set_codec(None)
+
+
+def test_cliente_rastreado_so_cria_spans_dentro_de_um_span(tracing_module, spans):
+    class Client:
+        exceptions = object()
+
+        def count_pending_activity_tasks(self, **kwargs):
+            return {"count": 0}
+
+    client = tracing_module.trace_client(Client())
+
+    client.count_pending_activity_tasks(domain=DOMAIN)
+    assert spans == []
+    with tracing_module.span("poll"):
+        client.count_pending_activity_tasks(domain=DOMAIN)
+
+    api_span, _poll = spans
+    assert api_span.name == "SWF.CountPendingActivityTasks"
+    assert api_span.attributes["rpc.method"] == "CountPendingActivityTasks"
+    assert client.exceptions is Client.exceptions
+
+
+def test_build_tracer_conforme_config(tracing_module, monkeypatch, tmp_path):
+    monkeypatch.setattr(tracing_module.Config, "TRACING_EXPORTER", "jsonl")
+    monkeypatch.setattr(tracing_module.Config, "TRACING_JSONL_PATH", str(tmp_path / "t.jsonl"))
+    tracer = tracing_module.build_tracer()
+    tracing_module.set_tracer(tracer)
+
+    with tracing_module.span("op", {"k": "v"}):
+        pass
+    tracer.exporter.close()
+
+    (line,) = (tmp_path / "t.jsonl").read_text().splitlines()
+    assert json.loads(line)["attributes"] == {"k": "v"}
+    monkeypatch.setattr(tracing_module.Config, "TRACING_EXPORTER", "zipkin")
+    with pytest.raises(ValueError):
+        tracing_module.build_tracer()
+
+
+def test_trace_conecta_starter_decider_e_atividades(tracing_module, spans):
+    import importlib
+
+    import activity_worker
+    import decision_worker
+    import swf_client
+    import swf_simulator
+    import workflow_starter
+
+    for module in (swf_client, swf_simulator, activity_worker, decision_worker, workflow_starter):
+        importlib.reload(module)
+    simulator = swf_simulator.SimulatedSWF(poll_timeout=0)
+    swf_client.set_client_factory(lambda: tracing_module.trace_client(simulator))
+    try:
+        decider = decision_worker.DecisionWorker(identity="decider")
+        worker = activity_worker.ActivityWorker(identity="worker")
+        inputs = []
+        worker.activities = {
+            name: (lambda data: inputs.append(data) or {"status": "ok"})
+            for name in worker.activities
+        }
+        workflow_starter.WorkflowStarter().start_workflow({"order_id": "ORD-1"})
+        for _ in range(50):
+            progressed = decider.poll_once("decider")
+            if not (worker.poll_once("worker") or progressed):
+                break
+    finally:
+        swf_client.set_client_factory(None)
+
+    (root,) = [s for s in spans if s.name == "start_workflow"]
+    traced = [s for s in spans if s.context.trace_id == root.context.trace_id]
+    names = [s.name for s in traced]
+    assert names.count("handle_activity_task") == 5
+    assert names.count("handle_decision_task") >= 5
+    assert "SWF.StartWorkflowExecution" in names
+    assert "SWF.RespondActivityTaskCompleted" in names
+    by_id = {s.context.span_id: s for s in traced}
+    for span in traced:
+        if span.name == "handle_activity_task":
+            assert by_id[span.parent_id].name == "make_decisions"
+    assert all("_traceparent" not in data for data in inputs)
+    assert len(inputs) == 5
+
+
+def test_adaptador_opentelemetry(tracing_module):
+    pytest.importorskip("opentelemetry.sdk")
+    from opentelemetry.sdk.trace import TracerProvider
+    from opentelemetry.sdk.trace.export import SimpleSpanProcessor
+    from opentelemetry.sdk.trace.export.in_memory_span_exporter import InMemorySpanExporter
+
+    exporter = InMemorySpanExporter()
+    provider = TracerProvider()
+    provider.add_span_processor(SimpleSpanProcessor(exporter))
+    tracing_module.set_tracer(tracing_module.OpenTelemetryTracer(provider.get_tracer("test")))
+    remote = tracing_module.SpanContext(trace_id=0xABC, span_id=0x12)
+
+    with tracing_module.span("atividade", parent=remote):
+        with tracing_module.span("filho"):
+            pass
+
+    child, parent = exporter.get_finished_spans()
+    assert parent.context.trace_id == 0xABC
+    assert parent.parent.span_id == 0x12
+    assert child.parent.span_id == parent.context.span_id
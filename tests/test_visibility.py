@@ -0,0 +1,171 @@
+"""Testes da listagem e contagem de execuções por janelas de tempo."""
+
+from __future__ import annotations
+
+import json
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+NOW = datetime(2024, 5, 1, 12, 0, tzinfo=timezone.utc)
+WORKFLOW_TYPE = {"name": "OrderWorkflow", "version": "1.0"}
+
+
+@pytest.fixture
+def setup():
+    import importlib
+
+    import config
+    import swf_client
+    import swf_simulator
+    import visibility
+    import workflow_starter
+
+    for module in (config, swf_client, swf_simulator, visibility, workflow_starter):
+        importlib.reload(module)
+    simulator = swf_simulator.install(poll_timeout=0)
+    yield simulator, visibility, workflow_starter.WorkflowStarter()
+    swf_simulator.uninstall()
+
+
+def _start(simulator, domain, workflow_id, minutes_ago, tags=(), closed=False):
+    """Inicia uma execução com data de início ``minutes_ago`` antes de NOW."""
+    run_id = simulator.start_workflow_execution(
+        domain=domain, workflowId=workflow_id, workflowType=WORKFLOW_TYPE, tagList=list(tags)
+    )["runId"]
+    execution = simulator._executions[(domain, workflow_id, run_id)]
+    execution.events[0]["eventTimestamp"] = NOW - timedelta(minutes=minutes_ago)
+    if closed:
+        simulator.terminate_workflow_execution(domain=domain, workflowId=workflow_id, runId=run_id)
+        execution.events[-1]["eventTimestamp"] = NOW - timedelta(minutes=minutes_ago - 1)
+    return run_id
+
+
+@pytest.fixture
+def populated(setup):
+    simulator, _visibility, starter = setup
+    domain = starter.swf_client.domain
+    # 0 e 60 minutos caem exatamente nos limites das janelas de 15 minutos
+    for minutes in (0, 5, 15, 30, 45, 59, 60):
+        _start(simulator, domain, f"open-{minutes}", minutes, tags=["web"] if minutes % 2 else [])
+    _start(simulator, domain, "ORD-1", 10, tags=["web"], closed=True)
+    _start(simulator, domain, "ORD-2", 20, tags=["batch"], closed=True)
+    _start(simulator, domain, "OTHER-1", 30, tags=["web"], closed=True)
+    _start(simulator, domain, "too-old", 120, closed=True)
+    return simulator, domain, starter.visibility(concurrency=2, windows=4)
+
+
+def test_janelas_paralelas_sem_duplicar_execucoes_no_limite(populated):
+    simulator, domain, visibility = populated
+    start, end = NOW - timedelta(hours=1), NOW
+
+    open_ids = [
+        info["execution"]["workflowId"] for info in visibility.iter_executions(start, end, "open")
+    ]
+    closed = list(visibility.iter_executions(start, end, "closed"))
+
+    assert sorted(open_ids) == sorted(f"open-{m}" for m in (0, 5, 15, 30, 45, 59, 60))
+    assert sorted(info["execution"]["workflowId"] for info in closed) == [
+        "ORD-1",
+        "ORD-2",
+        "OTHER-1",
+    ]
+    assert {info["closeStatus"] for info in closed} == {"TERMINATED"}
+    assert simulator.calls["ListOpenWorkflowExecutions"] == 4
+
+
+def test_filtros_combinados_um_no_swf_e_os_demais_locais(populated):
+    simulator, domain, visibility = populated
+    start = NOW - timedelta(hours=1)
+
+    infos = list(
+        visibility.iter_executions(
+            start,
+            NOW,
+            "closed",
+            tag="web",
+            workflow_type="OrderWorkflow",
+            close_status="TERMINATED",
+            workflow_id_prefix="ORD-",
+        )
+    )
+    by_close_time = visibility.iter_executions(
+        NOW - timedelta(minutes=12), NOW, "closed", time_field="close"
+    )
+
+    assert [info["execution"]["workflowId"] for info in infos] == ["ORD-1"]
+    assert [info["execution"]["workflowId"] for info in by_close_time] == ["ORD-1"]
+    with pytest.raises(ValueError):
+        list(visibility.iter_executions(start, NOW, "open", close_status="FAILED"))
+    with pytest.raises(simulator.exceptions.ValidationException):
+        simulator.list_closed_workflow_executions(
+            domain=domain,
+            startTimeFilter={"oldestDate": start},
+            tagFilter={"tag": "web"},
+            typeFilter=WORKFLOW_TYPE,
+        )
+
+
+def test_contagem_usa_api_de_contagem_ou_conta_a_listagem(populated):
+    simulator, domain, visibility = populated
+    start = NOW - timedelta(hours=1)
+
+    by_tag = visibility.count_executions(start, NOW, "open", tag="web")
+    by_prefix = visibility.count_executions(start, NOW, "closed", workflow_id_prefix="ORD-")
+
+    assert by_tag == {"count": 4, "truncated": False}
+    assert simulator.calls["CountOpenWorkflowExecutions"] == 1
+    assert by_prefix == {"count": 2, "truncated": False}
+    assert simulator.calls["CountClosedWorkflowExecutions"] == 0
+    assert simulator.calls["ListClosedWorkflowExecutions"] == 4
+
+
+def test_paginas_throttling_erros_e_parada_antecipada(populated, monkeypatch):
+    simulator, domain, visibility = populated
+    from botocore.exceptions import ClientError
+
+    import visibility as visibility_module
+
+    monkeypatch.setattr(visibility_module.Config, "POLLER_BACKOFF_BASE", 0.0)
+    visibility.page_size = 1
+    original = simulator.list_open_workflow_executions
+    failures = iter([ClientError({"Error": {"Code": "ThrottlingException"}}, "ListOpen")])
+
+    def flaky(**kwargs):
+        error = next(failures, None)
+        if error is not None:
+            raise error
+        return original(**kwargs)
+
+    monkeypatch.setattr(simulator, "list_open_workflow_executions", flaky)
+    infos = list(visibility.iter_executions(NOW - timedelta(hours=1), NOW, "open"))
+    assert len(infos) == 7
+
+    executions = visibility.iter_executions(NOW - timedelta(hours=1), NOW, "open")
+    next(executions)
+    executions.close()
+
+    def broken(**kwargs):
+        raise simulator.exceptions.UnknownResourceFault("Unknown domain", "ListOpen")
+
+    monkeypatch.setattr(simulator, "list_open_workflow_executions", broken)
+    with pytest.raises(simulator.exceptions.UnknownResourceFault):
+        list(visibility.iter_executions(NOW - timedelta(hours=1), NOW, "open"))
+
+
+def test_cli_lista_e_conta_em_json(populated, capsys):
+    import structured_log
+    import visibility as visibility_module
+
+    window = ["--start", (NOW - timedelta(hours=1)).isoformat(), "--end", NOW.isoformat()]
+    structured_log.flush()
+    capsys.readouterr()
+
+    visibility_module.main(["list", "--status", "closed", "--type", "OrderWorkflow:1.0", *window])
+    records = [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+    visibility_module.main(["count", "--status", "closed", "--close-status", "TERMINATED", *window])
+    count = json.loads(capsys.readouterr().out)
+
+    assert sorted(record["workflow_id"] for record in records) == ["ORD-1", "ORD-2", "OTHER-1"]
+    assert all(record["run_id"] and record["close_status"] == "TERMINATED" for record in records)
+    assert count == {"count": 3, "truncated": False}
@@ -0,0 +1,143 @@
+"""Testes das definições de workflow e da projeção de inputs."""
+
+from __future__ import annotations
+
+import json
+from unittest.mock import MagicMock
+
+import pytest
+
+from history import new_workflow_state
+from workflow_definition import (
+    BUSINESS_PROCESS_WORKFLOW,
+    StepDefinition,
+    WorkflowDefinition,
+    WorkflowRegistry,
+    compile_workflow,
+    projection_report,
+)
+
+WORKFLOW_INPUT = {"order_id": "ORD-1", "customer_id": "C-1", "items": ["a", "b"], "notes": "x"}
+RESULTS = {
+    "ValidateInput": {"status": "validated"},
+    "ProcessData": {"status": "processed", "processed_items": ["a", "b"] * 100},
+    "EnrichData": {"status": "enriched"},
+}
+
+
+def test_build_input_projeta_campos_e_resultados_declarados():
+    step = StepDefinition("SaveResults", reads_results=("ProcessData",), input_fields=("order_id",))
+
+    assert step.build_input(WORKFLOW_INPUT, RESULTS) == {
+        "order_id": "ORD-1",
+        "previous_results": {"ProcessData": RESULTS["ProcessData"]},
+    }
+
+
+def test_etapa_sem_dependencias_nao_recebe_previous_results():
+    step = BUSINESS_PROCESS_WORKFLOW.step("NotifyCompletion")
+
+    assert step.build_input(WORKFLOW_INPUT, RESULTS) == {"order_id": "ORD-1", "customer_id": "C-1"}
+
+
+def test_projection_report_mostra_economia_por_etapa():
+    report = {
+        row["step"]: row
+        for row in projection_report(BUSINESS_PROCESS_WORKFLOW, WORKFLOW_INPUT, RESULTS)
+    }
+
+    assert report["NotifyCompletion"]["saved_bytes"] > 900
+    assert all(row["projected_bytes"] <= row["full_bytes"] for row in report.values())
+
+
+def test_decider_agenda_com_input_projetado():
+    import decision_worker
+
+    worker = decision_worker.DecisionWorker()
+    worker.swf_client = MagicMock()
+    state = new_workflow_state()
+    state["workflow_input"] = WORKFLOW_INPUT
+    state["activity_results"] = dict(RESULTS)
+
+    decision = worker.schedule_activity("EnrichData", state)
+    activity_input = json.loads(decision["scheduleActivityTaskDecisionAttributes"]["input"])
+
+    assert activity_input == {
+        "order_id": "ORD-1",
+        "customer_id": "C-1",
+        "previous_results": {"ValidateInput": {"status": "validated"}},
+    }
+
+
+def test_ready_steps_libera_ramos_paralelos_e_juncao():
+    ready = BUSINESS_PROCESS_WORKFLOW.ready_steps
+    assert [s.name for s in ready({})] == ["ValidateInput"]
+    assert [s.name for s in ready({"ValidateInput": "completed"})] == ["ProcessData", "EnrichData"]
+    status = {"ValidateInput": "completed", "ProcessData": "completed", "EnrichData": "scheduled"}
+    assert ready(status) == []
+
+
+@pytest.mark.parametrize(
+    "steps",
+    [
+        (StepDefinition("A", depends_on=("B",)), StepDefinition("B", depends_on=("A",))),
+        (StepDefinition("A", depends_on=("Z",)),),
+        (StepDefinition("A"), StepDefinition("B", reads_results=("A",))),
+    ],
+)
+def test_definicao_invalida(steps):
+    with pytest.raises(ValueError):
+        WorkflowDefinition("W", "1", steps)
+
+
+def test_plano_avanca_progresso_por_transicoes():
+    plan = compile_workflow(BUSINESS_PROCESS_WORKFLOW)
+    progress = plan.initial_progress()
+    assert list(progress["ready"]) == ["ValidateInput"]
+
+    plan.advance(progress, "ValidateInput", "scheduled")
+    assert progress["ready"] == {} and list(progress["open"]) == ["ValidateInput"]
+
+    plan.advance(progress, "ValidateInput", "completed")
+    assert list(progress["ready"]) == ["ProcessData", "EnrichData"]
+
+    for name in ("ProcessData", "EnrichData"):
+        plan.advance(progress, name, "scheduled")
+    plan.advance(progress, "ProcessData", "completed")
+    plan.advance(progress, "EnrichData", "timed_out")
+    assert progress["ready"] == {} and list(progress["failed"]) == ["EnrichData"]
+
+    # Retry libera a junção apenas quando o ramo finalmente conclui
+    plan.advance(progress, "EnrichData", "scheduled")
+    plan.advance(progress, "EnrichData", "completed")
+    assert progress["failed"] == {} and list(progress["ready"]) == ["SaveResults"]
+
+    # Atividades fora da definição não alteram o progresso
+    plan.advance(progress, "RollbackStep", "scheduled")
+    assert "RollbackStep" not in progress["open"]
+
+
+def test_progresso_derivado_dos_estados_equivale_ao_replay():
+    plan = compile_workflow(BUSINESS_PROCESS_WORKFLOW)
+    status = {"ValidateInput": "completed", "ProcessData": "scheduled", "EnrichData": "failed"}
+
+    progress = plan.progress_from_status(status)
+
+    assert progress["ready"] == {}
+    assert list(progress["open"]) == ["ProcessData"]
+    assert list(progress["failed"]) == ["EnrichData"]
+    assert list(progress["done"]) == ["ValidateInput"]
+    assert progress["waiting"] == {"SaveResults": 2, "NotifyCompletion": 1}
+
+
+def test_registro_compila_uma_vez_por_tipo_e_versao():
+    v2 = WorkflowDefinition("BusinessProcess", "2.0", (StepDefinition("Only"),))
+    registry = WorkflowRegistry((BUSINESS_PROCESS_WORKFLOW, v2))
+
+    plan = registry.get(BUSINESS_PROCESS_WORKFLOW.name, BUSINESS_PROCESS_WORKFLOW.version)
+    assert registry.get(BUSINESS_PROCESS_WORKFLOW.name, BUSINESS_PROCESS_WORKFLOW.version) is plan
+    task = {"workflowType": {"name": "BusinessProcess", "version": "2.0"}}
+    assert registry.for_task(task).step_names == ("Only",)
+    assert registry.for_task({}, default=plan) is plan
+    with pytest.raises(KeyError):
+        registry.get("BusinessProcess", "9.9")
@@ -0,0 +1,135 @@
+"""Testes do início de workflows em lote."""
+
+from __future__ import annotations
+
+import io
+import itertools
+import json
+from unittest.mock import MagicMock
+
+import pytest
+from botocore.exceptions import ClientError
+
+
+@pytest.fixture
+def starter_module():
+    import importlib
+
+    import config
+    import swf_client
+    import workflow_starter
+
+    importlib.reload(config)
+    importlib.reload(swf_client)
+    importlib.reload(workflow_starter)
+    return workflow_starter
+
+
+def _throttled():
+    return ClientError(
+        {"Error": {"Code": "ThrottlingException", "Message": "Rate exceeded"}},
+        "StartWorkflowExecution",
+    )
+
+
+def _starter(starter_module, side_effect):
+    starter = starter_module.WorkflowStarter()
+    starter.swf_client.client = MagicMock()
+    starter.swf_client.client.start_workflow_execution.side_effect = side_effect
+    return starter
+
+
+def test_bulk_inicia_todos_e_devolve_run_id(starter_module):
+    starter = _starter(starter_module, lambda **kwargs: {"runId": f"run-{kwargs['workflowId']}"})
+    inputs = [{"order_id": f"ORD-{i}"} for i in range(50)]
+
+    results = list(
+        starter.start_workflows_bulk(
+            inputs,
+            concurrency=4,
+            rate=1000,
+            workflow_id_for=lambda item: f"workflow-{item['order_id']}",
+        )
+    )
+
+    assert len(results) == 50
+    assert {r[1] for r in results} == {f"workflow-ORD-{i}" for i in range(50)}
+    assert all(run_id == f"run-{workflow_id}" for _, workflow_id, run_id in results)
+
+
+def test_bulk_repete_throttling_e_devolve_outros_erros(starter_module, monkeypatch):
+    monkeypatch.setattr(starter_module.time, "sleep", lambda _s: None)
+    calls = {"ORD-1": 0}
+
+    def start(**kwargs):
+        order_id = json.loads(kwargs["input"])["order_id"]
+        if order_id == "ORD-2":
+            raise ValueError("invalid input")
+        calls["ORD-1"] += 1
+        if calls["ORD-1"] < 3:
+            raise _throttled()
+        return {"runId": "run-1"}
+
+    starter = _starter(starter_module, start)
+    results = {
+        item["order_id"]: outcome
+        for item, _, outcome in starter.start_workflows_bulk(
+            [{"order_id": "ORD-1"}, {"order_id": "ORD-2"}], rate=1000, max_retries=5
+        )
+    }
+
+    assert results["ORD-1"] == "run-1"
+    assert isinstance(results["ORD-2"], ValueError)
+    assert calls["ORD-1"] == 3
+
+
+def test_bulk_consome_inputs_sob_demanda(starter_module):
+    starter = _starter(starter_module, lambda **_kwargs: {"runId": "run"})
+    consumed = []
+
+    def inputs():
+        for i in itertools.count():
+            consumed.append(i)
+            yield {"order_id": i}
+
+    results = starter.start_workflows_bulk(inputs(), concurrency=2, rate=1000)
+    first = list(itertools.islice(results, 3))
+
+    assert len(first) == 3
+    assert len(consumed) <= 3 + 2 * 2 + 1
+
+
+def test_cli_bulk_le_jsonl(starter_module, monkeypatch, capsys):
+    lines = "\n".join(json.dumps({"order_id": f"ORD-{i}"}) for i in range(3)) + "\n"
+    monkeypatch.setattr(starter_module.sys, "stdin", io.StringIO(lines))
+    client = MagicMock()
+    client.start_workflow_execution.return_value = {"runId": "run"}
+    import swf_client
+
+    swf_client.set_client_factory(lambda: client)
+
+    exit_code = starter_module.main(["--bulk", "-", "--id-field", "order_id", "--rate", "1000"])
+
+    output = [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+    assert exit_code == 0
+    assert sorted(r["workflow_id"] for r in output) == [
+        "workflow-ORD-0",
+        "workflow-ORD-1",
+        "workflow-ORD-2",
+    ]
+
+
+def test_sinal_usa_o_codec_de_payloads(starter_module):
+    import codec
+
+    starter = _starter(starter_module, None)
+    codec.set_codec(codec.PayloadCodec(compression="zlib", compression_min_bytes=10))
+    try:
+        payload = {"step": "ProcessData", "note": "x" * 200}
+        starter.signal_workflow("wf-1", "run-1", "RESUME_FROM_STEP", payload)
+    finally:
+        codec.set_codec(None)
+
+    sent = starter.swf_client.client.signal_workflow_execution.call_args.kwargs["input"]
+    assert sent.startswith("~zlib:")
+    assert codec.decode(sent) == payload
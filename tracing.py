@@ -0,0 +1,612 @@
+"""
+Tracing distribuído do starter, do decider e das atividades.
+
+A interface não depende de bibliotecas externas: ``span(nome)`` abre um
+span filho do span corrente (guardado em um ``ContextVar``) e o encerra ao
+sair do bloco. O tracer do processo vem de ``TRACING_EXPORTER``:
+
+- ``none`` (padrão): ``Tracer`` sem efeito; ``span`` devolve um span vazio
+  e nada é propagado nos payloads
+- ``jsonl``: ``SimpleTracer`` grava os spans amostrados, um JSON por linha,
+  em ``TRACING_JSONL_PATH``
+- ``otel``: ``OpenTelemetryTracer`` repassa os spans ao OpenTelemetry
+  configurado no processo (extra ``otel``; a amostragem fica a cargo do
+  SDK)
+
+O contexto atravessa processos dentro dos próprios payloads: ``inject``
+adiciona o campo ``_traceparent`` (formato W3C ``traceparent``) como
+primeira chave do input do workflow e de cada atividade, e ``extract`` o
+remove antes que handlers e projeções de input o vejam. Por ser a primeira
+chave, ``context_from_payload`` lê o contexto de um payload serializado
+sem deserializá-lo.
+
+A amostragem é decidida na raiz do trace (``TRACING_SAMPLE_RATE``) e
+herdada pelos filhos, inclusive em outros processos: traces não amostrados
+propagam apenas o contexto, sem gerar nem exportar spans.
+"""
+
+from __future__ import annotations
+
+import contextlib
+import contextvars
+import json
+import random
+import threading
+import time
+from collections.abc import Iterator
+from dataclasses import dataclass
+from typing import Any, Callable
+
+from codec import decode
+from config import Config
+from payload_store import hydrate
+
+# Campo dos payloads que carrega o contexto de trace
+TRACE_FIELD = "_traceparent"
+_TRACE_PREFIX = f'{{"{TRACE_FIELD}":"'
+_TRACEPARENT_LENGTH = 55  # 00-<32 hex>-<16 hex>-<2 hex>
+
+
+@dataclass(frozen=True)
+class SpanContext:
+    """
+    Identificadores de um span, propagáveis entre processos.
+
+    Atributos:
+        trace_id (int): Identificador do trace (128 bits)
+        span_id (int): Identificador do span (64 bits)
+        sampled (bool): Se o trace foi amostrado na raiz
+    """
+
+    trace_id: int
+    span_id: int
+    sampled: bool = True
+
+    def traceparent(self) -> str:
+        """Contexto no formato W3C ``traceparent``."""
+        return f"00-{self.trace_id:032x}-{self.span_id:016x}-{'01' if self.sampled else '00'}"
+
+    @classmethod
+    def from_traceparent(cls, value: Any) -> SpanContext | None:
+        """
+        Lê um ``traceparent``.
+
+        Args:
+            value: Texto no formato W3C
+
+        Returns:
+            SpanContext | None: Contexto, ou None se o valor é inválido
+        """
+        if not isinstance(value, str):
+            return None
+        parts = value.split("-")
+        if len(parts) != 4 or len(parts[1]) != 32 or len(parts[2]) != 16:
+            return None
+        try:
+            trace_id, span_id, flags = int(parts[1], 16), int(parts[2], 16), int(parts[3], 16)
+        except ValueError:
+            return None
+        if not trace_id or not span_id:
+            return None
+        return cls(trace_id, span_id, bool(flags & 1))
+
+
+class NonRecordingSpan:
+    """Span que só carrega contexto: sem tracer ativo ou fora da amostra."""
+
+    __slots__ = ("context",)
+
+    is_recording = False
+
+    def __init__(self, context: SpanContext | None):
+        self.context = context
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        pass
+
+    def record_exception(self, error: BaseException) -> None:
+        pass
+
+    def end(self, end_time: int | None = None) -> None:
+        pass
+
+
+NOOP_SPAN = NonRecordingSpan(None)
+
+
+class Span:
+    """Span registrado pelo ``SimpleTracer``; exportado ao terminar."""
+
+    __slots__ = (
+        "name",
+        "context",
+        "parent_id",
+        "attributes",
+        "start_time",
+        "end_time",
+        "status",
+        "_export",
+    )
+
+    is_recording = True
+
+    def __init__(
+        self,
+        name: str,
+        context: SpanContext,
+        parent_id: int | None,
+        attributes: dict[str, Any] | None,
+        start_time: int,
+        export: Callable[[Span], None],
+    ):
+        self.name = name
+        self.context = context
+        self.parent_id = parent_id
+        self.attributes = dict(attributes) if attributes else {}
+        self.start_time = start_time
+        self.end_time: int | None = None
+        self.status = "ok"
+        self._export = export
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        self.attributes[key] = value
+
+    def record_exception(self, error: BaseException) -> None:
+        """Marca o span com erro e guarda o tipo e a mensagem da exceção."""
+        self.status = "error"
+        self.attributes["error.type"] = type(error).__name__
+        self.attributes["error.message"] = str(error)[:256]
+
+    def end(self, end_time: int | None = None) -> None:
+        """Encerra o span (uma única vez) e o entrega ao exportador."""
+        if self.end_time is not None:
+            return
+        self.end_time = end_time or time.time_ns()
+        self._export(self)
+
+    def to_dict(self) -> dict[str, Any]:
+        """Representação serializável em JSON."""
+        return {
+            "name": self.name,
+            "trace_id": f"{self.context.trace_id:032x}",
+            "span_id": f"{self.context.span_id:016x}",
+            "parent_id": f"{self.parent_id:016x}" if self.parent_id else None,
+            "start_time": self.start_time,
+            "end_time": self.end_time,
+            "duration_ms": ((self.end_time or self.start_time) - self.start_time) / 1e6,
+            "status": self.status,
+            "attributes": self.attributes,
+        }
+
+
+# Pai de um span: span local, ``SpanContext`` remoto ou None (raiz)
+Parent = Any
+
+
+class Tracer:
+    """
+    Interface dos tracers; esta implementação não registra nada.
+
+    Implementações devolvem, em ``start_span``, objetos com ``context``
+    (``SpanContext`` ou None), ``set_attribute``, ``record_exception`` e
+    ``end``.
+    """
+
+    def start_span(
+        self,
+        name: str,
+        parent: Parent = None,
+        attributes: dict[str, Any] | None = None,
+        start_time: int | None = None,
+    ) -> Any:
+        """
+        Inicia um span.
+
+        Args:
+            name (str): Nome da operação
+            parent: Span local ou ``SpanContext`` remoto (None: raiz)
+            attributes (dict): Atributos iniciais
+            start_time (int): Início em ns desde a época (padrão: agora)
+
+        Returns:
+            Span iniciado (encerrado por quem chamou, com ``end``)
+        """
+        return NOOP_SPAN
+
+
+class SimpleTracer(Tracer):
+    """Tracer embutido: amostragem na raiz e exportação por função."""
+
+    def __init__(
+        self,
+        exporter: Callable[[Span], None],
+        sample_rate: float = 1.0,
+        rng: random.Random | None = None,
+    ):
+        """
+        Args:
+            exporter (callable): Recebe cada span amostrado ao terminar
+            sample_rate (float): Fração dos traces novos amostrados (0 a 1)
+            rng (random.Random): Gerador dos identificadores e da amostragem
+        """
+        self.exporter = exporter
+        self.sample_rate = sample_rate
+        self._rng = rng or random.Random()
+
+    def start_span(self, name, parent=None, attributes=None, start_time=None):
+        parent_context = getattr(parent, "context", parent)
+        if parent_context is None:
+            sampled = self.sample_rate >= 1 or self._rng.random() < self.sample_rate
+            trace_id = self._rng.getrandbits(128) or 1
+            if not sampled:
+                return NonRecordingSpan(SpanContext(trace_id, self._new_span_id(), False))
+            parent_id = None
+        else:
+            if not parent_context.sampled:
+                # Filhos de um trace fora da amostra reaproveitam o contexto
+                return NonRecordingSpan(parent_context)
+            trace_id, parent_id = parent_context.trace_id, parent_context.span_id
+        return Span(
+            name,
+            SpanContext(trace_id, self._new_span_id()),
+            parent_id,
+            attributes,
+            start_time or time.time_ns(),
+            self.exporter,
+        )
+
+    def _new_span_id(self) -> int:
+        return self._rng.getrandbits(64) or 1
+
+
+class JsonlExporter:
+    """Grava cada span como uma linha JSON em um arquivo."""
+
+    def __init__(self, path: str):
+        """
+        Args:
+            path (str): Arquivo de saída (aberto em modo append no primeiro span)
+        """
+        self.path = path
+        self._file = None
+        self._lock = threading.Lock()
+
+    def __call__(self, span: Span) -> None:
+        line = json.dumps(span.to_dict(), default=str)
+        with self._lock:
+            if self._file is None:
+                self._file = open(self.path, "a", encoding="utf-8", buffering=1)
+            self._file.write(line + "\n")
+
+    def close(self) -> None:
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+
+class _OpenTelemetrySpan:
+    """Adapta um span do OpenTelemetry à interface deste módulo."""
+
+    __slots__ = ("_span", "_trace")
+
+    is_recording = True
+
+    def __init__(self, span: Any, trace_api: Any):
+        self._span = span
+        self._trace = trace_api
+
+    @property
+    def context(self) -> SpanContext | None:
+        context = self._span.get_span_context()
+        if not context.is_valid:
+            return None
+        return SpanContext(context.trace_id, context.span_id, context.trace_flags.sampled)
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        self._span.set_attribute(key, value)
+
+    def record_exception(self, error: BaseException) -> None:
+        self._span.record_exception(error)
+        self._span.set_status(self._trace.Status(self._trace.StatusCode.ERROR, str(error)[:256]))
+
+    def end(self, end_time: int | None = None) -> None:
+        self._span.end(end_time)
+
+
+class OpenTelemetryTracer(Tracer):
+    """
+    Repassa os spans ao OpenTelemetry (pacote ``opentelemetry-api``).
+
+    Exportação e amostragem seguem o ``TracerProvider`` configurado no
+    processo; sem SDK configurado, a API do OpenTelemetry não registra nada.
+    """
+
+    def __init__(self, tracer: Any = None):
+        """
+        Args:
+            tracer: Tracer do OpenTelemetry (padrão: ``trace.get_tracer("poc-swfaws")``)
+
+        Raises:
+            ImportError: Se o OpenTelemetry não estiver instalado
+        """
+        try:
+            from opentelemetry import context as otel_context
+            from opentelemetry import trace
+        except ImportError as e:
+            raise ImportError(
+                "TRACING_EXPORTER=otel requires the 'opentelemetry-api' package"
+            ) from e
+        self._trace = trace
+        self._empty_context = otel_context.Context()
+        self._tracer = tracer or trace.get_tracer("poc-swfaws")
+
+    def start_span(self, name, parent=None, attributes=None, start_time=None):
+        if isinstance(parent, _OpenTelemetrySpan):
+            context = self._trace.set_span_in_context(parent._span)
+        elif getattr(parent, "context", parent) is not None:
+            remote = getattr(parent, "context", parent)
+            otel_parent = self._trace.NonRecordingSpan(
+                self._trace.SpanContext(
+                    remote.trace_id,
+                    remote.span_id,
+                    is_remote=True,
+                    trace_flags=self._trace.TraceFlags(1 if remote.sampled else 0),
+                )
+            )
+            context = self._trace.set_span_in_context(otel_parent)
+        else:
+            # Raiz explícita: ignora o contexto implícito do OpenTelemetry
+            context = self._empty_context
+        span = self._tracer.start_span(
+            name, context=context, attributes=attributes, start_time=start_time
+        )
+        return _OpenTelemetrySpan(span, self._trace)
+
+
+# ========== Tracer do processo e span corrente ==========
+
+_current_span: contextvars.ContextVar[Any] = contextvars.ContextVar("current_span", default=None)
+_tracer: Tracer | None = None
+_tracer_lock = threading.Lock()
+
+
+def build_tracer() -> Tracer:
+    """
+    Cria o tracer descrito pelo Config.
+
+    Returns:
+        Tracer: Conforme ``TRACING_EXPORTER`` (``none``, ``jsonl`` ou ``otel``)
+
+    Raises:
+        ValueError: Se o exportador é desconhecido
+    """
+    exporter = Config.TRACING_EXPORTER
+    if exporter == "none":
+        return Tracer()
+    if exporter == "jsonl":
+        return SimpleTracer(JsonlExporter(Config.TRACING_JSONL_PATH), Config.TRACING_SAMPLE_RATE)
+    if exporter == "otel":
+        return OpenTelemetryTracer()
+    raise ValueError(f"Unknown TRACING_EXPORTER '{exporter}'")
+
+
+def get_tracer() -> Tracer:
+    """Tracer do processo, criado a partir do Config no primeiro uso."""
+    global _tracer
+    if _tracer is None:
+        with _tracer_lock:
+            if _tracer is None:
+                _tracer = build_tracer()
+    return _tracer
+
+
+def set_tracer(tracer: Tracer | None) -> None:
+    """
+    Substitui o tracer do processo.
+
+    Args:
+        tracer (Tracer): Novo tracer; None volta a criá-lo a partir do Config
+    """
+    global _tracer
+    with _tracer_lock:
+        _tracer = tracer
+
+
+def is_enabled() -> bool:
+    """Indica se há um tracer que registra spans (diferente do ``Tracer`` vazio)."""
+    return type(get_tracer()) is not Tracer
+
+
+def current_span() -> Any:
+    """Span corrente do contexto, ou None."""
+    return _current_span.get()
+
+
+def now() -> int:
+    """Instante atual em ns desde a época (para ``start_time``)."""
+    return time.time_ns()
+
+
+@contextlib.contextmanager
+def span(
+    name: str,
+    attributes: dict[str, Any] | None = None,
+    parent: Parent = None,
+    start_time: int | None = None,
+) -> Iterator[Any]:
+    """
+    Abre um span durante o bloco ``with`` e o torna o span corrente.
+
+    Exceções que escapam do bloco são registradas no span antes de
+    propagarem.
+
+    Args:
+        name (str): Nome da operação
+        attributes (dict): Atributos iniciais
+        parent: Span ou ``SpanContext`` pai (padrão: o span corrente)
+        start_time (int): Início em ns (para spans abertos depois do início real)
+
+    Yields:
+        Span aberto (``set_attribute``, ``record_exception``)
+    """
+    tracer = get_tracer()
+    if type(tracer) is Tracer:
+        yield NOOP_SPAN
+        return
+    opened = tracer.start_span(
+        name, parent if parent is not None else _current_span.get(), attributes, start_time
+    )
+    token = _current_span.set(opened)
+    try:
+        yield opened
+    except BaseException as e:
+        opened.record_exception(e)
+        raise
+    finally:
+        _current_span.reset(token)
+        opened.end()
+
+
+def record_span(name: str, start_time: int, attributes: dict[str, Any] | None = None) -> None:
+    """
+    Registra um span filho do corrente que já terminou (de ``start_time`` até agora).
+
+    Args:
+        name (str): Nome da operação
+        start_time (int): Início em ns desde a época
+        attributes (dict): Atributos
+    """
+    parent = _current_span.get()
+    if parent is None:
+        return
+    get_tracer().start_span(name, parent, attributes, start_time).end()
+
+
+# ========== Propagação nos payloads ==========
+
+
+def inject(payload: Any) -> Any:
+    """
+    Adiciona o contexto do span corrente a um payload.
+
+    Args:
+        payload: Input do workflow ou da atividade
+
+    Returns:
+        Cópia do dict com ``_traceparent`` como primeira chave, ou o próprio
+        payload se não há span corrente ou ele não é um dict
+    """
+    current = _current_span.get()
+    if current is None or not isinstance(payload, dict):
+        return payload
+    context = current.context
+    if context is None:
+        return payload
+    if TRACE_FIELD in payload:
+        payload = {key: value for key, value in payload.items() if key != TRACE_FIELD}
+    return {TRACE_FIELD: context.traceparent(), **payload}
+
+
+def extract(payload: Any) -> SpanContext | None:
+    """
+    Remove o contexto de trace de um payload deserializado.
+
+    Args:
+        payload: Input deserializado (alterado no lugar)
+
+    Returns:
+        SpanContext | None: Contexto propagado, se houver
+    """
+    if not isinstance(payload, dict) or TRACE_FIELD not in payload:
+        return None
+    return SpanContext.from_traceparent(payload.pop(TRACE_FIELD))
+
+
+def context_from_payload(text: str | None) -> SpanContext | None:
+    """
+    Lê o contexto de trace de um payload serializado.
+
+    Sem tracer ativo, retorna None sem tocar no payload. O contexto é
+    lido do prefixo do JSON; payloads comprimidos são deserializados.
+
+    Args:
+        text (str): Payload como recebido do SWF (pode ser referência do payload_store)
+
+    Returns:
+        SpanContext | None: Contexto propagado, se houver
+    """
+    if not text or not is_enabled():
+        return None
+    raw = hydrate(text)
+    if raw.startswith(_TRACE_PREFIX):
+        start = len(_TRACE_PREFIX)
+        return SpanContext.from_traceparent(raw[start : start + _TRACEPARENT_LENGTH])
+    if raw.startswith("{"):
+        return None  # JSON sem o campo na primeira posição
+    try:
+        return extract(decode(raw))
+    except Exception:
+        return None
+
+
+# ========== Cliente SWF com spans por chamada ==========
+
+
+def operation_name(method_name: str) -> str:
+    """Nome da operação da API a partir do método do boto3 (``poll_for_decision_task``)."""
+    return "".join(part.title() for part in method_name.split("_"))
+
+
+class TracedClient:
+    """
+    Proxy de um cliente SWF que abre um span por chamada à API.
+
+    Só chamadas feitas dentro de um span geram spans (poll, início de
+    workflow, respostas): heartbeats em lote e contagens de backlog não
+    criam traces próprios.
+    """
+
+    _PASSTHROUGH = frozenset({"exceptions", "meta", "can_paginate", "get_paginator", "get_waiter"})
+
+    def __init__(self, client: Any):
+        """
+        Args:
+            client: Cliente boto3 do SWF ou compatível
+        """
+        self._client = client
+
+    def __getattr__(self, name: str) -> Any:
+        attribute = getattr(self._client, name)
+        if name.startswith("_") or name in self._PASSTHROUGH or not callable(attribute):
+            return attribute
+        wrapped = self._wrap(operation_name(name), attribute)
+        self.__dict__[name] = wrapped
+        return wrapped
+
+    @staticmethod
+    def _wrap(operation: str, method: Callable[..., Any]) -> Callable[..., Any]:
+        attributes = {"rpc.system": "aws-api", "rpc.service": "SWF", "rpc.method": operation}
+
+        def call(*args, **kwargs):
+            if _current_span.get() is None:
+                return method(*args, **kwargs)
+            with span(f"SWF.{operation}", attributes):
+                return method(*args, **kwargs)
+
+        return call
+
+
+def trace_client(client: Any) -> Any:
+    """
+    Envolve o cliente em um ``TracedClient`` se o tracing está ativo.
+
+    Args:
+        client: Cliente boto3 do SWF ou compatível
+
+    Returns:
+        O proxy com spans por chamada, ou o próprio cliente sem tracer ativo
+    """
+    if not is_enabled() or isinstance(client, TracedClient):
+        return client
+    return TracedClient(client)
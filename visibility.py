@@ -0,0 +1,392 @@
+"""
+Listagem e contagem de execuções de workflow (APIs de visibilidade do SWF).
+
+``ListOpenWorkflowExecutions``/``ListClosedWorkflowExecutions`` devolvem
+páginas de até 1000 execuções, e cada página depende do token da anterior.
+Para listar intervalos grandes, o intervalo de tempo é dividido em janelas
+(``VISIBILITY_WINDOWS``) lidas em paralelo (``VISIBILITY_CONCURRENCY``);
+as execuções são repassadas conforme as páginas chegam, sem esperar o fim
+da listagem, e no máximo algumas páginas ficam em memória por vez.
+
+O SWF aceita um único filtro por chamada (tag, tipo, status de
+encerramento ou workflowId exato). O mais seletivo é enviado ao SWF e os
+demais, assim como o prefixo de workflowId, são aplicados localmente.
+Contagens com no máximo um filtro usam ``CountOpenWorkflowExecutions``/
+``CountClosedWorkflowExecutions``, que não listam as execuções.
+
+Uso:
+    python visibility.py list --status closed --close-status FAILED --start 2024-05-01
+    python visibility.py count --status open --prefix workflow-ORD-
+    python visibility.py list --status closed | python analytics.py --executions -
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import queue
+import sys
+import threading
+import time
+from collections.abc import Iterator
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable
+
+import structured_log
+from config import Config
+from poller_control import backoff_delay, is_throttling_error
+from swf_client import SWFClient
+
+logger = structured_log.get_logger(__name__)
+
+STATUSES = ("open", "closed")
+CLOSE_STATUSES = (
+    "COMPLETED",
+    "FAILED",
+    "CANCELED",
+    "TERMINATED",
+    "CONTINUED_AS_NEW",
+    "TIMED_OUT",
+)
+
+_OPERATIONS = {
+    "open": ("list_open_workflow_executions", "count_open_workflow_executions"),
+    "closed": ("list_closed_workflow_executions", "count_closed_workflow_executions"),
+}
+
+# Marca o fim de uma janela na fila de resultados
+_DONE = object()
+
+
+def _utc(value: datetime) -> datetime:
+    return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+
+
+def split_windows(start: datetime, end: datetime, count: int) -> list[tuple[datetime, datetime]]:
+    """
+    Divide ``[start, end]`` em até ``count`` janelas contíguas de mesma duração.
+
+    Args:
+        start (datetime): Início do intervalo
+        end (datetime): Fim do intervalo
+        count (int): Número de janelas
+
+    Returns:
+        list: Pares ``(início, fim)``; o fim de uma janela é o início da seguinte
+    """
+    if end <= start:
+        raise ValueError("end must be after start")
+    step = (end - start) / max(count, 1)
+    bounds = [start + step * index for index in range(max(count, 1))] + [end]
+    return [(low, high) for low, high in zip(bounds, bounds[1:]) if high > low]
+
+
+class WorkflowVisibility:
+    """Lista e conta execuções de um domínio, com filtros e leitura paralela."""
+
+    def __init__(
+        self,
+        swf_client: SWFClient | None = None,
+        concurrency: int | None = None,
+        windows: int | None = None,
+        page_size: int | None = None,
+        max_retries: int | None = None,
+    ):
+        """
+        Args:
+            swf_client (SWFClient): Cliente usado nas chamadas (padrão: um novo SWFClient)
+            concurrency (int): Janelas lidas ao mesmo tempo (padrão: Config.VISIBILITY_CONCURRENCY)
+            windows (int): Janelas por listagem (padrão: Config.VISIBILITY_WINDOWS)
+            page_size (int): Execuções por página (padrão: Config.VISIBILITY_PAGE_SIZE)
+            max_retries (int): Tentativas extras após throttling
+                (padrão: Config.VISIBILITY_MAX_RETRIES)
+        """
+        self.swf_client = swf_client or SWFClient()
+        self.concurrency = concurrency or Config.VISIBILITY_CONCURRENCY
+        self.windows = windows or Config.VISIBILITY_WINDOWS
+        self.page_size = page_size or Config.VISIBILITY_PAGE_SIZE
+        self.max_retries = Config.VISIBILITY_MAX_RETRIES if max_retries is None else max_retries
+
+    def _call(self, operation: str, **kwargs: Any) -> dict:
+        attempt = 0
+        while True:
+            try:
+                method = getattr(self.swf_client.client, operation)
+                return method(domain=self.swf_client.domain, **kwargs)
+            except Exception as e:
+                attempt += 1
+                if not is_throttling_error(e) or attempt > self.max_retries:
+                    raise
+                time.sleep(
+                    backoff_delay(attempt, Config.POLLER_BACKOFF_BASE, Config.POLLER_BACKOFF_MAX)
+                )
+
+    @staticmethod
+    def _plan(
+        status: str,
+        tag: str | None,
+        workflow_type: dict | str | None,
+        close_status: str | None,
+        workflow_id_prefix: str | None,
+    ) -> tuple[dict, Callable[[dict], bool], bool]:
+        """
+        Escolhe o filtro enviado ao SWF e monta o filtro local.
+
+        Returns:
+            tuple: ``(filtro do SWF, predicado local, se o predicado descarta algo)``
+        """
+        if status not in STATUSES:
+            raise ValueError(f"status must be one of {STATUSES}, got {status!r}")
+        if close_status is not None and status != "closed":
+            raise ValueError("close_status requires status='closed'")
+        if isinstance(workflow_type, str):
+            workflow_type = {"name": workflow_type}
+
+        # Do mais para o menos seletivo: só o primeiro vai para o SWF
+        candidates = []
+        if close_status is not None:
+            candidates.append(("closeStatusFilter", {"status": close_status}))
+        if tag is not None:
+            candidates.append(("tagFilter", {"tag": tag}))
+        if workflow_type is not None:
+            candidates.append(("typeFilter", workflow_type))
+        server = dict(candidates[:1])
+        local = len(candidates) > 1 or bool(workflow_id_prefix)
+
+        def matches(info: dict) -> bool:
+            if workflow_id_prefix and not info["execution"]["workflowId"].startswith(
+                workflow_id_prefix
+            ):
+                return False
+            if tag is not None and tag not in info.get("tagList", []):
+                return False
+            if close_status is not None and info.get("closeStatus") != close_status:
+                return False
+            if workflow_type is not None:
+                if info["workflowType"]["name"] != workflow_type["name"]:
+                    return False
+                if workflow_type.get("version") not in (None, info["workflowType"]["version"]):
+                    return False
+            return True
+
+        return server, matches, local
+
+    def iter_executions(
+        self,
+        start: datetime,
+        end: datetime | None = None,
+        status: str = "open",
+        tag: str | None = None,
+        workflow_type: dict | str | None = None,
+        close_status: str | None = None,
+        workflow_id_prefix: str | None = None,
+        time_field: str = "start",
+    ) -> Iterator[dict]:
+        """
+        Lista execuções em paralelo por janelas de tempo.
+
+        As execuções vêm na ordem em que as páginas chegam (mais recentes
+        primeiro dentro de cada janela), não em ordem global. Parar de
+        consumir o iterador (``close()`` ou ``break``) cancela as leituras
+        pendentes; um erro de qualquer janela é relançado para quem consome.
+
+        Args:
+            start (datetime): Início do intervalo (datas sem fuso são UTC)
+            end (datetime): Fim do intervalo (padrão: agora)
+            status (str): ``open`` ou ``closed``
+            tag (str): Só execuções com esta tag
+            workflow_type (dict | str): Tipo (``{"name", "version"}`` ou só o nome)
+            close_status (str): Status de encerramento (ex.: ``FAILED``); requer ``closed``
+            workflow_id_prefix (str): Só workflowIds com este prefixo
+            time_field (str): ``start`` ou ``close`` (só para ``closed``):
+                data comparada com o intervalo
+
+        Yields:
+            dict: ``executionInfo`` do SWF (execution, workflowType, startTimestamp, ...)
+        """
+        server, matches, _local = self._plan(
+            status, tag, workflow_type, close_status, workflow_id_prefix
+        )
+        if time_field not in ("start", "close") or (time_field == "close" and status != "closed"):
+            raise ValueError("time_field must be 'start', or 'close' with status='closed'")
+        time_filter = "startTimeFilter" if time_field == "start" else "closeTimeFilter"
+        time_key = "startTimestamp" if time_field == "start" else "closeTimestamp"
+        operation = _OPERATIONS[status][0]
+        windows = split_windows(_utc(start), _utc(end or datetime.now(timezone.utc)), self.windows)
+
+        results: queue.Queue = queue.Queue(maxsize=self.concurrency * 2)
+        stop = threading.Event()
+
+        def put(item: Any) -> None:
+            while not stop.is_set():
+                try:
+                    results.put(item, timeout=0.1)
+                    return
+                except queue.Full:
+                    continue
+
+        def fetch(low: datetime, high: datetime, last: bool) -> None:
+            # As datas dos filtros são inclusivas: execuções exatamente no
+            # limite entre duas janelas ficam só na janela seguinte
+            request = {time_filter: {"oldestDate": low, "latestDate": high}, **server}
+            token = None
+            while not stop.is_set():
+                if token:
+                    request["nextPageToken"] = token
+                response = self._call(operation, maximumPageSize=self.page_size, **request)
+                infos = [
+                    info
+                    for info in response.get("executionInfos", [])
+                    if (last or info[time_key] < high) and matches(info)
+                ]
+                if infos:
+                    put(infos)
+                token = response.get("nextPageToken")
+                if not token:
+                    return
+
+        def run(low: datetime, high: datetime, last: bool) -> None:
+            try:
+                fetch(low, high, last)
+            except Exception as e:
+                put(e)
+            put(_DONE)
+
+        executor = ThreadPoolExecutor(min(self.concurrency, len(windows)), "visibility")
+        try:
+            for index, (low, high) in enumerate(windows):
+                executor.submit(run, low, high, index == len(windows) - 1)
+            pending = len(windows)
+            while pending:
+                item = results.get()
+                if item is _DONE:
+                    pending -= 1
+                elif isinstance(item, Exception):
+                    raise item
+                else:
+                    yield from item
+        finally:
+            stop.set()
+            executor.shutdown(wait=True, cancel_futures=True)
+
+    def count_executions(
+        self,
+        start: datetime,
+        end: datetime | None = None,
+        status: str = "open",
+        tag: str | None = None,
+        workflow_type: dict | str | None = None,
+        close_status: str | None = None,
+        workflow_id_prefix: str | None = None,
+        time_field: str = "start",
+    ) -> dict:
+        """
+        Conta execuções com os mesmos filtros de ``iter_executions``.
+
+        Com no máximo um filtro (tag, tipo ou status de encerramento) e sem
+        prefixo, usa uma única chamada de contagem do SWF. Caso contrário,
+        conta a listagem paralela.
+
+        Returns:
+            dict: ``count`` e ``truncated`` (o SWF limita contagens muito grandes)
+        """
+        server, _matches, local = self._plan(
+            status, tag, workflow_type, close_status, workflow_id_prefix
+        )
+        if local:
+            logger.debug("visibility_count_by_listing", status=status)
+            count = sum(
+                1
+                for _info in self.iter_executions(
+                    start,
+                    end,
+                    status,
+                    tag,
+                    workflow_type,
+                    close_status,
+                    workflow_id_prefix,
+                    time_field,
+                )
+            )
+            return {"count": count, "truncated": False}
+
+        time_filter = "startTimeFilter" if time_field == "start" else "closeTimeFilter"
+        end = _utc(end or datetime.now(timezone.utc))
+        response = self._call(
+            _OPERATIONS[status][1],
+            **{time_filter: {"oldestDate": _utc(start), "latestDate": end}},
+            **server,
+        )
+        return {"count": response["count"], "truncated": response.get("truncated", False)}
+
+
+def _isoformat(value: datetime | None) -> str | None:
+    return value.isoformat() if value is not None else None
+
+
+def execution_record(info: dict) -> dict:
+    """Linha JSON da CLI (com ``workflow_id``/``run_id``, como ``workflow_starter --bulk``)."""
+    return {
+        "workflow_id": info["execution"]["workflowId"],
+        "run_id": info["execution"]["runId"],
+        "workflow_type": info["workflowType"],
+        "status": info["executionStatus"],
+        "close_status": info.get("closeStatus"),
+        "start": _isoformat(info.get("startTimestamp")),
+        "close": _isoformat(info.get("closeTimestamp")),
+        "tags": info.get("tagList", []),
+    }
+
+
+def _parse_datetime(value: str) -> datetime:
+    return _utc(datetime.fromisoformat(value))
+
+
+def main(argv: list[str] | None = None) -> int:
+    """Ponto de entrada: ``python visibility.py``."""
+    parser = argparse.ArgumentParser(description="Lista e conta execuções de workflow")
+    parser.add_argument("command", choices=("list", "count"))
+    parser.add_argument("--status", choices=STATUSES, default="open")
+    parser.add_argument(
+        "--start", type=_parse_datetime, help="Início do intervalo, ISO 8601 (padrão: 24h atrás)"
+    )
+    parser.add_argument("--end", type=_parse_datetime, help="Fim do intervalo (padrão: agora)")
+    parser.add_argument(
+        "--time-field", choices=("start", "close"), default="start", help="Data filtrada"
+    )
+    parser.add_argument("--tag", help="Só execuções com esta tag")
+    parser.add_argument("--type", metavar="NOME[:VERSÃO]", help="Tipo de workflow")
+    parser.add_argument("--close-status", choices=CLOSE_STATUSES)
+    parser.add_argument("--prefix", help="Prefixo do workflowId")
+    parser.add_argument("--concurrency", type=int, help="Janelas lidas ao mesmo tempo")
+    parser.add_argument("--windows", type=int, help="Janelas de tempo por listagem")
+    args = parser.parse_args(argv)
+
+    workflow_type = None
+    if args.type:
+        name, _, version = args.type.partition(":")
+        workflow_type = {"name": name, **({"version": version} if version else {})}
+    end = args.end or datetime.now(timezone.utc)
+    filters = dict(
+        start=args.start or end - timedelta(hours=24),
+        end=end,
+        status=args.status,
+        tag=args.tag,
+        workflow_type=workflow_type,
+        close_status=args.close_status,
+        workflow_id_prefix=args.prefix,
+        time_field=args.time_field,
+    )
+    visibility = WorkflowVisibility(concurrency=args.concurrency, windows=args.windows)
+
+    if args.command == "count":
+        print(json.dumps(visibility.count_executions(**filters)))
+        return 0
+    for info in visibility.iter_executions(**filters):
+        print(json.dumps(execution_record(info)))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,418 @@
+"""
+Definições declarativas de workflows.
+
+Um workflow é um grafo acíclico de etapas: cada etapa declara as etapas
+das quais depende (``depends_on``) e fica pronta quando todas foram
+concluídas. O decider agenda todas as etapas prontas na mesma decisão, de
+modo que etapas independentes rodam em paralelo e a latência total fica
+limitada pelo caminho crítico.
+
+Cada etapa declara também o que lê: campos do input do workflow
+(``input_fields``) e resultados de etapas anteriores (``reads_results``).
+O decider monta o input de cada atividade apenas com esses dados, em vez
+de copiar o input inteiro e todos os resultados já produzidos.
+
+Definições são compiladas uma única vez em um ``WorkflowPlan``: índices de
+dependentes e contadores de dependências pendentes, mais uma tabela de
+transições por estado de atividade. Durante o replay, cada evento de
+atividade avança o progresso das etapas em O(1) (mais os dependentes
+liberados), e o decider lê as etapas prontas, em aberto e com falha
+diretamente, sem reavaliar o grafo. O ``WorkflowRegistry`` guarda um plano
+por ``(nome, versão)``, permitindo que um decider atenda vários tipos de
+workflow.
+
+``projection_report`` compara, etapa a etapa, o tamanho do input projetado
+com o do input completo (comportamento anterior).
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from typing import Any
+
+from codec import encode
+from config import Config
+
+
+@dataclass(frozen=True)
+class StepDefinition:
+    """
+    Etapa de um workflow.
+
+    Atributos:
+        name (str): Tipo de atividade executado pela etapa
+        depends_on (tuple): Etapas que precisam estar concluídas antes desta
+        reads_results (tuple): Etapas cujos resultados entram em ``previous_results``
+        input_fields (tuple | None): Campos do input do workflow repassados
+            (None repassa o input inteiro)
+    """
+
+    name: str
+    depends_on: tuple[str, ...] = ()
+    reads_results: tuple[str, ...] = ()
+    input_fields: tuple[str, ...] | None = None
+
+    def build_input(self, workflow_input: dict, activity_results: dict) -> dict:
+        """
+        Monta o input da atividade apenas com os dados declarados.
+
+        Args:
+            workflow_input (dict): Input do workflow
+            activity_results (dict): Resultados das etapas concluídas
+
+        Returns:
+            dict: Input projetado; ``previous_results`` só aparece se a
+            etapa lê algum resultado
+        """
+        if self.input_fields is None:
+            activity_input = dict(workflow_input)
+        else:
+            activity_input = {
+                key: workflow_input[key] for key in self.input_fields if key in workflow_input
+            }
+        if self.reads_results:
+            activity_input["previous_results"] = {
+                name: activity_results[name]
+                for name in self.reads_results
+                if name in activity_results
+            }
+        return activity_input
+
+
+@dataclass(frozen=True)
+class WorkflowDefinition:
+    """
+    Tipo de workflow e o grafo de dependências das suas etapas.
+
+    A definição é validada na criação: dependências precisam existir, o
+    grafo não pode ter ciclos e uma etapa só pode ler resultados de etapas
+    das quais depende (direta ou indiretamente).
+    """
+
+    name: str
+    version: str
+    steps: tuple[StepDefinition, ...]
+    _by_name: dict[str, StepDefinition] = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self):
+        object.__setattr__(self, "_by_name", {step.name: step for step in self.steps})
+        self._validate()
+
+    def _validate(self) -> None:
+        ancestors: dict[str, set[str]] = {}
+        visiting: set[str] = set()
+
+        def visit(name: str) -> set[str]:
+            if name in ancestors:
+                return ancestors[name]
+            if name in visiting:
+                raise ValueError(f"Workflow '{self.name}' has a dependency cycle at '{name}'")
+            visiting.add(name)
+            found: set[str] = set()
+            for dependency in self._by_name[name].depends_on:
+                if dependency not in self._by_name:
+                    raise ValueError(f"Step '{name}' depends on unknown step '{dependency}'")
+                found |= {dependency} | visit(dependency)
+            visiting.discard(name)
+            ancestors[name] = found
+            return found
+
+        for step in self.steps:
+            unreachable = set(step.reads_results) - visit(step.name)
+            if unreachable:
+                raise ValueError(
+                    f"Step '{step.name}' reads results of {sorted(unreachable)} "
+                    "without depending on them"
+                )
+
+    @property
+    def step_names(self) -> list[str]:
+        """Nomes das etapas, na ordem em que foram declaradas."""
+        return [step.name for step in self.steps]
+
+    def ready_steps(self, activity_status: dict[str, str]) -> list[StepDefinition]:
+        """
+        Etapas prontas para agendar.
+
+        Args:
+            activity_status (dict): Último estado de cada atividade (ver ``history``)
+
+        Returns:
+            list: Etapas nunca agendadas cujas dependências foram concluídas
+        """
+        return [
+            step
+            for step in self.steps
+            if step.name not in activity_status
+            and all(activity_status.get(dep) == "completed" for dep in step.depends_on)
+        ]
+
+    def step(self, name: str) -> StepDefinition | None:
+        """Etapa pelo nome (None para atividades fora da definição, ex.: rollback)."""
+        return self._by_name.get(name)
+
+
+# Estados de atividade que contam como falha da etapa (sujeitos a retry)
+FAILURE_STATUSES = ("failed", "timed_out", "canceled")
+
+
+class WorkflowPlan:
+    """
+    Definição compilada em tabela de transições.
+
+    O progresso de uma execução é um dict simples (armazenado no estado do
+    replay e, portanto, no cache de replay do decider)::
+
+        {
+            "waiting": {etapa: dependências ainda não concluídas},
+            "ready": {etapa: True},   # prontas, em ordem de liberação
+            "open": {etapa: True},    # agendadas, sem resultado
+            "failed": {etapa: True},  # último resultado foi falha/timeout/cancelamento
+            "done": {etapa: True},    # concluídas ao menos uma vez
+        }
+    """
+
+    def __init__(self, definition: WorkflowDefinition):
+        """
+        Args:
+            definition (WorkflowDefinition): Definição validada
+        """
+        self.definition = definition
+        self.name = definition.name
+        self.version = definition.version
+        self.step_names = tuple(definition.step_names)
+        self.steps = {step.name: step for step in definition.steps}
+        self.dependency_count = {step.name: len(step.depends_on) for step in definition.steps}
+        dependents: dict[str, list[str]] = {name: [] for name in self.step_names}
+        for step in definition.steps:
+            for dependency in step.depends_on:
+                dependents[dependency].append(step.name)
+        self.dependents = {name: tuple(names) for name, names in dependents.items()}
+        self.roots = tuple(name for name, count in self.dependency_count.items() if not count)
+
+        # Tabela de transições: estado da atividade -> ação sobre o progresso
+        self.transitions = {
+            "scheduled": self._on_scheduled,
+            "completed": self._on_completed,
+            **{status: self._on_failure for status in FAILURE_STATUSES},
+        }
+
+    def initial_progress(self) -> dict[str, dict]:
+        """Progresso de uma execução sem nenhum evento aplicado."""
+        return {
+            "waiting": {name: count for name, count in self.dependency_count.items() if count},
+            "ready": dict.fromkeys(self.roots, True),
+            "open": {},
+            "failed": {},
+            "done": {},
+        }
+
+    def advance(self, progress: dict, activity_name: str, status: str) -> None:
+        """
+        Aplica a mudança de estado de uma atividade ao progresso.
+
+        Atividades fora da definição (rollback, compensação) são ignoradas.
+
+        Args:
+            progress (dict): Progresso da execução (alterado no lugar)
+            activity_name (str): Nome da atividade
+            status (str): Novo estado da atividade
+        """
+        if activity_name in self.steps:
+            self.transitions[status](progress, activity_name)
+
+    def _on_scheduled(self, progress, name):
+        progress["ready"].pop(name, None)
+        progress["failed"].pop(name, None)
+        progress["open"][name] = True
+
+    def _on_completed(self, progress, name):
+        progress["ready"].pop(name, None)
+        progress["open"].pop(name, None)
+        progress["failed"].pop(name, None)
+        if name in progress["done"]:
+            return  # Reexecução (retomada): dependentes já foram liberados
+        progress["done"][name] = True
+        waiting = progress["waiting"]
+        for dependent in self.dependents[name]:
+            waiting[dependent] -= 1
+            if not waiting[dependent]:
+                del waiting[dependent]
+                progress["ready"][dependent] = True
+
+    def _on_failure(self, progress, name):
+        progress["ready"].pop(name, None)
+        progress["open"].pop(name, None)
+        progress["failed"][name] = True
+
+    def progress_from_status(self, activity_status: dict[str, str]) -> dict[str, dict]:
+        """
+        Progresso equivalente a um mapa de estados de atividade.
+
+        Usado quando o estado não foi montado por um replay com este plano.
+
+        Args:
+            activity_status (dict): Último estado de cada atividade
+
+        Returns:
+            dict: Progresso no formato de ``initial_progress``
+        """
+        progress = self.initial_progress()
+        # Conclusões primeiro: liberam dependentes que podem já estar em andamento
+        for name in self.step_names:
+            if activity_status.get(name) == "completed":
+                self.advance(progress, name, "completed")
+        for name in self.step_names:
+            status = activity_status.get(name)
+            if status is not None and status != "completed":
+                self.advance(progress, name, status)
+        return progress
+
+    def is_complete(self, progress: dict) -> bool:
+        """Indica se todas as etapas foram concluídas."""
+        return len(progress["done"]) == len(self.step_names) and not progress["open"]
+
+    def step(self, name: str) -> StepDefinition | None:
+        """Etapa pelo nome (None para atividades fora da definição)."""
+        return self.steps.get(name)
+
+
+def compile_workflow(definition: WorkflowDefinition) -> WorkflowPlan:
+    """Compila uma definição em um ``WorkflowPlan``."""
+    return WorkflowPlan(definition)
+
+
+class WorkflowRegistry:
+    """Planos compilados por ``(nome, versão)`` do tipo de workflow."""
+
+    def __init__(self, definitions: tuple[WorkflowDefinition, ...] = ()):
+        """
+        Args:
+            definitions (tuple): Definições registradas (compiladas na hora)
+        """
+        self._plans: dict[tuple[str, str], WorkflowPlan] = {}
+        for definition in definitions:
+            self.register(definition)
+
+    def register(self, definition: WorkflowDefinition) -> WorkflowPlan:
+        """
+        Compila e registra uma definição; substitui a anterior de mesmo tipo.
+
+        Returns:
+            WorkflowPlan: Plano compilado
+        """
+        plan = compile_workflow(definition)
+        self._plans[(definition.name, definition.version)] = plan
+        return plan
+
+    def get(self, name: str, version: str) -> WorkflowPlan:
+        """
+        Plano do tipo de workflow.
+
+        Raises:
+            KeyError: Se o tipo não foi registrado
+        """
+        try:
+            return self._plans[(name, version)]
+        except KeyError:
+            raise KeyError(
+                f"Workflow type '{name}' version '{version}' is not registered"
+            ) from None
+
+    def for_task(self, task: dict, default: WorkflowPlan | None = None) -> WorkflowPlan:
+        """
+        Plano do ``workflowType`` de uma decision task.
+
+        Args:
+            task (dict): Decision task retornada pelo SWF
+            default (WorkflowPlan): Usado quando a task não informa o tipo
+
+        Returns:
+            WorkflowPlan: Plano do tipo de workflow da task
+        """
+        workflow_type = task.get("workflowType")
+        if not workflow_type:
+            return default or self.get(Config.WORKFLOW_NAME, Config.WORKFLOW_VERSION)
+        return self.get(workflow_type["name"], workflow_type["version"])
+
+    def __iter__(self):
+        return iter(self._plans.values())
+
+
+# Processo de negócio padrão (registrado por setup.py)
+BUSINESS_PROCESS_WORKFLOW = WorkflowDefinition(
+    name=Config.WORKFLOW_NAME,
+    version=Config.WORKFLOW_VERSION,
+    steps=(
+        StepDefinition("ValidateInput"),
+        # ProcessData e EnrichData são independentes: rodam em paralelo
+        StepDefinition(
+            "ProcessData",
+            depends_on=("ValidateInput",),
+            reads_results=("ValidateInput",),
+            input_fields=("order_id", "items"),
+        ),
+        StepDefinition(
+            "EnrichData",
+            depends_on=("ValidateInput",),
+            reads_results=("ValidateInput",),
+            input_fields=("order_id", "customer_id"),
+        ),
+        # Junção: SaveResults aguarda os dois ramos
+        StepDefinition(
+            "SaveResults",
+            depends_on=("ProcessData", "EnrichData"),
+            reads_results=("ProcessData", "EnrichData"),
+            input_fields=("order_id",),
+        ),
+        StepDefinition(
+            "NotifyCompletion",
+            depends_on=("SaveResults",),
+            input_fields=("order_id", "customer_id"),
+        ),
+    ),
+)
+
+
+# Registro padrão usado pelo decision worker
+default_registry = WorkflowRegistry((BUSINESS_PROCESS_WORKFLOW,))
+
+
+def full_input(workflow_input: dict, activity_results: dict) -> dict:
+    """Input sem projeção: input do workflow mais todos os resultados."""
+    return {**workflow_input, "previous_results": activity_results}
+
+
+def projection_report(
+    definition: WorkflowDefinition, workflow_input: dict, activity_results: dict
+) -> list[dict[str, Any]]:
+    """
+    Bytes economizados pela projeção em cada etapa.
+
+    Cada etapa é medida com os resultados disponíveis no momento em que
+    seria agendada (os das etapas anteriores).
+
+    Args:
+        definition (WorkflowDefinition): Workflow a analisar
+        workflow_input (dict): Input do workflow
+        activity_results (dict): Resultados de uma execução completa
+
+    Returns:
+        list: ``{'step', 'full_bytes', 'projected_bytes', 'saved_bytes'}`` por etapa
+    """
+    report = []
+    available: dict = {}
+    for step in definition.steps:
+        full_bytes = len(encode(full_input(workflow_input, available)))
+        projected_bytes = len(encode(step.build_input(workflow_input, available)))
+        report.append(
+            {
+                "step": step.name,
+                "full_bytes": full_bytes,
+                "projected_bytes": projected_bytes,
+                "saved_bytes": full_bytes - projected_bytes,
+            }
+        )
+        if step.name in activity_results:
+            available[step.name] = activity_results[step.name]
+    return report
@@ -5,11 +5,27 @@ Este módulo fornece funcionalidades para iniciar, controlar e monitorar
 execuções de workflow, incluindo sinais, histórico e retomada de etapas.
 """
 
+import argparse
 import json
+import sys
 import time
 import uuid
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 from swf_client import SWFClient
 from config import Config
+from codec import encode
+from payload_store import dehydrate
+from poller_control import backoff_delay, is_throttling_error
+from rate_limit import TokenBucket
+from history_cache import get_history_cache
+from visibility import WorkflowVisibility
+import metrics
+import tracing
+import structured_log
+
+
+logger = structured_log.get_logger(__name__)
+
 
 class WorkflowStarter:
     """
@@ -21,12 +37,26 @@ class WorkflowStarter:
     - Consultar histórico de execução
     - Terminar workflows
     - Retomar workflows a partir de etapas específicas
+    - Listar e contar execuções (ver ``visibility``)
     """
     
     def __init__(self):
         """Inicializa o WorkflowStarter com cliente SWF."""
         self.swf_client = SWFClient()
     
+    def visibility(self, concurrency=None, windows=None):
+        """
+        Listagem e contagem de execuções do domínio, com o mesmo cliente SWF.
+        
+        Args:
+            concurrency (int): Janelas lidas ao mesmo tempo (padrão: Config.VISIBILITY_CONCURRENCY)
+            windows (int): Janelas de tempo por listagem (padrão: Config.VISIBILITY_WINDOWS)
+        
+        Returns:
+            WorkflowVisibility: Objeto com ``iter_executions`` e ``count_executions``
+        """
+        return WorkflowVisibility(self.swf_client, concurrency=concurrency, windows=windows)
+    
     def start_workflow(self, workflow_input):
         """
         Inicia uma nova execução de workflow.
@@ -48,6 +78,35 @@ class WorkflowStarter:
         workflow_id = f"workflow-{uuid.uuid4()}"
         
         try:
+            run_id = self._start_execution(workflow_id, workflow_input)
+            logger.info('workflow_started', workflow_id=workflow_id, run_id=run_id)
+            
+            return {
+                'workflow_id': workflow_id,
+                'run_id': run_id
+            }
+            
+        except Exception as e:
+            logger.error('workflow_start_error', workflow_id=workflow_id, error=e)
+            raise
+    
+    def _start_execution(self, workflow_id, workflow_input):
+        """
+        Chama ``start_workflow_execution`` e devolve o run_id.
+        
+        Args:
+            workflow_id (str): ID do workflow
+            workflow_input (dict): Dados de entrada para o workflow
+        
+        Returns:
+            str: Run ID da execução iniciada
+        """
+        # Raiz do trace do workflow: o contexto segue no input até o decider
+        with tracing.span('start_workflow', {'workflow.id': workflow_id}) as span:
+            # Dados de entrada serializados (inputs grandes vão para o payload_store)
+            serialized_input = dehydrate(encode(tracing.inject(workflow_input)))
+            metrics.PAYLOAD_BYTES.labels('workflow_input').observe(len(serialized_input))
+            
             # Inicia a execução do workflow no SWF
             response = self.swf_client.client.start_workflow_execution(
                 domain=self.swf_client.domain,
@@ -57,26 +116,88 @@ class WorkflowStarter:
                     'version': Config.WORKFLOW_VERSION
                 },
                 taskList={'name': self.swf_client.task_list},  # Fila para decision tasks
-                input=json.dumps(workflow_input),  # Dados de entrada serializados
+                input=serialized_input,
                 executionStartToCloseTimeout=Config.EXECUTION_START_TO_CLOSE_TIMEOUT,
                 taskStartToCloseTimeout=Config.DECISION_TASK_TIMEOUT,
                 childPolicy='TERMINATE'  # Política para workflows filhos
             )
-            
-            # Extrai o run_id da resposta (identificador único desta execução)
-            run_id = response['runId']
-            print(f"Workflow started successfully!")
-            print(f"Workflow ID: {workflow_id}")
-            print(f"Run ID: {run_id}")
-            
-            return {
-                'workflow_id': workflow_id,
-                'run_id': run_id
-            }
-            
-        except Exception as e:
-            print(f"Error starting workflow: {e}")
-            raise
+            span.set_attribute('workflow.run_id', response['runId'])
+        
+        # Extrai o run_id da resposta (identificador único desta execução)
+        return response['runId']
+    
+    def start_workflows_bulk(self, inputs, concurrency=None, rate=None, burst=None,
+                             max_retries=None, workflow_id_for=None):
+        """
+        Inicia muitos workflows em paralelo, com limite de taxa.
+        
+        Os inputs são consumidos sob demanda (aceita geradores com milhões
+        de itens): no máximo ``2 * concurrency`` inícios ficam pendentes ao
+        mesmo tempo. Cada chamada consome um token de um token bucket
+        compartilhado. Inícios recusados por throttling são repetidos com
+        backoff exponencial com jitter; outros erros são devolvidos no
+        resultado, sem interromper o lote.
+        
+        Args:
+            inputs (iterable): Dados de entrada de cada workflow
+            concurrency (int): Inícios simultâneos (padrão: Config.STARTER_BULK_CONCURRENCY)
+            rate (float): Chamadas por segundo (padrão: Config.STARTER_RATE_LIMIT)
+            burst (float): Rajada máxima de chamadas (padrão: Config.STARTER_RATE_BURST)
+            max_retries (int): Tentativas extras após throttling (padrão: Config.STARTER_MAX_RETRIES)
+            workflow_id_for (callable): Gera o workflowId a partir do input;
+                use um ID determinístico (ex.: pelo order_id) para que
+                reexecuções do lote não dupliquem workflows
+        
+        Yields:
+            tuple: ``(input, workflow_id, run_id)`` em caso de sucesso ou
+            ``(input, workflow_id, exception)`` em caso de erro, na ordem
+            em que os inícios terminam
+        """
+        concurrency = concurrency or Config.STARTER_BULK_CONCURRENCY
+        bucket = TokenBucket(rate or Config.STARTER_RATE_LIMIT, burst or Config.STARTER_RATE_BURST)
+        max_retries = Config.STARTER_MAX_RETRIES if max_retries is None else max_retries
+        workflow_id_for = workflow_id_for or (lambda _input: f"workflow-{uuid.uuid4()}")
+        
+        def start(workflow_input, workflow_id):
+            attempt = 0
+            while True:
+                bucket.acquire()
+                try:
+                    return self._start_execution(workflow_id, workflow_input)
+                except Exception as e:
+                    attempt += 1
+                    if not is_throttling_error(e) or attempt > max_retries:
+                        raise
+                    time.sleep(backoff_delay(
+                        attempt, Config.POLLER_BACKOFF_BASE, Config.POLLER_BACKOFF_MAX
+                    ))
+        
+        with ThreadPoolExecutor(concurrency, 'bulk-start') as executor:
+            pending = {}
+            iterator = iter(inputs)
+            exhausted = False
+            while pending or not exhausted:
+                # Mantém a fila de inícios cheia sem materializar o iterável
+                while not exhausted and len(pending) < concurrency * 2:
+                    try:
+                        workflow_input = next(iterator)
+                    except StopIteration:
+                        exhausted = True
+                        break
+                    workflow_id = workflow_id_for(workflow_input)
+                    future = executor.submit(start, workflow_input, workflow_id)
+                    pending[future] = (workflow_input, workflow_id)
+                
+                if not pending:
+                    break
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    workflow_input, workflow_id = pending.pop(future)
+                    try:
+                        outcome = future.result()
+                    except Exception as e:
+                        outcome = e
+                    yield workflow_input, workflow_id, outcome
     
     def signal_workflow(self, workflow_id, run_id, signal_name, signal_input):
         """
@@ -100,11 +221,12 @@ class WorkflowStarter:
                 workflowId=workflow_id,
                 runId=run_id,
                 signalName=signal_name,
-                input=json.dumps(signal_input)
+                input=dehydrate(encode(signal_input))
             )
-            print(f"Signal '{signal_name}' sent to workflow {workflow_id}")
+            logger.info('workflow_signaled', workflow_id=workflow_id, signal=signal_name)
         except Exception as e:
-            print(f"Error sending signal: {e}")
+            logger.error('workflow_signal_error', workflow_id=workflow_id, signal=signal_name,
+                         error=e)
             raise
     
     def get_workflow_history(self, workflow_id, run_id):
@@ -113,7 +235,8 @@ class WorkflowStarter:
         
         Recupera todos os eventos que ocorreram durante a execução,
         incluindo início, atividades agendadas, completadas, falhas, etc.
-        Útil para debugging e auditoria.
+        Útil para debugging e auditoria. Para históricos longos ou muitas
+        execuções, prefira ``iter_workflow_history``, que não monta a lista.
         
         Args:
             workflow_id (str): ID do workflow
@@ -126,38 +249,65 @@ class WorkflowStarter:
             Exception: Se houver erro ao obter o histórico
         """
         try:
-            events = []
-            next_page_token = None
-            
-            # Itera sobre todas as páginas de eventos (paginação automática)
-            while True:
-                params = {
-                    'domain': self.swf_client.domain,
-                    'execution': {
-                        'workflowId': workflow_id,
-                        'runId': run_id
-                    }
-                }
-                
-                # Adiciona token de paginação se houver mais páginas
-                if next_page_token:
-                    params['nextPageToken'] = next_page_token
-                
-                response = self.swf_client.client.get_workflow_execution_history(**params)
-                events.extend(response['events'])
-                
-                # Se não há mais páginas, termina o loop
-                if 'nextPageToken' not in response:
-                    break
-                
-                next_page_token = response['nextPageToken']
-            
-            return events
-            
+            return list(self.iter_workflow_history(workflow_id, run_id))
         except Exception as e:
-            print(f"Error getting workflow history: {e}")
+            logger.error('workflow_history_error', workflow_id=workflow_id, error=e)
             raise
     
+    def iter_workflow_history(self, workflow_id, run_id, reverse_order=False, page_size=None):
+        """
+        Percorre o histórico de eventos de um workflow sob demanda.
+        
+        As páginas são buscadas conforme os eventos são consumidos: quem
+        para antes do fim evita as chamadas restantes. O histórico de uma
+        execução encerrada, lido até o fim, é gravado no cache em disco
+        (``history_cache``) e as leituras seguintes não chamam a API.
+        
+        Args:
+            workflow_id (str): ID do workflow
+            run_id (str): ID da execução específica
+            reverse_order (bool): Eventos do mais recente para o mais antigo
+                (ex.: status final sem ler o histórico inteiro)
+            page_size (int): Eventos por página (``maximumPageSize``, até 1000)
+            
+        Yields:
+            dict: Eventos do workflow
+        """
+        domain = self.swf_client.domain
+        cache = get_history_cache()
+        if cache is not None:
+            cached = cache.open(domain, workflow_id, run_id, reverse_order)
+            if cached is not None:
+                yield from cached
+                return
+        
+        events = self._iter_history_events(workflow_id, run_id, reverse_order, page_size)
+        if cache is not None:
+            events = cache.record(domain, workflow_id, run_id, events, reverse_order)
+        yield from events
+    
+    def _iter_history_events(self, workflow_id, run_id, reverse_order, page_size):
+        """Eventos lidos da API, página a página, seguindo o ``nextPageToken``."""
+        params = {
+            'domain': self.swf_client.domain,
+            'execution': {
+                'workflowId': workflow_id,
+                'runId': run_id
+            },
+            'reverseOrder': reverse_order
+        }
+        if page_size:
+            params['maximumPageSize'] = page_size
+        
+        while True:
+            response = self.swf_client.client.get_workflow_execution_history(**params)
+            yield from response['events']
+            
+            # Se não há mais páginas, termina
+            if not response.get('nextPageToken'):
+                return
+            params['nextPageToken'] = response['nextPageToken']
+    
     def terminate_workflow(self, workflow_id, run_id, reason="Manual termination"):
         """
         Termina forçadamente um workflow em execução.
@@ -180,9 +330,9 @@ class WorkflowStarter:
                 runId=run_id,
                 reason=reason
             )
-            print(f"Workflow {workflow_id} terminated")
+            logger.info('workflow_terminated', workflow_id=workflow_id, reason=reason)
         except Exception as e:
-            print(f"Error terminating workflow: {e}")
+            logger.error('workflow_terminate_error', workflow_id=workflow_id, error=e)
             raise
     
     def resume_workflow_from_step(self, workflow_id, run_id, step_name):
@@ -208,17 +358,82 @@ class WorkflowStarter:
         
         # Envia sinal para o workflow
         self.signal_workflow(workflow_id, run_id, 'RESUME_FROM_STEP', signal_input)
-        print(f"Workflow will resume from step: {step_name}")
+        logger.info('workflow_resume_requested', workflow_id=workflow_id, step=step_name)
 
-if __name__ == '__main__':
+def read_jsonl(stream):
+    """
+    Lê inputs de workflow de um arquivo JSONL, um objeto por linha.
+    
+    Args:
+        stream: Arquivo de texto aberto
+    
+    Yields:
+        dict: Input de cada linha não vazia
+    """
+    for line in stream:
+        line = line.strip()
+        if line:
+            yield json.loads(line)
+
+
+def main(argv=None):
+    """
+    Ponto de entrada de linha de comando.
+    
+    Sem argumentos inicia um workflow de exemplo. Com ``--bulk ARQUIVO``
+    inicia um workflow por linha do JSONL (``-`` para stdin) e imprime um
+    resultado JSON por linha.
+    """
+    parser = argparse.ArgumentParser(description="Inicia workflows no SWF")
+    parser.add_argument('--bulk', metavar='ARQUIVO', help="JSONL com um input por linha ('-' para stdin)")
+    parser.add_argument('--concurrency', type=int, help="Inícios simultâneos")
+    parser.add_argument('--rate', type=float, help="Chamadas por segundo")
+    parser.add_argument('--id-field', help="Campo do input usado como workflowId (ex.: order_id)")
+    args = parser.parse_args(argv)
+    
     starter = WorkflowStarter()
     
-    # Exemplo de uso
-    workflow_input = {
-        'order_id': 'ORD-12345',
-        'items': ['item1', 'item2', 'item3'],
-        'customer_id': 'CUST-789'
-    }
+    if not args.bulk:
+        # Exemplo de uso
+        workflow_input = {
+            'order_id': 'ORD-12345',
+            'items': ['item1', 'item2', 'item3'],
+            'customer_id': 'CUST-789'
+        }
+        
+        result = starter.start_workflow(workflow_input)
+        logger.info('workflow_execution_details', **result)
+        return 0
     
-    result = starter.start_workflow(workflow_input)
-    print(f"\nWorkflow execution details: {result}")
+    workflow_id_for = None
+    if args.id_field:
+        workflow_id_for = lambda workflow_input: f"workflow-{workflow_input[args.id_field]}"
+    
+    stream = sys.stdin if args.bulk == '-' else open(args.bulk, encoding='utf-8')
+    started = failed = 0
+    try:
+        results = starter.start_workflows_bulk(
+            read_jsonl(stream),
+            concurrency=args.concurrency,
+            rate=args.rate,
+            workflow_id_for=workflow_id_for
+        )
+        for _input, workflow_id, outcome in results:
+            if isinstance(outcome, Exception):
+                failed += 1
+                print(json.dumps({'workflow_id': workflow_id, 'error': str(outcome)}))
+            else:
+                started += 1
+                print(json.dumps({'workflow_id': workflow_id, 'run_id': outcome}))
+    finally:
+        if stream is not sys.stdin:
+            stream.close()
+    
+    # Saída da CLI, não log: o resumo vai para o stderr para não se misturar
+    # às linhas JSON (e aos logs estruturados) do stdout
+    print(f"Started: {started}, failed: {failed}", file=sys.stderr)
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())